@@ -18,6 +18,7 @@ from inspect import ismethod
 from types import FunctionType
 from scipy.interpolate import RectBivariateSpline, interp1d
 from ..util.Pickling import read_pickle_file, write_pickle_file
+from ..util.ColumnFile import read_columns, column_file_exists
 try:
     # this runs with no issues in python 2 but raises error in python 3
     basestring
@@ -708,6 +709,15 @@ class BlobFactory(object):
     def _get_item(self, name):
         
         i, j, nd, dims = self.blob_info(name)
+        
+        # Binary output: can memory-map the whole thing.
+        fn = "{0!s}.blob_{1}d.{2!s}".format(self.prefix, nd, name)
+        if column_file_exists(fn):
+            data = read_columns(fn)
+            mask = np.logical_not(np.isfinite(data))
+            masked_data = np.ma.array(data, mask=mask)
+            self.blob_data = {name: masked_data}
+            return masked_data
     
         fn = "{0!s}.blob_{1}d.{2!s}.pkl".format(self.prefix, nd, name)
                                 
@@ -726,9 +736,12 @@ class BlobFactory(object):
                 by_proc = False
                 by_dd = True
                 
-                search_for = "{0!s}.dd????.blob_{1}d.{2!s}.pkl".format(\
-                    self.prefix, nd, name)
-                _ddf = glob.glob(search_for)
+                # Checkpoints can be a mix of binary and pickle files,
+                # e.g., if a blob was ragged at some point.
+                search_for = "{0!s}.dd????.blob_{1}d.{2!s}.{3!s}"
+                _ddf = glob.glob(search_for.format(self.prefix, nd, name,
+                    'pkl')) + glob.glob(search_for.format(self.prefix, nd, 
+                    name, 'idx'))
                         
                 if self.include_checkpoints is None:
                     ddf = _ddf
@@ -736,9 +749,12 @@ class BlobFactory(object):
                     ddf = []
                     for dd in self.include_checkpoints:
                         ddid = str(dd).zfill(4)
-                        tmp = "{0!s}.dd{1!s}.blob_{2}d.{3!s}.pkl".format(\
+                        tmp = "{0!s}.dd{1!s}.blob_{2}d.{3!s}".format(\
                             self.prefix, ddid, nd, name)
-                        ddf.append(tmp)
+                        if column_file_exists(tmp):
+                            ddf.append(tmp + '.idx')
+                        else:
+                            ddf.append(tmp + '.pkl')
                              
                 # Need to put in order if we want to match up with
                 # chain etc.
@@ -754,11 +770,14 @@ class BlobFactory(object):
             if not os.path.exists(fn):
                 break
         
-            all_data = []
-            data_chunks = read_pickle_file(fn, nloads=None, verbose=False)
-            for data_chunk in data_chunks:
-                all_data.extend(data_chunk)
-            del data_chunks
+            if fn.endswith('.idx'):
+                all_data = read_columns(fn[0:-4])
+            else:    
+                all_data = []
+                data_chunks = read_pickle_file(fn, nloads=None, verbose=False)
+                for data_chunk in data_chunks:
+                    all_data.extend(data_chunk)
+                del data_chunks
             
             print("# Loaded {}".format(fn))
                 
@@ -38,6 +38,8 @@ from ..util.Stats import Gauss1D, GaussND, error_2D, _error_2D_crude, \
     bin_e2c, correlation_matrix
 from ..util.ReadData import concatenate, read_pickled_chain,\
     read_pickled_logL
+from ..util.ColumnFile import read_columns, column_file_exists
+from ..util.CallLog import read_call_log
 try:
     # this runs with no issues in python 2 but raises error in python 3
     basestring
@@ -435,8 +437,12 @@ class ModelSet(BlobFactory):
         if not hasattr(self, '_is_mcmc'):
             if os.path.exists('{!s}.logL.pkl'.format(self.prefix)):
                 self._is_mcmc = True
+            elif column_file_exists('{!s}.logL'.format(self.prefix)):
+                self._is_mcmc = True
             elif glob.glob('{!s}.dd*.logL.pkl'.format(self.prefix)):
                 self._is_mcmc = True    
+            elif glob.glob('{!s}.dd*.logL.idx'.format(self.prefix)):
+                self._is_mcmc = True    
             else:
                 self._is_mcmc = False
 
@@ -450,6 +456,8 @@ class ModelSet(BlobFactory):
                     read_pickle_file('{!s}.facc.pkl'.format(self.prefix),\
                     nloads=None, verbose=False)
                 self._facc = np.array(self._facc)
+            elif column_file_exists('{!s}.facc'.format(self.prefix)):
+                self._facc = read_columns('{!s}.facc'.format(self.prefix))
             else:
                 self._facc = None
         
@@ -546,7 +554,8 @@ class ModelSet(BlobFactory):
         convention which starts with zero.
         """
         if not hasattr(self, '_saved_checkpoints'):
-            fns = glob.glob(self.prefix + '.dd*.chain.pkl')
+            fns = glob.glob(self.prefix + '.dd*.chain.pkl') \
+                + glob.glob(self.prefix + '.dd*.chain.idx')
             self._saved_checkpoints = [(int(fn[-14:-10])) for fn in fns]
             self._saved_checkpoints = sorted(self._saved_checkpoints)
             self._saved_checkpoints = np.array(self._saved_checkpoints)
@@ -569,13 +578,17 @@ class ModelSet(BlobFactory):
             chains = []
             for h, path in enumerate(paths):
             
+                have_chain_b = column_file_exists('{!s}/{!s}.chain'.format(path, 
+                    self.fn))
                 have_chain_f = os.path.exists('{!s}/{!s}.chain.pkl'.format(path, 
                     self.fn))
                 have_f = os.path.exists('{!s}/{!s}.pkl'.format(path, 
                     self.fn))
 
-                if have_chain_f or have_f:
-                    if have_chain_f:
+                if have_chain_b or have_chain_f or have_f:
+                    if have_chain_b:
+                        fn = '{!s}/{!s}.chain.bin'.format(path, self.fn)
+                    elif have_chain_f:
                         fn = '{!s}/{!s}.chain.pkl'.format(path, self.fn)
                     else:
                         fn = '{!s}/{!s}.pkl'.format(path, self.fn)
@@ -584,7 +597,11 @@ class ModelSet(BlobFactory):
                         print("# Loading {!s}...".format(fn))
                 
                     t1 = time.time()
-                    _chain = read_pickled_chain(fn)
+                    if have_chain_b:
+                        # Memory-mapped, so this is (almost) free.
+                        _chain = read_columns(fn[0:-4])
+                    else:    
+                        _chain = read_pickled_chain(fn)
                     t2 = time.time()
                 
                     if rank == 0:
@@ -656,18 +673,25 @@ class ModelSet(BlobFactory):
                     f.close()
                 
                 # If each "chunk" gets its own file.
-                elif glob.glob('{!s}.dd*.chain.pkl'.format(self.prefix)):
+                elif glob.glob('{!s}.dd*.chain.pkl'.format(self.prefix)) or \
+                     glob.glob('{!s}.dd*.chain.idx'.format(self.prefix)):
+                    
+                    if glob.glob('{!s}.dd*.chain.idx'.format(self.prefix)):
+                        ext = 'idx'
+                    else:
+                        ext = 'pkl'
                     
                     if self.include_checkpoints is not None:
                         outputs_to_read = []
                         for output_num in self.include_checkpoints:
                             dd = str(output_num).zfill(4)
-                            fn = '{0!s}.dd{1!s}.chain.pkl'.format(self.prefix, dd)
+                            fn = '{0!s}.dd{1!s}.chain.{2!s}'.format(self.prefix,
+                                dd, ext)
                             outputs_to_read.append(fn)
                     else:
                         # Only need to use "sorted" on the second time around
                         outputs_to_read = sorted(glob.glob(\
-                            '{!s}.dd*.chain.pkl'.format(self.prefix)))
+                            '{0!s}.dd*.chain.{1!s}'.format(self.prefix, ext)))
                                     
                     full_chain = []
                     if rank == 0:
@@ -677,7 +701,10 @@ class ModelSet(BlobFactory):
                         if not os.path.exists(fn):
                             print("# Found no output: {!s}".format(fn))
                             continue
-                        this_chain = read_pickled_chain(fn)
+                        if ext == 'idx':
+                            this_chain = read_columns(fn[0:-4])
+                        else:    
+                            this_chain = read_pickled_chain(fn)
                         full_chain.extend(this_chain)
                         
                     _chain = np.ma.array(full_chain, mask=0)
@@ -690,8 +717,12 @@ class ModelSet(BlobFactory):
                     self._chain = None         
                 
                 chains.append(_chain)        
-                
-            self._chain = np.concatenate(chains, axis=0)    
+            
+            # Don't copy a single (possibly memory-mapped) chain.
+            if len(chains) == 1:
+                self._chain = chains[0]
+            else:    
+                self._chain = np.concatenate(chains, axis=0)    
 
         return self._chain        
         
@@ -751,9 +782,29 @@ class ModelSet(BlobFactory):
                         
         return good_walkers, bad_walkers, np.minimum(mask, 1)
         
+    @property
+    def calls(self):
+        """
+        Record of the most recent likelihood calls made by each processor.
+        
+        Returns
+        -------
+        Dictionary, with processor ID numbers as keys, whose values are
+        dictionaries of arrays. See `ares.util.CallLog.read_call_log`.
+        """
+        if not hasattr(self, '_calls'):
+            self._calls = {}
+            for fn in sorted(glob.glob('{!s}.*.calls.npy'.format(self.prefix))):
+                i = int(fn[-13:-10])
+                self._calls[i] = read_call_log(fn)
+                
+        return self._calls
+    
     @property
     def checkpoints(self):
-        # Read MCMC chain
+        """
+        Parameters of the last model started by each processor.
+        """
         if not hasattr(self, '_checkpoints'):
             i = 0
             fail = 0
@@ -773,6 +824,21 @@ class ModelSet(BlobFactory):
                 i += 1
                 fn = '{0!s}.{1!s}.checkpt.pkl'.format(self.prefix,\
                     str(i).zfill(3))
+            
+            # Newer runs only keep a log of recent calls
+            for i in self.calls:
+                if i in self._checkpoints:
+                    continue
+                if len(self.calls[i]['call']) == 0:
+                    continue
+                
+                pars = self.calls[i]['pars'][-1]
+                self._checkpoints[i] = {}
+                for j, par in enumerate(self.parameters):
+                    if self.is_log[j]:
+                        self._checkpoints[i][par] = 10**pars[j]
+                    else:
+                        self._checkpoints[i][par] = pars[j]
                 
         return self._checkpoints  
     
@@ -790,6 +856,16 @@ class ModelSet(BlobFactory):
                     mask1d = self.mask
                     
                 self._logL = np.ma.array(self._logL, mask=mask1d)
+            
+            elif column_file_exists('{!s}.logL'.format(self.prefix)):
+                self._logL = read_columns('{!s}.logL'.format(self.prefix))
+                
+                if self.mask.ndim == 2:
+                    mask1d = np.max(self.mask, axis=1)
+                else:
+                    mask1d = self.mask
+                    
+                self._logL = np.ma.array(self._logL, mask=mask1d)
                 
             elif os.path.exists('{!s}.000.logL.pkl'.format(self.prefix)):
                 i = 0
@@ -814,24 +890,35 @@ class ModelSet(BlobFactory):
                 self._logL = np.ma.array(full_logL, 
                     mask=np.zeros_like(full_logL))    
             
-            elif glob.glob('{!s}.dd*.logL.pkl'.format(self.prefix)):
+            elif glob.glob('{!s}.dd*.logL.pkl'.format(self.prefix)) or \
+                 glob.glob('{!s}.dd*.logL.idx'.format(self.prefix)):
+                
+                if glob.glob('{!s}.dd*.logL.idx'.format(self.prefix)):
+                    ext = 'idx'
+                else:
+                    ext = 'pkl'
+                
                 if self.include_checkpoints is not None:
                     outputs_to_read = []
                     for output_num in self.include_checkpoints:
                         dd = str(output_num).zfill(4)
-                        fn = '{0!s}.dd{1!s}.logL.pkl'.format(self.prefix, dd)
+                        fn = '{0!s}.dd{1!s}.logL.{2!s}'.format(self.prefix, dd,
+                            ext)
                         outputs_to_read.append(fn)
                 else:
                     outputs_to_read = sorted(glob.glob(\
-                        '{!s}.dd*.logL.pkl'.format(self.prefix)))
+                        '{0!s}.dd*.logL.{1!s}'.format(self.prefix, ext)))
                 
                 full_chain = []
                 for fn in outputs_to_read:
                     if not os.path.exists(fn):
                         print("Found no output: {!s}".format(fn))
                         continue
-                        
-                    full_chain.extend(read_pickled_logL(fn))
+                    
+                    if ext == 'idx':
+                        full_chain.extend(read_columns(fn[0:-4]))
+                    else:    
+                        full_chain.extend(read_pickled_logL(fn))
                         
                 if self.mask.ndim == 2:
                     N = self.chain.shape[0]
@@ -15,7 +15,7 @@ from __future__ import print_function
 import glob
 import numpy as np
 from ..util import get_rev
-from ..util.MPIPool import MPIPool
+from ..util.MPIPool import MPIPool, ResidentFunction
 from ..util.PrintInfo import print_fit
 from ..physics.Constants import nu_0_mhz
 from ..util.Warnings import not_a_restart
@@ -32,6 +32,9 @@ from ..util.Pickling import read_pickle_file, write_pickle_file
 from ..util.SetDefaultParameterValues import _blob_names, _blob_redshifts
 from ..util.ReadData import flatten_chain, flatten_logL, flatten_blobs, \
     read_pickled_chain, read_pickled_logL
+from ..util.ColumnFile import append_columns, read_columns, \
+    column_file_exists, delete_columns, read_column_index
+from ..util.CallLog import get_call_log
 
 #import psutil
 #
@@ -83,36 +86,12 @@ jitter_shape_err += " shape (nparameters)"
 
 def_kwargs = {'verbose': False, 'progress_bar': False}
 
-def checkpoint(prefix, is_blobs=False, checkpoint_by_proc=True, 
-    **kwargs):
-    if checkpoint_by_proc:
-        procid = str(rank).zfill(3)
-
-        # Save parameters
-        if not is_blobs:
-            fn = '{0!s}.{1!s}.checkpt.pkl'.format(prefix, procid)
-            write_pickle_file(kwargs, fn, ndumps=1, open_mode='w',
-                safe_mode=False, verbose=False)
-
-        # Timing info
-        fn = '{0!s}.{1!s}.checkpt.txt'.format(prefix, procid)
-        with open(fn, 'a' if is_blobs else 'w') as f:
-            if is_blobs:
-                print("Generating blobs: {!s}".format(time.ctime()), file=f)
-            else:
-                print("Simulation began: {!s}".format(time.ctime()), file=f)
-
-def checkpoint_on_completion(prefix, is_blobs=False, checkpoint_by_proc=True,
-    **kwargs):
-    if checkpoint_by_proc:
-        procid = str(rank).zfill(3)
-        fn = '{0!s}.{1!s}.checkpt.txt'.format(prefix, procid)
-        with open(fn, 'a') as f:
-            if is_blobs:
-                print("Blobs generated    : {!s}".format(time.ctime()), file=f)
-            else:
-                print("Simulation finished: {!s}".format(time.ctime()), file=f)
-
+def get_checkpoint(prefix, parameters):
+    """
+    Ring buffer recording recent likelihood calls made by this processor.
+    """
+    fn = '{0!s}.{1!s}.calls.npy'.format(prefix, str(rank).zfill(3))
+    return get_call_log(fn, len(parameters))
     
 def _compute_blob_prior(sim, priors_B):
     
@@ -180,7 +159,11 @@ def loglikelihood(pars, prefix, parameters, is_log, prior_set_P, prior_set_B,
     kw.update(kwargs)
 
     # Don't save base_kwargs for each proc! Needlessly expensive I/O-wise.
-    checkpoint(prefix, False, checkpoint_by_proc, **kwargs)
+    # This just records parameters and timing info in memory, which gets
+    # synced to disk every so often.
+    if checkpoint_by_proc:
+        log = get_checkpoint(prefix, parameters)
+        log.begin(pars)
 
     #for i, par in enumerate(self.parameters):
     #    print(rank, par, pars[i], kwargs[par])
@@ -201,6 +184,8 @@ def loglikelihood(pars, prefix, parameters, is_log, prior_set_P, prior_set_B,
             blobs = copy.deepcopy(sim.blobs)
     except ValueError:
         print('FAILURE: ', kwargs)
+        if checkpoint_by_proc:
+            log.end(-np.inf)
         del sim, kw, kwargs
         gc.collect()
         return -np.inf, blank_blob
@@ -209,26 +194,29 @@ def loglikelihood(pars, prefix, parameters, is_log, prior_set_P, prior_set_B,
     
     #write_memory('2')
     
-    checkpoint_on_completion(prefix, False, checkpoint_by_proc, **kwargs)
+    if checkpoint_by_proc:
+        log.mark('sim')
 
     lnL = 0.0
     for fitter in fitters:
         lnL += fitter.loglikelihood(sim)
+        
+    if checkpoint_by_proc:
+        log.mark('like')
                 
     # Blob prior: only compute if log-likelihood is finite
     if np.isfinite(lnL):
         
         ##    
         # Blobs    
-        checkpoint(prefix, True, checkpoint_by_proc, **kwargs)
-
         try:
             blobs = sim.blobs
         except:
             print("WARNING: Failure to generate blobs.")
             blobs = blank_blob
 
-        checkpoint_on_completion(prefix, True, checkpoint_by_proc, **kwargs)
+        if checkpoint_by_proc:
+            log.mark('blobs')
         ##
         #
         
@@ -243,6 +231,8 @@ def loglikelihood(pars, prefix, parameters, is_log, prior_set_P, prior_set_B,
 
     # emcee doesn't like nans, but -inf is OK (see below)
     if np.isnan(PofD) or isinstance(PofD, np.ma.core.MaskedConstant):
+        if checkpoint_by_proc:
+            log.end(-np.inf)
         del sim, kw, kwargs
         gc.collect()
         return -np.inf, blank_blob
@@ -252,6 +242,9 @@ def loglikelihood(pars, prefix, parameters, is_log, prior_set_P, prior_set_B,
     if PofD == np.inf:
         raise ValueError('+inf obtained in likelihood. Should not happen!')
     
+    if checkpoint_by_proc:
+        log.end(PofD)
+    
     #write_memory('3')
     
     del sim, kw, kwargs
@@ -526,6 +519,24 @@ class ModelFit(FitBase):
     def save_hmf(self, value):
         self._save_hmf = value
         
+    @property 
+    def pool_resident(self):
+        """
+        Send shared state to workers just once? 
+        
+        If True, everything but the parameter vector (including, e.g., the
+        HaloMassFunction instance saved via `save_hmf`) is broadcast to 
+        each MPI worker when the sampler is set up, so each task only ships
+        the parameters. Otherwise, all of it is pickled for every task.
+        """
+        if not hasattr(self, '_pool_resident'):
+            self._pool_resident = True
+        return self._pool_resident
+    
+    @pool_resident.setter
+    def pool_resident(self, value):
+        self._pool_resident = value
+        
     @property 
     def save_hist(self):
         if not hasattr(self, '_save_hist'):
@@ -892,26 +903,55 @@ class ModelFit(FitBase):
         
         try:
             if self.checkpoint_append:
-                chain = read_pickled_chain('{!s}.chain.pkl'.format(prefix))
+                chain = self._read_chain_file('{!s}.chain.pkl'.format(prefix))
             else:
                 # lec = largest existing checkpoint
-                chain = \
-                    read_pickled_chain(self._latest_checkpoint_chain_file(prefix_restart))
+                chain = self._read_chain_file(\
+                    self._latest_checkpoint_chain_file(prefix_restart))
 
             pos = chain[-((self.nwalkers-1)*self.save_freq)-1::self.save_freq,:]
 
         except ValueError:
             print("WARNING: chain empty! Starting from last point in burn-in")
             
-            chain = read_pickled_chain('{!s}.burn.chain.pkl'.format(prefix))
-            prob = read_pickled_logL('{!s}.burn.logL.pkl'.format(prefix))
+            chain = self._read_chain_file('{!s}.burn.chain.pkl'.format(prefix))
+            prob = self._read_logL_file('{!s}.burn.logL.pkl'.format(prefix))
             mlpt = chain[np.argmax(prob)]
             pos = sample_ball(mlpt, np.std(chain, axis=0), size=self.nwalkers)
         
         return pos
 
     def _saved_checkpoint_chain_files(self, prefix):
-        return glob.glob(prefix + ".dd*.chain.pkl")
+        # Note: '.chain.pkl' and '.chain.idx' have the same length, so the
+        # checkpoint number can be sliced out of either.
+        return glob.glob(prefix + ".dd*.chain.pkl") \
+             + glob.glob(prefix + ".dd*.chain.idx")
+    
+    def _have_output(self, fn):
+        """
+        Check for output file `fn`, e.g., 'test.chain.pkl', in either
+        checkpoint format.
+        """
+        return os.path.exists(fn) or column_file_exists(fn[0:-4])
+    
+    def _read_chain_file(self, fn):
+        """
+        Read (flattened) chain from `fn`, which can end in '.pkl' or '.idx'.
+        Will look for binary output even if `fn` ends in '.pkl'.
+        """
+        if column_file_exists(fn[0:-4]):
+            chain = read_columns(fn[0:-4])
+            if chain.shape[0] == 0:
+                raise ValueError('Chain {} is empty!'.format(fn))
+            return np.array(chain)
+        
+        return read_pickled_chain(fn)
+        
+    def _read_logL_file(self, fn):
+        if column_file_exists(fn[0:-4]):
+            return np.array(read_columns(fn[0:-4]))
+        
+        return read_pickled_logL(fn)
     
 
     def _saved_checkpoints(self, prefix):
@@ -947,6 +987,24 @@ class ModelFit(FitBase):
     def checkpoint_append(self, value):
         self._checkpoint_append = value  
     
+    @property
+    def checkpoint_format(self):
+        """
+        Format of chain, logL, facc, and blob outputs. Either 'pkl' (the 
+        default) or 'bin', in which case each quantity is written as a raw,
+        typed array that is appended to at every checkpoint and can be
+        memory-mapped by ModelSet. See `ares.util.ColumnFile`.
+        """
+        if not hasattr(self, '_checkpoint_format'):
+            self._checkpoint_format = 'pkl'
+        return self._checkpoint_format
+    
+    @checkpoint_format.setter
+    def checkpoint_format(self, value):
+        assert value in ['pkl', 'bin'], \
+            "checkpoint_format must be 'pkl' or 'bin'!"
+        self._checkpoint_format = value
+    
     @property
     def counter(self):
         if not hasattr(self, '_counter'):
@@ -975,7 +1033,7 @@ class ModelFit(FitBase):
             # naming convention!
             # These suffixes are always the same
             for suffix in ['logL', 'chain', 'facc', 'pinfo', 'rinfo', 
-                'binfo', 'setup', 'load', 'fail', 'timeout']:
+                'binfo', 'setup', 'load', 'fail', 'timeout', 'cost']:
                 
                 _fn1 = '{0!s}.{1!s}.pkl'.format(self.prefix, suffix)
                 
@@ -987,6 +1045,12 @@ class ModelFit(FitBase):
                     
                     if os.path.exists(_fn2):
                         os.remove(_fn2)
+                        
+                # Binary outputs
+                delete_columns('{0!s}.{1!s}'.format(self.prefix, suffix))
+                for _fn2 in glob.glob('{0!s}.*.{1!s}.idx'.format(self.prefix,\
+                    suffix)):
+                    delete_columns(_fn2[0:-4])
             
             if os.path.exists('{!s}.prior_set.hdf5'.format(self.prefix)):        
                 os.remove('{!s}.prior_set.hdf5'.format(self.prefix))
@@ -998,13 +1062,20 @@ class ModelFit(FitBase):
             for _fn in glob.glob('{!s}.*.blob_*.pkl'.format(self.prefix)):
                 if os.path.exists(_fn):
                     os.remove(_fn)
+            for _fn in glob.glob('{!s}.*blob_*.idx'.format(self.prefix)):
+                delete_columns(_fn[0:-4])
+            for _fn in glob.glob('{!s}.*.calls.npy'.format(self.prefix)):
+                os.remove(_fn)
                     
         # Each processor gets its own fail file
         f = open('{!s}.fail.pkl'.format(prefix_by_proc), 'wb')
         f.close()
 
+        # Binary outputs are created upon the first checkpoint
+        if self.checkpoint_format == 'bin':
+            pass
         # Main output: MCMC chains (flattened)
-        if self.checkpoint_append:
+        elif self.checkpoint_append:
             f = open('{!s}.chain.pkl'.format(prefix_by_proc), 'wb')
             f.close()
         
@@ -1013,11 +1084,13 @@ class ModelFit(FitBase):
             f.close()
         
         # Store acceptance fraction
-        f = open('{!s}.facc.pkl'.format(self.prefix), 'wb')
-        f.close()
+        if self.checkpoint_format == 'pkl':
+            f = open('{!s}.facc.pkl'.format(self.prefix), 'wb')
+            f.close()
         
         # File for blobs themselves
-        if self.blob_names is not None and self.checkpoint_append:
+        if self.blob_names is not None and self.checkpoint_append and \
+            self.checkpoint_format == 'pkl':
             
             for i, group in enumerate(self.blob_names):
                 for blob in group:
@@ -1228,7 +1301,8 @@ class ModelFit(FitBase):
         self.prefix = prefix 
         
         if rank == 0:
-            if os.path.exists('{!s}.chain.pkl'.format(prefix)) and (not clobber):
+            if self._have_output('{!s}.chain.pkl'.format(prefix)) and \
+                (not clobber):
                 if not restart:
                     raise IOError(('{!s} exists! Remove manually, set ' +\
                         'clobber=True, or set restart=True to ' +\
@@ -1252,16 +1326,16 @@ class ModelFit(FitBase):
             
             # below checks for checkpoint_append==True failure
             cptapdtrfl = (self.checkpoint_append and\
-                (not os.path.exists('{!s}.chain.pkl'.format(prefix))))
+                (not self._have_output('{!s}.chain.pkl'.format(prefix))))
             # below checks for checkpoint_append==False failure
             cptapdflsfl = ((not self.checkpoint_append) and\
-                (not glob.glob('{!s}.dd*.pkl'.format(prefix))))
+                (not self._saved_checkpoint_chain_files(prefix)))
             
             cptapdtrfl_b = (self.checkpoint_append and\
-                (not os.path.exists('{!s}.burn.chain.pkl'.format(prefix))))
+                (not self._have_output('{!s}.burn.chain.pkl'.format(prefix))))
             # below checks for checkpoint_append==False failure
             cptapdflsfl_b = ((not self.checkpoint_append) and\
-                (not glob.glob('{!s}.burn.dd*.pkl'.format(prefix))))
+                (not self._saved_checkpoint_chain_files(prefix + '.burn')))
             
             # either way, produce error
             if (cptapdtrfl or cptapdflsfl):
@@ -1282,7 +1356,7 @@ class ModelFit(FitBase):
                     else:    
                         fn_last_chain = '{!s}.chain.pkl'.format(prefix)
                         
-                    _chain = read_pickled_chain(fn_last_chain)
+                    _chain = self._read_chain_file(fn_last_chain)
                                         
                 else:
                     if restart_from_burn:
@@ -1293,7 +1367,7 @@ class ModelFit(FitBase):
                     fn_last_chain = \
                         self._latest_checkpoint_chain_file(pref_prev)                    
                                         
-                    _chain = read_pickled_chain(fn_last_chain)
+                    _chain = self._read_chain_file(fn_last_chain)
                                                             
                     if restart_from_burn:
                         _anl_ = ModelSet(pref_prev, verbose=False)
@@ -1304,7 +1378,8 @@ class ModelFit(FitBase):
                                         
             except ValueError:        
                 if rank == 0:
-                    has_burn = os.path.exists('{!s}.burn.chain.pkl'.format(prefix))
+                    has_burn = \
+                        self._have_output('{!s}.burn.chain.pkl'.format(prefix))
                     if not has_burn:
                         restart = False
                         clobber = True
@@ -1429,8 +1504,16 @@ class ModelFit(FitBase):
             self.base_kwargs, self.checkpoint_by_proc, 
             self.simulator, self.fitters, self.debug]
         
+        if self.pool_resident and hasattr(self.pool, 'broadcast'):
+            nbytes = self.pool.broadcast('loglikelihood', (loglikelihood, args))
+            print("# Sent {0:.3g} MB of shared state to each worker.".format(
+                nbytes / 1e6))
+            func, args = ResidentFunction('loglikelihood'), []
+        else:
+            func = loglikelihood
+        
         self.sampler = emcee.EnsembleSampler(self.nwalkers,
-            self.Nd, loglikelihood, pool=self.pool, args=args)
+            self.Nd, func, pool=self.pool, args=args)
                             
         # If restart, will use last point from previous chain, or, if one
         # isn't found, will look for burn-in data.
@@ -1569,6 +1652,13 @@ class ModelFit(FitBase):
         else:
             kw = {'storechain': False}   
             
+        # Keep track of how much we send to workers each step
+        count_bytes = hasattr(self.pool, 'bytes_sent')
+        if count_bytes:
+            sent = self.pool.bytes_sent
+            if not hasattr(self, 'bytes_per_step'):
+                self.bytes_per_step = []
+            
         # Take steps, append to pickle file every save_freq steps
         pos_all = []; prob_all = []; blobs_all = []
         for pos, prob, state, blobs in self.sampler.sample(pos, 
@@ -1585,11 +1675,19 @@ class ModelFit(FitBase):
             prob_all.append(prob.copy())
             blobs_all.append(blobs)
             
+            if count_bytes:
+                self.bytes_per_step.append(self.pool.bytes_sent - sent)
+                sent = self.pool.bytes_sent
+            
             #del blobs
 
             if ct % save_freq != 0:
                 gc.collect()
                 continue
+                
+            if count_bytes:
+                print("# Sent {0:.3g} kB to workers per step.".format(
+                    np.mean(self.bytes_per_step[-save_freq:]) / 1e3))
 
             # Remember that pos.shape = (nwalkers, ndim)
             # So, pos_all has shape = (nsteps, nwalkers, ndim)
@@ -1650,9 +1748,12 @@ class ModelFit(FitBase):
                     fn = '{0!s}.{1!s}.pkl'.format(prefix, suffix)
                 else:
                     fn = '{0!s}.{1!s}.{2!s}.pkl'.format(prefix, dd, suffix)
-                    
-                write_pickle_file(data[i], fn, ndumps=1,\
-                    open_mode=mode[0], safe_mode=False, verbose=False)
+                
+                if self.checkpoint_format == 'bin':
+                    append_columns(fn[0:-4], np.array(data[i]))
+                else:    
+                    write_pickle_file(data[i], fn, ndumps=1,\
+                        open_mode=mode[0], safe_mode=False, verbose=False)
                 
         if self.checkpoint_append:
             fn_facc = '{0!s}.facc.pkl'.format(prefix)
@@ -1661,9 +1762,13 @@ class ModelFit(FitBase):
                 
         # This is a running total already so just save the end result 
         # for this set of steps
-        write_pickle_file(self.sampler.acceptance_fraction,
-            fn_facc, ndumps=1, open_mode=mode[0],\
-            safe_mode=False, verbose=False)
+        if self.checkpoint_format == 'bin':
+            append_columns(fn_facc[0:-4], 
+                np.atleast_2d(self.sampler.acceptance_fraction))
+        else:    
+            write_pickle_file(self.sampler.acceptance_fraction,
+                fn_facc, ndumps=1, open_mode=mode[0],\
+                safe_mode=False, verbose=False)
         
         if self.checkpoint_append:
             print("# Checkpoint #{0}: {1!s}".format(ct // save_freq,
@@ -1741,9 +1846,38 @@ class ModelFit(FitBase):
                         self.blob_nd[j], blob)        
                     
                     assert dd is not None, "checkpoint_append=False but no DDID!"        
-                            
-                write_pickle_file(np.array(to_write), bfn, ndumps=1,\
-                    open_mode=mode[0], safe_mode=False, verbose=False)
+                
+                # Ragged blobs (e.g., with a different number of elements
+                # for each model) become object arrays.
+                shapes = set([np.shape(barr) for barr in to_write])
+                if len(shapes) > 1:
+                    arr = np.empty(len(to_write), dtype=object)
+                    for l, barr in enumerate(to_write):
+                        arr[l] = barr
+                else:
+                    arr = np.array(to_write)
+                
+                # Binary output only works for regular arrays that match
+                # what we've already written. Otherwise, this blob gets
+                # pickled, now and for the rest of the run.
+                use_bin = (self.checkpoint_format == 'bin') \
+                    and (arr.dtype != object) and (not os.path.exists(bfn))
+                if use_bin and column_file_exists(bfn[0:-4]):
+                    use_bin = read_column_index(bfn[0:-4])[1] == arr.shape[1:]
+                
+                if use_bin:
+                    append_columns(bfn[0:-4], arr)
+                    continue
+                    
+                if column_file_exists(bfn[0:-4]):
+                    write_pickle_file(read_columns(bfn[0:-4], mmap=False), 
+                        bfn, ndumps=1, open_mode=mode[0], safe_mode=False, 
+                        verbose=False)
+                    delete_columns(bfn[0:-4])
+                    mode = 'ab'
+                        
+                write_pickle_file(arr, bfn, ndumps=1, open_mode=mode[0],\
+                    safe_mode=False, verbose=False)
     
         
     @property
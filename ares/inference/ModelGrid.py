@@ -14,9 +14,10 @@ from __future__ import print_function
 import signal
 import subprocess
 import numpy as np
-import copy, os, gc, re, time
+import copy, os, gc, re, time, glob
 from ..util.Pickling import read_pickle_file, write_pickle_file
 from .ModelFit import ModelFit
+from .WarmStart import WarmStart, snake_order
 from ..analysis import ModelSet
 from ..simulations import Global21cm
 from ..util import GridND, ProgressBar
@@ -253,8 +254,11 @@ class ModelGrid(ModelFit):
                         
         prefix_by_proc = '{0!s}.{1!s}'.format(self.prefix, str(rank).zfill(3))
 
+        # Dynamic scheduling: nobody knows who runs what until it's done.
+        static = self.scheduler == 'static'
+
         # Reshape assignments so it's Nlinks long.
-        if self.grid.structured:
+        if self.grid.structured and static:
             assignments = self._reshape_assignments(self.assignments)
                 
             if restart:
@@ -273,7 +277,7 @@ class ModelGrid(ModelFit):
                         
         super(ModelGrid, self)._prep_from_scratch(clobber, by_proc=True)
             
-        if self.grid.structured:
+        if self.grid.structured and static:
             write_pickle_file(assignments,\
                 '{!s}.load.pkl'.format(self.prefix), ndumps=1, open_mode='w',\
                 safe_mode=False, verbose=False)
@@ -357,6 +361,77 @@ class ModelGrid(ModelFit):
     @reuse_splines.setter
     def reuse_splines(self, value):
         self._reuse_splines = value
+        
+    @property
+    def warm_start(self):
+        """
+        Seed each model with results from the nearest model already run?
+        
+        Can be True (use all artifacts listed in `WarmStart.artifacts`), 
+        or a list of artifact names, e.g., ['feedback_LW_Mmin'].
+        """
+        if not hasattr(self, '_warm_start'):
+            self._warm_start = False
+        return self._warm_start
+        
+    @warm_start.setter
+    def warm_start(self, value):
+        self._warm_start = value
+        if hasattr(self, '_warm'):
+            del self._warm
+            
+    @property
+    def warm_start_maxbytes(self):
+        """
+        Most memory [bytes] to spend on artifacts kept for warm starts.
+        """
+        if not hasattr(self, '_warm_start_maxbytes'):
+            self._warm_start_maxbytes = 2**28
+        return self._warm_start_maxbytes
+    
+    @warm_start_maxbytes.setter
+    def warm_start_maxbytes(self, value):
+        self._warm_start_maxbytes = value
+        if hasattr(self, '_warm'):
+            del self._warm
+            
+    @property
+    def warm(self):
+        if not hasattr(self, '_warm'):
+            if self.warm_start in [True, 1]:
+                names = None
+            else:
+                names = self.warm_start
+            self._warm = WarmStart(self.parameters, names=names,
+                maxbytes=self.warm_start_maxbytes)
+        return self._warm
+        
+    def _model_order(self):
+        """
+        Order in which to run models (modulo load-balancing).
+        
+        For warm starts on structured grids, sweep back and forth along 
+        each axis, so consecutive models are always nearest neighbors.
+        Otherwise, just the order of `self.grid.all_kwargs`.
+        
+        Returns
+        -------
+        Array of indices of models in `self.grid.all_kwargs`.
+        
+        """
+        
+        if self.warm_start and self.grid.structured:
+            return snake_order(self.grid.coords, self.grid.shape)
+            
+        return np.arange(self.grid.size)
+        
+    def _print_warm_start_stats(self):
+        if not self.warm_start:
+            return
+            
+        for name in self.warm.names:
+            print("Processor {0}: warm-started {1} models with {2!s} ({3} misses)".format(
+                rank, self.warm.hits[name], name, self.warm.misses[name]))
     
     @property
     def tricks(self):
@@ -493,11 +568,21 @@ class ModelGrid(ModelFit):
     def exit_if_fail_streak(self, value):
         self._exit_if_fail_streak = bool(value)
             
-    def _run_sim(self, kw, p):
+    def _run_sim(self, kw, p, point=None):
         
         failct = 0
+        
+        # Seed with results from nearby models
+        if self.warm_start and (point is not None):
+            to_inject = self.warm.seed(point, p)
+        else:
+            to_inject = {}
+        
         sim = self.simulator(**p)
         
+        if to_inject:
+            self.warm.inject(sim, to_inject)
+        
         if self.debug:
             sim.run()
             blobs = sim.blobs
@@ -506,6 +591,10 @@ class ModelGrid(ModelFit):
             if not self.debug:
                 sim.run()            
                 blobs = copy.deepcopy(sim.blobs)
+                
+            if self.warm_start and (point is not None):
+                self.warm.store(point, sim)
+                
         except RuntimeError:
             write_pickle_file(kw, '{0!s}.{1!s}.timeout.pkl'.format(\
                 self.prefix, str(rank).zfill(3)), ndumps=1, open_mode='a',\
@@ -527,14 +616,6 @@ class ModelGrid(ModelFit):
             
             blobs = copy.deepcopy(self.blank_blob)
             
-        if 'feedback_LW_guess' in self.tricks:            
-            try:
-                self.trick_data['pop_Mmin{2}'] = \
-                    np.interp(sim.pops[2].halos.tab_z, 
-                        sim.medium.field._zarr, sim.medium.field._Mmin_now)
-            except AttributeError:
-                del self.trick_data['pop_Mmin{2}']    
-            
         del sim    
             
         return blobs, failct
@@ -550,6 +631,132 @@ class ModelGrid(ModelFit):
         assert type(value) in [int, bool]
         self._debug = value
     
+    def _prep_model(self, kwargs, fcoll):
+        """
+        Assemble all parameters for a single model.
+        
+        Parameters
+        ----------
+        kwargs : dict
+            Grid point, i.e., values of parameters along each axis.
+        fcoll : dict
+            Collapsed fraction splines we've already made, organized by
+            index in the Tmin axis (if there is one). Will be updated in 
+            place if need be.
+            
+        Returns
+        -------
+        Tuple: (parameters for this grid point after un-logging, complete
+        set of parameters to pass to the simulator).
+        
+        """
+        
+        # Grab Tmin index
+        if self.Tmin_in_grid and self.LB == 1:
+            Tmin_ax = self.grid.axes[self.grid.axisnum(self.Tmin_ax_name)]
+            i_Tmin = Tmin_ax.locate(kwargs[self.Tmin_ax_name])
+        else:
+            i_Tmin = 0
+
+        # Copy kwargs - may need updating with pre-existing lookup tables
+        p = self.base_kwargs.copy()
+        
+        # Log-ify stuff if necessary
+        kw = {}
+        for i, par in enumerate(self.parameters):
+            if self.is_log[i]:
+                kw[par] = 10**kwargs[par]
+            else:
+                kw[par] = kwargs[par]
+        
+        p.update(kw)
+        
+        # Create new splines if we haven't hit this Tmin yet in our model grid.    
+        if self.reuse_splines and \
+            i_Tmin not in fcoll.keys() and (not self.phenomenological):
+            #raise NotImplementedError('help')
+            sim = self.simulator(**p)
+                           
+            pops = sim.pops
+            
+            if hasattr(self, 'Tmin_ax_popid'):
+                loc = self.Tmin_ax_popid
+                suffix = '{{{}}}'.format(loc)
+            else:
+                if sim.pf.Npops > 1:
+                    loc = 0
+                    suffix = '{0}'
+                else:    
+                    loc = 0
+                    suffix = ''
+            
+            hmf_pars = {'pop_Tmin{!s}'.format(suffix): sim.pf['pop_Tmin{!s}'.format(suffix)],
+                'fcoll{!s}'.format(suffix): copy.deepcopy(pops[loc].fcoll), 
+                'dfcolldz{!s}'.format(suffix): copy.deepcopy(pops[loc].dfcolldz)}
+            
+            # Save for future iterations
+            fcoll[i_Tmin] = hmf_pars.copy()
+
+            p.update(hmf_pars)
+        # If we already have matching fcoll splines, use them!
+        elif self.reuse_splines and (not self.phenomenological):
+            p.update(fcoll[i_Tmin])
+        else:
+            pass
+            
+        return kw, p
+        
+    def _run_model(self, kw, p, point=None):
+        """
+        Run a single model, with checkpoint files and timeout.
+        
+        Parameters
+        ----------
+        kw : dict
+            Parameters for this grid point after un-logging.
+        p : dict
+            Complete set of parameters to pass to the simulator.
+        point : dict
+            Grid point, i.e., values of parameters along each axis. Only 
+            needed for warm starts.
+        
+        Returns
+        -------
+        Tuple: (blobs, number of failures).
+        
+        """
+        
+        # Write this set of parameters to disk before running 
+        # so we can troubleshoot later if the run never finishes.
+        procid = str(rank).zfill(3)
+        fn = '{0!s}.{1!s}.checkpt.pkl'.format(self.prefix, procid)
+        write_pickle_file(kw, fn, ndumps=1, open_mode='w',\
+            safe_mode=False, verbose=False)
+        fn = '{0!s}.{1!s}.checkpt.txt'.format(self.prefix, procid)
+        with open(fn, 'w') as f:
+            print("Simulation began: {!s}".format(time.ctime()), file=f)
+
+        # Kill if model gets stuck
+        if self.timeout is not None:
+            signal.signal(signal.SIGALRM, self._handler)
+            signal.alarm(self.timeout)
+
+        ##
+        # Run simulation!
+        ##   
+        blobs, failct = self._run_sim(kw, p, point)
+        
+        # Disable the alarm
+        if self.timeout is not None:
+            signal.alarm(0)
+            
+        # If this is missing from a file, we'll know where things went south.
+        fn = '{0!s}.{1!s}.checkpt.txt'.format(self.prefix, procid)
+        with open(fn, 'a') as f:
+            print("Simulation finished: {!s}".format(time.ctime()), file=f)
+            
+        return blobs, failct
+    
     def run(self, prefix, clobber=False, restart=False, save_freq=500,
         use_pb=True, use_checks=True, long_run=False, exit_after=None):
         """
@@ -567,6 +774,12 @@ class ModelGrid(ModelFit):
             Overwrite pre-existing files of the same prefix if one exists?
         restart : bool
             Append to pre-existing files of the same prefix if one exists?
+        exit_after : int
+            Stop after this many checkpoints (per processor).
+            
+        .. note :: By default, models are assigned to processors up front
+            (see `LoadBalance`). Set `scheduler='dynamic'` to instead hand
+            out models one at a time, most expensive first.
 
         Returns
         -------
@@ -576,6 +789,11 @@ class ModelGrid(ModelFit):
         self.prefix = prefix
         self.save_freq = save_freq
         
+        if self.scheduler == 'dynamic':
+            return self._run_dynamic(prefix, clobber=clobber, 
+                restart=restart, save_freq=save_freq, use_pb=use_pb,
+                use_checks=use_checks, exit_after=exit_after)
+        
         prefix_by_proc = '{0!s}.{1!s}'.format(prefix, str(rank).zfill(3))
         prefix_next_proc = '{0!s}.{1!s}'.format(prefix, str(rank+1).zfill(3))
                 
@@ -745,7 +963,7 @@ class ModelGrid(ModelFit):
         pb = ProgressBar(Nleft, 'grid', use_pb)
         pb.start()
         
-        chain_all = []; blobs_all = []
+        chain_all = []; blobs_all = []; cost_all = []
         
         t1 = time.time()
 
@@ -755,7 +973,8 @@ class ModelGrid(ModelFit):
 
         # Loop over models, use StellarPopulation.update routine 
         # to speed-up (don't have to re-load HMF spline as many times)
-        for h, kwargs in enumerate(self.grid.all_kwargs):
+        for h in self._model_order():
+            kwargs = self.grid.all_kwargs[h]
             
             # Where does this model live in the grid?
             if self.grid.structured:
@@ -776,92 +995,12 @@ class ModelGrid(ModelFit):
                 pb.update(ct)
                 continue
 
-            # Grab Tmin index
-            if self.Tmin_in_grid and self.LB == 1:
-                Tmin_ax = self.grid.axes[self.grid.axisnum(self.Tmin_ax_name)]
-                i_Tmin = Tmin_ax.locate(kwargs[self.Tmin_ax_name])
-            else:
-                i_Tmin = 0
-
-            # Copy kwargs - may need updating with pre-existing lookup tables
-            p = self.base_kwargs.copy()
+            kw, p = self._prep_model(kwargs, fcoll)
             
-            # Log-ify stuff if necessary
-            kw = {}
-            for i, par in enumerate(self.parameters):
-                if self.is_log[i]:
-                    kw[par] = 10**kwargs[par]
-                else:
-                    kw[par] = kwargs[par]
-            
-            p.update(kw)
-            
-            # Create new splines if we haven't hit this Tmin yet in our model grid.    
-            if self.reuse_splines and \
-                i_Tmin not in fcoll.keys() and (not self.phenomenological):
-                #raise NotImplementedError('help')
-                sim = self.simulator(**p)
-                               
-                pops = sim.pops
-                
-                if hasattr(self, 'Tmin_ax_popid'):
-                    loc = self.Tmin_ax_popid
-                    suffix = '{{{}}}'.format(loc)
-                else:
-                    if sim.pf.Npops > 1:
-                        loc = 0
-                        suffix = '{0}'
-                    else:    
-                        loc = 0
-                        suffix = ''
-                
-                hmf_pars = {'pop_Tmin{!s}'.format(suffix): sim.pf['pop_Tmin{!s}'.format(suffix)],
-                    'fcoll{!s}'.format(suffix): copy.deepcopy(pops[loc].fcoll), 
-                    'dfcolldz{!s}'.format(suffix): copy.deepcopy(pops[loc].dfcolldz)}
-                
-                # Save for future iterations
-                fcoll[i_Tmin] = hmf_pars.copy()
-
-                p.update(hmf_pars)
-            # If we already have matching fcoll splines, use them!
-            elif self.reuse_splines and (not self.phenomenological):
-                                        
-                hmf_pars = {'pop_Tmin{!s}'.format(suffix): fcoll[i_Tmin]['pop_Tmin{!s}'.format(suffix)],
-                    'fcoll{!s}'.format(suffix): fcoll[i_Tmin]['fcoll{!s}'.format(suffix)],
-                    'dfcolldz{!s}'.format(suffix): fcoll[i_Tmin]['dfcolldz{!s}'.format(suffix)]}
-                p.update(hmf_pars)
-            else:
-                pass
-                
-            # Write this set of parameters to disk before running 
-            # so we can troubleshoot later if the run never finishes.
-            procid = str(rank).zfill(3)
-            fn = '{0!s}.{1!s}.checkpt.pkl'.format(self.prefix, procid)
-            write_pickle_file(kw, fn, ndumps=1, open_mode='w',\
-                safe_mode=False, verbose=False)
-            fn = '{0!s}.{1!s}.checkpt.txt'.format(self.prefix, procid)
-            with open(fn, 'w') as f:
-                print("Simulation began: {!s}".format(time.ctime()), file=f)
-
-            # Kill if model gets stuck
-            if self.timeout is not None:
-                signal.signal(signal.SIGALRM, self._handler)
-                signal.alarm(self.timeout)
-
-            ##
-            # Run simulation!
-            ##   
-            blobs, _failct = self._run_sim(kw, p)
+            t3 = time.time()
+            blobs, _failct = self._run_model(kw, p, kwargs)
             failct += _failct
-            
-            # Disable the alarm
-            if self.timeout is not None:
-                signal.alarm(0)
-                
-            # If this is missing from a file, we'll know where things went south.
-            fn = '{0!s}.{1!s}.checkpt.txt'.format(self.prefix, procid)
-            with open(fn, 'a') as f:
-                print("Simulation finished: {!s}".format(time.ctime()), file=f)
+            cost_all.append(time.time() - t3)
 
             chain = np.array([kwargs[key] for key in self.parameters])
             chain_all.append(chain)
@@ -892,17 +1031,13 @@ class ModelGrid(ModelFit):
                 
             # First assemble data from all processors?
             # Analogous to assembling data from all walkers in MCMC
-            write_pickle_file(chain_all,\
-                '{!s}.chain.pkl'.format(prefix_by_proc), ndumps=1,\
-                open_mode='a', safe_mode=False, verbose=False)
-
-            self.save_blobs(blobs_all, False, prefix_by_proc)
+            self._save_models(prefix_by_proc, chain_all, blobs_all, cost_all)
 
             del p, chain, blobs
-            del chain_all, blobs_all
+            del chain_all, blobs_all, cost_all
             gc.collect()
 
-            chain_all = []; blobs_all = []
+            chain_all = []; blobs_all = []; cost_all = []
             
             # If, after the first checkpoint, we only have 'failed' models,
             # raise an error.
@@ -924,15 +1059,12 @@ class ModelGrid(ModelFit):
         # Need to make sure we write results to disk if we didn't 
         # hit the last checkpoint
         if chain_all:
-            write_pickle_file(chain_all,\
-                '{!s}.chain.pkl'.format(prefix_by_proc), ndumps=1,\
-                open_mode='a', safe_mode=False, verbose=False)
-        
-        if blobs_all:
-            self.save_blobs(blobs_all, False, prefix_by_proc)
+            self._save_models(prefix_by_proc, chain_all, blobs_all, cost_all)
         
         print("Processor {0}: Wrote {1!s}.*.pkl ({2!s})".format(rank, prefix,\
             time.ctime()))
+        
+        self._print_warm_start_stats()
 
         # You. shall. not. pass.
         # Maybe unnecessary?
@@ -952,6 +1084,406 @@ class ModelGrid(ModelFit):
             else:
                 print("Elapsed time (min)  : {0:.3g}".format(dt / 60.))
                 
+    @property
+    def scheduler(self):
+        """
+        How to divide up models among processors.
+        
+        'static' : Each processor gets a fixed set of models up front, 
+            determined by `LoadBalance`.
+        'dynamic' : Rank 0 hands out models one at a time to whichever
+            processor is free, most expensive first (as best we can tell
+            from previous runs, see `_schedule`). Rank 0 doesn't run 
+            models itself in this case unless it's the only processor.
+            
+        """
+        if not hasattr(self, '_scheduler'):
+            self._scheduler = 'static'
+        return self._scheduler
+        
+    @scheduler.setter
+    def scheduler(self, value):
+        assert value in ['static', 'dynamic'], \
+            "Unrecognized scheduler '{!s}'".format(value)
+        self._scheduler = value
+        
+    def _save_models(self, prefix_by_proc, chain_all, blobs_all, cost_all):
+        """
+        Append most recent results to this processor's output files.
+        
+        In addition to the chain and blobs, record the wall-clock time 
+        spent on each model (as rows of [parameters..., seconds]) in 
+        `prefix_by_proc.cost.pkl`, so later runs can schedule accordingly.
+        """
+        
+        write_pickle_file(chain_all,\
+            '{!s}.chain.pkl'.format(prefix_by_proc), ndumps=1,\
+            open_mode='a', safe_mode=False, verbose=False)
+
+        self.save_blobs(blobs_all, False, prefix_by_proc)
+        
+        cost = np.column_stack((np.array(chain_all), cost_all))
+        write_pickle_file(cost,\
+            '{!s}.cost.pkl'.format(prefix_by_proc), ndumps=1,\
+            open_mode='a', safe_mode=False, verbose=False)
+            
+    def _read_by_proc(self, prefix, suffix):
+        """
+        Read and stitch together `prefix.NNN.suffix.pkl` for all processors.
+        
+        Returns
+        -------
+        List of whatever was pickled, for all processors in turn.
+        
+        """
+        
+        data = []
+        for fn in sorted(glob.glob('{0!s}.[0-9][0-9][0-9].{1!s}.pkl'.format(
+            prefix, suffix))):
+            data.extend(read_pickle_file(fn, nloads=None, verbose=False))
+            
+        return data
+        
+    def _pending_models(self, prefix):
+        """
+        Figure out which models have not been run by *any* processor.
+        
+        Unlike `_read_restart`, doesn't care how many processors were used
+        previously, or how models were divided up between them.
+        
+        Returns
+        -------
+        Indices of models (in `self.grid.all_kwargs`) yet to be run.
+        
+        """
+        
+        done = np.zeros(self.grid.size, dtype=bool)
+        
+        chain = self._read_by_proc(prefix, 'chain')
+        if not chain:
+            return np.arange(self.grid.size)
+        
+        lookup = {}
+        for h, kwargs in enumerate(self.grid.all_kwargs):
+            lookup[tuple([kwargs[par] for par in self.parameters])] = h
+        
+        for link in concatenate(chain):
+            h = lookup.get(tuple(link))
+            
+            # Gridding may have changed slightly since last time.
+            if (h is None) and self.grid.structured:
+                kw = {par:link[i] for i, par in enumerate(self.parameters)}
+                kvec = self.grid.locate_entry(kw, tol=self.tol)
+                if None in kvec:
+                    continue
+                h = self.grid.coords.index(kvec)
+            elif h is None:
+                continue
+                
+            done[h] = True
+            
+        return np.flatnonzero(~done)
+        
+    def _known_costs(self, prefix):
+        """
+        Wall-clock time spent on models in previous runs.
+        
+        Models that timed out (according to the `.timeout` records) count 
+        as having taken at least `self.timeout` seconds, or, if no timeout
+        has been set, twice as long as the slowest model otherwise.
+        Failed models carry no timing information of their own, so we can
+        only use them if they also appear in the `.cost` records.
+        
+        Returns
+        -------
+        Tuple: (2-D array of parameters, shape (Nmodels, Nparams), 
+        1-D array of times in seconds). Both None if we know nothing.
+        
+        """
+        
+        cost = self._read_by_proc(prefix, 'cost')
+        if cost:
+            cost = concatenate(cost)
+            pts, dt = cost[:,0:-1], cost[:,-1]
+        else:
+            pts, dt = np.zeros((0, len(self.parameters))), np.zeros(0)
+            
+        timeouts = self._read_by_proc(prefix, 'timeout')
+        if timeouts:
+            if self.timeout is not None:
+                slow = float(self.timeout)
+            elif dt.size > 0:
+                slow = 2 * dt.max()
+            else:
+                slow = 1.
+            
+            tpts = []
+            for kw in timeouts:
+                tpts.append([np.log10(kw[par]) if self.is_log[i] else kw[par] 
+                    for i, par in enumerate(self.parameters)])
+                    
+            pts = np.concatenate((pts, tpts), axis=0)
+            dt = np.concatenate((dt, slow * np.ones(len(tpts))))
+            
+        if dt.size == 0:
+            return None, None
+            
+        return pts, dt
+            
+    def _schedule(self, prefix, pending):
+        """
+        Order models so the most expensive ones go first.
+        
+        Handing out long jobs first, and short ones last, means processors 
+        run out of work at nearly the same time. We estimate the cost of 
+        each model as the cost of the nearest model (in parameter space, 
+        with each axis normalized to unit length) that's been timed already.
+        
+        Parameters
+        ----------
+        prefix : str
+            Prefix of output files, used to look for timing info.
+        pending : np.ndarray
+            Indices of models (in `self.grid.all_kwargs`) to be run.
+            
+        Returns
+        -------
+        Indices of models in the order they should be handed out. If we 
+        don't know anything about costs yet, that's just grid order (see
+        `_model_order`).
+        
+        """
+        
+        pts, dt = self._known_costs(prefix)
+        
+        if pts is None:
+            pos = np.argsort(self._model_order())
+            return pending[np.argsort(pos[pending], kind='stable')]
+            
+        x = np.array([[self.grid.all_kwargs[h][par] \
+            for par in self.parameters] for h in pending])
+        
+        lo = np.minimum(x.min(axis=0), pts.min(axis=0))
+        hi = np.maximum(x.max(axis=0), pts.max(axis=0))
+        scale = np.where(hi > lo, hi - lo, 1.)
+        
+        x = (x - lo) / scale
+        y = (pts - lo) / scale
+        
+        # Nearest neighbors in chunks, so as to limit memory use
+        est = np.zeros(len(pending))
+        chunk = max(1, int(1e7 // y.size))
+        for i in range(0, len(pending), chunk):
+            d2 = np.sum((x[i:i+chunk,None,:] - y[None,:,:])**2, axis=2)
+            est[i:i+chunk] = dt[np.argmin(d2, axis=1)]
+            
+        return pending[np.argsort(-est, kind='stable')]
+        
+    def _dispatch(self, order, use_pb=True):
+        """
+        Hand out models to worker processors as they become free.
+        
+        Only run by rank 0. Each worker asks for a model (or says it's 
+        leaving) via tag 1, and gets its answer (model index, or None when
+        we're out of work) via tag 2.
+        
+        Returns
+        -------
+        Array containing the rank of the processor that was sent each 
+        model, and -1 for models that weren't sent to anyone.
+        
+        """
+        
+        comm = MPI.COMM_WORLD
+        status = MPI.Status()
+        
+        runner = -1 * np.ones(self.grid.size, dtype=int)
+        queue = list(order[-1::-1])
+        
+        pb = ProgressBar(len(order), 'grid', use_pb)
+        pb.start()
+        
+        active = size - 1
+        while active:
+            ready = comm.recv(source=MPI.ANY_SOURCE, tag=1, status=status)
+            worker = status.source
+            
+            if ready and queue:
+                h = int(queue.pop())
+                runner[h] = worker
+                comm.send(h, dest=worker, tag=2)
+                pb.update(len(order) - len(queue))
+                continue
+            
+            # Either the worker is leaving (see `exit_after`), or we're 
+            # out of work, in which case we tell the worker to leave.
+            if ready:
+                comm.send(None, dest=worker, tag=2)
+                
+            active -= 1
+            
+        pb.finish()
+        
+        return runner
+        
+    def _request_tasks(self):
+        """
+        Ask rank 0 for models to run, one at a time, until there are none.
+        """
+        
+        comm = MPI.COMM_WORLD
+        
+        while True:
+            comm.send(True, dest=0, tag=1)
+            h = comm.recv(source=0, tag=2)
+            
+            if h is None:
+                break
+                
+            yield h
+        
+    def _run_dynamic(self, prefix, clobber=False, restart=False, 
+        save_freq=500, use_pb=True, use_checks=True, exit_after=None):
+        """
+        Run model grid with a dynamic (master/worker) scheduler.
+        
+        Output files are the same as in the static case, i.e., each 
+        processor writes the models it ran to `prefix.NNN.*.pkl`, so runs 
+        can be restarted with either scheduler and any number of 
+        processors. See `run` for a description of the parameters.
+        
+        """
+        
+        prefix_by_proc = '{0!s}.{1!s}'.format(prefix, str(rank).zfill(3))
+        
+        chain_exists = len(glob.glob('{!s}.[0-9][0-9][0-9].chain.pkl'.format(
+            prefix))) > 0
+            
+        if chain_exists and (not clobber):
+            if not restart:
+                raise IOError(('{!s}*.pkl exists! Remove manually, set ' +\
+                    'clobber=True, or set restart=True to append.').format(\
+                    prefix))
+        
+        restart = restart and chain_exists
+        self.is_restart = restart
+        
+        # Figure out what to run, and in what order
+        if rank == 0:
+            if restart:
+                pending = self._pending_models(prefix)
+                print(("Update               : {0} models down, {1} to " +\
+                    "go.").format(self.grid.size - pending.size, pending.size))
+            else:
+                pending = np.arange(self.grid.size)
+                print('Running {}-element model grid.'.format(
+                    self.grid.size))
+                    
+            order = self._schedule(prefix, pending)
+        
+        # Make some blank files for data output        
+        self.prep_output_files(restart, clobber)
+        
+        # Don't start writing until rank 0 has cleaned up.
+        if size > 1:
+            MPI.COMM_WORLD.Barrier()
+            
+        t1 = time.time()
+            
+        if size == 1:
+            tasks = order
+        elif rank == 0:
+            runner = self._dispatch(order, use_pb)
+            tasks = []
+        else:
+            tasks = self._request_tasks()
+            
+        # Dictionary for hmf tables
+        fcoll = {}
+        
+        chain_all = []; blobs_all = []; cost_all = []
+        
+        ct = 0
+        failct = 0
+        left_early = False
+        for h in tasks:
+            kwargs = self.grid.all_kwargs[h]
+            
+            kw, p = self._prep_model(kwargs, fcoll)
+            
+            t3 = time.time()
+            blobs, _failct = self._run_model(kw, p, kwargs)
+            failct += _failct
+            cost_all.append(time.time() - t3)
+            
+            chain = np.array([kwargs[key] for key in self.parameters])
+            chain_all.append(chain)
+            blobs_all.append(blobs)
+
+            ct += 1
+            
+            del p, chain, blobs
+            
+            if ct % save_freq != 0:
+                gc.collect()
+                continue
+                
+            if use_checks:
+                print("Processor {0}: checkpoint #{1} ({2!s})".format(rank, 
+                    ct // save_freq, time.ctime()))
+                
+            self._save_models(prefix_by_proc, chain_all, blobs_all, cost_all)
+            
+            del chain_all, blobs_all, cost_all
+            gc.collect()
+
+            chain_all = []; blobs_all = []; cost_all = []
+            
+            # If, after the first checkpoint, we only have 'failed' models,
+            # raise an error.
+            if (ct == failct) and self.exit_if_fail_streak:
+                raise ValueError('Only failed models up to first checkpoint!')
+                
+            if exit_after is not None:
+                if exit_after == (ct // save_freq):
+                    left_early = True
+                    break
+                    
+        # Tell rank 0 not to wait up for us.
+        if left_early and size > 1:
+            MPI.COMM_WORLD.send(False, dest=0, tag=1)
+            
+        if chain_all:
+            self._save_models(prefix_by_proc, chain_all, blobs_all, cost_all)
+            
+        if ct > 0:
+            print("Processor {0}: Wrote {1!s}.*.pkl ({2!s})".format(rank, 
+                prefix, time.ctime()))
+            self._print_warm_start_stats()
+        
+        # Record who ran what (for structured grids, like `prep_output_files`)
+        if rank == 0 and self.grid.structured:
+            if size == 1:
+                runner = np.zeros(self.grid.size, dtype=int)
+                
+            write_pickle_file(runner[np.sort(order)],\
+                '{!s}.load.pkl'.format(self.prefix), ndumps=1,\
+                open_mode='a' if restart else 'w', safe_mode=False, 
+                verbose=False)
+        
+        if size > 1:
+            MPI.COMM_WORLD.Barrier()
+            
+        t2 = time.time()
+        
+        if rank == 0:
+            print("Calculation complete: {!s}".format(time.ctime()))
+            dt = t2 - t1
+            if dt > 3600:
+                print("Elapsed time (hr)   : {0:.3g}".format(dt / 3600.))
+            else:
+                print("Elapsed time (min)  : {0:.3g}".format(dt / 60.))
+                
     @property        
     def Tmin_in_grid(self):
         """
@@ -0,0 +1,364 @@
+"""
+
+WarmStart.py
+
+Description: Re-use converged results from neighboring models in a grid.
+After each model is run, we hold onto a few expensive by-products (e.g.,
+the self-consistent Mmin(z) from the LW feedback iteration), and use them
+to seed the next model. Each kind of by-product, or "artifact," knows which
+parameters are safe to vary without changing it, so that it's only re-used
+when every other parameter is the same (or, if it's just an initial guess,
+that it's always safe to re-use). Anything not known to be safe, e.g., the
+parameters of a ParameterizedQuantity that might feed into Mmin, forces the
+artifact to be rebuilt.
+
+"""
+
+import re
+import numpy as np
+from ..util.Cache import LRUCache
+
+# Parameters that only affect how much (and what kind of) light galaxies
+# emit, not which halos host them or how those halos grow.
+_emission = [r'^pop_fstar', r'^pop_fesc', r'^pop_N(ion|lw|lya)', 
+    r'^pop_rad_yield', r'^pop_sed', r'^pop_alpha', r'^pop_E(min|max)',
+    r'^pop_logN', r'^pop_(ion|heat)_src', r'^pop_fX', r'^pop_cX',
+    r'^pop_solve_rte', r'^(fstar|fesc|Nion|Nlw|Nlya|fX|cX)$', r'^tau_',
+    r'^clumping_factor']
+
+def _get_pops(sim):
+    try:
+        return sim.pops
+    except AttributeError:
+        return None
+
+##
+# Mmin(z) from the LW feedback iteration. Used as the initial guess for the
+# next model via `feedback_LW_guesses`, so it never has to be invalidated:
+# the iteration will still run to convergence.
+##
+def _extract_lw_Mmin(sim):
+    if not sim.pf['feedback_LW']:
+        return None
+
+    try:
+        field = sim.medium.field
+    except AttributeError:
+        return None
+
+    if not hasattr(field, '_Mmin_now'):
+        return None
+
+    return field._zarr.copy(), field._Mmin_now.copy()
+
+def _seed_lw_Mmin(p, value):
+    # MetaGalacticBackground needs to know which population to take the
+    # initial guess from.
+    if not p.get('feedback_LW', False):
+        return False
+    if p.get('feedback_LW_sfrd_popid') is None:
+        return False
+    if p.get('feedback_LW_guesses') is not None:
+        return False
+
+    p['feedback_LW_guesses'] = value
+    return True
+
+##
+# Minimum mass tables for each population, in the absence of feedback.
+# These are re-used exactly, so must be invalidated if anything that affects
+# them changes.
+##
+def _extract_tab_Mmin(sim):
+    if sim.pf['feedback_LW']:
+        return None
+
+    pops = _get_pops(sim)
+    if pops is None:
+        return None
+
+    tabs = [pop._tab_Mmin_.copy() if hasattr(pop, '_tab_Mmin_') else None \
+        for pop in pops]
+
+    if all([tab is None for tab in tabs]):
+        return None
+
+    return tabs
+
+def _inject_tab_Mmin(sim, value):
+    pops = _get_pops(sim)
+    if (pops is None) or (len(pops) != len(value)):
+        return False
+
+    for i, pop in enumerate(pops):
+        if value[i] is None:
+            continue
+        if value[i].size != pop.halos.tab_z.size:
+            continue
+        pop._tab_Mmin_ = value[i].copy()
+
+    return True
+
+##
+# Halo histories fed to the semi-analytic model, i.e., after thinning and
+# adding scatter. Re-used exactly.
+##
+def _extract_histories(sim):
+    pops = _get_pops(sim)
+    if pops is None:
+        return None
+
+    hist = [getattr(pop, '_cache_halos_', None) for pop in pops]
+
+    if all([h is None for h in hist]):
+        return None
+
+    return hist
+
+def _inject_histories(sim, value):
+    pops = _get_pops(sim)
+    if (pops is None) or (len(pops) != len(value)):
+        return False
+
+    for i, pop in enumerate(pops):
+        if value[i] is None:
+            continue
+        # Shallow copy so new keys don't leak between models
+        pop._cache_halos = dict(value[i])
+
+    return True
+
+# name: (extract, seed via parameters, inject into simulator, safe to vary)
+# A safe list of None means the artifact can always be re-used.
+artifacts = \
+{
+ 'feedback_LW_Mmin': (_extract_lw_Mmin, _seed_lw_Mmin, None, None),
+ 'tab_Mmin': (_extract_tab_Mmin, None, _inject_tab_Mmin, _emission),
+ 'histories': (_extract_histories, None, _inject_histories,
+    _emission + [r'^pop_dust', r'^pop_Z$']),
+}
+
+def _nbytes(obj):
+    """
+    Rough size of `obj` in memory [bytes], counting arrays only.
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    elif isinstance(obj, dict):
+        return sum([_nbytes(val) for val in obj.values()])
+    elif isinstance(obj, (list, tuple)):
+        return sum([_nbytes(val) for val in obj])
+    return 0
+
+def snake_order(coords, shape):
+    """
+    Order N-D grid points so that neighbors in the list are neighbors in
+    the grid, i.e., differ by one step along a single axis.
+
+    Parameters
+    ----------
+    coords : list
+        Index tuples of grid points, e.g., `GridND.coords`.
+    shape : tuple
+        Number of elements along each axis.
+
+    Returns
+    -------
+    Array of indices that sort `coords` in boustrophedon order.
+
+    """
+
+    keys = []
+    for loc in coords:
+        key = []
+        lin = 0
+        for i, N in zip(loc, shape):
+            # Reverse this axis whenever the snake through the higher axes
+            # is at an odd position.
+            t = i if lin % 2 == 0 else N - 1 - i
+            key.append(t)
+            lin = lin * N + t
+        keys.append(tuple(key))
+
+    return np.array(sorted(range(len(coords)), key=keys.__getitem__),
+        dtype=int)
+
+class WarmStart(object):
+    def __init__(self, parameters, names=None, maxsize=8, maxbytes=2**28):
+        """
+        Cache of artifacts from models that have been run already.
+
+        Parameters
+        ----------
+        parameters : list
+            Names of parameters that vary from model to model.
+        names : list
+            Names of artifacts to use (see `artifacts`). If None, will use
+            all of them.
+        maxsize : int
+            Number of models to keep artifacts for. The least recently used
+            are dropped first.
+        maxbytes : int, None
+            Also drop artifacts (least recently used first) until the arrays
+            they hold take up at most this many bytes. Artifacts from the
+            most recent model are always kept.
+
+        """
+
+        self.parameters = list(parameters)
+        self.names = list(artifacts.keys()) if names is None else list(names)
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+
+        for name in self.names:
+            assert name in artifacts, \
+                "Unrecognized warm-start artifact '{!s}'".format(name)
+
+        self.cache = LRUCache(maxsize)
+        self.nbytes = {}
+        self.hits = {name: 0 for name in self.names}
+        self.misses = {name: 0 for name in self.names}
+
+        # For each artifact, which grid parameters would invalidate it?
+        # Anything not known to be safe.
+        self._deps = {}
+        for name in self.names:
+            safe = artifacts[name][3]
+            if safe is None:
+                self._deps[name] = []
+                continue
+            
+            regex = [re.compile(pattern) for pattern in safe]
+            self._deps[name] = [i for i, par in enumerate(self.parameters) \
+                if not any([r.search(par) for r in regex])]
+
+    def _point(self, kwargs):
+        return tuple([kwargs[par] for par in self.parameters])
+
+    def store(self, kwargs, sim):
+        """
+        Save artifacts from model with parameters `kwargs` after it's run.
+        """
+
+        point = self._point(kwargs)
+
+        found = {}
+        for name in self.names:
+            try:
+                value = artifacts[name][0](sim)
+            except (AttributeError, KeyError):
+                value = None
+
+            if value is not None:
+                found[name] = value
+
+        if not found:
+            return
+
+        self.cache.put(point, found)
+        self.nbytes[point] = _nbytes(found)
+        
+        # Forget about anything LRUCache evicted, then evict some more if 
+        # we're using too much memory.
+        for pt in list(self.nbytes.keys()):
+            if pt not in self.cache:
+                del self.nbytes[pt]
+        
+        if self.maxbytes is None:
+            return
+            
+        while (len(self.cache) > 1) \
+            and (sum(self.nbytes.values()) > self.maxbytes):
+            pt, val = self.cache.data.popitem(last=False)
+            self.cache.evictions += 1
+            del self.nbytes[pt]
+
+    def nearest(self, kwargs, name):
+        """
+        Find artifact `name` from the nearest (valid) model in the cache.
+
+        Each parameter's contribution to the distance is normalized by the
+        range of values it spans in the cache.
+
+        Returns
+        -------
+        Tuple: (artifact or None, point it came from or None).
+
+        """
+
+        point = np.array(self._point(kwargs), dtype=float)
+
+        cands = [pt for pt in self.cache.data if name in self.cache.data[pt]]
+        if not cands:
+            return None, None
+
+        pts = np.array(cands, dtype=float)
+
+        # Anything that disagrees in a parameter this artifact depends on
+        # can't be used.
+        deps = self._deps[name]
+        if deps:
+            ok = np.all(pts[:,deps] == point[deps], axis=1)
+            if not np.any(ok):
+                return None, None
+        else:
+            ok = np.ones(len(cands), dtype=bool)
+
+        span = np.ptp(np.vstack((pts, point)), axis=0)
+        span[span == 0] = 1.
+
+        d2 = np.sum(((pts - point) / span)**2, axis=1)
+        d2[~ok] = np.inf
+
+        best = cands[int(np.argmin(d2))]
+
+        return self.cache.get(best)[name], best
+
+    def seed(self, kwargs, p):
+        """
+        Seed new model with artifacts from its nearest neighbor(s).
+
+        Parameters
+        ----------
+        kwargs : dict
+            Values of grid parameters for this model.
+        p : dict
+            Full set of parameters for this model. Will be modified in
+            place for artifacts that are passed in as parameters.
+
+        Returns
+        -------
+        Dictionary of artifacts that must be injected into the simulator
+        once it's created, to be passed to `inject`.
+
+        """
+
+        to_inject = {}
+        for name in self.names:
+            value, src = self.nearest(kwargs, name)
+
+            if value is None:
+                self.misses[name] += 1
+                continue
+
+            extract, seed, inject, deps = artifacts[name]
+
+            if seed is not None:
+                used = seed(p, value)
+            else:
+                used = True
+                to_inject[name] = value
+
+            if used:
+                self.hits[name] += 1
+            else:
+                self.misses[name] += 1
+
+        return to_inject
+
+    def inject(self, sim, to_inject):
+        """
+        Hand artifacts (see `seed`) to newly-created simulator instance.
+        """
+        for name in to_inject:
+            artifacts[name][2](sim, to_inject[name])
@@ -13,8 +13,8 @@ import os
 import numpy as np
 from scipy.misc import derivative
 from scipy.optimize import fsolve
-from scipy.integrate import quad, ode
-from ..util.Math import interp1d
+from scipy.integrate import ode
+from ..util.Math import interp1d, hermite_interp
 from ..util.ParameterFile import ParameterFile
 from .InitialConditions import InitialConditions
 from .Constants import c, G, km_per_mpc, m_H, m_He, sigma_SB, g_per_msun, \
@@ -31,6 +31,11 @@ _ares_to_planck = \
 }
     
 class Cosmology(InitialConditions):
+    # Comoving distances are tabulated in ln(1+z) out to this redshift,
+    # beyond which Lambda is negligible and we use the closed form.
+    _D_zmax = 1e4
+    _D_N = 4096
+    
     def __init__(self, pf=None, **kwargs):
         if pf is not None:
             self.pf = pf
@@ -659,10 +664,83 @@ class Cosmology(InitialConditions):
         us (z = 0).
         """
         
-        integr = quad(lambda z: self.hubble_0 / self.HubbleParameter(z), 
-            0.0, z)[0]
+        return (c * self._D(z) * (1. + np.asarray(z)) / self.hubble_0)[()]
+        
+    def _dDdx(self, x):
+        """ Derivative of `_D` with respect to x = ln(1+z). """
+        z = np.expm1(x)
+        return (1. + z) * self.hubble_0 / self.HubbleParameter(z)
+        
+    @property
+    def _tab_D(self):
+        """
+        Comoving distance to z (in units of c / H0) on a fine grid in
+        x = ln(1+z), along with its derivative. Computed with 8-point
+        Gauss-Legendre quadrature in each cell, i.e., to machine precision.
+        """
+        if not hasattr(self, '_tab_D_'):
+            x = np.linspace(0., np.log1p(self._D_zmax), self._D_N + 1)
+            h = np.diff(x)
+            
+            nodes, weights = np.polynomial.legendre.leggauss(8)
+            xx = x[0:-1,None] + 0.5 * h[:,None] * (nodes[None,:] + 1.)
+            dD = 0.5 * h * np.sum(weights[None,:] * self._dDdx(xx), axis=1)
+            
+            D = np.concatenate(([0.], np.cumsum(dD)))
+            
+            self._tab_D_ = x, D, self._dDdx(x)
+            
+        return self._tab_D_
+        
+    def _D(self, z):
+        """
+        Comoving distance from z = 0 to `z` in units of c / H0.
+        """
+        z = np.asarray(z, dtype=float)
+        
+        if self.approx_highz:
+            return 2. * (1. - (1. + z)**-0.5) / np.sqrt(self.omega_m_0)
+        
+        x, D, dDdx = self._tab_D
+        lnz = np.log1p(z)
+        
+        D_z = hermite_interp(np.minimum(lnz, x[-1]), x, D, dDdx)
         
-        return integr * c * (1. + z) / self.hubble_0
+        hi = lnz > x[-1]
+        if np.any(hi):
+            D_hi = D[-1] + 2. * (np.exp(-0.5 * x[-1]) - np.exp(-0.5 * lnz)) \
+                / np.sqrt(self.omega_m_0)
+            D_z = np.where(hi, D_hi, D_z)
+            
+        return D_z
+        
+    def _z_of_D(self, D):
+        """
+        Inverse of `_D`.
+        """
+        D = np.asarray(D, dtype=float)
+        
+        if self.approx_highz:
+            return (1. - 0.5 * D * np.sqrt(self.omega_m_0))**-2 - 1.
+            
+        x, D_tab, dDdx = self._tab_D
+        
+        lnz = hermite_interp(np.minimum(D, D_tab[-1]), D_tab, x, 1. / dDdx)
+        
+        # One Newton step takes care of interpolation error in the inverse.
+        lnz -= (self._D(np.expm1(lnz)) - np.minimum(D, D_tab[-1])) \
+            / self._dDdx(lnz)
+            
+        hi = D > D_tab[-1]
+        if np.any(hi):
+            with np.errstate(invalid='ignore', divide='ignore'):
+                arg = np.exp(-0.5 * x[-1]) \
+                    - 0.5 * (D - D_tab[-1]) * np.sqrt(self.omega_m_0)
+                # NaN beyond the particle horizon.
+                lnz_hi = -2. * np.log(np.where(arg > 0, arg, np.nan))
+            lnz = np.where(hi, lnz_hi, lnz)
+            
+        return np.expm1(lnz)
         
     def DifferentialRedshiftElement(self, z, dl):
         """
@@ -687,22 +765,29 @@ class Cosmology(InitialConditions):
         return dz
         
     def DeltaZed(self, z0, dR):
-        f = lambda z2: self.ComovingRadialDistance(z0, z2) / cm_per_mpc - dR
-        return fsolve(f, x0=z0+0.1)[0] - z0
+        """
+        Redshift interval corresponding to comoving distance `dR` [Mpc]
+        beyond redshift `z0`.
+        """
+        D = self._D(z0) + np.asarray(dR) * cm_per_mpc * self.hubble_0 / c
+        return (self._z_of_D(D) - z0)[()]
         
     def ComovingRadialDistance(self, z0, z):
         """
         Return comoving distance between redshift z0 and z, z0 < z.
         """
         
-        if self.approx_highz:
-            return 2. * c * ((1. + z0)**-0.5 - (1. + z)**-0.5) \
-                / self.hubble_0 / np.sqrt(self.omega_m_0)
-                
-        # Otherwise, do the integral - normalize to H0 for numerical reasons
-        integrand = lambda z: self.hubble_0 / self.HubbleParameter(z)
-
-        return c * quad(integrand, z0, z)[0] / self.hubble_0  
+        return (c * (self._D(z) - self._D(z0)) / self.hubble_0)[()]
+        
+    def ComovingDistanceToRedshift(self, R, z0=0.):
+        """
+        Return redshift a comoving distance `R` [cm] beyond redshift z0.
+        
+        Inverse of `ComovingRadialDistance`.
+        """
+        
+        D = self._D(z0) + np.asarray(R) * self.hubble_0 / c
+        return self._z_of_D(D)[()]
             
     def ProperRadialDistance(self, z0, z):
         return self.ComovingRadialDistance(z0, z) / (1. + z0)    
@@ -758,7 +843,8 @@ class Cosmology(InitialConditions):
         
         dA = angle_rad * d_cm
         
-        dldz = quad(self.ComovingLineElement, z-0.5*dz, z+0.5*dz)[0]
+        # Integral of ComovingLineElement over the shell
+        dldz = self.ComovingRadialDistance(z-0.5*dz, z+0.5*dz)
         
         return dA**2 * dldz / cm_per_mpc**3
     
@@ -778,8 +864,10 @@ class Cosmology(InitialConditions):
         """
         Convert a length scale (co-moving) to an observed angle [arcmin].
         """
-        f = lambda ang: self.AngleToComovingLength(z, ang) - R
-        return fsolve(f, x0=0.1)[0]
+        d = self.LuminosityDistance(z) / (1. + np.asarray(z)) # cm
+        in_rad = np.arctan(R * cm_per_mpc / d)
+        
+        return (in_rad * 60. * 180. / np.pi)[()]
         
     def AngleToComovingLength(self, z, angle):
         return self.AngleToProperLength(z, angle) * (1. + z)
@@ -63,9 +63,15 @@ def PhotoIonizationCrossSection(E, species=0):
     
 sigma0 = PhotoIonizationCrossSection(E_th[0])
 def ApproximatePhotoIonizationCrossSection(E, species=0):
-    if E < E_th[species]:
-        return 0.0
-    return sigma0 * (E_th[species] / E)**3                         
+    if type(E) == np.ndarray:
+        mask = np.array(E >= E_th[species], dtype=int)
+    else:
+        if E < E_th[species]:
+            return 0.0
+        
+        mask = 1
+        
+    return sigma0 * (E_th[species] / E)**3 * mask
     
 
     
\ No newline at end of file
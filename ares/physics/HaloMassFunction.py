@@ -18,6 +18,7 @@ from ..util import ParameterFile
 from scipy.misc import derivative
 from scipy.optimize import fsolve
 from ..util.Warnings import no_hmf
+from ..util.Cache import MappedCache, digest, pack_mapped, unpack_mapped
 from scipy.integrate import cumtrapz, simps
 from ..util.PrintInfo import print_hmf
 from ..util.ProgressBar import ProgressBar
@@ -38,6 +39,11 @@ try:
     import h5py
 except ImportError:
     pass
+    
+try:
+    import multiprocessing
+except ImportError:
+    pass
 
 try:
     from mpi4py import MPI
@@ -369,6 +375,48 @@ class HaloMassFunction(object):
             self._tab_MAR = 10**(np.diff(log_tmar, axis=0).squeeze() \
                 * (m_X - m_X_l) + log_tmar[0])            
                     
+    def _read_hmf_hdf5(self):
+        """ Read tables from HDF5 into a dictionary. """
+        names = ['tab_z', 'tab_M', 'tab_dndm', 'tab_k_lin', 'tab_ps_lin',
+            'tab_sigma', 'tab_dlnsdlnm', 'tab_ngtm', 'tab_mgtm', 'tab_MAR',
+            'tab_growth']
+        
+        tabs = {}
+        with h5py.File(self.tab_name, 'r') as f:
+            for name in names:
+                # tab_MAR is optional: can generate on the fly.
+                if name in f:
+                    tabs[name] = np.array(f[(name)])
+                    
+        return tabs
+        
+    def _load_hmf_shared(self):
+        """
+        Map tables from ``shared_tables`` directory, putting them there first
+        if we're the first process on this node to need them.
+        
+        Entries are keyed by the path, size, and modification time of the
+        HDF5 file, so regenerating the tables invalidates old copies.
+        """
+        st = os.stat(self.tab_name)
+        key = digest(('hmf', os.path.abspath(self.tab_name), st.st_size,
+            st.st_mtime))
+        
+        cache = MappedCache(self.pf['shared_tables'])
+        tabs = cache.get(key)
+        if tabs is None:
+            tabs = cache.put(key, self._read_hmf_hdf5())
+            
+        return tabs
+        
+    def __getstate__(self):
+        # Pickle shared tables as references so that, e.g., ModelFit can
+        # hand this instance to other processes cheaply.
+        return pack_mapped(self.__dict__)
+        
+    def __setstate__(self, state):
+        self.__dict__.update(unpack_mapped(state))
+                        
     def _load_hmf(self):
         """ Load table from HDF5 or binary. """
 
@@ -437,24 +485,16 @@ class HaloMassFunction(object):
                 self.TabulateMAR()
             
         elif ('.hdf5' in self.tab_name) or ('.h5' in self.tab_name):
-            f = h5py.File(self.tab_name, 'r')
-            self.tab_z = np.array(f[('tab_z')])
-            self.tab_M = np.array(f[('tab_M')])
-            self.tab_dndm = np.array(f[('tab_dndm')])
-
-            #if self.pf['hmf_load_ps']:
-            self.tab_k_lin = np.array(f[('tab_k_lin')])
-            self.tab_ps_lin = np.array(f[('tab_ps_lin')])
-            self.tab_sigma = np.array(f[('tab_sigma')])
-            self.tab_dlnsdlnm = np.array(f[('tab_dlnsdlnm')])
-
-            self.tab_ngtm = np.array(f[('tab_ngtm')])
-            self.tab_mgtm = np.array(f[('tab_mgtm')])
-            if 'tab_MAR' in f:
-                self._tab_MAR = np.array(f[('tab_MAR')])
-            self.tab_growth = np.array(f[('tab_growth')])
+            if self.pf['shared_tables'] is not None:
+                tabs = self._load_hmf_shared()
+            else:
+                tabs = self._read_hmf_hdf5()
             
-            f.close()
+            for name in tabs:
+                if name == 'tab_MAR':
+                    self._tab_MAR = tabs[name]
+                else:
+                    setattr(self, name, tabs[name])
         else:
             raise IOError('Unrecognized format for hmf_table.')   
                 
@@ -673,19 +713,11 @@ class HaloMassFunction(object):
 
         for i, z in enumerate(self.tab_z):
                         
-            if i > 0:
-                self._MF.update(z=z)
-
             if i % size != rank:
                 continue
 
-            # Undo little h for all main quantities
-            self.tab_dndm[i] = self._MF.dndm.copy() * self.cosm.h70**4
-            self.tab_mgtm[i] = self._MF.rho_gtm.copy() * self.cosm.h70**2
-            self.tab_ngtm[i] = self._MF.ngtm.copy() * self.cosm.h70**3
-             
-            self.tab_ps_lin[i] = self._MF.power.copy() / self.cosm.h70**3                
-            self.tab_growth[i] = self._MF.growth_factor * 1.            
+            self.tab_dndm[i], self.tab_mgtm[i], self.tab_ngtm[i], \
+                self.tab_ps_lin[i], self.tab_growth[i] = self._hmf_slab(i)
                                     
             pb.update(i)
             
@@ -724,38 +756,275 @@ class HaloMassFunction(object):
         
         self.TabulateMAR()
     
+    def _hmf_slab(self, i):
+        """
+        Compute the mass function (and friends) at redshift self.tab_z[i].
+        
+        Returns
+        -------
+        Tuple containing dn/dm, m(>M), n(>M), linear power spectrum, and
+        growth factor, with little h removed.
+        """
+        
+        if self._MF.z != self.tab_z[i]:
+            self._MF.update(z=self.tab_z[i])
+        
+        return self._MF.dndm.copy() * self.cosm.h70**4, \
+            self._MF.rho_gtm.copy() * self.cosm.h70**2, \
+            self._MF.ngtm.copy() * self.cosm.h70**3, \
+            self._MF.power.copy() / self.cosm.h70**3, \
+            self._MF.growth_factor * 1.
+            
+    def GenerateHMF(self, fn=None, destination=None, save_MAR=True, 
+        nproc=None, chunk_M=None):
+        """
+        Tabulate the mass function, writing each redshift to disk as it is
+        computed, so that an interrupted calculation can be resumed.
+        
+        Output is an HDF5 file laid out just like those made by `SaveHMF`.
+        If `fn` already exists (e.g., from an earlier run that got killed),
+        redshifts that were already finished are skipped.
+        
+        Work is split among MPI processors if there are any, in which case
+        the root processor does all the writing. Otherwise, will use a 
+        multiprocessing pool with `nproc` processes (default: all cores).
+        
+        Parameters
+        ----------
+        fn : str (optional)
+            Name of file to save results to. If None, will use 
+            self.tab_prefix_hmf to make one up.
+        destination : str
+            Path to directory (other than CWD) to save table.
+        chunk_M : int
+            Number of masses per HDF5 chunk. Default is all of them, i.e.,
+            one chunk per redshift.
+            
+        """
+        
+        if destination is None:
+            destination = '.'
+            
+        if fn is None:
+            fn = '{0!s}/{1!s}.hdf5'.format(destination, 
+                self.tab_prefix_hmf(True))
+            
+        # Initialize the MassFunction object.
+        MF = self._MF
+        
+        # Masses in hmf are really Msun / h
+        if hmf_vers < 3:
+            self.tab_M = self._MF.M / self.cosm.h70
+        else:
+            self.tab_M = self._MF.m / self.cosm.h70
+            
+        self.tab_k_lin = self._MF.k * self.cosm.h70
+        
+        Nz, NM, Nk = self.tab_z.size, self.tab_M.size, self.tab_k_lin.size
+        
+        if chunk_M is None:
+            chunk_M = NM
+        
+        # Setup file, or figure out where we left off.
+        if rank == 0:
+            if os.path.exists(fn):
+                f = h5py.File(fn, 'r+')
+                
+                if 'done' not in f:
+                    f.close()
+                    raise IOError(('{!s} exists but was not made by ' +\
+                        'GenerateHMF! Remove manually.').format(fn))
+                
+                ok = np.array_equal(np.array(f[('tab_z')]), self.tab_z) \
+                    and np.array_equal(np.array(f[('tab_M')]), self.tab_M)
+                if not ok:
+                    f.close()
+                    raise ValueError(('Grid in {!s} does not match ' +\
+                        'parameters!').format(fn))
+                
+                done = np.array(f[('done')])
+                
+                if self.pf['verbose']:
+                    print("# Resuming {!s}: {}/{} redshifts done.".format(fn,
+                        done.sum(), Nz))
+            else:
+                f = h5py.File(fn, 'w')
+                f.create_dataset('tab_z', data=self.tab_z)
+                f.create_dataset('tab_M', data=self.tab_M)
+                f.create_dataset('tab_k_lin', data=self.tab_k_lin)
+                
+                for key in ['tab_dndm', 'tab_ngtm', 'tab_mgtm']:
+                    f.create_dataset(key, shape=(Nz, NM), dtype=float,
+                        chunks=(1, min(chunk_M, NM)), fillvalue=0.0)
+                f.create_dataset('tab_ps_lin', shape=(Nz, Nk), dtype=float,
+                    chunks=(1, Nk), fillvalue=0.0)    
+                f.create_dataset('tab_growth', shape=(Nz,), dtype=float,
+                    fillvalue=0.0)
+                f.create_dataset('done', shape=(Nz,), dtype=bool, 
+                    fillvalue=False)
+                
+                done = np.zeros(Nz, dtype=bool)
+        else:
+            f = None
+            done = None
+        
+        if size > 1:
+            done = MPI.COMM_WORLD.bcast(done, root=0)
+                
+        todo = np.argwhere(np.logical_not(done)).ravel()
+        
+        def write(i, slab):
+            f['tab_dndm'][i], f['tab_mgtm'][i], f['tab_ngtm'][i], \
+                f['tab_ps_lin'][i], f['tab_growth'][i] = slab
+            f['done'][i] = True
+            f.flush()
+        
+        pb = ProgressBar(todo.size, 'hmf')
+        pb.start()
+        
+        if size > 1:
+            # Lock-step: each processor does one redshift, root writes.
+            for j, lo in enumerate(range(0, todo.size, size)):
+                k = lo + rank
+                slab = (todo[k], self._hmf_slab(todo[k])) \
+                    if k < todo.size else None
+                slabs = MPI.COMM_WORLD.gather(slab, root=0)
+                
+                if rank == 0:
+                    for element in slabs:
+                        if element is not None:
+                            write(*element)
+                            
+                pb.update(min(lo + size, todo.size))
+        else:
+            if nproc is None:
+                nproc = multiprocessing.cpu_count()
+                
+            # Workers inherit this object, hence the 'fork' requirement.
+            try:
+                ctx = multiprocessing.get_context('fork')
+            except (NameError, ValueError):
+                nproc = 1
+                
+            if (nproc > 1) and (todo.size > 1):
+                global _hmf_for_pool
+                _hmf_for_pool = self
+                pool = ctx.Pool(min(nproc, todo.size))
+                try:
+                    results = pool.imap_unordered(_hmf_slab_pool, todo)
+                    for j, (i, slab) in enumerate(results):
+                        write(i, slab)
+                        pb.update(j + 1)
+                finally:
+                    pool.close()
+                    pool.join()
+                    _hmf_for_pool = None
+            else:
+                for j, i in enumerate(todo):
+                    write(i, self._hmf_slab(i))
+                    pb.update(j + 1)
+                
+        pb.finish()
+        
+        # Now, everybody reads in the full table.
+        if size > 1:
+            MPI.COMM_WORLD.Barrier()
+        
+        if rank == 0:
+            f.close()
+            
+        f = h5py.File(fn, 'r')
+        self.tab_dndm = np.array(f[('tab_dndm')])
+        self.tab_ngtm = np.array(f[('tab_ngtm')])
+        self.tab_mgtm = np.array(f[('tab_mgtm')])
+        self.tab_ps_lin = np.array(f[('tab_ps_lin')])
+        self.tab_growth = np.array(f[('tab_growth')])
+        has_MAR = 'tab_MAR' in f
+        if has_MAR:
+            self._tab_MAR = np.array(f[('tab_MAR')])
+        f.close()
+        
+        # All processors will have this.
+        self.tab_sigma = self._MF._sigma_0
+        self.tab_dlnsdlnm = self._MF._dlnsdlnm
+        
+        # Can't be done until all redshifts are available.
+        if save_MAR and (not has_MAR):
+            self.TabulateMAR()
+        
+        if rank > 0:
+            return fn
+            
+        try:
+            hmf_v = hmf.__version__
+        except (NameError, AttributeError):
+            hmf_v = 'unknown'
+            
+        f = h5py.File(fn, 'r+')
+        
+        if save_MAR and (not has_MAR):
+            f.create_dataset('tab_MAR', data=self.tab_MAR)
+            
+        for key in ['tab_Mmin_floor', 'tab_sigma', 'tab_dlnsdlnm']:
+            if key not in f:
+                f.create_dataset(key, data=self.__getattribute__(key))
+                
+        if 'hmf-version' not in f:
+            f.create_dataset('hmf-version', data=hmf_v)
+            
+        if 'cosmology' not in f:
+            grp = f.create_group('cosmology')
+            grp.attrs.update(cosmology_name=self.pf['cosmology_name'],
+                cosmology_id=self.pf['cosmology_id'])
+            
+            grp.create_dataset('omega_m_0', data=self.cosm.omega_m_0)
+            grp.create_dataset('omega_l_0', data=self.cosm.omega_l_0)
+            grp.create_dataset('sigma_8', data=self.cosm.sigma_8)
+            grp.create_dataset('h70', data=self.cosm.h70)
+            grp.create_dataset('omega_b_0', data=self.cosm.omega_b_0)
+            grp.create_dataset('omega_cdm_0', data=self.cosm.omega_cdm_0)
+            grp.create_dataset('helium_by_mass', data=self.cosm.Y)
+            grp.create_dataset('cmb_temp_0', data=self.cosm.cmb_temp_0)
+            grp.create_dataset('primordial_index', 
+                data=self.cosm.primordial_index)
+            
+        f.close()
+        
+        print('# Wrote {!s}.'.format(fn))
+        
+        return fn
+        
     def TabulateMAR(self):
         ##
         # Generate halo growth histories
         ##
-
         
-        pb = ProgressBar(self.tab_z.size+self.tab_M.size, 'mar')
-        pb.start()
+        Nz, NM = self.tab_z.size, self.tab_M.size
+        
+        # The first dimension is halo identity, the first self.tab_z.size
+        # elements are halos with M=self.tab_M[0], the next self.tab_M.size
+        # elements are halos with M=self.tab_M and formation redshifts
+        # equal to self.tab_z[-1]. The second dimension is a series
+        # of masses at corresponding redshifts in self.tab_z.
+        iz = np.zeros(Nz + NM, dtype=int)
+        iM = np.zeros(Nz + NM, dtype=int)
+        iz[1:Nz] = np.arange(1, Nz)
+        iz[Nz:-1] = Nz - 1
+        iM[Nz:-1] = np.arange(1, NM)
+        
+        # Rows 0 and -1 are never filled in
+        todo = np.zeros(Nz + NM, dtype=bool)
+        todo[1:-1] = True
+        
+        # Split up halos among processors
+        todo[np.arange(Nz + NM) % size != rank] = False
         
         # First, do the cumulative number density calculation.
         # This is actually the slowest part.
-        MM = np.zeros((self.tab_z.size+self.tab_M.size, self.tab_z.size))
-
-        for j, i in enumerate(range(self.tab_z.size-1, 0, -1)):
-            if i % size != rank:
-                continue
-            MM[i] = self._run_CND(i,0)
-            
-            pb.update(j)
-        
-        # Find trajectories for more massive halos with zform=zfirst    
-        for j, i in enumerate(range(1, self.tab_M.size)):
-            if i % size != rank:
-                continue
-            MM[i+self.tab_z.size-1] = self._run_CND(self.tab_z.size-1, i)
-                                             
-            pb.update(j+self.tab_z.size-1)
-            
-        pb.finish()                              
+        MM = np.zeros((Nz + NM, Nz))
+        MM[todo==1] = self._run_CND_vec(iz[todo==1], iM[todo==1])
                                                 
         self.tab_traj = MM
-
         
         if size > 1:
             tmp = np.zeros_like(self.tab_traj)
@@ -763,37 +1032,29 @@ class HaloMassFunction(object):
             self.tab_traj = tmp.copy()
             del tmp
         
-        # The first dimension is halo identity, the first self.tab_z.size
-        # elements are halos with M=self.tab_M[0], the next self.tab_M.size
-        # elements are halos with M=self.tab_M and formation redshifts
-        # equal to self.tab_z[-1]. The second dimension is a series
-        # of masses at corresponding redshifts in self.tab_z.
-        
+        # Compute dMdt for each history, and interpolate onto tab_z, which
+        # is the same for all halos, so we do this all at once. Mirrors
+        # scipy's interp1d (linear, with fill_value=-inf) exactly.
         dtdz = self.cosm.dtdz(self.tab_z)[1:-1]
-        # Step 0: Compute dMdt for each history.
-        # Step 1: Interpolate dMdt onto tab_M grid.
-        tab_dMdt_of_z = np.zeros((self.tab_traj.shape[0], self.tab_z.size))
-        tab_dMdt_of_M = np.zeros((self.tab_traj.shape[0], self.tab_M.size))    
-        for i, hist in enumerate(self.tab_traj):
-            # 'hist' is the trajectory of a halo
-            
-            # Remember that mass increases as z decreases, so we flip
-            
-            z, dmdz = central_difference(self.tab_z, hist)
-            
-            mofz = hist[1:-1] * 1
-                            
-            # Interpolate accretion rates onto common mass grid
-            dmdt = dmdz[-1::-1] * s_per_yr / -dtdz[-1::-1]
-            _interp1 = interp1d(np.log(mofz[-1::-1]), np.log(dmdt), 
-                kind='linear', bounds_error=False, fill_value=-np.inf)
-            _interp2 = interp1d(np.log(z[-1::-1]), np.log(dmdt), 
-                kind='linear', bounds_error=False, fill_value=-np.inf)
-            dmdt_rg1 = np.exp(_interp1(np.log(self.tab_M)))
-            dmdt_rg2 = np.exp(_interp2(np.log(self.tab_z)))
-                            
-            tab_dMdt_of_M[i,:] = dmdt_rg1
-            tab_dMdt_of_z[i,:] = dmdt_rg2
+        
+        z = self.tab_z[1:-1]
+        dmdz = (self.tab_traj[:,2:] - self.tab_traj[:,0:-2]) \
+            / (self.tab_z[2:] - self.tab_z[0:-2])
+        dmdt = dmdz * s_per_yr / -dtdz
+        
+        x = np.log(z)
+        y = np.log(dmdt)
+        xnew = np.log(self.tab_z)
+        
+        hi = np.clip(np.searchsorted(x, xnew), 1, x.size - 1)
+        lo = hi - 1
+        slope = (y[:,hi] - y[:,lo]) / (x[hi] - x[lo])
+        ynew = slope * (xnew - x[lo]) + y[:,lo]
+        
+        oob = np.logical_or(xnew < x[0], xnew > x[-1])
+        ynew[:,oob==1] = -np.inf
+        
+        tab_dMdt_of_z = np.exp(ynew)
 
         ##    
         # Convert from trajectories to (z, Mh) table.
@@ -1079,6 +1340,47 @@ class HaloMassFunction(object):
         
         return np.squeeze(self.dfcolldz_spline(z))
 
+    def _run_CND_vec(self, iz, iM):
+        """
+        Same as `_run_CND`, but for many halos at once.
+        
+        Parameters
+        ----------
+        iz : np.ndarray
+            Index of starting redshift for each halo.
+        iM : np.ndarray
+            Index of starting mass for each halo.
+            
+        Returns
+        -------
+        Array of masses with shape (number of halos, number of redshifts).
+        
+        """
+        
+        iz = np.atleast_1d(iz)
+        M = np.zeros((iz.size, self.tab_z.size))
+        
+        if iz.size == 0:
+            return M
+        
+        logM = np.log(self.tab_M)
+        m_1 = self.tab_M[np.atleast_1d(iM)] * np.ones(iz.size)
+        
+        # All halos take the same step at once, once they've started.
+        for j in range(iz.max(), 1, -1):
+            on = iz >= j
+            
+            ngtm_1 = np.exp(np.interp(np.log(m_1[on==1]), logM, 
+                np.log(self.tab_ngtm[j])))
+            ngtm_2 = self.tab_ngtm[j-1,:]
+            m_2 = np.exp(np.interp(np.log(ngtm_1), np.log(ngtm_2[-1::-1]),
+                logM[-1::-1]))
+            
+            M[on==1,j] = m_2
+            m_1[on==1] = m_2
+            
+        return M
+    
     def _run_CND(self, iz, iM=0):
         """
         "Evolve" a halo through time (assuming fixed number density).
@@ -1462,4 +1764,10 @@ class HaloMassFunction(object):
         print('# Wrote {!s}.'.format(fn))
         
         return
-        
+
+_hmf_for_pool = None
+def _hmf_slab_pool(i):
+    """
+    For HaloMassFunction.GenerateHMF: compute one redshift in a worker.
+    """
+    return i, _hmf_for_pool._hmf_slab(i)
@@ -9,6 +9,8 @@ from types import FunctionType
 from scipy.integrate import quad
 from scipy.interpolate import interp1d, Akima1DInterpolator
 from ..util.ProgressBar import ProgressBar
+from ..util.FFTLog import fftlog
+from ..util.Cache import LRUCache, fingerprint
 from .Constants import rho_cgs, c, cm_per_mpc
 from .HaloMassFunction import HaloMassFunction
 
@@ -98,11 +100,18 @@ class HaloModel(HaloMassFunction):
         
         ..note:: This is Equation 81 from Cooray & Sheth (2002).
         
+        ..note:: Like all profiles, `k` and `m` can be arrays, so long as
+            they broadcast against one another, e.g., k[:,None] and
+            m[None,:] will yield a table of shape (len(k), len(m)).
+        
         Parameters
         ----------
-        k : int, float
+        k : int, float, np.ndarray
             Wavenumber
-        m : 
+        m : int, float, np.ndarray
+            Halo mass [Msun]
+        z : int, float
+            Redshift
         """
         c, r_s = self.cm_relation(m, z, get_rs=True)
 
@@ -155,14 +164,56 @@ class HaloModel(HaloMassFunction):
     #def RadialProfile(self, value):
     #    pass
     
-    def FluxProfileFT(self, k, m, z, lc=False):
-        _numerator = lambda r: 4. * np.pi * r**2 * np.sin(k * r) / (k * r) \
-            * self.FluxProfile(r, m, z, lc=lc)
-        _denominator = lambda r: 4. * np.pi * r**2 *\
-            self.FluxProfile(r, m, z, lc=lc)
+    def FluxProfileFT(self, k, m, z, lc=False, Nr=2000):
+        """
+        Normalized Fourier transform of the LW flux profile.
+        
+        The mass-dependence cancels out, so all that's left is the transform
+        of the modulation factor, which we take to be piecewise linear in r
+        on `Nr` points between the source and the LW horizon. Each segment
+        can then be integrated analytically against sin(kr) / kr, which
+        stays accurate even when the integrand oscillates many times over
+        a single segment (i.e., at high k).
+        
+        Parameters
+        ----------
+        k : int, float, np.ndarray
+            Wavenumber [1 / cMpc]
+        m : int, float, np.ndarray
+            Halo mass [Msun]. Only used to set the shape of the output.
+        z : int, float
+            Redshift
+        
+        """
+        
         _r_LW = 97.39 * self.ScalingFactor(z)
-        temp = quad(_numerator, 0., _r_LW)[0] / quad(_denominator, 0., _r_LW)[0]
-        return temp
+        r = np.linspace(0., _r_LW, Nr)
+        g = self.ModulationFactor(z, r=r, lc=lc)
+        
+        # g(r) = a + b * r on each segment
+        b = np.diff(g) / np.diff(r)
+        a = g[0:-1] - b * r[0:-1]
+        
+        kk = np.reshape(np.abs(k), (-1, 1))
+        x = kk * r[None,:]
+        
+        si = sp.sici(x)[0]
+        
+        # Difference in cos(k r) across each segment, written so as not 
+        # to suffer from round-off at small k.
+        dcos = -2. * np.sin(0.5 * (x[:,1:] + x[:,0:-1])) \
+            * np.sin(0.5 * (x[:,1:] - x[:,0:-1]))
+        
+        num = np.sum(a * (si[:,1:] - si[:,0:-1]) / kk - b * dcos / kk**2,
+            axis=1)
+        den = np.trapz(g, x=r)
+        
+        temp = np.reshape(num / den, np.shape(k))
+        
+        if np.ndim(temp) == 0 and np.ndim(m) == 0:
+            return float(temp)
+        
+        return temp * np.ones_like(m, dtype=float)
     
     def ScalingFactor(self, z):
         return (self.cosm.h70 / 0.7)**-1 * (self.cosm.omega_m_0 / 0.27)**-0.5 * ((1. + z) / 21.)**-0.5
@@ -177,9 +228,9 @@ class HaloModel(HaloMassFunction):
         :lc: True or False, including the light cone effect
         :return:
         """
-        if z != None and r == None:
+        if (z is not None) and (r is None):
             r_comov = self.cosm.ComovingRadialDistance(z0, z)
-        elif z == None and r != None:
+        elif (z is None) and (r is not None):
             r_comov = r
         else:
             raise ValueError('Must specify either "z" or "r".')
@@ -202,31 +253,129 @@ class HaloModel(HaloMassFunction):
         
         """
         
-        if type(k) == np.ndarray:
-            integ1 = []; integ2 = []
-            for _k in k:
-                _integ1, _integ2 = self._integrate_over_prof(_k, iz, 
-                    prof1, prof2, lum1, lum2, mmin1, mmin2, term)
-                integ1.append(_integ1)
-                integ2.append(_integ2)
-                
-            integ1 = np.array(integ1)
-            integ2 = np.array(integ2)    
-        else:    
-            integ1, integ2 = self._integrate_over_prof(k, iz, 
-                prof1, prof2, lum1, lum2, mmin1, mmin2, term)
+        shape = np.shape(k)
+        
+        integ1, integ2 = self._integrate_over_prof(np.ravel(k), iz, 
+            prof1, prof2, lum1, lum2, mmin1, mmin2, term)
+        
+        if len(shape) == 0:
+            integ1 = integ1[0]
+            integ2 = None if integ2 is None else integ2[0]
+        else:
+            integ1 = np.reshape(integ1, shape)
+            integ2 = None if integ2 is None else np.reshape(integ2, shape)
         
         return integ1, integ2
+    
+    def _get_prof_key(self, prof):
+        """
+        Hashable summary of profile `prof` and any parameters it depends on.
+        
+        For bound methods, this is just the method and the object it's bound
+        to. For functions (e.g., lambdas wrapping `u_isl`), it's the code 
+        object and the contents of its closure, so that, e.g., lambdas with
+        different `rmax` don't collide. Returns None if we can't tell.
+        """
+        
+        if hasattr(prof, '__func__') and hasattr(prof, '__self__'):
+            key = (prof.__func__, prof.__self__)
+        elif hasattr(prof, '__code__'):
+            cells = prof.__closure__ or ()
+            
+            state = []
+            for cell in cells:
+                try:
+                    val = cell.cell_contents
+                except ValueError:
+                    return None
+                
+                fp = val if callable(val) else fingerprint(val)
+                
+                # Would only be able to identify this by its id, which
+                # may be re-used once the original object is gone.
+                if type(fp) is tuple and len(fp) == 2 and fp[0] == 'id':
+                    return None
+                
+                state.append(fp)
+            
+            key = (prof.__code__, tuple(state), 
+                fingerprint(prof.__defaults__))
+        else:
+            key = prof
+        
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        
+        return key
+    
+    def _get_prof_tab(self, prof, k, iz):
+        """
+        Tabulate profile `prof` on (k, M) mesh at redshift tab_z[iz].
+        
+        Tables are cached (up to `hps_prof_cache_size` of them), keyed by
+        redshift, profile (and its parameters), and k, so that repeated 
+        calls, e.g., in an MCMC where only luminosities change from one 
+        model to the next, only have to do the integrals over mass.
+        
+        Returns
+        -------
+        Array of shape (len(k), len(self.tab_M)).
+        
+        """
+        
+        if not hasattr(self, '_cache_prof_'):
+            self._cache_prof_ = LRUCache(maxsize=self.pf['hps_prof_cache_size'])
+        
+        key = self._get_prof_key(prof)
+        if key is not None:
+            key = (iz, key, fingerprint(k))
+            cached = self._cache_prof_.get(key)
+            if cached is not None:
+                return cached
+        
+        z = self.tab_z[iz]
+        shape = (k.size, self.tab_M.size)
+        
+        try:
+            tab = np.broadcast_to(prof(k[:,None], self.tab_M[None,:], z), 
+                shape)
+        except (TypeError, ValueError):
+            # Profile only knows about scalars
+            tab = np.array([[prof(_k, M, z) for M in self.tab_M] \
+                for _k in k])
         
+        tab = np.abs(tab)
+        
+        if key is not None:
+            self._cache_prof_.put(key, tab)
+        
+        return tab
+    
     def _integrate_over_prof(self, k, iz, prof1, prof2, lum1, lum2, mmin1, 
         mmin2, term):
         """
         Compute integrals over profile, weighted by bias, dndm, etc.,
         needed for halo model.
+        
+        The integrals over mass are done for all `k` at once, as products
+        of (k, M) profile tables with vectors of trapezoidal weights in ln M.
+        
+        Parameters
+        ----------
+        k : np.ndarray
+            1-D array of wavenumbers.
+        
+        Returns
+        -------
+        Tuple of arrays, each the same length as `k` (second element is None
+        for the 1-halo term).
+        
         """
         
-        p1 = np.abs([prof1(k, M, self.tab_z[iz]) for M in self.tab_M])
-        p2 = np.abs([prof2(k, M, self.tab_z[iz]) for M in self.tab_M])
+        p1 = self._get_prof_tab(prof1, k, iz)
+        p2 = p1 if prof2 is prof1 else self._get_prof_tab(prof2, k, iz)
         
         bias = self.tab_bias[iz]
         rho_bar = self.cosm.rho_m_z0 * rho_cgs
@@ -253,10 +402,16 @@ class HaloModel(HaloMassFunction):
             corr2 = 0.0
             fcoll2 = 1.    
         else:
-            fcoll2 = self.fcoll_2d(z, np.log10(Mmin_2))#self.fcoll_Tmin[iz]
+            fcoll2 = self.tab_fcoll[iz,np.argmin(np.abs(mmin2-self.tab_M))]
             corr2 = 0.0
 
         ok = self.tab_fcoll[iz] > 0
+        
+        # Trapezoidal weights in ln(M) for the masses we're keeping.
+        lnM = np.log(self.tab_M[ok])
+        wt = np.zeros_like(lnM)
+        wt[0:-1] += 0.5 * np.diff(lnM)
+        wt[1:] += 0.5 * np.diff(lnM)
 
         # If luminosities passed, then we must cancel out a factor of halo 
         # mass that generally normalizes the integrand.
@@ -277,20 +432,18 @@ class HaloModel(HaloMassFunction):
         ##
         # Are we doing the 1-h or 2-h term?
         if term == 1:
-            integrand = dndlnm * weight1 * weight2 * p1 * p2 / norm1 / norm2 
+            integrand = dndlnm * weight1 * weight2 / norm1 / norm2 
 
-            result = np.trapz(integrand[ok==1], x=np.log(self.tab_M[ok==1]))
+            result = np.dot(p1[:,ok] * p2[:,ok], integrand[ok] * wt)
             
             return result, None
             
         elif term == 2:
-            integrand1 = dndlnm * weight1 * p1 * bias / norm1
-            integrand2 = dndlnm * weight2 * p2 * bias / norm2
+            integrand1 = dndlnm * weight1 * bias / norm1
+            integrand2 = dndlnm * weight2 * bias / norm2
         
-            integral1 = np.trapz(integrand1[ok==1], x=np.log(self.tab_M[ok==1]), 
-                axis=0)
-            integral2 = np.trapz(integrand2[ok==1], x=np.log(self.tab_M[ok==1]), 
-                axis=0)
+            integral1 = np.dot(p1[:,ok], integrand1[ok] * wt)
+            integral2 = np.dot(p2[:,ok], integrand2[ok] * wt)
             
             return integral1 + corr1, integral2 + corr2
             
@@ -388,7 +541,7 @@ class HaloModel(HaloMassFunction):
         ps_1h = self.get_ps_1h(z, k, prof1, prof2, lum1, lum2, mmin1, mmin2, ztol)    
         ps_2h = self.get_ps_2h(z, k, prof1, prof2, lum1, lum2, mmin1, mmin2, ztol)    
         
-        return ps1h + ps2h
+        return ps_1h + ps_2h
 
     def CorrelationFunction(self, z, R, k=None, Pofk=None, load=True):
         """
@@ -435,12 +588,23 @@ class HaloModel(HaloMassFunction):
     
     def InverseFT3D(self, R, ps, k=None, kmin=None, kmax=None,
         epsabs=1e-12, epsrel=1e-12, limit=500, split_by_scale=False,
-        method='clenshaw-curtis', use_pb=False, suppression=np.inf):
+        method='clenshaw-curtis', use_pb=False, suppression=np.inf,
+        bias=1.5, pad=0):
         """
         Take a power spectrum and perform the inverse (3-D) FT to recover
         a correlation function.
+        
+        .. note :: If method='fftlog', all `R` are done at once with an FFT,
+            which requires `k` to be (close to) uniformly spaced in ln(k).
+            `bias` and `pad` are passed to ares.util.FFTLog.fftlog, and 
+            the remaining integration parameters are ignored.
+        
         """
         assert type(R) == np.ndarray
+        
+        if method == 'fftlog':
+            return self._fftlog_3d(R, ps, k, kmin, kmax, suppression,
+                bias, pad, inverse=True)
     
         if (type(ps) == FunctionType) or isinstance(ps, interp1d) \
            or isinstance(ps, Akima1DInterpolator):
@@ -561,7 +725,8 @@ class HaloModel(HaloMassFunction):
     
     def FT3D(self, k, cf, R=None, Rmin=None, Rmax=None, 
         epsabs=1e-12, epsrel=1e-12, limit=500, split_by_scale=False,
-        method='clenshaw-curtis', use_pb=False, suppression=np.inf):
+        method='clenshaw-curtis', use_pb=False, suppression=np.inf,
+        bias=1.5, pad=0):
         """
         This is nearly identical to the inverse transform function above,
         I just got tired of having to remember to swap meanings of the
@@ -569,6 +734,10 @@ class HaloModel(HaloMassFunction):
         redundancy.
         """
         assert type(k) == np.ndarray
+        
+        if method == 'fftlog':
+            return np.abs(self._fftlog_3d(k, cf, R, Rmin, Rmax, suppression,
+                bias, pad, inverse=False))
     
         if (type(cf) == FunctionType) or isinstance(cf, interp1d) \
            or isinstance(cf, Akima1DInterpolator):
@@ -672,6 +841,50 @@ class HaloModel(HaloMassFunction):
         # 
         return np.abs(ps)
     
+    def _fftlog_3d(self, y, fx, x, xmin, xmax, suppression, bias, pad,
+        inverse):
+        """
+        Transform P(k) -> xi(R) (inverse=True) or xi(R) -> P(k) with FFTLog.
+        
+        Parameters
+        ----------
+        y : np.ndarray
+            Scales (or wavenumbers) at which to evaluate the transform.
+        fx : np.ndarray, interp1d
+            Function to transform, either sampled at `x` or an interpolant
+            in ln(x).
+        x : np.ndarray
+            Wavenumbers (or scales) at which `fx` is sampled.
+        xmin, xmax : int, float
+            Range of `x` to include in the transform.
+        
+        """
+        
+        assert suppression == np.inf, \
+            "FFTLog can't include k- and R-dependent suppression!"
+        
+        if type(fx) != np.ndarray:
+            # Interpolants are in ln(x)
+            x = np.exp(fx.x)
+            fx = fx(fx.x)
+        else:
+            assert x is not None, "Must supply {} vector as well!".format(
+                'k' if inverse else 'R')
+        
+        ok = np.ones(x.size, dtype=bool)
+        if xmin is not None:
+            ok = np.logical_and(ok, x >= xmin)
+        if xmax is not None:
+            ok = np.logical_and(ok, x <= xmax)
+        
+        g = fftlog(x[ok], fx[ok], y=y, ell=0, bias=bias, pad=pad)[1]
+        
+        # Our FT convention
+        if inverse:
+            return g / (2. * np.pi**2)
+        else:
+            return four_pi * g
+    
     @property
     def tab_k(self):
         """
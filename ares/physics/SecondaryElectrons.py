@@ -118,6 +118,10 @@ class SecondaryElectrons(object):
             Method = 3: Lookup tables of Furlanetto & Stoever 2010.
             
         xHII is preferably an array of values (corresponding to grid elements).
+        
+        E is the electron energy [eV]. If it's an array, the result will be
+        2-D, with shape (len(E), len(xHII)), i.e., we'll evaluate on the full
+        (E, xHII) mesh at once.
             
         """
         
@@ -126,9 +130,24 @@ class SecondaryElectrons(object):
         
         if not isinstance(xHII, Iterable):
             xHII = np.array([xHII])
+        else:
+            xHII = np.asarray(xHII)
                     
         if E is None: 
             E = tiny_number
+            
+        if isinstance(E, Iterable) and (np.ndim(E) > 0):
+            E = np.asarray(E)
+            
+            if method == 3:
+                return self._DepositionFractionMesh(xHII, E, channel)
+            
+            # Fitting formulae are cheap: just stack results.
+            f = np.zeros([E.size, xHII.size])
+            for k, nrg in enumerate(E):
+                f[k] = self.DepositionFraction(xHII, E=nrg, channel=channel,
+                    method=method)
+            return f
         
         if method == 0:
             if channel == 'heat':
@@ -187,23 +206,36 @@ class SecondaryElectrons(object):
         
         # Furlanetto & Stoever (2010)
         if method == 3:
+            return self._DepositionFractionMesh(xHII, np.array([E]), 
+                channel)[0]
             
-            f = tiny_number * np.zeros_like(xHII)
-            
-            for i, x in enumerate(xHII):
-            
-                if channel == 'heat':
-                    f[i] = self.fh(E, x)
-                if channel == 'h_1': 
-                    f[i] = self.fHI(E, x)
-                if channel == 'he_1': 
-                    f[i] = self.fHeI(E, x)
-                if channel == 'he_2': 
-                    f[i] = self.fHeII(E, x)
-                if channel == 'lya':
-                    f[i] = self.flya(E, x)
-                if channel == 'exc':
-                    f[i] = self.fexc(E, x)
+    @property
+    def _splines(self):
+        if not hasattr(self, '_splines_'):
+            self._splines_ = {'heat': self.fh, 'h_1': self.fHI, 
+                'he_1': self.fHeI, 'he_2': self.fHeII, 'lya': self.flya,
+                'exc': self.fexc}
+        return self._splines_
             
-            return f
+    def _DepositionFractionMesh(self, xHII, E, channel):
+        """
+        Evaluate Furlanetto & Stoever (2010) deposition fractions for all
+        combinations of electron energy `E` and ionized fraction `xHII`.
+        
+        Returns
+        -------
+        Array with shape (len(E), len(xHII)).
+        
+        """
+        
+        if channel not in self._splines:
+            return tiny_number * np.zeros([E.size, xHII.size])
+        
+        # Neither array need be sorted, so evaluate point-by-point (but all
+        # in one call).
+        EE, xx = np.meshgrid(E, xHII, indexing='ij')
+        
+        f = self._splines[channel](EE.ravel(), xx.ravel(), grid=False)
+        
+        return f.reshape(EE.shape)
             
@@ -2306,6 +2306,103 @@ class GalaxyCohort(GalaxyAggregate,BlobFactory):
                 
         return np.array(results)
         
+    def _SAM_1z_vec(self, z, y):
+        """
+        Same as `_SAM_1z`, but for many halos at a common redshift.
+        
+        Parameters
+        ----------
+        z : int, float
+            current redshift
+        y : array
+            Shape (6, number of halos). Rows are halo mass, gas mass, stellar
+            mass, metal mass, cumulative stellar mass, and BH mass.
+        
+        Returns
+        -------
+        Array of derivatives (wrt redshift) with the same shape as `y`.
+        
+        """
+        
+        # Splines in (z, Mh) need halo masses in ascending order.
+        sorter = np.argsort(y[0])
+        Mh, Mg, Mst, MZ, cMst, Mbh = y[:,sorter]
+
+        kw = {'z':z, 'Mh': Mh, 'Ms': Mst, 'Mg': Mg, 'MZ': MZ,
+            'cMst': cMst, 'Mbh': Mbh}
+        
+        fb = self.cosm.fbar_over_fcdm
+        
+        # Convert from s/dz to yr/dz
+        dtdz_s = -self.cosm.dtdz(z)
+        dtdz = dtdz_s / s_per_yr
+        
+        # Splitting up the inflow. P = pristine.
+        PIR = fb * self.MAR(z, Mh) * dtdz
+        NPIR = fb * self.MDR(z, Mh) * dtdz
+        MGR = self.MGR(z, Mh)
+        
+        # Measured relative to baryonic inflow
+        Mb = fb * Mh
+        Zfrac = self.pf['pop_acc_frac_metals'] * (MZ / Mb)
+        Sfrac = self.pf['pop_acc_frac_stellar'] * (Mst / Mb)
+        Gfrac = self.pf['pop_acc_frac_gas'] * (Mg / Mb)
+
+        # Need SFR per dz
+        if not self.pf['pop_star_formation']:
+            fstar = SFR = 0.0
+        elif self.pf['pop_sfr'] is None:
+            fstar = self.SFE(**kw)
+            SFR = PIR * fstar
+        else:
+            fstar = 1e-10
+            SFR = self.sfr(**kw) * dtdz
+
+        # Eq. 1: halo mass.
+        y1p = MGR * dtdz
+
+        # Eq. 2: gas mass
+        if self.pf['pop_sfr'] is None:
+            y2p = PIR - SFR + NPIR * Gfrac
+        else:
+            y2p = PIR * (1. - fstar) + NPIR * Gfrac
+
+        if self._done_setting_Mmax:
+            Mmax = self.Mmax(z)
+        else:
+            Mmax = np.inf
+        
+        # Eq. 3: stellar mass
+        Mmin = self.Mmin(z)
+        on = np.logical_and(Mh >= Mmin, Mh <= Mmax)
+        SFR = SFR * on
+        y3p = on * (SFR * (1. - self.pf['pop_mass_yield']) + NPIR * Sfrac)
+
+        # Eq. 4: metal mass -- constant return per unit star formation for now
+        y4p = self.pf['pop_mass_yield'] * self.pf['pop_metal_yield'] * SFR \
+            * (1. - self.pf['pop_mass_escape']) \
+            + NPIR * Zfrac
+
+        y5p = on * (SFR + NPIR * Sfrac)
+
+        # BH accretion rate
+        if self.pf['pop_bh_formation']:
+            if self.pf['pop_bh_facc'] is not None:
+                y6p = self.pf['pop_bh_facc'] * PIR
+            else:
+                eta = self.pf['pop_eta']
+                fduty = self.pf['pop_fduty']
+                y6p = np.where(Mbh > 0, 
+                    Mbh * dtdz_s * fduty * (1. - eta) / eta / t_edd, 0.0)
+        else:
+            y6p = 0.0
+            
+        results = np.zeros_like(y)
+        results[:,sorter] = [yp * np.ones_like(Mh) \
+            for yp in [y1p, y2p, y3p, y4p, y5p, y6p]]
+        
+        return results
+        
     def _SAM_1z_jac(self, z, y): # pragma: no cover
         """
         Jacobian for _SAM_1z
@@ -2786,6 +2883,33 @@ class GalaxyCohort(GalaxyAggregate,BlobFactory):
         else:    
             results = {key:np.zeros([zarr.size]*2) for key in keys}                
 
+        # Evolve all cohorts together on the redshift grid.
+        if self._sam_fixed_step:
+            z0 = np.array(zarr)
+            if self.pf['hgh_Mmax'] is not None:
+                z0 = np.concatenate((z0, zarr.max() * np.ones(M0_aug.size)))
+                _M0 = np.concatenate((M0 * np.ones(zarr.size), M0_aug))
+            else:
+                _M0 = M0 * np.ones(zarr.size)
+            
+            ics = [self._SAM_initial_conditions(_z0_, _M0_) \
+                for _z0_, _M0_ in zip(z0, _M0)]
+            
+            _results = self.RunSAMFixedStep(zarr, z0, 
+                np.array([ic[0] for ic in ics]), 
+                np.array([ic[1] for ic in ics]))
+            
+            for key in keys:
+                results[key] = _results[key]
+            
+            results['zmax'] = self.zdead * np.ones(z0.size)
+            results['zform'] = z0
+            results['z'] = zarr
+            
+            self._trajectories = z0, results
+            
+            return z0, results
+                
         for i, z in enumerate(zarr):
                         
             #if z == zarr[0]:
@@ -2853,6 +2977,166 @@ class GalaxyCohort(GalaxyAggregate,BlobFactory):
                 
         return np.array(zform), results
 
+    @property
+    def _sam_fixed_step(self):
+        """
+        Can all cohorts be integrated at once on the halo redshift grid?
+        
+        Criteria that "kill" a population are tracked halo-by-halo in
+        `RunSAM`, so in those cases we always use the ODE solver.
+        """
+        if not hasattr(self, '_sam_fixed_step_'):
+            ok = self.pf['sam_integrator'] != 'lsoda'
+            ok &= self.pf['pop_sam_nz'] == 1
+            ok &= self.pf['sam_dz'] is None
+            for par in ['pop_bind_limit', 'pop_time_limit']:
+                ok &= self.pf[par] in [None, 0]
+            for par in ['pop_temp_limit', 'pop_mass_limit', 'pop_abun_limit',
+                'pop_time_ceil']:
+                ok &= self.pf[par] is None
+                
+            self._sam_fixed_step_ = ok
+            
+        return self._sam_fixed_step_
+        
+    def _SAM_step(self, z, dz, y):
+        """
+        Advance the state of many halos from redshift z to z + dz.
+        """
+        
+        f = self._SAM_1z_vec
+        
+        if self.pf['sam_integrator'] == 'euler':
+            return y + dz * f(z, y)
+        elif self.pf['sam_integrator'] == 'rk4':
+            k1 = f(z, y)
+            k2 = f(z + 0.5 * dz, y + 0.5 * dz * k1)
+            k3 = f(z + 0.5 * dz, y + 0.5 * dz * k2)
+            k4 = f(z + dz, y + dz * k3)
+            return y + dz * (k1 + 2. * k2 + 2. * k3 + k4) / 6.
+        else:
+            raise NotImplementedError('Unrecognized sam_integrator={}'.format(\
+                self.pf['sam_integrator']))
+            
+    def RunSAMFixedStep(self, zarr, z0, M0, n0):
+        """
+        Evolve many halos at once, taking fixed steps along `zarr`.
+        
+        This is the array-valued analog of `RunSAM`: rather than solving
+        the ODEs separately for each formation redshift, the state of all
+        halos that exist at a given redshift is advanced together.
+        
+        Parameters
+        ----------
+        zarr : np.ndarray
+            Redshifts (ascending) at which to evolve and record halos.
+        z0 : np.ndarray
+            Formation redshift of each halo. Must be elements of `zarr`.
+        M0 : np.ndarray
+            Initial (total) mass of each halo.
+        n0 : np.ndarray
+            Number density of each halo.
+            
+        Returns
+        -------
+        Dictionary of quantities, each having shape (len(z0), len(zarr)). 
+        Elements at redshifts above a halo's formation redshift are zero.
+        
+        """
+        
+        z0 = np.atleast_1d(z0)
+        M0 = np.atleast_1d(M0)
+        n0 = np.atleast_1d(n0)
+        
+        Nh, Nz = z0.size, zarr.size
+        
+        # Index of formation redshift of each halo in `zarr`.
+        j0 = np.argmin(np.abs(zarr[None,:] - z0[:,None]), axis=1)
+        
+        keys = ['Mh', 'Mg', 'Ms', 'MZ', 'cMs', 'Mbh', 'SFR', 'SFE', 'MAR', 
+            'nh', 't']
+        results = {key:np.zeros((Nh, Nz)) for key in keys}
+        
+        # Time since Big Bang in Myr
+        tarr = self.cosm.t_of_z(zarr) / s_per_yr / 1e6
+        
+        y = np.zeros((6, Nh))
+        seeded = np.zeros(Nh, dtype=bool)
+        for j in range(Nz - 1, -1, -1):
+            z = zarr[j]
+            
+            # Boundary conditions (pristine halo)
+            new = j0 == j
+            y[0,new] = M0[new]
+            y[1,new] = self.cosm.fbar_over_fcdm * M0[new]
+            
+            # Existing halos, sorted by mass
+            idx = np.flatnonzero(j0 >= j)
+            
+            if idx.size == 0:
+                continue
+            
+            idx = idx[np.argsort(y[0,idx])]    
+            Mh = y[0,idx]
+            
+            for k, key in enumerate(['Mh', 'Mg', 'Ms', 'MZ', 'cMs']):
+                results[key][idx,j] = y[k,idx]
+            
+            results['SFR'][idx,j] = self.SFR(z=z, Mh=Mh)
+            results['nh'][idx,j] = n0[idx]
+            results['t'][idx,j] = tarr[j] - tarr[j0[idx]]
+            
+            if self.pf['pop_sfr_model'] in ['sfe-func']:
+                results['MAR'][idx,j] = self.MGR(z, Mh)
+                
+            if 'sfe' in self.pf['pop_sfr_model']:
+                results['SFE'][idx,j] = self.SFE(z=z, Mh=Mh)
+                
+            Mmin = np.interp(z, self.halos.tab_z, self._tab_Mmin)
+                        
+            if self.pf['pop_bh_seed_mass'] is not None:
+                Mseed = self.pf['pop_bh_seed_mass']    
+            elif self.pf['pop_bh_seed_eff'] is not None:
+                Mseed = self.pf['pop_bh_seed_eff'] * y[1,idx]
+            else:
+                Mseed = self.pf['pop_bh_seed_ratio'] * Mmin
+            
+            # Form new BHs
+            seed = np.logical_and(Mh >= Mmin, ~seeded[idx])
+            y[5,idx] = np.where(seed, Mseed, y[5,idx] * seeded[idx])
+            seeded[idx[seed]] = True
+            results['Mbh'][idx,j] = y[5,idx]
+            
+            if j == 0:
+                break
+            
+            y[:,idx] = self._SAM_step(z, zarr[j-1] - z, y[:,idx])
+            
+        formed = np.arange(Nz)[None,:] <= j0[:,None]
+        
+        if self.pf['pop_dust_yield'] is not None:
+            zz = np.ones_like(results['Mh']) * zarr[None,:]
+            _Mh = results['Mh'][formed]
+            Md = self.dust_yield(z=zz[formed], Mh=_Mh) * results['MZ'][formed]
+            Rd = self.dust_scale(z=zz[formed], Mh=_Mh)
+            # Assumes spherical symmetry, uniform dust density
+            Sd = 3. * Md * g_per_msun / 4. / np.pi / (Rd * cm_per_kpc)**2
+        else:
+            Md = Sd = 0.0
+        
+        results['Md'] = np.zeros((Nh, Nz))
+        results['Sd'] = np.zeros((Nh, Nz))
+        results['Z'] = np.zeros((Nh, Nz))
+        results['Md'][formed] = Md
+        results['Sd'][formed] = Sd
+        results['Z'][formed] = self.pf['pop_metal_retention'] \
+            * (results['MZ'][formed] / results['Mg'][formed])
+            
+        for key in results:
+            results[key] = np.maximum(results[key], 0.0)
+                
+        return results
+
     def _ScalingRelationsStaticSFE(self, z0=None, M0=0):
         self.RunSAM(z0, M0)
 
@@ -2862,6 +3146,51 @@ class GalaxyCohort(GalaxyAggregate,BlobFactory):
     #    """
     #    return self.RunSAM(z0, M0)
         
+    def _SAM_initial_conditions(self, z0, M0=0):
+        """
+        Determine the initial halo mass and number density of a cohort.
+        
+        Parameters
+        ----------
+        z0 : int, float
+            Formation redshift.
+        M0 : int, float
+            Formation mass. If <= 1, halos start at Mmin(z0), otherwise 
+            this is the starting mass in units of Mmin(z0).
+            
+        Returns
+        -------
+        Tuple containing (initial halo mass, number density).
+        
+        """
+        
+        n0 = 0.0
+        
+        if (M0 <= 1):
+            
+            # If we're treating a continuum of halos.
+            M0 = np.interp(z0, self.halos.tab_z, self._tab_Mmin)            
+
+            iz = np.argmin(np.abs(z0 - self.halos.tab_z))
+
+            if np.allclose(z0, self.halos.tab_z[iz], rtol=1e-2):
+                n0 = self._tab_n_Mmin[iz]
+            else:
+                print('hay problemas!', z0, self.halos.tab_z[iz])
+        elif (M0 > 1):
+            M0 = np.interp(z0, self.halos.tab_z, M0 * self._tab_Mmin)
+
+            dM = self.pf['hgh_dlogM']
+            
+            # Set number density of these guys.
+            _marr_ = np.arange(np.log10(M0) - 3 * dM, np.log10(M0) + 3 * dM, 
+                dM * 0.2)
+            _ngtm = [self._spline_ngtm(z0, _m_) for _m_ in _marr_]
+            func = interp1d(_marr_, _ngtm, kind='cubic')
+            n0 = func(np.log10(M0)) - func(np.log10(M0) + dM)
+            
+        return M0, n0
+        
     def RunSAM(self, z0=None, M0=0):
         """
         Evolve a halo from initial mass M0 at redshift z0 forward in time.
@@ -2903,35 +3232,14 @@ class GalaxyCohort(GalaxyAggregate,BlobFactory):
         ##
         # Outputs have shape (z, z)
         ##
-        n0 = 0.0
                 
         # Our results don't depend on this, unless SFE depends on z
         if (z0 is None) and (M0 == 0):
             z0 = self.halos.tab_z.max()
             M0 = self._tab_Mmin[-1]
             raise NotImplemented('Is this used anymore?')
-        elif (M0 <= 1):
-            
-            # If we're treating a continuum of halos.
-            M0 = np.interp(z0, self.halos.tab_z, self._tab_Mmin)            
-
-            iz = np.argmin(np.abs(z0 - self.halos.tab_z))
-
-            if np.allclose(z0, self.halos.tab_z[iz], rtol=1e-2):
-                n0 = self._tab_n_Mmin[iz]
-            else:
-                print('hay problemas!', z0, self.halos.tab_z[iz])
-        elif (M0 > 1):
-            M0 = np.interp(z0, self.halos.tab_z, M0 * self._tab_Mmin)
-
-            dM = self.pf['hgh_dlogM']
-            
-            # Set number density of these guys.
-            _marr_ = np.arange(np.log10(M0) - 3 * dM, np.log10(M0) + 3 * dM, 
-                dM * 0.2)
-            _ngtm = [self._spline_ngtm(z0, _m_) for _m_ in _marr_]
-            func = interp1d(_marr_, _ngtm, kind='cubic')
-            n0 = func(np.log10(M0)) - func(np.log10(M0) + dM)
+        
+        M0, n0 = self._SAM_initial_conditions(z0, M0)
 
         # Setup time-stepping
         zf = max(float(self.halos.tab_z.min()), self.zdead)
@@ -19,6 +19,7 @@ from ..util import read_lit
 from ..util.Math import smooth
 from ..util import ProgressBar
 from ..util.Survey import Survey
+from ..util.HistoryStore import HistoryStore
 from .Halo import HaloPopulation
 from scipy.optimize import curve_fit
 from .GalaxyCohort import GalaxyCohort
@@ -277,6 +278,38 @@ class GalaxyEnsemble(HaloPopulation,BlobFactory):
             return self._cache_halos
 
         raw = self.load()
+                                        
+        # Just read in histories in this case.
+        if raw is None:
+            print('Running halo trajectories...')
+            zall, raw = self.guide.Trajectories()
+            print('Done with halo trajectories.')
+        elif isinstance(raw, HistoryStore):
+            raw = raw.read(0, raw.Nhalos)
+        
+        histories = self._prep_halo_histories(raw)
+        
+        del raw
+        gc.collect()
+
+        return histories
+        
+    def _prep_halo_histories(self, raw, reseed=True):
+        """
+        Thin, add scatter to, and trim a set of raw halo histories.
+        
+        Parameters
+        ----------
+        raw : dict
+            Halo histories, either all of them or just a block (see 
+            `pop_hist_block`), in order of ascending redshift.
+        reseed : bool
+            If True, seed the random number generator with 
+            `pop_scatter_mar_seed` before adding scatter. Set to False when
+            processing histories in blocks so that each block gets a 
+            different realization.
+            
+        """
         
         thin = self.pf['pop_thin_hist']
         
@@ -286,14 +319,8 @@ class GalaxyEnsemble(HaloPopulation,BlobFactory):
 
         sigma_mar = self.pf['pop_scatter_mar']
         sigma_env = self.pf['pop_scatter_env']
-                                        
-        # Just read in histories in this case.
-        if raw is None:
-            print('Running halo trajectories...')
-            zall, raw = self.guide.Trajectories()
-            print('Done with halo trajectories.')
-        else:
-            zall = raw['z']
+        
+        zall = raw['z']
             
         # Should be in ascending redshift.
         assert np.all(np.diff(zall) > 0)
@@ -351,8 +378,12 @@ class GalaxyEnsemble(HaloPopulation,BlobFactory):
             any_viable = np.sum(is_viable, axis=1)
             
             # Cut out halos that never exist in our mass range of interest.
-            ilo = np.min(np.argwhere(any_viable > 0))
-            ihi = np.max(np.argwhere(any_viable > 0)) + 1
+            # (When processing blocks of halos, there may not be any.)
+            if np.any(any_viable > 0):
+                ilo = np.min(np.argwhere(any_viable > 0))
+                ihi = np.max(np.argwhere(any_viable > 0)) + 1
+            else:
+                ilo = ihi = 0
 
             # Also cut out some redshift range.        
             zok = np.logical_and(zall >= self.pf['pop_synth_zmin'],
@@ -389,7 +420,8 @@ class GalaxyEnsemble(HaloPopulation,BlobFactory):
             mar *= (1. + self.noise_normal(mar, sigma_env))
 
         if sigma_mar > 0:
-            np.random.seed(self.pf['pop_scatter_mar_seed'])
+            if reseed:
+                np.random.seed(self.pf['pop_scatter_mar_seed'])
             noise = self.noise_lognormal(mar, sigma_mar)
             mar += noise
             # Normalize by mean of log-normal to preserve mean MAR?
@@ -441,9 +473,6 @@ class GalaxyEnsemble(HaloPopulation,BlobFactory):
 
         self.tab_z = zall
         #self._cache_halos = histories
-        
-        del raw
-        gc.collect()
 
         return histories
         
@@ -475,19 +504,82 @@ class GalaxyEnsemble(HaloPopulation,BlobFactory):
                     
         self._histories = value
         
+    @property
+    def history_store(self):
+        """
+        Raw halo histories, which will be read in blocks as needed.
+        """
+        if not hasattr(self, '_history_store'):
+            raw = self.load()
+            if raw is None:
+                zall, raw = self.guide.Trajectories()
+                
+            if isinstance(raw, HistoryStore):
+                self._history_store = raw
+            else:
+                self._history_store = HistoryStore(raw)
+            
+        return self._history_store
+        
+    def _iter_histories(self):
+        """
+        Loop over galaxy histories in blocks of `pop_hist_block` halos.
+        
+        Thinning, scatter, and cuts (see `_prep_halo_histories`) are applied
+        to one block at a time, so only one block of histories needs to be
+        held in memory. If `pop_hist_block` is None, just yields 
+        `self.histories`.
+        """
+        
+        if self.pf['pop_hist_block'] is None:
+            yield self.histories
+            return
+            
+        store = self.history_store
+        
+        if self.pf['pop_scatter_mar'] > 0:
+            np.random.seed(self.pf['pop_scatter_mar_seed'])
+        
+        for lo, hi in store.blocks(self.pf['pop_hist_block']):
+            halos = self._prep_halo_histories(store.read(lo, hi), 
+                reseed=False)
+            
+            if halos['Mh'].shape[0] == 0:
+                continue
+                
+            hist = self.RunSAM(halos=halos)
+            
+            # Make sure we're in order of ascending time.
+            if np.all(np.diff(hist['z']) > 0):
+                for key in hist:
+                    if not type(hist[key]) == np.ndarray:
+                        continue
+                    if hist[key].ndim == 1:
+                        hist[key] = hist[key][-1::-1]
+                    else:
+                        hist[key] = hist[key][:,-1::-1]
+            
+            yield hist
+            
     def Trajectories(self):
         return self.RunSAM()
     
-    def RunSAM(self):
+    def RunSAM(self, halos=None):
         """
         Run models. If deterministic, will just return pre-determined
         histories. Otherwise, will do some time integration.
+        
+        Parameters
+        ----------
+        halos : dict
+            Halo histories to use. If None, will use all of them and save
+            the results to `self.histories`.
         """
                
         if self.pf['pop_sam_method'] == 0:
-            return self._gen_prescribed_galaxy_histories()
+            return self._gen_prescribed_galaxy_histories(halos=halos)
         elif self.pf['pop_sam_method'] == 1:
-            return self._gen_active_galaxy_histories()
+            return self._gen_active_galaxy_histories(halos=halos)
         else:
             raise NotImplemented('Unrecognized pop_sam_method={}.'.format(self.pf['pop_sam_method']))
     
@@ -539,7 +631,7 @@ class GalaxyEnsemble(HaloPopulation,BlobFactory):
             mf = lambda logM: self.ClusterMF(10**logM)
             f_cdf = lambda M: quad(lambda logM: mf(logM) * 10**logM, -3, np.log10(M), 
                 limit=500)[0] / self._norm
-            self._tab_cdf = np.array(map(f_cdf, self.tab_Mcl))
+            self._tab_cdf = np.array(list(map(f_cdf, self.tab_Mcl)))
             
         return self._tab_cdf    
     
@@ -916,6 +1008,132 @@ class GalaxyEnsemble(HaloPopulation,BlobFactory):
                                     
         return Ms, Mw, imf
         
+    def _gen_stars_batch(self, idx, Mg, vesc, SN, t, i):
+        """
+        Draw clusters in many halos at once until stopping criterion met.
+        
+        Array-valued analog of `_gen_stars`. Rather than drawing clusters
+        one at a time, we draw them in blocks for all halos, and keep the
+        leading clusters in each block that satisfy the stopping criteria.
+        
+        Parameters
+        ----------
+        idx : np.ndarray
+            Indices of halos (i.e., rows of `SN`) forming stars.
+        Mg : np.ndarray
+            Cold gas mass available in each halo [Msun].
+        vesc : np.ndarray
+            Escape velocity of each halo [cm/s].
+        SN : np.ndarray
+            Number of SNe going off in each halo (first dimension) and 
+            time-step (second dimension). Delayed SNe are added in place.
+        t : np.ndarray
+            Time [Myr], in ascending order.
+        i : int
+            Index of current time-step.
+            
+        Returns
+        -------
+        Tuple containing (stellar mass formed, mass of wind, number of SNe 
+        going off in this step) in each halo.
+        
+        """
+        
+        if self.pf['pop_sample_imf'] or self.pf['pop_feedback_rad']:
+            raise NotImplementedError('IMF sampling and radiative feedback' +\
+                ' only available with pop_sam_per_halo=True.')
+        
+        N = idx.size
+        dt = t[i+1] - t[i] # in Myr
+        tfut = t[i:] - t[i]
+        
+        nsn_per_m = self._stars.nsn_per_m
+        fstar_gmc = self.pf['pop_fstar_cloud']
+        delay_fb_sne = self.pf['pop_delay_sne_feedback']
+        
+        if delay_fb_sne not in [0, 1, 2]:
+            raise NotImplementedError('help')
+        
+        # SNe all happen at average delay time from formation.
+        if delay_fb_sne == 1:
+            avg_delay = self._stars.avg_sn_delay
+            iSN_avg = np.argmin(np.abs(tfut - avg_delay))
+            
+        # Wind mass per SN
+        Mw_per_SN = 2e51 * self.pf['pop_coupling_sne'] / vesc**2 / g_per_msun
+        
+        # Number of supernovae from stars formed previously
+        N_SN_p = SN[idx,i].copy()
+        
+        Ms = np.zeros(N)
+        Mw = np.zeros(N)
+        N_SN_0 = np.zeros(N)
+        has_SN = np.zeros(N, dtype=bool)
+        done = Mg * fstar_gmc <= 0
+        
+        K = 64
+        while not np.all(done):
+            j = np.flatnonzero(~done)
+            
+            # Draw K clusters in each halo, and the number of SNe in each.
+            Mc = np.interp(np.random.rand(j.size, K), self.tab_cdf, 
+                self.tab_Mcl)
+            N_MS = np.random.poisson(Mc * nsn_per_m)
+                
+            # Split into SNe going off now and later.
+            if delay_fb_sne == 0:
+                N_now = N_MS
+            elif delay_fb_sne == 1:
+                N_now = N_MS * (dt > avg_delay)
+            else:
+                delays = self._stars.draw_delays(N_MS.sum())
+                owner = np.repeat(np.arange(N_MS.size), N_MS.ravel())
+                # Closest time-step to each delay
+                iSNe = np.searchsorted(0.5 * (tfut[1:] + tfut[:-1]), delays)
+                now = iSNe == 0
+                N_now = np.reshape(np.bincount(owner[now], 
+                    minlength=N_MS.size), N_MS.shape)
+            
+            # State after each cluster
+            _Ms = Ms[j,None] + np.cumsum(Mc, axis=1)
+            _N_SN_0 = N_SN_0[j,None] + np.cumsum(N_now, axis=1)
+            _has_SN = np.logical_or(has_SN[j,None], 
+                np.cumsum(N_MS, axis=1) > 0)
+            _Mw = Mw_per_SN[j,None] * (_N_SN_0 + N_SN_p[j,None]) * _has_SN
+            
+            # State before each cluster
+            Ms_pre = np.hstack((Ms[j,None], _Ms[:,0:-1]))
+            Mw_pre = np.hstack((Mw[j,None], _Mw[:,0:-1]))
+            
+            # Keep forming clusters until we use all the gas or blow it 
+            # all out, but don't allow a cluster to take up all the rest
+            # of our gas (and then some).
+            ok = np.logical_and(Ms_pre + Mw_pre < Mg[j,None] * fstar_gmc,
+                Ms_pre + Mc + Mw_pre < Mg[j,None])
+            Nacc = np.cumprod(ok, axis=1).sum(axis=1)
+            accepted = np.arange(K)[None,:] < Nacc[:,None]
+            
+            # Increment stuff
+            a = Nacc > 0
+            row, col = np.flatnonzero(a), Nacc[a] - 1
+            Ms[j[a]] = _Ms[row,col]
+            Mw[j[a]] = _Mw[row,col]
+            N_SN_0[j[a]] = _N_SN_0[row,col]
+            has_SN[j[a]] = _has_SN[row,col]
+            
+            # Figure out when the rest of the SNe will blow up.
+            if (delay_fb_sne == 1) and (dt <= avg_delay):
+                SN[idx[j],i+iSN_avg] += np.sum(N_MS * accepted, axis=1)
+            elif delay_fb_sne == 2:
+                later = np.logical_and(~now, accepted.ravel()[owner])
+                np.add.at(SN, (idx[j][owner[later] // K], i + iSNe[later]), 1)
+            
+            done[j[Nacc < K]] = True
+            
+            K = min(2 * K, 4096)
+        
+        return Ms, Mw, N_SN_0 + N_SN_p
+        
     def deposit_in(self, tnow, delay):
         """
         Determin index of time-array in which to deposit some gas, energy,
@@ -1126,22 +1344,185 @@ class GalaxyEnsemble(HaloPopulation,BlobFactory):
                 
         return data
             
-    def _gen_prescribed_galaxy_histories(self, zstop=0): # pragma: no cover
+    def _gen_galaxy_histories(self, halos, zobs=0):
+        """
+        Evolve all galaxies in time at once. 
+        
+        Array-valued analog of `_gen_galaxy_history`, which is used instead
+        if `pop_sam_per_halo=True`.
+        
+        Parameters
+        ----------
+        halos : dict
+            Growth histories of all halos in order of *ascending redshift*, 
+            i.e., the output of `_gen_halo_histories`.
+        
+        Returns
+        -------
+        Dictionary of galaxy properties, each having shape (halos, times), 
+            in order of ascending time.
+        
+        """
+        
+        # Flip arrays to be in ascending time.
+        z = halos['z'][-1::-1]
+        t = halos['t'][-1::-1]
+        Mh = halos['Mh'][:,-1::-1]
+        MAR = halos['MAR'][:,-1::-1]
+        nh = halos['nh'][:,-1::-1]
+        
+        assert np.all(np.diff(t) >= 0)
+        
+        Nh, Nt = Mh.shape
+        
+        # Short-hand
+        fb = self.cosm.fbar_over_fcdm
+        
+        SFR = np.zeros_like(Mh)
+        Msc = np.zeros_like(Mh)
+        Nsn = np.zeros_like(Mh)
+        bursty = np.zeros_like(Mh)
+        Mg_t = np.zeros_like(Mh)
+        Mg_c = np.zeros_like(Mh)
+        SN = np.zeros_like(Mh)
+        
+        # Generate smooth histories 'cuz sometimes we need that.
+        # Guide population wants masses in ascending order.
+        MAR_s = np.zeros_like(Mh)
+        for k in range(Nt):
+            j = np.flatnonzero(Mh[:,k] > 0)
+            j = j[np.argsort(Mh[j,k])]
+            if j.size == 0:
+                continue
+            MAR_s[j,k] = self.guide.MAR(z=z[k], Mh=Mh[j,k])
+            
+        # Index of time-step in which gas accreted now becomes available
+        # for star formation.
+        if self.pf['pop_multiphase']:
+            tdyn = self.halos.DynamicalTime(z) / s_per_myr
+            ifut = [k + np.argmin(np.abs((t[k:] - t[k]) - tdyn[k])) \
+                for k in range(Nt)]
+        else:
+            ifut = range(Nt)
+            
+        NSN_per_M = self._stars.nsn_per_m
+        
+        for i in range(Nt - 1):
+            
+            if z[i] < zobs:
+                break
+            
+            j = np.flatnonzero(Mh[:,i] > 0)
+            
+            if j.size == 0:
+                continue
+                
+            # In years    
+            dt = (t[i+1] - t[i]) * 1e6    
+            
+            # Newly formed halos start with cosmic baryon fraction.
+            if i == 0:
+                new = j
+            else:
+                new = j[Mh[j,i-1] == 0]
+                
+            Mg_t[new,i] = fb * Mh[new,i]
+            
+            # Gas we will accrete on this timestep
+            Macc = fb * 0.5 * (MAR[j,i+1] + MAR[j,i]) * dt
+            
+            ##
+            # Override switch to smooth inflow-driven star formation model.
+            ##
+            E_h = self.halos.BindingEnergy(z[i], Mh[j,i])
+            eq = E_h > (1e51 * self.pf['pop_force_equilibrium'])
+            
+            # Determine gas supply
+            Mg_c[j,ifut[i]] = Mg_t[j,i] + Macc * ~eq
+            
+            Mnew = np.zeros(j.size)
+            Mw = np.zeros(j.size)
+            if np.any(eq):
+                vesc = self.halos.EscapeVelocity(z[i], Mh[j[eq],i])
+                
+                # Assume 1e51 * SNR * dt = 1e51 * SFR * SN/Mstell * dt = E_h
+                eta = 2. * self.pf['pop_coupling_sne'] * 1e51 * NSN_per_M \
+                    / g_per_msun / vesc**2
+                
+                SFR[j[eq],i] = fb * MAR[j[eq],i] / (1. + eta)
+                Mnew[eq] = SFR[j[eq],i] * dt
+                Mw[eq] = eta * Mnew[eq]
+            
+            ##
+            # FORM STARS!
+            ##
+            if not np.all(eq):
+                js = j[~eq]
+                vesc = self.halos.EscapeVelocity(z[i], Mh[js,i])
+                _Mnew, _Mw, _Nsn = self._gen_stars_batch(js, Mg_c[js,i], 
+                    vesc, SN, t, i)
+            
+                Mnew[~eq] = _Mnew
+                Mw[~eq] = _Mw
+                
+                # Flag this step as bursty.
+                SFR[js,i] = _Mnew / dt
+                Nsn[js,i] = _Nsn
+                bursty[js,i] = 1
+                
+            # Set Ms, Mg for next iteration.
+            Mg_t[j,i+1] = np.maximum(Mg_t[j,i] + Macc - Mnew - Mw, 0.)
+            Msc[j,i+1] = Msc[j,i] + Mnew
+            
+        data = \
+        { 
+         'SFR': SFR,
+         'MAR': MAR_s,
+         'Mg': Mg_t, 
+         'Mg_c': Mg_c, 
+         'Ms': Msc, # *cumulative* stellar mass!
+         'Mh': Mh, 
+         'nh': nh,
+         'Nsn': Nsn,
+         'bursty': bursty,
+         'z': z,
+         't': t,
+         'zthin': halos['zthin'][-1::-1],
+        }
+        
+        if 'rand' in halos:
+            data['rand'] = halos['rand'][:,-1::-1]
+            
+        return data
+            
+    def _gen_prescribed_galaxy_histories(self, zstop=0, halos=None): # pragma: no cover
         """
         Take halo histories and paint on galaxy histories in some way.
         
         If pop_stochastic, must operate on each galaxy individually using
         `self._gen_galaxy_history`, otherwise, can 'evolve' galaxies
         deterministically all at once.
+        
+        If `halos` is supplied (e.g., a block of halos), the results are
+        returned but not saved to `self.histories`.
         """
                 
         # First, grab halos
-        halos = self._gen_halo_histories()
+        if halos is None:
+            halos = self._gen_halo_histories()
+            save = True
+        else:
+            save = False
                                         
         ## 
         # Stochastic model
         ##
-        if self.pf['pop_sample_cmf']:
+        if self.pf['pop_sample_cmf'] and (not self.pf['pop_sam_per_halo']):
+            hist = self._gen_galaxy_histories(halos, zstop)
+            if save:
+                self.histories = hist
+            return hist
+        elif self.pf['pop_sample_cmf']:
             
             fields = ['SFR', 'MAR', 'Mg', 'Ms', 'Mh', 'nh', 
                 'Nsn', 'bursty', 'rand']
@@ -1172,7 +1553,8 @@ class GalaxyEnsemble(HaloPopulation,BlobFactory):
         
             flip = {key:hist[key][-1::-1] for key in hist.keys()}
         
-            self.histories = flip
+            if save:
+                self.histories = flip
             return flip                                            
         
         
@@ -1598,11 +1980,12 @@ class GalaxyEnsemble(HaloPopulation,BlobFactory):
             results['rand'] = halos['rand'][:,-1::-1]
             
         # Reset attribute!
-        self.histories = results
+        if save:
+            self.histories = results
                                 
         return results
         
-    def _gen_active_galaxy_histories(self):
+    def _gen_active_galaxy_histories(self, halos=None):
         """
         This is called when pop_sam_method == 1.
         
@@ -1614,8 +1997,8 @@ class GalaxyEnsemble(HaloPopulation,BlobFactory):
         
         """
         # First, grab halos
-        halos = self._gen_halo_histories()
-        
+        if halos is None:
+            halos = self._gen_halo_histories()
         
         # Eventually generalize
         assert self.pf['pop_update_dt'].startswith('native')
@@ -1820,10 +2203,6 @@ class GalaxyEnsemble(HaloPopulation,BlobFactory):
         cached_result = self._cache_smf(z, bins)
         if cached_result is not None:
             return cached_result
-                            
-        iz = np.argmin(np.abs(z - self.histories['z']))
-        Ms = self.histories['Ms'][:,iz]
-        nh = self.histories['nh'][:,iz]
          
         if (bins is None) or (type(bins) is not np.ndarray):
             binw = 0.5
@@ -1836,7 +2215,14 @@ class GalaxyEnsemble(HaloPopulation,BlobFactory):
             
         bin_e = bin_c2e(bin_c)
         
-        phi, _bins = np.histogram(Ms, bins=10**bin_e, weights=nh)
+        # Accumulate over blocks of halos (if pop_hist_block is not None).
+        phi = np.zeros(bin_c.size)
+        for hist in self._iter_histories():
+            iz = np.argmin(np.abs(z - hist['z']))
+            Ms = hist['Ms'][:,iz]
+            nh = hist['nh'][:,iz]
+            
+            phi += np.histogram(Ms, bins=10**bin_e, weights=nh)[0]
                 
         if units == 'dex':
             # Convert to dex**-1 units
@@ -2259,6 +2645,41 @@ class GalaxyEnsemble(HaloPopulation,BlobFactory):
            
         return L
             
+    def Spectrum(self, z, waves, idnum=None, window=1, units='Hz', 
+        load=True):
+        """
+        Return the spectra of one or all sources at wavelengths `waves`.
+        
+        All wavelengths are synthesized in a single pass (see
+        `SpectralSynthesis.Spectrum`), which is much cheaper than calling
+        `Luminosity` once per wavelength.
+        
+        Parameters
+        ----------
+        z : int, float
+            Redshift of observation.
+        waves : np.ndarray
+            Rest wavelengths of interest [Angstrom]
+        idnum : int
+            If supplied, will only determine the spectrum for a single object
+            (the one at this position in the array).
+        units : str
+            Return specific luminosities per unit frequency, 'Hz', or per 
+            unit wavelength, 'Ang'.
+            
+        Returns
+        -------
+        Array of luminosities with shape (number of galaxies, number of 
+        wavelengths), or (number of wavelengths) if `idnum` is supplied.
+        
+        """
+        
+        raw = self.histories
+        
+        return self.synth.Spectrum(np.atleast_1d(waves), sfh=raw['SFR'], 
+            zarr=raw['z'], zobs=z, hist=raw, extras=self.extras, idnum=idnum,
+            window=window, units=units, load=load)
+            
     def LuminosityFunction(self, z, x, mags=True, wave=1600., window=1, 
         band=None):
         """
@@ -2273,55 +2694,62 @@ class GalaxyEnsemble(HaloPopulation,BlobFactory):
         if cached_result is not None:
             return cached_result
                                 
-        # These are kept in descending redshift just to make life difficult.
-        # [The last element corresponds to observation redshift.]
-        raw = self.histories
-                        
-        keys = raw.keys()
-        Nt = raw['t'].size
-        Nh = raw['Mh'].shape[0]
+        # Always bin to setup cache, interpolate from then on.
+        _x = np.arange(-28, 5., self.pf['pop_mag_bin'])
+        bin_e = bin_c2e(_x)
+        
+        # Accumulate over blocks of halos (if pop_hist_block is not None).
+        counts = np.zeros(_x.size)
+        N = 0.0
+        for raw in self._iter_histories():
         
-        # Find the z grid point closest to that requested.
-        # Must be >= z requested.
-        izobs = np.argmin(np.abs(raw['z'] - z))
-        if z > raw['z'][izobs]:
-            # Go to one grid point lower redshift
-            izobs += 1
+            # These are kept in descending redshift just to make life 
+            # difficult. [The last element corresponds to observation 
+            # redshift.]
+            
+            # Find the z grid point closest to that requested.
+            # Must be >= z requested.
+            izobs = np.argmin(np.abs(raw['z'] - z))
+            if z > raw['z'][izobs]:
+                # Go to one grid point lower redshift
+                izobs += 1
 
-        izobs = min(izobs, len(raw['z']) - 2)                   
+            izobs = min(izobs, len(raw['z']) - 2)                   
 
-        ##
-        # Run in batch.
-        L = self.Luminosity(z, wave=wave, band=band, window=window)
-        ##    
-        
-        zarr = raw['z']
-        tarr = raw['t']
+            ##
+            # Run in batch.
+            if self.pf['pop_hist_block'] is None:
+                L = self.Luminosity(z, wave=wave, band=band, window=window)
+            else:
+                L = self.synth.Luminosity(wave=wave, zobs=z, hist=raw, 
+                    extras=self.extras, window=window, band=band, 
+                    use_cache=False)
+            ##    
 
-        # Need to be more careful here as nh can change when using
-        # simulated halos
-        w = raw['nh'][:,izobs+1]
-                                                        
-        _MAB = self.magsys.L_to_MAB(L, z=z)
-        
-        if self.pf['dustcorr_method'] is not None:
-            MAB = self.dust.Mobs(z, _MAB)
-        else:
-            MAB = _MAB
+            # Need to be more careful here as nh can change when using
+            # simulated halos
+            w = raw['nh'][:,izobs+1]
+                                                            
+            _MAB = self.magsys.L_to_MAB(L, z=z)
+            
+            if self.pf['dustcorr_method'] is not None:
+                MAB = self.dust.Mobs(z, _MAB)
+            else:
+                MAB = _MAB
 
-        # If L=0, MAB->inf. Hack these elements off if they exist.
-        # This should be a clean cut, i.e., there shouldn't be random
-        # spikes where L==0, all L==0 elements should be a contiguous chunk.
-        Misok = np.logical_and(L > 0, np.isfinite(L))
+            # If L=0, MAB->inf. Hack these elements off if they exist.
+            # This should be a clean cut, i.e., there shouldn't be random
+            # spikes where L==0, all L==0 elements should be a contiguous 
+            # chunk.
+            Misok = np.logical_and(L > 0, np.isfinite(L))
+            
+            counts += np.histogram(MAB[Misok==1], weights=w[Misok==1], 
+                bins=bin_e)[0]
+             
+            N += np.sum(w[Misok==1]) 
         
-        # Always bin to setup cache, interpolate from then on.
-        _x = np.arange(-28, 5., self.pf['pop_mag_bin'])
-
-        hist, bin_edges = np.histogram(MAB[Misok==1],
-            weights=w[Misok==1], bins=bin_c2e(_x), density=True)
-         
-        N = np.sum(w[Misok==1]) 
-        phi = hist * N
+        # Same as np.histogram(..., density=True) * N for all halos at once.
+        phi = N * counts / np.sum(counts) / np.diff(bin_e)
                           
         self._cache_lf_[(z, wave)] = _x, phi
         
@@ -2958,6 +3386,14 @@ class GalaxyEnsemble(HaloPopulation,BlobFactory):
             if self.pf['verbose']:
                 print("Should check that HMF parameters match!")
                         
+        # Stream histories from disk rather than reading them in.
+        if (type(fn_hist) is str) and (os.path.isdir(fn_hist) or \
+            (fn_hist.endswith('.hdf5') and \
+            (self.pf['pop_hist_block'] is not None))):
+            if self.pf['verbose']:
+                print("# Opened {}.".format(fn_hist.replace(self.cosm.path_ARES, '$ARES')))
+            return HistoryStore(fn_hist)
+                        
         # Read output
         if type(fn_hist) is str:
             if fn_hist.endswith('.pkl'):
@@ -75,7 +75,9 @@ class GasParcel(object):
             recombination=self.pf['recombination'], 
             interp_rc=self.pf['interp_rc'], 
             rtol=self.pf['solver_rtol'],
-            atol=self.pf['solver_atol'])
+            atol=self.pf['solver_atol'],
+            batch=self.pf['solver_batch'],
+            nproc=self.pf['solver_nproc'])
         
     def reset(self):
         del self.gen
@@ -175,6 +177,9 @@ class GasParcel(object):
             pb.update(t)
 
         pb.finish()
+        
+        # Shut down process pool, if we made one
+        self.chem.close()
 
         self.history = _sort_history(all_data)
         self.history['t'] = np.array(all_t)
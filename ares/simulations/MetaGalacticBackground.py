@@ -904,9 +904,16 @@ class MetaGalacticBackground(AnalyzeMGB):
             if self.pf['feedback_LW_guesses'] is not None:
                 has_guess = True
                 pid = self.pf['feedback_LW_sfrd_popid']
-                #_z_guess, _Mmin_guess = guess
-                self._Mmin_pre = self.pops[pid].Mmin(zarr)
-                
+                guess = self.pf['feedback_LW_guesses']
+
+                # Either (z, Mmin) from a previous model, or a ModelSet
+                # the population knows how to read.
+                if isinstance(guess, (tuple, list)):
+                    _z_guess, _Mmin_guess = guess
+                    self._Mmin_pre = np.interp(zarr, _z_guess, _Mmin_guess)
+                else:
+                    self._Mmin_pre = self.pops[pid].Mmin(zarr)
+
             else:
                 self._Mmin_pre = np.min([self.pops[idnum].Mmin(zarr) \
                     for idnum in self._lwb_sources], axis=0)
@@ -1,8 +1,10 @@
 import os
 import copy
 import pickle
+import threading
 import numpy as np
 from types import FunctionType
+from multiprocessing.pool import ThreadPool
 from ..static import Fluctuations
 from .Global21cm import Global21cm
 from ..physics.HaloModel import HaloModel
@@ -106,6 +108,9 @@ class PowerSpectrum21cm(AnalyzePS): # pragma: no cover
     def run(self): 
         """
         Run a simulation, compute power spectrum at each redshift.
+        
+        If `ps_nthreads` > 1, all redshifts after the first are split over
+        a pool of threads, each with its own Fluctuations instance.
 
         Returns
         -------
@@ -117,26 +122,75 @@ class PowerSpectrum21cm(AnalyzePS): # pragma: no cover
         pb = self.pb = ProgressBar(N, use=self.pf['progress_bar'], 
             name='ps-21cm')
 
+        nthreads = self.pf['ps_nthreads']
+        
         all_ps = []                        
         for i, (z, data) in enumerate(self.step()):
 
             # Do stuff
             all_ps.append(data.copy())
-
-            if i == 0:
-                keys = data.keys()
                 
             if not pb.has_pb:
                 pb.start()
 
             pb.update(i)
+            
+            # Once the first redshift is done, everything shared between
+            # threads (halo model tables, global 21-cm history, etc.) has
+            # been loaded, so we can farm out the rest.
+            if (nthreads is not None) and (nthreads > 1) and (N > 1):
+                break
+
+        # Fluctuations instances used, one per thread (plus the main one)
+        fields = [self.field]
+        
+        if len(all_ps) < N:
+            self._threads = threading.local()
+            self._thread_fields = fields
+            pool = ThreadPool(nthreads)
+            
+            try:
+                for i, data in enumerate(pool.imap(self._step_z_threaded, 
+                    self.z[1:])):
+                    all_ps.append(data.copy())
+                    pb.update(i + 1)
+            finally:
+                pool.close()
+                pool.join()
+                del self._threads, self._thread_fields
 
         pb.finish()
         
+        if self.pf['verbose']:
+            # Add up over threads
+            stats = {}
+            for field in fields:
+                for kind, st in field.memo.stats.items():
+                    if kind == 'disk':
+                        continue
+                    if kind not in stats:
+                        stats[kind] = {'hits': 0, 'misses': 0, 'evictions': 0}
+                    for key in stats[kind]:
+                        stats[kind][key] += st[key]
+                        
+            for kind in sorted(stats.keys()):
+                print(("# Memo ({}): {} hits, {} misses, {} evictions " +\
+                    "(total over {} thread(s)).").format(kind, 
+                    stats[kind]['hits'], stats[kind]['misses'],
+                    stats[kind]['evictions'], len(fields)))
+        
+        # These aren't part of the history: just hang on to the values
+        # from the last redshift.
+        if all_ps:
+            for key in ['zeta', 'R_s', 'Th']:
+                for data in all_ps:
+                    val = data.pop(key)
+                setattr(self, key, val)
+        
         self.all_ps = all_ps
         
         hist = {}
-        for key in keys:
+        for key in (all_ps[0].keys() if all_ps else []):
             
             is2d_k = key.startswith('ps')
             is2d_R = key.startswith('jp') or key.startswith('ev') \
@@ -232,304 +286,343 @@ class PowerSpectrum21cm(AnalyzePS): # pragma: no cover
         self.field.tab_Mmin = self.tab_Mmin    
         
         for i, z in enumerate(self.z):
+            yield z, self._step_z(z, self.field)
+            
+    def _get_thread_field(self):
+        """
+        Each thread gets its own Fluctuations instance (and memo), but they
+        all share the halo model, whose tables are read-only once loaded and
+        whose profile cache is thread-safe.
+        """
+        
+        if not hasattr(self._threads, 'field'):
+            field = Fluctuations(**self.kwargs)
+            field._halos = self.field.halos
+            field.tab_Mmin = self.tab_Mmin
+            self._threads.field = field
+            self._thread_fields.append(field)
+            
+        return self._threads.field
+        
+    def _step_z_threaded(self, z):
+        return self._step_z(z, self._get_thread_field())
+            
+    def _step_z(self, z, field):
+        """
+        Compute the power spectrum (and friends) at a single redshift.
+        
+        Parameters
+        ----------
+        z : int, float
+            Redshift.
+        field : ares.static.Fluctuations instance
+            Object that does the actual work.
+            
+        Returns
+        -------
+        Dictionary of results at this redshift. Also includes the ionizing
+        efficiency (`zeta`), shell size function (`R_s`), and shell 
+        temperature (`Th`), which `run` removes before building the history.
+        
+        """
 
-            data = {}
-                
-            ## 
-            # First, loop over populations and determine total
-            # UV and X-ray outputs. 
-            ##          
-            
-            # Prepare for the general case of Mh-dependent things
-            Nion = np.zeros_like(self.halos.tab_M)
-            Nlya = np.zeros_like(self.halos.tab_M)
-            fXcX = np.zeros_like(self.halos.tab_M)
-            zeta_ion = zeta = np.zeros_like(self.halos.tab_M)
-            zeta_lya = np.zeros_like(self.halos.tab_M)
-            zeta_X = np.zeros_like(self.halos.tab_M)
-            #Tpro = None
-            for j, pop in enumerate(self.pops):
-                pop_zeta = pop.IonizingEfficiency(z=z)
-                
-                if pop.is_src_ion:
-
-                    if type(pop_zeta) is tuple:
-                        _Mh, _zeta = pop_zeta
-                        zeta += np.interp(self.halos.tab_M, _Mh, _zeta)
-                        Nion += pop.src.Nion
-                    else:
-                        zeta += pop_zeta
-                        Nion += pop.pf['pop_Nion']
-                        Nlya += pop.pf['pop_Nlw']
-
-                    zeta = np.maximum(zeta, 1.) # why?
-
-                if pop.is_src_heat:
-                    pop_zeta_X = pop.HeatingEfficiency(z=z)
-                    zeta_X += pop_zeta_X
+        data = {}
+            
+        ## 
+        # First, loop over populations and determine total
+        # UV and X-ray outputs. 
+        ##          
+        
+        # Prepare for the general case of Mh-dependent things
+        Nion = np.zeros_like(self.halos.tab_M)
+        Nlya = np.zeros_like(self.halos.tab_M)
+        fXcX = np.zeros_like(self.halos.tab_M)
+        zeta_ion = zeta = np.zeros_like(self.halos.tab_M)
+        zeta_lya = np.zeros_like(self.halos.tab_M)
+        zeta_X = np.zeros_like(self.halos.tab_M)
+        #Tpro = None
+        for j, pop in enumerate(self.pops):
+            pop_zeta = pop.IonizingEfficiency(z=z)
+            
+            if pop.is_src_ion:
 
-                if pop.is_src_lya:
+                if type(pop_zeta) is tuple:
+                    _Mh, _zeta = pop_zeta
+                    zeta += np.interp(self.halos.tab_M, _Mh, _zeta)
+                    Nion += pop.src.Nion
+                else:
+                    zeta += pop_zeta
+                    Nion += pop.pf['pop_Nion']
                     Nlya += pop.pf['pop_Nlw']
-                    #Nlya += pop.src.Nlw
-
-            # Only used if...ps_lya_method==0?
-            zeta_lya += zeta * (Nlya / Nion)
-                                                                        
-            ##
-            # Make scalar if it's a simple model
-            ##
-            if np.all(np.diff(zeta) == 0):
-                zeta = zeta[0]
-            if np.all(np.diff(zeta_X) == 0):
-                zeta_X = zeta_X[0]    
-            if np.all(np.diff(zeta_lya) == 0):
-                zeta_lya = zeta_lya[0]
-                
-            self.field.zeta = zeta
-            self.field.zeta_X = zeta_X
-                            
-            self.zeta = zeta    
-                
-            ##
-            # Figure out scaling from ionized regions to heated regions.
-            # Right now, only constant (relative) scaling is allowed.
-            ##    
-            asize = self.pf['bubble_shell_asize_zone_0']
-            if self.pf['ps_include_temp'] and asize is not None:
-                
-                self.field.is_Rs_const = False
-                
-                if type(asize) is FunctionType:
-                    R_s = lambda R, z: R + asize(z)
-                else:    
-                    R_s = lambda R, z: R + asize
-                
-            elif self.pf['ps_include_temp'] and self.pf['ps_include_ion']:
-                fvol = self.pf["bubble_shell_rvol_zone_0"]
-                frad = self.pf['bubble_shell_rsize_zone_0']
-                
-                assert (fvol is not None) + (frad is not None) <= 1
+
+                zeta = np.maximum(zeta, 1.) # why?
+
+            if pop.is_src_heat:
+                pop_zeta_X = pop.HeatingEfficiency(z=z)
+                zeta_X += pop_zeta_X
+
+            if pop.is_src_lya:
+                Nlya += pop.pf['pop_Nlw']
+                #Nlya += pop.src.Nlw
+
+        # Only used if...ps_lya_method==0?
+        zeta_lya += zeta * (Nlya / Nion)
+                                                                    
+        ##
+        # Make scalar if it's a simple model
+        ##
+        if np.all(np.diff(zeta) == 0):
+            zeta = zeta[0]
+        if np.all(np.diff(zeta_X) == 0):
+            zeta_X = zeta_X[0]    
+        if np.all(np.diff(zeta_lya) == 0):
+            zeta_lya = zeta_lya[0]
+            
+        field.zeta = zeta
+        field.zeta_X = zeta_X
+                        
+        data['zeta'] = zeta
+            
+        ##
+        # Figure out scaling from ionized regions to heated regions.
+        # Right now, only constant (relative) scaling is allowed.
+        ##    
+        asize = self.pf['bubble_shell_asize_zone_0']
+        if self.pf['ps_include_temp'] and asize is not None:
+            
+            field.is_Rs_const = False
+            
+            if type(asize) is FunctionType:
+                R_s = lambda R, z: R + asize(z)
+            else:    
+                R_s = lambda R, z: R + asize
+            
+        elif self.pf['ps_include_temp'] and self.pf['ps_include_ion']:
+            fvol = self.pf["bubble_shell_rvol_zone_0"]
+            frad = self.pf['bubble_shell_rsize_zone_0']
+            
+            assert (fvol is not None) + (frad is not None) <= 1
+            
+            if fvol is not None:
+                assert frad is None
                 
-                if fvol is not None:
-                    assert frad is None
+                # Assume independent variable is redshift for now.
+                if type(fvol) is FunctionType:
+                    frad = lambda z: (1. + fvol(z))**(1./3.) - 1.
+                    field.is_Rs_const = False
+                else:
+                    frad = lambda z: (1. + fvol)**(1./3.) - 1.
                     
-                    # Assume independent variable is redshift for now.
-                    if type(fvol) is FunctionType:
-                        frad = lambda z: (1. + fvol(z))**(1./3.) - 1.
-                        self.field.is_Rs_const = False
-                    else:
-                        frad = lambda z: (1. + fvol)**(1./3.) - 1.
-                        
-                elif frad is not None:
-                    if type(frad) is FunctionType:
-                        self.field.is_Rs_const = False
-                    else:
-                        frad = lambda z: frad
+            elif frad is not None:
+                if type(frad) is FunctionType:
+                    field.is_Rs_const = False
                 else:
-                    # If R_s = R_s(z), must re-compute overlap volumes on each
-                    # step. Should set attribute if this is the case.
-                    raise NotImplemented('help')
-                
-                R_s = lambda R, z: R * (1. + frad(z))
-                
-                
+                    frad = lambda z: frad
             else:
-                R_s = lambda R, z: None    
-                Th = None
-                
-            # Must be constant, for now.
-            Th = self.pf["bubble_shell_ktemp_zone_0"]
+                # If R_s = R_s(z), must re-compute overlap volumes on each
+                # step. Should set attribute if this is the case.
+                raise NotImplemented('help')
+            
+            R_s = lambda R, z: R * (1. + frad(z))
             
-            self.R_s = R_s
-            self.Th = Th
-                
-                
-            ##
-            # First: some global quantities we'll need
-            ##
-            Tcmb = self.cosm.TCMB(z)
-            Tk = np.interp(z, self.mean_history['z'][-1::-1],
-                self.mean_history['igm_Tk'][-1::-1])
-            Ts = np.interp(z, self.mean_history['z'][-1::-1],
-                self.mean_history['Ts'][-1::-1])
-            Ja = np.interp(z, self.mean_history['z'][-1::-1],
-                self.mean_history['Ja'][-1::-1])
-            xHII, ne = [0] * 2
-            
-            xa = self.hydr.RadiativeCouplingCoefficient(z, Ja, Tk)
-            xc = self.hydr.CollisionalCouplingCoefficient(z, Tk)
-            xt = xa + xc
-            
-            # Won't be terribly meaningful if temp fluctuations are off.
-            C = self.field.TempToContrast(z, Th=Th, Tk=Tk, Ts=Ts, Ja=Ja)            
-            data['c'] = C
-            data['Ts'] = Ts
-            data['Tk'] = Tk
-            data['xa'] = xa
-            data['Ja'] = Ja
-            
-            
-            
-            # Assumes strong coupling. Mapping between temperature 
-            # fluctuations and contrast fluctuations.
-            #Ts = Tk
-            
-            
-            # Add beta factors to dictionary
-            for f1 in ['x', 'd', 'a']:
-                func = self.hydr.__getattribute__('beta_%s' % f1)
-                data['beta_%s' % f1] = func(z, Tk, xHII, ne, Ja)
-            
-            Qi_gs = np.interp(z, self.gs.history['z'][-1::-1], 
-                self.gs.history['cgm_h_2'][-1::-1])
-            
-            # Ionization fluctuations
-            if self.pf['ps_include_ion']:
-            
-                Ri, Mi, Ni = self.field.BubbleSizeDistribution(z, ion=True)
-            
-                data['n_i'] = Ni
-                data['m_i'] = Mi
-                data['r_i'] = Ri
-                data['delta_B'] = self.field._B(z, ion=True)
-            else:
-                Ri = Mi = Ni = None    
             
-            Qi = self.field.MeanIonizedFraction(z)
+        else:
+            R_s = lambda R, z: None    
+            Th = None
+            
+        # Must be constant, for now.
+        Th = self.pf["bubble_shell_ktemp_zone_0"]
+        
+        data['R_s'] = R_s
+        data['Th'] = Th
             
-            Qi_bff = self.field.BubbleFillingFactor(z)
             
-            xibar = Qi_gs                
+        ##
+        # First: some global quantities we'll need
+        ##
+        Tcmb = self.cosm.TCMB(z)
+        Tk = np.interp(z, self.mean_history['z'][-1::-1],
+            self.mean_history['igm_Tk'][-1::-1])
+        Ts = np.interp(z, self.mean_history['z'][-1::-1],
+            self.mean_history['Ts'][-1::-1])
+        Ja = np.interp(z, self.mean_history['z'][-1::-1],
+            self.mean_history['Ja'][-1::-1])
+        xHII, ne = [0] * 2
+        
+        xa = self.hydr.RadiativeCouplingCoefficient(z, Ja, Tk)
+        xc = self.hydr.CollisionalCouplingCoefficient(z, Tk)
+        xt = xa + xc
+        
+        # Won't be terribly meaningful if temp fluctuations are off.
+        C = field.TempToContrast(z, Th=Th, Tk=Tk, Ts=Ts, Ja=Ja)            
+        data['c'] = C
+        data['Ts'] = Ts
+        data['Tk'] = Tk
+        data['xa'] = xa
+        data['Ja'] = Ja
+        
+        
+        
+        # Assumes strong coupling. Mapping between temperature 
+        # fluctuations and contrast fluctuations.
+        #Ts = Tk
+        
+        
+        # Add beta factors to dictionary
+        for f1 in ['x', 'd', 'a']:
+            func = self.hydr.__getattribute__('beta_%s' % f1)
+            data['beta_%s' % f1] = func(z, Tk, xHII, ne, Ja)
+        
+        Qi_gs = np.interp(z, self.gs.history['z'][-1::-1], 
+            self.gs.history['cgm_h_2'][-1::-1])
+        
+        # Ionization fluctuations
+        if self.pf['ps_include_ion']:
+        
+            Ri, Mi, Ni = field.BubbleSizeDistribution(z, ion=True)
+        
+            data['n_i'] = Ni
+            data['m_i'] = Mi
+            data['r_i'] = Ri
+            data['delta_B'] = field._B(z, ion=True)
+        else:
+            Ri = Mi = Ni = None    
+        
+        Qi = field.MeanIonizedFraction(z)
+        
+        Qi_bff = field.BubbleFillingFactor(z)
+        
+        xibar = Qi_gs                
+                        
+        #print(z, Qi_bff, Qi, xibar, Qi_bff / Qi)
+                        
+        if self.pf['ps_include_temp']:
+            # R_s=R_s(Ri,z)
+            Qh = field.MeanIonizedFraction(z, ion=False)
+            data['Qh'] = Qh
+        else:
+            data['Qh'] = Qh = 0.0
+        
+        # Interpolate global signal onto new (coarser) redshift grid.
+        dTb_ps = np.interp(z, self.gs.history['z'][-1::-1], 
+            self.gs.history['dTb'][-1::-1])
+        
+        xavg_gs = np.interp(z, self.gs.history['z'][-1::-1], 
+            self.gs.history['xavg'][-1::-1])
                             
-            #print(z, Qi_bff, Qi, xibar, Qi_bff / Qi)
+        data['dTb'] = dTb_ps
+        
+        #data['dTb_bulk'] = np.interp(z, self.gs.history['z'][-1::-1], 
+        #    self.gs.history['dTb_bulk'][-1::-1])
+
+        
+        ##
+        # Correct for fraction of ionized and heated volumes
+        # and densities!
+        ##            
+        if self.pf['ps_include_temp']:
+            data['dTb_vcorr'] = None#(1 - Qh - Qi) * data['dTb_bulk'] \
+                #+ Qh * self.hydr.dTb(z, 0.0, Th)
+        else:
+            data['dTb_vcorr'] = None#data['dTb_bulk'] * (1. - Qi)
+        
+        if self.pf['ps_include_xcorr_ion_rho']:
+            pass
+        if self.pf['ps_include_xcorr_ion_hot']:
+            pass
+            
+        # Just for now    
+        data['dTb0'] = data['dTb']
+        data['dTb0_2'] = data['dTb0_1'] = data['dTb_vcorr']
+        
+        #if self.pf['include_ion_fl']:
+        #    if self.pf['ps_rescale_Qion']:
+        #        xibar = min(np.interp(z, self.pops[0].halos.z,
+        #            self.pops[0].halos.fcoll_Tmin) * zeta, 1.)
+        #        Qi = xibar
+        #        
+        #        xibar = np.interp(z, self.mean_history['z'][-1::-1],
+        #            self.mean_history['cgm_h_2'][-1::-1])
+        #        
+        #    else:
+        #        Qi = field.BubbleFillingFactor(z, zeta)
+        #        xibar = 1. - np.exp(-Qi)
+        #else:
+        #    Qi = 0.
+        
+        
                             
-            if self.pf['ps_include_temp']:
-                # R_s=R_s(Ri,z)
-                Qh = self.field.MeanIonizedFraction(z, ion=False)
-                data['Qh'] = Qh
-            else:
-                data['Qh'] = Qh = 0.0
+        #if self.pf['ps_force_QHII_gs'] or self.pf['ps_force_QHII_fcoll']:
+        #    rescale_Q = True
+        #else:
+        #    rescale_Q = False
             
-            # Interpolate global signal onto new (coarser) redshift grid.
-            dTb_ps = np.interp(z, self.gs.history['z'][-1::-1], 
-                self.gs.history['dTb'][-1::-1])
+        #Qi = np.mean([QHII_gs, field.BubbleFillingFactor(z, zeta)])    
+                                                            
+        #xibar = np.interp(z, self.mean_history['z'][-1::-1],
+        #    self.mean_history['cgm_h_2'][-1::-1])
             
-            xavg_gs = np.interp(z, self.gs.history['z'][-1::-1], 
-                self.gs.history['xavg'][-1::-1])
-                                
-            data['dTb'] = dTb_ps
+        # Avoid divide by zeros when reionization is over
+        if Qi == 1:
+            Tbar = 0.0
+        else:
+            Tbar = data['dTb0_2']
+                            
+        xbar = 1. - xibar
+        data['Qi'] = Qi
+        data['xibar'] = xibar
+        data['dTb0'] = Tbar            
+        #data['dTb_bulk'] = dTb_ps / (1. - xavg_gs)
+                    
+        ##
+        # 21-cm fluctuations
+        ##
+        if self.pf['ps_include_21cm']:
             
-            #data['dTb_bulk'] = np.interp(z, self.gs.history['z'][-1::-1], 
-            #    self.gs.history['dTb_bulk'][-1::-1])
-
+            data['cf_21'] = field.CorrelationFunction(z,
+                R=self.R, term='21', R_s=R_s(Ri,z), Ts=Ts, Th=Th,
+                Tk=Tk, Ja=Ja, k=self.k)
+                                    
+            # Always compute the 21-cm power spectrum. Individual power
+            # spectra can be saved by setting ps_save_components=True.
+            data['ps_21'] = field.PowerSpectrumFromCF(self.k, 
+                data['cf_21'], self.R, 
+                split_by_scale=self.pf['ps_split_transform'],
+                epsrel=self.pf['ps_fht_rtol'],
+                epsabs=self.pf['ps_fht_atol'])
+                                    
+        # Should just do the above, and then loop over whatever is in 
+        # the cache and save also. If ps_save_components is True, then
+        # FT everything we haven't already. 
+        for term in ['dd', 'ii', 'id', 'psi', 'phi']:
+            # Should change suffix to _ev
+            jp_1 = field._cache_jp(z, term, self.R)
+            cf_1 = field._cache_cf(z, term, self.R)
             
-            ##
-            # Correct for fraction of ionized and heated volumes
-            # and densities!
-            ##            
-            if self.pf['ps_include_temp']:
-                data['dTb_vcorr'] = None#(1 - Qh - Qi) * data['dTb_bulk'] \
-                    #+ Qh * self.hydr.dTb(z, 0.0, Th)
-            else:
-                data['dTb_vcorr'] = None#data['dTb_bulk'] * (1. - Qi)
+            if (jp_1 is None and cf_1 is None) and (term not in ['psi', 'phi', 'oo']):
+                continue
+                    
+            _cf = field.CorrelationFunction(z, 
+                R=self.R, term=term, R_s=R_s(Ri,z), Ts=Ts, Th=Th,
+                Tk=Tk, Ja=Ja, k=self.k)
+                    
+            data['cf_{}'.format(term)] = _cf.copy()
             
-            if self.pf['ps_include_xcorr_ion_rho']:
-                pass
-            if self.pf['ps_include_xcorr_ion_hot']:
-                pass
+            if not self.pf['ps_output_components']:
+                continue
                 
-            # Just for now    
-            data['dTb0'] = data['dTb']
-            data['dTb0_2'] = data['dTb0_1'] = data['dTb_vcorr']
-            
-            #if self.pf['include_ion_fl']:
-            #    if self.pf['ps_rescale_Qion']:
-            #        xibar = min(np.interp(z, self.pops[0].halos.z,
-            #            self.pops[0].halos.fcoll_Tmin) * zeta, 1.)
-            #        Qi = xibar
-            #        
-            #        xibar = np.interp(z, self.mean_history['z'][-1::-1],
-            #            self.mean_history['cgm_h_2'][-1::-1])
-            #        
-            #    else:
-            #        Qi = self.field.BubbleFillingFactor(z, zeta)
-            #        xibar = 1. - np.exp(-Qi)
-            #else:
-            #    Qi = 0.
-            
-            
-                                
-            #if self.pf['ps_force_QHII_gs'] or self.pf['ps_force_QHII_fcoll']:
-            #    rescale_Q = True
-            #else:
-            #    rescale_Q = False
-                
-            #Qi = np.mean([QHII_gs, self.field.BubbleFillingFactor(z, zeta)])    
-                                                                
-            #xibar = np.interp(z, self.mean_history['z'][-1::-1],
-            #    self.mean_history['cgm_h_2'][-1::-1])
-                
-            # Avoid divide by zeros when reionization is over
-            if Qi == 1:
-                Tbar = 0.0
-            else:
-                Tbar = data['dTb0_2']
-                                
-            xbar = 1. - xibar
-            data['Qi'] = Qi
-            data['xibar'] = xibar
-            data['dTb0'] = Tbar            
-            #data['dTb_bulk'] = dTb_ps / (1. - xavg_gs)
-                        
-            ##
-            # 21-cm fluctuations
-            ##
-            if self.pf['ps_include_21cm']:
-                
-                data['cf_21'] = self.field.CorrelationFunction(z,
-                    R=self.R, term='21', R_s=R_s(Ri,z), Ts=Ts, Th=Th,
-                    Tk=Tk, Ja=Ja, k=self.k)
-                                        
-                # Always compute the 21-cm power spectrum. Individual power
-                # spectra can be saved by setting ps_save_components=True.
-                data['ps_21'] = self.field.PowerSpectrumFromCF(self.k, 
-                    data['cf_21'], self.R, 
-                    split_by_scale=self.pf['ps_split_transform'],
-                    epsrel=self.pf['ps_fht_rtol'],
-                    epsabs=self.pf['ps_fht_atol'])
-                                        
-            # Should just do the above, and then loop over whatever is in 
-            # the cache and save also. If ps_save_components is True, then
-            # FT everything we haven't already. 
-            for term in ['dd', 'ii', 'id', 'psi', 'phi']:
-                # Should change suffix to _ev
-                jp_1 = self.field._cache_jp(z, term)
-                cf_1 = self.field._cache_cf(z, term)
-                
-                if (jp_1 is None and cf_1 is None) and (term not in ['psi', 'phi', 'oo']):
-                    continue
-                        
-                _cf = self.field.CorrelationFunction(z, 
-                    R=self.R, term=term, R_s=R_s(Ri,z), Ts=Ts, Th=Th,
-                    Tk=Tk, Ja=Ja, k=self.k)
-                        
-                data['cf_{}'.format(term)] = _cf.copy()
-                
-                if not self.pf['ps_output_components']:
-                    continue
-                    
-                data['ps_{}'.format(term)] = \
-                    self.field.PowerSpectrumFromCF(self.k, 
-                    data['cf_{}'.format(term)], self.R, 
-                    split_by_scale=self.pf['ps_split_transform'],
-                    epsrel=self.pf['ps_fht_rtol'],
-                    epsabs=self.pf['ps_fht_atol'])    
+            data['ps_{}'.format(term)] = \
+                field.PowerSpectrumFromCF(self.k, 
+                data['cf_{}'.format(term)], self.R, 
+                split_by_scale=self.pf['ps_split_transform'],
+                epsrel=self.pf['ps_fht_rtol'],
+                epsabs=self.pf['ps_fht_atol'])    
+            
+        # Always save the matter correlation function.        
+        data['cf_dd'] = field.CorrelationFunction(z, 
+            term='dd', R=self.R)
                 
-            # Always save the matter correlation function.        
-            data['cf_dd'] = self.field.CorrelationFunction(z, 
-                term='dd', R=self.R)
-                    
-            yield z, data
+        return data
             
     def save(self, prefix, suffix='pkl', clobber=False, fields=None):
         """
@@ -12,20 +12,38 @@ Notes: If we want to parallelize over the grid, we'll need to use different
 ODE integration routines, as scipy.integrate.ode is not re-entrant :(
 Maybe not - MPI should be OK, multiprocessing should cause the problems.
 
+Update: in batch mode, all cells are evolved at once as one big system,
+whose Jacobian is block diagonal (and so banded, which LSODA can exploit).
+Cells can be split among a pool of forked processes, each of which gets its
+own copy of the integrator, so re-entrancy is a non-issue. The pool is
+created on the first time-step and kept until `close` is called, so the
+rate coefficients (which change every step for non-isothermal gas) are sent
+along with each job rather than inherited.
+
 """
 
 import copy
 import numpy as np
+try:
+    import multiprocessing
+except ImportError:
+    pass
 from scipy.integrate import ode
 from ..physics.Constants import k_B
 from ..static.ChemicalNetwork import ChemicalNetwork
     
 tiny_ion = 1e-12 
 
+# ChemicalNetwork attributes that can change between time-steps, and so must
+# be sent to workers in the process pool.
+_chemnet_state = ['T', 'Beta', 'alpha', 'zeta', 'eta', 'psi', 'xi', 'omega',
+    'dBeta', 'dalpha', 'dzeta', 'deta', 'dpsi', 'dxi', 'domega', 
+    '_monotonic_EoR']
+
 class Chemistry(object):
     """ Class for evolving chemical reaction equations. """
     def __init__(self, grid, rt=False, atol=1e-8, rtol=1e-8, rate_src='fk94',
-        recombination='B', interp_rc='linear'):
+        recombination='B', interp_rc='linear', batch=True, nproc=1):
         """
         Create a chemistry object.
         
@@ -35,6 +53,11 @@ class Chemistry(object):
             Need this!
         rt: bool
             Use radiative transfer?
+        batch : bool
+            If True, and there's more than one cell, solve for all cells
+            simultaneously rather than one at a time.
+        nproc : int
+            In batch mode, split cells among this many processes.
             
         """
 
@@ -55,6 +78,19 @@ class Chemistry(object):
             nsteps=1e4, atol=atol, rtol=rtol)
         
         self.solver._integrator.iwork[2] = -1
+        
+        self.batch = batch and (self.grid.dims > 1)
+        self.nproc = nproc
+        
+        # Jacobian is block diagonal, i.e., banded. Let LSODA compute it
+        # by finite differencing if there's exotic heating, since its
+        # derivative isn't available analytically.
+        if self.batch:
+            Nb = len(self.grid.evolving_fields) - 1
+            jac = None if self.grid.exotic_heating else self._JacobianBanded
+            self.solver_batch = ode(self._RateEquationsBatch, jac)
+            self.solver_batch.set_integrator('lsoda', nsteps=1e4, atol=atol, 
+                rtol=rtol, lband=Nb, uband=Nb)
             
         # Empty arrays in the shapes we often need
         self.zeros_gridxq = np.zeros([self.grid.dims, 
@@ -106,33 +142,36 @@ class Chemistry(object):
         # For debugging
         self.kwargs_by_cell = kwargs_by_cell
         
-        # Loop over grid and solve chemistry
-        for cell in range(self.grid.dims):
+        if self.batch:
+            self._EvolveBatch(data, newdata, t, dt, kwargs)
+        else:
+            # Loop over grid and solve chemistry
+            for cell in range(self.grid.dims):
 
-            # Construct q vector
-            q = np.zeros(len(self.grid.evolving_fields))
-            for i, species in enumerate(self.grid.evolving_fields):
-                q[i] = data[species][cell]
+                # Construct q vector
+                q = np.zeros(len(self.grid.evolving_fields))
+                for i, species in enumerate(self.grid.evolving_fields):
+                    q[i] = data[species][cell]
                                     
-            kwargs_cell = kwargs_by_cell[cell]
+                kwargs_cell = kwargs_by_cell[cell]
                     
-            if self.rtON:
-                args = (cell, kwargs_cell['k_ion'], kwargs_cell['k_ion2'],
-                    kwargs_cell['k_heat'], data['n'][cell], t)
-            else:
-                args = (cell, self.grid.zeros_absorbers, 
-                    self.grid.zeros_absorbers2, self.grid.zeros_absorbers, 
-                    data['n'][cell], t)
+                if self.rtON:
+                    args = (cell, kwargs_cell['k_ion'], kwargs_cell['k_ion2'],
+                        kwargs_cell['k_heat'], data['n'][cell], t)
+                else:
+                    args = (cell, self.grid.zeros_absorbers, 
+                        self.grid.zeros_absorbers2, self.grid.zeros_absorbers, 
+                        data['n'][cell], t)
 
-            self.solver.set_initial_value(q, 0.0).set_f_params(args).set_jac_params(args)
+                self.solver.set_initial_value(q, 0.0).set_f_params(args).set_jac_params(args)
                         
-            self.solver.integrate(dt)
+                self.solver.integrate(dt)
 
-            self.q_grid[cell] = q.copy()
-            self.dqdt_grid[cell] = self.chemnet.dqdt.copy()
+                self.q_grid[cell] = q.copy()
+                self.dqdt_grid[cell] = self.chemnet.dqdt.copy()
 
-            for i, value in enumerate(self.solver.y):
-                newdata[self.grid.evolving_fields[i]][cell] = self.solver.y[i]
+                for i, value in enumerate(self.solver.y):
+                    newdata[self.grid.evolving_fields[i]][cell] = self.solver.y[i]
 
         # Compute particle density
         newdata['n'] = self.grid.particle_density(newdata, z - dz)
@@ -146,6 +185,163 @@ class Chemistry(object):
 
         return newdata  
 
+    def _EvolveBatch(self, data, newdata, t, dt, kwargs):
+        """
+        Evolve all cells by dt at once, possibly split among processes.
+        
+        Same arguments as `Evolve`, plus `newdata`, which is updated in
+        place, and `kwargs`, the rate coefficients (for all cells).
+        """
+        
+        fields = self.grid.evolving_fields
+        
+        # Shape (cells, fields)
+        q = np.array([data[species] for species in fields]).T
+        
+        # Move cells to the last axis, as ChemicalNetwork expects
+        if self.rtON:
+            k_ion = kwargs['k_ion'].T
+            k_ion2 = np.moveaxis(kwargs['k_ion2'], 0, -1)
+            k_heat = kwargs['k_heat'].T
+        else:
+            k_ion = k_heat = self.grid.zeros_absorbers
+            k_ion2 = self.grid.zeros_absorbers2
+        
+        chunks = np.array_split(np.arange(self.grid.dims), 
+            min(max(self.nproc, 1), self.grid.dims))
+        
+        jobs = []
+        for cells in chunks:
+            sl = slice(cells[0], cells[-1] + 1)
+            if self.rtON:
+                job = (sl, q[sl], k_ion[...,sl], k_ion2[...,sl], 
+                    k_heat[...,sl], data['n'][sl], t, dt)
+            else:
+                job = (sl, q[sl], k_ion, k_ion2, k_heat, data['n'][sl], t, dt)
+                
+            jobs.append(job)
+            
+        if len(jobs) > 1 and (self.pool is not None):
+            state = {}
+            for name in _chemnet_state:
+                if hasattr(self.chemnet, name):
+                    state[name] = getattr(self.chemnet, name)
+            
+            results = self.pool.map(_evolve_cells_pool, 
+                [(state, job) for job in jobs])
+        else:
+            results = [self._EvolveCells(*job) for job in jobs]
+        
+        for cells, (y, dqdt) in zip(chunks, results):
+            sl = slice(cells[0], cells[-1] + 1)
+            self.q_grid[sl] = q[sl]
+            self.dqdt_grid[sl] = dqdt
+            for i, species in enumerate(fields):
+                newdata[species][sl] = y[:,i]
+        
+    @property
+    def pool(self):
+        """
+        Pool of forked processes for batch mode, created on first use.
+        
+        Workers inherit this object, hence the 'fork' requirement. Will be 
+        None if there's only one process or forking isn't possible.
+        """
+        if not hasattr(self, '_pool'):
+            nproc = min(self.nproc, self.grid.dims)
+            
+            try:
+                ctx = multiprocessing.get_context('fork')
+            except (NameError, ValueError):
+                ctx = None
+            
+            if (nproc > 1) and (ctx is not None):
+                global _chem_for_pool
+                _chem_for_pool = self
+                try:
+                    self._pool = ctx.Pool(nproc)
+                finally:
+                    _chem_for_pool = None
+            else:
+                self._pool = None
+            
+        return self._pool
+        
+    def close(self):
+        """
+        Shut down the process pool (if there is one).
+        """
+        if getattr(self, '_pool', None) is not None:
+            self._pool.close()
+            self._pool.join()
+            
+        if hasattr(self, '_pool'):
+            del self._pool
+        
+    def __del__(self):
+        if getattr(self, '_pool', None) is not None:
+            self._pool.terminate()
+        
+    def _EvolveCells(self, cells, q, k_ion, k_ion2, k_heat, ntot, t, dt):
+        """
+        Evolve a contiguous block of cells by dt.
+        
+        Parameters
+        ----------
+        cells : slice
+            Cells to evolve.
+        q : np.ndarray
+            Initial conditions, shape (cells, fields).
+        k_ion, k_ion2, k_heat : np.ndarray
+            Rate coefficients, with cells along the last axis.
+        ntot : np.ndarray
+            Particle density in each cell.
+            
+        Returns
+        -------
+        Tuple: solution at t + dt and last computed time derivatives, each
+        with the same shape as `q`.
+        
+        """
+        args = (cells, k_ion, k_ion2, k_heat, ntot, t)
+        
+        self.solver_batch.set_initial_value(q.ravel(), 0.0)
+        self.solver_batch.set_f_params(args).set_jac_params(args)
+        self.solver_batch.integrate(dt)
+        
+        return self.solver_batch.y.reshape(q.shape), self.chemnet.dqdt.T.copy()
+        
+    def _RateEquationsBatch(self, t, y, args):
+        """
+        Right-hand side for a block of cells, each of whose equations are
+        contiguous in `y`.
+        """
+        q = y.reshape(-1, self.chemnet.Nev).T
+        return self.chemnet.RateEquations(t, q, args).T.ravel()
+        
+    def _JacobianBanded(self, t, y, args):
+        """
+        Block diagonal Jacobian for a block of cells, in the packed format
+        LSODA expects for banded matrices, i.e., 
+        `band[i - j + uband, j] = J[i, j]`, with an extra `lband` rows of
+        zeros at the bottom (for its LU decomposition), for a total of
+        2 * lband + uband + 1 rows.
+        """
+        Nev = self.chemnet.Nev
+        q = y.reshape(-1, Nev).T
+        # Don't clobber last time derivatives (see _EvolveCells)
+        dqdt = self.chemnet.dqdt
+        J = self.chemnet.Jacobian(t, q, args)
+        self.chemnet.dqdt = dqdt
+        
+        # lband = uband = Nev - 1
+        band = np.zeros((3 * (Nev - 1) + 1, y.size))
+        for i in range(Nev):
+            for j in range(Nev):
+                band[i - j + Nev - 1,j::Nev] = J[i,j]
+                
+        return band
+        
     def _sort_kwargs_by_cell(self, kwargs):
         """
         Convert kwargs dictionary to list.
@@ -163,3 +359,15 @@ class Chemistry(object):
             kwargs_by_cell.append(new_kwargs)
         
         return kwargs_by_cell
+
+_chem_for_pool = None
+def _evolve_cells_pool(args):
+    """
+    For Chemistry._EvolveBatch: evolve one block of cells in a worker, after
+    bringing its rate coefficients up to date.
+    """
+    state, job = args
+    for name in state:
+        setattr(_chem_for_pool.chemnet, name, state[name])
+    
+    return _chem_for_pool._EvolveCells(*job)
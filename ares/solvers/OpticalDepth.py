@@ -18,12 +18,13 @@ from scipy.integrate import quad
 from ..physics import Cosmology, Hydrogen
 from scipy.interpolate import interp1d as interp1d_scipy
 from ..util.Misc import num_freq_bins
+from ..util.Cache import DiskCache, digest
 from ..physics.Constants import c, h_p, erg_per_ev
 from ..util.Math import interp1d
 from ..util.Warnings import no_tau_table
 from ..util import ProgressBar, ParameterFile
 from ..physics.CrossSections import PhotoIonizationCrossSection, \
-    ApproximatePhotoIonizationCrossSection
+    ApproximatePhotoIonizationCrossSection, E_th
 from ..util.Warnings import tau_tab_z_mismatch, tau_tab_E_mismatch
 
 try:
@@ -243,6 +244,86 @@ class OpticalDepth(object):
     
         return tau
         
+    def _ionized_fraction(self, xavg, z):
+        """
+        Evaluate user-supplied ionization history on an array of redshifts.
+        """
+        try:
+            x = np.asarray(xavg(z), dtype=float)
+            return x * np.ones_like(z)
+        except (TypeError, ValueError):
+            # Function only accepts scalars
+            return np.vectorize(xavg, otypes=[float])(z)
+    
+    def DiffuseOpticalDepthGrid(self, z1, z2, E, order=None, **kwargs):
+        """
+        Compute the optical depth between many pairs of redshifts at once.
+        
+        Same as `DiffuseOpticalDepth`, except the integral is done with
+        fixed-order Gauss-Legendre quadrature, which is plenty over a
+        single step in the (logarithmic) redshift grid, and vectorized.
+        The integration starts at the redshift where the photon crosses the
+        ionization threshold of each species (if it does) since the 
+        cross sections are discontinuous there.
+    
+        Parameters
+        ----------
+        z1 : np.ndarray
+            observer redshifts
+        z2 : np.ndarray
+            emission redshifts
+        E : np.ndarray
+            observed photon energies (eV)
+        order : int
+            Number of nodes. Defaults to `tau_gauss_order` parameter.
+    
+        Returns
+        -------
+        Optical depth between z1 and z2 at observed energy E, with shape
+        determined by broadcasting the inputs against one another.
+    
+        """
+        
+        if self.self_consistent_He:
+            raise NotImplementedError('Only H or approx_He for now.')
+        
+        kw = self._fix_kwargs(functionify=True, **kwargs)
+        
+        if order is None:
+            order = self.pf['tau_gauss_order']
+        
+        z1, z2, E = np.broadcast_arrays(*map(np.asarray, (z1, z2, E)))
+        z1 = z1[...,None]
+        z2 = z2[...,None]
+        E = E[...,None]
+        
+        x, w = np.polynomial.legendre.leggauss(int(order))
+        
+        if self.approx_He:
+            species = [0, 1]
+        else:
+            species = [0]
+        
+        tau = 0.0
+        for i in species:
+            # Redshift at which (rest-frame) photon hits threshold
+            zth = E_th[i] * (1. + z1) / E - 1.
+            lo = np.minimum(np.maximum(z1, zth), z2)
+            
+            dz = 0.5 * (z2 - lo)
+            z = lo + dz * (x + 1.)
+            
+            n = self.cosm.nH(z) * (1. - self._ionized_fraction(kw['xavg'], z))
+            if i == 1:
+                n *= self.cosm.y
+            
+            integrand = self.cosm.dldz(z) * n \
+                * self.sigma(self.RestFrameEnergy(z1, E, z), species=i)
+            
+            tau += np.sum(w * integrand, axis=-1) * dz[...,0]
+            
+        return tau
+        
     def _fix_kwargs(self, functionify=False, **kwargs):
     
         kw = defkwargs.copy()
@@ -287,7 +368,70 @@ class OpticalDepth(object):
         
         if not hasattr(self, 'L'):
             self._set_xrb(use_tab=False)
-    
+            
+        # Maybe we've done this before
+        if self.pf['tau_cache'] is not None:
+            cache = DiskCache(self.pf['tau_cache'], self.pf['tau_cache_size'])
+            key = self.tau_digest()
+            data = cache.get(key)
+            if data is not None:
+                self.tau = data['tau']
+                if 'tau_err' in data:
+                    self.tau_err = data['tau_err']
+                if self.pf['verbose'] and rank == 0:
+                    print("# Loaded tau from {}.".format(cache._fn(key)))
+                return self.tau
+            
+        if (self.pf['tau_integrator'] == 'gauss') and \
+            (not self.self_consistent_He):
+            tau = self._TabulateOpticalDepthGauss(xavg)
+        else:
+            tau = self._TabulateOpticalDepthQuad(xavg)
+            
+        if (self.pf['tau_cache'] is not None) and (rank == 0):
+            data = {'z': self.z, 'E': self.E, 'tau': tau}
+            if hasattr(self, 'tau_err'):
+                data['tau_err'] = self.tau_err
+            cache.put(key, data)
+            
+        return tau
+        
+    def tau_digest(self):
+        """
+        Hash of everything the optical depth table depends on: the redshift 
+        and energy grids, the ionization history, the treatment of helium
+        and cross sections, the integrator, and the cosmology.
+        """
+        
+        if not hasattr(self, 'L'):
+            self._set_xrb(use_tab=False)
+            
+        # Sample ionization history between grid points too
+        xmid = np.sqrt(self.x[1:] * self.x[0:-1])
+        zs = np.sort(np.concatenate([self.z, xmid - 1.]))
+        
+        info = \
+        {
+         'z': self.z, 
+         'E': self.E,
+         'xavg': self._ionized_fraction(self.ionization_history, zs),
+         'include_He': self.pf['include_He'],
+         'approx_He': self.pf['approx_He'],
+         'approx_sigma': self.pf['approx_sigma'],
+         'tau_integrator': self.pf['tau_integrator'],
+         'tau_gauss_order': self.pf['tau_gauss_order'],
+         'cosmology': [self.cosm.nH0, self.cosm.y, self.cosm.omega_m_0,
+            self.cosm.omega_l_0, self.cosm.hubble_0, 
+            self.cosm.approx_highz],
+        }
+        
+        return digest(info)
+        
+    def _TabulateOpticalDepthQuad(self, xavg):
+        """
+        Tabulate optical depth one cell at a time with `DiffuseOpticalDepth`.
+        """
+        
         # Create array for each processor
         tau_proc = np.zeros([self.L, self.N])
     
@@ -325,6 +469,61 @@ class OpticalDepth(object):
     
         return tau
         
+    def _TabulateOpticalDepthGauss(self, xavg):
+        """
+        Tabulate optical depth using `DiffuseOpticalDepthGrid`.
+        
+        Also sets `tau_err` attribute, the absolute difference between the
+        table and one computed with half as many nodes. This is a 
+        conservative estimate of the error relative to `quad`.
+        """
+        
+        order = int(self.pf['tau_gauss_order'])
+        
+        tau_proc = np.zeros([self.L, self.N])
+        err_proc = np.zeros([self.L, self.N])
+        
+        # Do blocks of redshifts at once to keep memory use in check
+        Nb = max(1, int(2**20 // (self.N * order)))
+        
+        pb = ProgressBar(self.L, 'tau')
+        pb.start()
+        
+        # Last row (highest redshift) stays zero.
+        for h, lo in enumerate(range(0, self.L - 1, Nb)):
+            if h % size != rank:
+                continue
+            
+            hi = min(lo + Nb, self.L - 1)
+            
+            z1 = self.z[lo:hi,None]
+            z2 = self.z[lo+1:hi+1,None]
+            
+            tau_proc[lo:hi] = self.DiffuseOpticalDepthGrid(z1, z2, self.E,
+                order=order, xavg=xavg)
+            tau_lo = self.DiffuseOpticalDepthGrid(z1, z2, self.E,
+                order=max(order // 2, 1), xavg=xavg)
+            err_proc[lo:hi] = np.abs(tau_proc[lo:hi] - tau_lo)
+            
+            pb.update(hi)
+        
+        pb.finish()
+        
+        # Communicate results
+        if size > 1:
+            tau = np.zeros_like(tau_proc)       
+            nothing = MPI.COMM_WORLD.Allreduce(tau_proc, tau)
+            err = np.zeros_like(err_proc)       
+            nothing = MPI.COMM_WORLD.Allreduce(err_proc, err)
+        else:
+            tau = tau_proc
+            err = err_proc
+        
+        self.tau = tau
+        self.tau_err = err
+        
+        return tau
+        
     def RestFrameEnergy(self, z, E, zp):
         """
         Return energy of a photon observed at (z, E) and emitted at zp.
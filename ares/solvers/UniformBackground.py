@@ -1304,6 +1304,49 @@ class UniformBackground(object):
 
         return epsilon
 
+    def _flux_coefficients(self, redshifts, ehat, tau, popid):
+        """
+        Coefficients of the recurrence relation for the flux.
+        
+        Equivalent to Eq. 25 in Mirocha (2014), i.e., the flux at redshift
+        index ll is
+        
+            flux[ll] = P[ll] + Q[ll] * (flux[ll+1] shifted down one bin)
+            
+        where shifting down means flux[ll+1][1:], with a zero at the end.
+        Everything except the shift is known in advance, so we compute it
+        for the whole (z, E) table at once.
+        
+        Returns
+        -------
+        Tuple of 2-D arrays (P, Q), each with shape 
+        (len(redshifts) - 1, number of energies).
+        
+        """
+        
+        x = 1. + redshifts
+        xsq = x**2
+        R = x[1] / x[0]     
+        Rsq = R**2
+        
+        # Special case: delta function SED
+        if self.pops[popid].src.is_delta:
+            trapz_base = np.ones(redshifts.size - 1)
+        else:    
+            trapz_base = 0.5 * np.diff(redshifts)
+        
+        # Won't matter that we carried the first element to the end because
+        # the incoming flux in that bin is always zero.
+        tau_r = np.roll(tau, -1, axis=1)
+        ehat_r = np.roll(np.roll(ehat, -1, axis=0), -1, axis=1)
+        
+        Q = np.exp(-tau_r[0:-1])
+        P = c_over_four_pi * trapz_base[:,None] \
+          * (xsq[0:-1,None] * ehat[0:-1] + Q * xsq[1:,None] * ehat_r[0:-1])
+        Q /= Rsq
+        
+        return P, Q
+
     def _flux_generator_generic(self, energies, redshifts, ehat, tau=None,
         flux0=None, my_id=None, accept_photons=False):
         """
@@ -1318,22 +1361,16 @@ class UniformBackground(object):
         ehat : np.ndarray
             2-D array of tabulate emissivities (divided by H(z)).
         tau : np.ndarray
-            2-D array of optical depths, or reference to an array that will
-            be modified with time.
+            2-D array of optical depths.
         flux0 : np.ndarray  
             1-D array of initial flux values.
             
+        Each step yields the current redshift and a 1-D array of fluxes,
+        which is a row of a table allocated up front, i.e., fluxes yielded
+        at earlier steps are not overwritten.
+            
         """
-        
-        # Some stuff we need
-        x = 1. + redshifts
-        xsq = x**2
-        R = x[1] / x[0]     
-        Rsq = R**2
                 
-        # Shorthand
-        zarr = redshifts
-        
         # Remember what band I'm in and what Population I belong to.
         popid, bandid = my_id
                 
@@ -1349,30 +1386,16 @@ class UniformBackground(object):
                                     
         # Initialize flux-passing to zero
         self._fluxes_from[(popid, bandid)] = energies[0], 0.0
-            
-        #if tau is None:
-        #    if type(energies) is list:
-        #        tau = [np.zeros([redshifts.size, Earr.size]) \
-        #            for Earr in energies]
-        #    else:
-        #        tau = np.zeros([redshifts.size, energies.size])
-
-        if flux0 is None:
-            flux = np.zeros_like(energies)
-        else:
-            flux = flux0
-
+        
         L = redshifts.size
         ll = self._ll = L - 1
-
-        otf = False
         
-        # Pre-roll some stuff
-        tau_r = np.roll(tau, -1, axis=1)
-        ehat_r = np.roll(np.roll(ehat, -1, axis=0), -1, axis=1)
-        # Won't matter that we carried the first element to the end because
-        # the incoming flux in that bin is always zero.
+        P, Q = self._flux_coefficients(redshifts, ehat, tau, popid)
         
+        # All fluxes, filled in as we go
+        flux = np.zeros((L, len(energies)))
+        if flux0 is not None:
+            flux[-1] = flux0
         
         # Loop over redshift - this is the generator                    
         z = redshifts[-1]
@@ -1385,26 +1408,12 @@ class UniformBackground(object):
     
             # General case
             else:
-                    
-                if otf:
-                    exp_term = np.exp(-np.roll(tau, -1))
-                else:
-                    exp_term = np.exp(-tau_r[ll])
-                    
-                # Special case: delta function SED
-                if self.pops[popid].src.is_delta:
-                    trapz_base = 1.
-                else:    
-                    trapz_base = 0.5 * (zarr[ll+1] - zarr[ll])
-
-                # Equivalent to Eq. 25 in Mirocha (2014)
-                # Less readable, but faster!  
-                flux = c_over_four_pi \
-                    * ((xsq[ll] * trapz_base) * ehat[ll]) \
-                    + exp_term * (c_over_four_pi * xsq[ll+1] \
-                    * trapz_base * ehat_r[ll] \
-                    + np.hstack((flux[1:], [0])) / Rsq)
-                    #+ np.roll(flux, -1) / Rsq)
+                
+                # Equivalent to Eq. 25 in Mirocha (2014), in place
+                now = flux[ll]
+                np.multiply(Q[ll,0:-1], flux[ll+1,1:], out=now[0:-1])
+                now[-1] = 0.0
+                now += P[ll]
                                                                                             
                 ##
                 # Add Ly-a flux from cascades    
@@ -1427,7 +1436,7 @@ class UniformBackground(object):
                         assert _E == En[i]
                         
                         Jn = self.grid.hydr.frec(n) * J
-                        flux[0] += Jn
+                        now[0] += Jn
                         
                     # Still need to set flux[-1] = 0!
                     # Will happen below in 'else' bracket
@@ -1446,22 +1455,22 @@ class UniformBackground(object):
                         # Very approximate at the moment. Could correct
                         # for slight redshifting and dilution.
                         ##
-                        flux[-1] = in_flux
+                        now[-1] = in_flux
                     else:
-                        flux[-1] = 0.0
+                        now[-1] = 0.0
                     
                 # Otherwise, can be no flux at highest energy, because SED
                 # is truncated and there's no where it could have come from.    
                 #elif not accept_photons:
                 elif energies[-1] != E_LyA:
-                    flux[-1] = 0.0
+                    now[-1] = 0.0
 
-                self._fluxes_from[my_id] = energies[0], flux[0]
+                self._fluxes_from[my_id] = energies[0], now[0]
 
             ##
             # Yield results, move on to next iteration
             ##  
-            yield redshifts[ll], flux
+            yield redshifts[ll], flux[ll]
 
             # Increment redshift
             ll -= 1
@@ -1536,6 +1545,57 @@ class UniformBackground(object):
             
         return generators_by_band
         
+    def FluxTable(self, popid):
+        """
+        Evolve the background for a single population all at once.
+        
+        Parameters
+        ----------
+        popid : int
+            ID number of population.
+            
+        Returns
+        -------
+        None if we don't solve the RTE for this population at all. Otherwise, 
+        a list with one element per band: None if we don't solve the RTE in
+        that band, otherwise a 2-D array of fluxes with shape 
+        (number of redshifts, number of energies), or, for sawtooth bands,
+        a list of such arrays (one per sub-band). Like `FluxGenerator`, 
+        redshifts are in *descending* order. Units are 
+        s**-1 cm**-2 Hz**-1 sr**-1.
+        
+        .. note :: Uses its own generators, so it's safe to call this before,
+            after, or in the middle of stepping through `generators`.
+        
+        """
+        
+        if not np.any(self.solve_rte[popid]):
+            return None
+        
+        # Generators share some state (for passing flux between bands), 
+        # which we don't want to clobber.
+        saved = self._fluxes_from
+        self._fluxes_from_ = {}
+        
+        try:
+            tables = []
+            for gen in self.FluxGenerator(popid):
+                if gen is None:
+                    tables.append(None)
+                    continue
+                
+                fluxes = [flux for z, flux in gen]
+                
+                # Sawtooth bands yield lists of fluxes (one per sub-band)
+                if type(fluxes[0]) is list:
+                    tables.append([np.array(sub) for sub in zip(*fluxes)])
+                else:
+                    tables.append(np.array(fluxes))
+        finally:
+            self._fluxes_from_ = saved
+                
+        return tables
+        
     @property    
     def _fluxes_from(self):
         """
@@ -16,8 +16,10 @@ from ..util.Math import interp1d
 from ares.physics import Cosmology
 from scipy.optimize import minimize
 from ..util.ReadData import read_lit
+from ..util.Cache import MappedCache, digest, pack_mapped, unpack_mapped
 from ..physics import NebularEmission
 from ..util.ParameterFile import ParameterFile
+from ..util.SetDefaultParameterValues import SynthesisParameters
 from ares.physics.Constants import h_p, c, erg_per_ev, g_per_msun, s_per_yr, \
     s_per_myr, m_H, ev_per_hz
         
@@ -558,6 +560,17 @@ class SynthesisModel(SynthesisMaster):
                 self._times = _times
                 self._wavelengths = _waves
                 return self._data
+                
+            if self._shared is not None:
+                tabs = self._shared.get(self._shared_key)
+                if tabs is not None:
+                    self._data = tabs['data']
+                    self._wavelengths = tabs['wavelengths']
+                    if 'data_all_Z' in tabs:
+                        self._data_all_Z = tabs['data_all_Z']
+                    # Nebular continuum is already included.
+                    self._neb_cont_ = None
+                    return self._data
             
             Zall_l = list(self.metallicities.values())
             Zall = np.sort(Zall_l)
@@ -631,6 +644,63 @@ class SynthesisModel(SynthesisMaster):
         if not hasattr(self, '_neb_cont_'):
             self._data += self._neb_cont
             self._data[np.argwhere(np.isnan(self._data))] = 0.0
+            
+            if self._shared is not None:
+                tabs = {'data': self._data, 'wavelengths': self.wavelengths}
+                if hasattr(self, '_data_all_Z'):
+                    tabs['data_all_Z'] = self._data_all_Z
+                    
+                # Swap in memory-mapped copies so our own can be freed.
+                tabs = self._shared.put(self._shared_key, tabs)
+                self._data = tabs['data']
+                self._wavelengths = tabs['wavelengths']
+                if 'data_all_Z' in tabs:
+                    self._data_all_Z = tabs['data_all_Z']
+                self._neb_cont_ = None
                             
         return self._data
+        
+    @property
+    def _shared(self):
+        """
+        Store for SPS tables shared by all processes on a node, if any.
+        
+        Only applies to models read from litdata, i.e., not tables passed
+        in via ``source_sed_by_Z`` or ``source_sps_data``.
+        """
+        if not hasattr(self, '_shared_'):
+            if (self.pf['shared_tables'] is None) or \
+               (self.pf['source_sed_by_Z'] is not None) or \
+               (type(self.pf['source_sed']) is not str):
+                self._shared_ = None
+            else:
+                self._shared_ = MappedCache(self.pf['shared_tables'])
+        return self._shared_
+        
+    @property
+    def _shared_key(self):
+        """
+        Digest of everything that determines the contents of ``data``.
+        """
+        if not hasattr(self, '_shared_key_'):
+            pars = {'interp_Z': self.pf['interp_Z']}
+            for par in SynthesisParameters():
+                if par.endswith('_instance') or (par == 'source_sps_data'):
+                    continue
+                pars[par] = self.pf[par]
+            
+            # For nebular emission
+            for par in self.pf:
+                if par.startswith('pop_nebula') or (par == 'pop_fesc'):
+                    pars[par] = self.pf[par]
+            
+            self._shared_key_ = digest(('sps', pars))
+        return self._shared_key_
+        
+    def __getstate__(self):
+        # See HaloMassFunction.__getstate__
+        return pack_mapped(self.__dict__)
+        
+    def __setstate__(self, state):
+        self.__dict__.update(unpack_mapped(state))
             
\ No newline at end of file
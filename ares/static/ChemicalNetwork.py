@@ -113,7 +113,10 @@ class ChemicalNetwork(object):
         t : float
             Current time.
         q : np.ndarray
-            Array of dependent variables, one per rate equation.
+            Array of dependent variables, one per rate equation. Can also
+            be 2-D, i.e., shape (number of equations, number of cells), in
+            which case all other per-cell quantities in `args` must have
+            cells along their last axis.
         args : list
             Extra information needed to compute rates. They are, in order:
             [cell #, ionization rate coefficient (IRC), secondary IRC,
@@ -314,22 +317,24 @@ class ChemicalNetwork(object):
             
         # Can effectively turn off ionization equations once EoR is over.
         if self.monotonic_EoR:
-            if x['h_1'] <= self.monotonic_EoR:
-                dqdt['h_1'] = dqdt['h_2'] = 0.0
+            done = x['h_1'] <= self.monotonic_EoR
+            dqdt['h_1'] = np.where(done, 0.0, dqdt['h_1'])
+            dqdt['h_2'] = np.where(done, 0.0, dqdt['h_2'])
             if self.include_He:
-                if x['he_1'] <= self.monotonic_EoR:
-                    dqdt['he_1'] = 0.0
-                if x['he_2'] <= self.monotonic_EoR:
-                    dqdt['he_2'] = 0.0
+                for sp in ['he_1', 'he_2']:
+                    done = x[sp] <= self.monotonic_EoR
+                    dqdt[sp] = np.where(done, 0.0, dqdt[sp])
                         
-        self.dqdt = self.zeros_q.copy()
+        self.dqdt = np.zeros_like(q)
         for i, sp in enumerate(self.grid.qmap):
             self.dqdt[i] = dqdt[sp]
 
         if np.isnan(self.dqdt).sum():
             raise ValueError('NaN encountered in RateEquations!')
         if (self.q < 0).sum():
-            solver_error(self.grid, -1000, [self.q], [self.dqdt], -1000, cell, -1000)
+            if self.q.ndim == 1:
+                solver_error(self.grid, -1000, [self.q], [self.dqdt], -1000, 
+                    cell, -1000)
             raise ValueError('Something < 0.')
 
         return self.dqdt
@@ -337,9 +342,12 @@ class ChemicalNetwork(object):
     def Jacobian(self, t, q, args):
         """
         Compute the Jacobian for the system of equations.
+        
+        If `q` is 2-D (see `RateEquations`), the result has shape 
+        (number of equations, number of equations, number of cells).
         """
         self.q = q
-        self.dqdt = self.zeros_q.copy()
+        self.dqdt = np.zeros_like(q)
     
         cell, k_ion, k_ion2, k_heat, ntot, time = args
                 
@@ -379,7 +387,7 @@ class ChemicalNetwork(object):
             dxi = self.dxi
             domega = self.domega
     
-        J = self.zeros_jac.copy()
+        J = np.zeros(self.zeros_jac.shape + np.shape(q)[1:])
         
         # Where do the electrons live?
         if self.Nev == 6:
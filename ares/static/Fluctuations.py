@@ -15,6 +15,7 @@ from math import factorial
 from ..physics import Cosmology
 from ..util import ParameterFile
 from ..util.Stats import bin_c2e
+from ..util.Cache import MemoCache
 from scipy.special import erfinv
 from scipy.optimize import fsolve
 from scipy.interpolate import interp1d
@@ -92,16 +93,14 @@ class Fluctuations(object): # pragma: no cover
              + 2. * dr * R2 + 6. * R1 * R2 - 3. * R2**2) / 12. / dr
         
         if type(Vo) == np.ndarray:
-            # Small-scale vs. large Scale
+            # Small-scale vs. large Scale. Use np.where so that any of
+            # dr, R1, and R2 can be broadcast against the others, e.g.,
+            # separations as a column and bubble sizes as a row.
             SS = dr <= R2 - R1
             LS = dr >= R1 + R2
             
-            Vo[LS == 1] = 0.0
-
-            if type(R1) == np.ndarray:
-                Vo[SS == 1] = 4. * np.pi * R1[SS == 1]**3 / 3.
-            else:
-                Vo[SS == 1] = 4. * np.pi * R1**3 / 3.
+            Vo = np.where(LS, 0.0, Vo)
+            Vo = np.where(SS, 4. * np.pi * R1**3 / 3., Vo)
             
         return Vo
         
@@ -111,6 +110,33 @@ class Fluctuations(object): # pragma: no cover
         """
                 
         return self._overlap_region(dr, R1, R2)
+        
+    def _tabulate_volumes(self, func, R, R_i, *args):
+        """
+        Tabulate overlap or intersectional volumes on a (R x R_i) mesh.
+        
+        Parameters
+        ----------
+        func : function
+            Either `overlap_volumes` or `intersectional_volumes`.
+        R : np.ndarray
+            Separations between points.
+        R_i : np.ndarray
+            Bubble radii.
+        
+        Returns
+        -------
+        Array of shape (len(R), 6, len(R_i)).
+        
+        """
+        
+        R = np.atleast_1d(R)
+        
+        out = np.empty((R.size, 6, np.size(R_i)))
+        for j, V in enumerate(func(R[:,None], R_i, *args)):
+            out[:,j,:] = V
+        
+        return out
 
     def intersectional_volumes(self, dr, R1, R2, R3):
          IV = self.IV
@@ -618,13 +644,17 @@ class Fluctuations(object): # pragma: no cover
         bHII = self.bubble_bias(z, ion)
         bbar = self.mean_bubble_bias(z, ion)
         
-        if R < self.halos.tab_R.min():
+        if np.any(R < self.halos.tab_R.min()):
             print("R too small")
-        if R > self.halos.tab_R.max():
+        if np.any(R > self.halos.tab_R.max()):
             print("R too big")
 
         xi_dd = self.spline_cf_mm(z)(np.log(R))
 
+        # For an array of separations, return shape (len(R), len(bHII))
+        if np.ndim(R) > 0:
+            return bbar * np.multiply.outer(xi_dd, bHII)
+
         #if term == 'ii':
         return bHII * bbar * xi_dd
         #elif term == 'id':
@@ -926,43 +956,46 @@ class Fluctuations(object): # pragma: no cover
         return 4. * np.pi * (R_i * cm_per_mpc / (1. + z))**3 \
             * self.cosm.nH(z) / 3.
                     
-    def _cache_jp(self, z, term):
-        if not hasattr(self, '_cache_jp_'):
-            self._cache_jp_ = {}
-        
-        if z not in self._cache_jp_:
-            self._cache_jp_[z] = {}
-        
-        if term not in self._cache_jp_[z]:
-            return None
-        else:
-            #print("Loaded P_{} at z={} from cache.".format(term, z))
-            return self._cache_jp_[z][term]
-        
-    def _cache_cf(self, z, term):
-        if not hasattr(self, '_cache_cf_'):
-            self._cache_cf_ = {}
+    @property
+    def memo(self):
+        """
+        Memo for expectation values, joint probabilities, correlation 
+        functions, etc., at each redshift. See `ares.util.Cache.MemoCache`.
+        """
+        if not hasattr(self, '_memo'):
+            maxsize = {None: self.pf['ps_memo_size'],
+                'Vo': self.pf['ps_memo_size_volumes'],
+                'IV': self.pf['ps_memo_size_volumes']}
+            
+            # Overlap volumes are big and cheap-ish, so only keep in memory.
+            self._memo = MemoCache(maxsize=maxsize, 
+                ztol=self.pf['ps_memo_ztol'], path=self.pf['ps_cache'],
+                maxbytes=self.pf['ps_cache_size'], model=self.pf,
+                persist=['p', 'jp', 'cf', 'ps'])
+        
+        return self._memo
     
-        if z not in self._cache_cf_:
-            self._cache_cf_[z] = {}
+    def _memo_kwargs(self, kwargs):
+        # Ionization and heating efficiencies are set by hand, i.e., they
+        # aren't (necessarily) in the parameter file. 
+        kwargs['zeta'] = getattr(self, '_zeta', None)
+        kwargs['zeta_X'] = getattr(self, '_zeta_X', None)
+        return kwargs
     
-        if term not in self._cache_cf_[z]:
-            return None
-        else:
-            #print("Loaded cf_{} at z={} from cache.".format(term, z))
-            return self._cache_cf_[z][term]    
+    def _memo_get(self, kind, z, term=None, **kwargs):
+        return self.memo.get(kind, z, term, **self._memo_kwargs(kwargs))
     
-    def _cache_ps(self, z, term):
-        if not hasattr(self, '_cache_ps_'):
-            self._cache_ps_ = {}
+    def _memo_put(self, kind, z, term, value, **kwargs):
+        self.memo.put(kind, z, term, value, **self._memo_kwargs(kwargs))
     
-        if z not in self._cache_ps_:
-            self._cache_ps_[z] = {}
+    def _cache_jp(self, z, term, R):
+        return self._memo_get('jp', z, term, R=R)
+        
+    def _cache_cf(self, z, term, R):
+        return self._memo_get('cf', z, term, R=R)
     
-        if term not in self._cache_ps_[z]:
-            return None
-        else:
-            return self._cache_ps_[z][term]        
+    def _cache_ps(self, z, term, k):
+        return self._memo_get('ps', z, term, k=k)
     
     @property
     def is_Rs_const(self):
@@ -974,41 +1007,14 @@ class Fluctuations(object): # pragma: no cover
     def is_Rs_const(self, value):
         self._is_Rs_const = value
     
-    def _cache_Vo(self, z):
-        if not hasattr(self, '_cache_Vo_'):
-            self._cache_Vo_ = {}
-
-        if z in self._cache_Vo_:
-            return self._cache_Vo_[z]
+    def _cache_Vo(self, z, R, R_s):
+        return self._memo_get('Vo', z, R=R, R_s=R_s)
         
-        #if self.is_Rs_const and len(self._cache_Vo_.keys()) > 0:
-        #    return self._cache_Vo_[self._cache_Vo_.keys()[0]]
-
-        return None
-        
-    def _cache_IV(self, z):
-        if not hasattr(self, '_cache_IV_'):
-            self._cache_IV_ = {}
-    
-        if z in self._cache_IV_:
-            return self._cache_IV_[z]
-            
-        #if self.is_Rs_const and len(self._cache_IV_.keys()) > 0:
-        #    return self._cache_IV_[self._cache_IV_.keys()[0]]    
-    
-        return None    
+    def _cache_IV(self, z, R, R_s, R3):
+        return self._memo_get('IV', z, R=R, R_s=R_s, R3=R3)
         
     def _cache_p(self, z, term):
-        if not hasattr(self, '_cache_p_'):
-            self._cache_p_ = {}
-    
-        if z not in self._cache_p_:
-            self._cache_p_[z] = {}
-    
-        if term not in self._cache_p_[z]:
-            return None
-        else:
-            return self._cache_p_[z][term]
+        return self._memo_get('p', z, term)
     
     def mean_halo_overdensity(self, z):
         # Mean density of halos (mass is arbitrary)
@@ -1248,7 +1254,7 @@ class Fluctuations(object): # pragma: no cover
         else:
             raise ValueError('Don\' know how to handle <{}>'.format(term))
                 
-        self._cache_p_[z][term] = val
+        self._memo_put('p', z, term, val)
         
         return val
                 
@@ -1264,7 +1270,7 @@ class Fluctuations(object): # pragma: no cover
         
         basics = {}
         for term in ['ii', 'ih', 'ib', 'hh', 'hb', 'bb']:
-            cache = self._cache_jp(z, term)
+            cache = self._cache_jp(z, term, R)
             
             
             if self.pf['ps_include_temp'] and self.pf['ps_temp_model'] == 2:
@@ -1299,7 +1305,8 @@ class Fluctuations(object): # pragma: no cover
                 P = 1. - (basics['ii'][0] + 2 * basics['ib'][0]
                   + 2 * basics['ih'][0] + basics['hh'][0] + 2 * basics['hb'][0])
                 P1 = P2 = np.zeros_like(P)  
-                self._cache_jp_[z][term] = R, P, np.zeros_like(P), np.zeros_like(P)
+                self._memo_put('jp', z, term, 
+                    (R, P, np.zeros_like(P), np.zeros_like(P)), R=R)
             else:
                 P, P1, P2 = cache[1:]
                 
@@ -1421,18 +1428,19 @@ class Fluctuations(object): # pragma: no cover
         ##
         if not self.pf['ps_include_ion']:
             if term == 'ii':
-                self._cache_jp_[z][term] = R, Qi**2 * Rones, Rzeros, Rzeros
+                self._memo_put('jp', z, term,
+                    (R, Qi**2 * Rones, Rzeros, Rzeros), R=R)
                 return Qi**2 * Rones, Rzeros, Rzeros
             elif term in ['id']:
-                self._cache_jp_[z][term] = R, Rzeros, Rzeros, Rzeros
+                self._memo_put('jp', z, term, (R, Rzeros, Rzeros, Rzeros), R=R)
                 return Rzeros, Rzeros, Rzeros
             elif term == 'idd':
                 ev2pt = Qi * xi_dd
-                self._cache_jp_[z][term] = R, ev2pt, Rzeros, Rzeros
+                self._memo_put('jp', z, term, (R, ev2pt, Rzeros, Rzeros), R=R)
                 return ev2pt, Rzeros, Rzeros     # 
             elif term == 'iidd':
                 ev2pt = Qi**2 * xi_dd
-                self._cache_jp_[z][term] = R, ev2pt, Rzeros, Rzeros
+                self._memo_put('jp', z, term, (R, ev2pt, Rzeros, Rzeros), R=R)
                 return ev2pt, Rzeros, Rzeros
             #elif 'i' in term:
             #    #self._cache_jp_[z][term] = R, Rzeros, Rzeros, Rzeros
@@ -1656,28 +1664,25 @@ class Fluctuations(object): # pragma: no cover
         iM = np.argmin(np.abs(M_b - Mmin))
         
         # Only need overlap volumes once per redshift
-        all_OV_z = self._cache_Vo(z)
+        all_OV_z = self._cache_Vo(z, R, R_s)
         if all_OV_z is None:
-            all_OV_z = np.zeros((len(R), 6, len(R_i)))
-            for i, sep in enumerate(R):
-                all_OV_z[i,:,:] = \
-                    np.array(self.overlap_volumes(sep, R_i, R_s))
+            all_OV_z = self._tabulate_volumes(self.overlap_volumes, R, R_i,
+                R_s)
 
-            self._cache_Vo_[z] = all_OV_z.copy()
+            self._memo_put('Vo', z, None, all_OV_z.copy(), R=R, R_s=R_s)
 
             #print("Generated z={} overlap_volumes".format(z))
            
         #else:    
         #   print("Read in z={} overlap_volumes".format(z))
            
-        all_IV_z = self._cache_IV(z)
+        all_IV_z = self._cache_IV(z, R, R_s, R3)
         if all_IV_z is None:
-            all_IV_z = np.zeros((len(R), 6, len(R_i)))
-            for i, sep in enumerate(R):
-                all_IV_z[i,:,:] = \
-                    np.array(self.intersectional_volumes(sep, R_i, R_s, R3))
+            all_IV_z = self._tabulate_volumes(self.intersectional_volumes,
+                R, R_i, R_s, R3)
         
-            self._cache_IV_[z] = all_IV_z.copy()    
+            self._memo_put('IV', z, None, all_IV_z.copy(), R=R, R_s=R_s,
+                R3=R3)
         
         Mmin_b = self.Mmin(z) * self.zeta
         Mmin_h = self.Mmin(z)
@@ -1694,255 +1699,229 @@ class Fluctuations(object): # pragma: no cover
         #dR = np.diff(10**bin_c2e(np.log(R)))#np.concatenate((np.diff(R), [np.diff(R)[-1]]))  
         #dR = 10**np.arange(np.log(R).min(), np.log(R).max() + 2 * dlogR, dlogR)    
                 
-        # Loop over scales
+        ##
+        # Everything below is done for all separations at once, so the
+        # quantities in each branch are 2-D, i.e., (separation x bubble mass),
+        # and get_prob integrates over bubble mass to yield one probability
+        # per separation.
+        ##
         P1 = np.zeros(R.size)
         P2 = np.zeros(R.size)
         PT = np.zeros(R.size)
-        for i, sep in enumerate(R):
-            
-            ##
-            # Note: each element of this loop we're constructing an array
-            # over bubble mass, which we then integrate over to get a total
-            # probability. The shape of every quantity should be `self.m`.
-            ##
-                        
-            # Yields: V11, V12, V22, V1n, V2n, Van
-            # Remember: these radii arrays depend on redshift (through delta_B)
-            all_V = all_OV_z[i]
-            all_IV = all_IV_z[i]
         
-            # For two-halo terms, need bias of sources.
-            if self.pf['ps_include_bias']:
-                # Should modify for temp_model==2
-                if self.pf['ps_include_temp']:
-                    if self.pf['ps_temp_model'] == 2 and 'h' in term:
-                        _ion = False
-                    else:
-                        _ion = True
+        # Yields: V11, V12, V22, V1n, V2n, Van
+        # Remember: these radii arrays depend on redshift (through delta_B)
+        all_V = np.swapaxes(all_OV_z, 0, 1)
+        all_IV = np.swapaxes(all_IV_z, 0, 1)
+        
+        # For two-halo terms, need bias of sources.
+        if self.pf['ps_include_bias']:
+            # Should modify for temp_model==2
+            if self.pf['ps_include_temp']:
+                if self.pf['ps_temp_model'] == 2 and 'h' in term:
+                    _ion = False
                 else:
                     _ion = True
-                ep = self.excess_probability(z, sep, ion=_ion)
             else:
-                ep = np.zeros_like(self.m)
+                _ion = True
+            ep = self.excess_probability(z, R, ion=_ion)
+        else:
+            ep = 0.0
 
-            ##
-            # For each zone, figure out volume of region where a
-            # single source can ionize/heat/couple both points, as well
-            # as the region where a single source is not enough (Vss_ne)
-            ##
-            if term == 'ii':
-                
-                Vo = all_V[0]
-                            
-                # Subtract off more volume if heating is ON.
-                #if self.pf['ps_include_temp']:
-                #    #Vne1 = Vne2 = V_i - self.IV(sep, R_i, R_s)
-                #    Vne1 = Vne2 = V_i - all_IV[1]
-                #else:
-                
-                # You might think: hey! If temperature fluctuations are on,
-                # we need to make sure the second point isn't *heated* by
-                # the first point. This gets into issues of overlap. By not
-                # introducing this correction (commented out above), we're 
-                # saying "yes, the second point can still lie in the heated
-                # region of the first (ionized) point, but that point itself
-                # may actually be ionized, since the way we construct regions
-                # doesn't know that a heated region may actually live in the
-                # ionized region of another bubble." That is, a heated point
-                # can be ionized but an ionized pt can't later be designated
-                # a hot point.
-                Vne1 = Vne2 = V_i - Vo
-                    
-                _P1 = self.get_prob(z, M_b, dndm_b, Mmin_b, Vo, True)
-                
-                _P2_1 = self.get_prob(z, M_b, dndm_b, Mmin_b, Vne1, True)
-                _P2_2 = self.get_prob(z, M_b, dndm_b, Mmin_b, Vne2, True, ep)
-                
-                _P2 = (1. - _P1) * _P2_1 * _P2_2
-                                                
-                if self.pf['ps_volfix'] and Qi > 0.5:
-                    P1[i] = _P1
-                    P2[i] = (1. - P1[i]) * _P2_1**2
-                                        
-                else:
-                    P1[i] = _P1
-                    P2[i] = _P2
-
-            # Probability that one point is ionized, other in "bulk IGM"
-            elif term == 'ib':
-                Vo_iN = all_V[3] # region in which a source ionized one point
-                                 # and does nothing to the other.
-
-                # Probability that a single source does something to 
-                # each point. If no temp fluctuations, same as _Pis                 
-                P1_iN = self.get_prob(z, M_b, dndm_b, Mmin_b, all_V[3], True)
-
-                # "probability of an ionized pt 2 given ionized pt 1"
-                Pigi = self.get_prob(z, M_b, dndm_b, Mmin_b, V_i-all_V[0], True, ep)
-
-                if self.pf['ps_include_temp']:
-                    if self.pf['ps_temp_model'] == 1:
-                        Vne2 = V_ioh - all_IV[2] - (V_i - all_IV[1])
-                        # "probability of a heated pt 2 given ionized pt 1"
-                        Phgi = self.get_prob(z, M_b, dndm_b * f_h, Mmin_b, Vne2, True, ep)
+        ##
+        # For each zone, figure out volume of region where a
+        # single source can ionize/heat/couple both points, as well
+        # as the region where a single source is not enough (Vss_ne)
+        ##
+        if term == 'ii':
+            
+            Vo = all_V[0]
                         
-                        P2[i] = P1_iN * (1. - Pigi - Phgi)   
-                    else:
-                        P2[i] = Qi * (1. - Qi - Qh)
+            # Subtract off more volume if heating is ON.
+            #if self.pf['ps_include_temp']:
+            #    #Vne1 = Vne2 = V_i - self.IV(sep, R_i, R_s)
+            #    Vne1 = Vne2 = V_i - all_IV[1]
+            #else:
+            
+            # You might think: hey! If temperature fluctuations are on,
+            # we need to make sure the second point isn't *heated* by
+            # the first point. This gets into issues of overlap. By not
+            # introducing this correction (commented out above), we're 
+            # saying "yes, the second point can still lie in the heated
+            # region of the first (ionized) point, but that point itself
+            # may actually be ionized, since the way we construct regions
+            # doesn't know that a heated region may actually live in the
+            # ionized region of another bubble." That is, a heated point
+            # can be ionized but an ionized pt can't later be designated
+            # a hot point.
+            Vne1 = Vne2 = V_i - Vo
+                
+            _P1 = self.get_prob(z, M_b, dndm_b, Mmin_b, Vo, True)
+            
+            _P2_1 = self.get_prob(z, M_b, dndm_b, Mmin_b, Vne1, True)
+            _P2_2 = self.get_prob(z, M_b, dndm_b, Mmin_b, Vne2, True, ep)
+            
+            _P2 = (1. - _P1) * _P2_1 * _P2_2
+                                            
+            if self.pf['ps_volfix'] and Qi > 0.5:
+                P1[:] = _P1
+                P2[:] = (1. - P1) * _P2_1**2
+                                    
+            else:
+                P1[:] = _P1
+                P2[:] = _P2
+
+        # Probability that one point is ionized, other in "bulk IGM"
+        elif term == 'ib':
+            Vo_iN = all_V[3] # region in which a source ionized one point
+                             # and does nothing to the other.
+
+            # Probability that a single source does something to 
+            # each point. If no temp fluctuations, same as _Pis                 
+            P1_iN = self.get_prob(z, M_b, dndm_b, Mmin_b, all_V[3], True)
+
+            # "probability of an ionized pt 2 given ionized pt 1"
+            Pigi = self.get_prob(z, M_b, dndm_b, Mmin_b, V_i-all_V[0], True, ep)
+
+            if self.pf['ps_include_temp']:
+                if self.pf['ps_temp_model'] == 1:
+                    Vne2 = V_ioh - all_IV[2] - (V_i - all_IV[1])
+                    # "probability of a heated pt 2 given ionized pt 1"
+                    Phgi = self.get_prob(z, M_b, dndm_b * f_h, Mmin_b, Vne2, True, ep)
+                    
+                    P2[:] = P1_iN * (1. - Pigi - Phgi)   
                 else:
-                    P2[i] = P1_iN * (1. - Pigi)
+                    P2[:] = Qi * (1. - Qi - Qh)
+            else:
+                P2[:] = P1_iN * (1. - Pigi)
 
-            elif term == 'hb':
+        elif term == 'hb':
+            
+            #if self.pf['ps_temp_model'] == 2:
+            #    print('Ignoring hb term for now...')
+            #    continue
+            #else:
+            #    pass
+            
+            if self.pf['ps_temp_model'] == 2:    
+                P1_hN = self.get_prob(z, M_s, dndm_s, Mmin_s, all_V[4], True)
+            else:
+                # Probability that single source can heat one pt but 
+                # does nothing to the other.
+                P1_hN = self.get_prob(z, M_b, dndm_b * f_h, Mmin_b, all_V[4], True)
+                
+            # Given that the first point is heated, what is the probability
+            # that the second pt is heated or ionized by a different source?
+            # We want the complement of that.
+            
+            # Volume in which I heat but don't ionize (or heat) the other pt, 
+            # i.e., same as the two-source term for <hh'>
+            #Vne2 = Vh - self.IV(sep, R_i, R_s)
+            Vne2 = V_ioh - all_IV[2] - (V_i - all_IV[1])
+                            
+            # Volume in which single source ioniz
+            V2ii = V_i - all_V[0]
+            
+            Phgh = self.get_prob(z, M_b, dndm_b * f_h, Mmin_b, Vne2, True, ep)
+            Pigh = self.get_prob(z, M_b, dndm_b, Mmin_b, V2ii, True, ep)
+            
+            #P1[i] = P1_hN 
+            #ih2 = _P_ih_2[i]
+            #hh2 = _P_hh_2[i]
+            P2[:] = P1_hN * (1. - Phgh - Pigh)
+            
+        elif term == 'hh':
+            
+            # Excursion set approach for temperature.
+            if self.pf['ps_temp_model'] == 2:
+                Vo = all_V[2]
+                        
+                Vne1 = Vne2 = V_h - Vo
                 
-                #if self.pf['ps_temp_model'] == 2:
-                #    print('Ignoring hb term for now...')
-                #    continue
+                _P1 = self.get_prob(z, M_s, dndm_s, Mmin_s, Vo, True)
+            
+                _P2_1 = self.get_prob(z, M_s, dndm_s, Mmin_s, Vne1, True)
+                _P2_2 = self.get_prob(z, M_s, dndm_s, Mmin_s, Vne2, True, ep)
+            
+                #_P2_1 -= Qi
+                #_P2_1 -= Qi
+            
+                _P2 = (1. - _P1) * _P2_1 * _P2_2
+                                                                
+                #if self.pf['ps_volfix'] and Qi > 0.5:
+                #    P1[i] = _P1
+                #    P2[i] = (1. - P1[i]) * _P2_1**2
+                #                    
                 #else:
-                #    pass
-                
-                if self.pf['ps_temp_model'] == 2:    
-                    P1_hN = self.get_prob(z, M_s, dndm_s, Mmin_s, all_V[4], True)
-                    
-                    # Given that the first point is heated, what is the probability
-                    # that the second pt is heated or ionized by a different source?
-                    # We want the complement of that.
-                    
-                    # Volume in which I heat but don't ionize (or heat) the other pt, 
-                    # i.e., same as the two-source term for <hh'>
-                    #Vne2 = Vh - self.IV(sep, R_i, R_s)
-                    Vne2 = V_ioh - all_IV[2] - (V_i - all_IV[1])
-                                    
-                    # Volume in which single source ioniz
-                    V2ii = V_i - all_V[0]
-                    
-                    Phgh = self.get_prob(z, M_b, dndm_b * f_h, Mmin_b, Vne2, True, ep)
-                    Pigh = self.get_prob(z, M_b, dndm_b, Mmin_b, V2ii, True, ep)
-                    
-                    #P1[i] = P1_hN 
-                    #ih2 = _P_ih_2[i]
-                    #hh2 = _P_hh_2[i]
-                    P2[i] = P1_hN * (1. - Phgh - Pigh)
-                else:    
-                    # Probability that single source can heat one pt but 
-                    # does nothing to the other.
-                    P1_hN = self.get_prob(z, M_b, dndm_b * f_h, Mmin_b, all_V[4], True)
-                    
-                    # Given that the first point is heated, what is the probability
-                    # that the second pt is heated or ionized by a different source?
-                    # We want the complement of that.
-                    
-                    # Volume in which I heat but don't ionize (or heat) the other pt, 
-                    # i.e., same as the two-source term for <hh'>
-                    #Vne2 = Vh - self.IV(sep, R_i, R_s)
-                    Vne2 = V_ioh - all_IV[2] - (V_i - all_IV[1])
-                                    
-                    # Volume in which single source ioniz
-                    V2ii = V_i - all_V[0]
-                    
-                    Phgh = self.get_prob(z, M_b, dndm_b * f_h, Mmin_b, Vne2, True, ep)
-                    Pigh = self.get_prob(z, M_b, dndm_b, Mmin_b, V2ii, True, ep)
-                    
-                    
-                    #P1[i] = P1_hN 
-                    #ih2 = _P_ih_2[i]
-                    #hh2 = _P_hh_2[i]
-                    P2[i] = P1_hN * (1. - Phgh - Pigh)
+                P1[:] = _P1
+                P2[:] = _P2
                 
+            else:
+            
+                #Vii = all_V[0]
+                #_integrand1 = dndm * Vii
+                #
+                #_exp_int1 = np.exp(-simps(_integrand1[iM:] * M_b[iM:],
+                #    x=np.log(M_b[iM:])))
+                #_P1_ii = (1. - _exp_int1)
+                
+                # Region in which two points are heated by the same source
+                Vo = all_V[2]
+                                     
+                # Subtract off region of the intersection HH volume
+                # in which source 1 would do *anything* to point 2.
+                #Vss_ne_1 = Vh - (Vo - self.IV(sep, R_i, R_s) + all_V[0])
+                #Vne1 = Vne2 = Vh - Vo
+                # For ionization, this is just Vi - Vo
+                #Vne1 = V2 - all_IV[2] - (V1 - all_IV[1])
+                Vne1 = V_ioh - all_IV[2] - (V_i - all_IV[1])
+                #Vne1 =  V2 - self.IV(sep, R_s, R_s) - (V1 - self.IV(sep, R_i, R_s))
+                Vne2 = Vne1
+                
+                # Shouldn't max(Vo) = Vh?
                 
-            elif term == 'hh':
+                #_P1, _P2 = self.get_prob(z, zeta, Vo, Vne1, Vne2, corr, term)
+                                
+                _P1 = self.get_prob(z, M_b, dndm_b * f_h, Mmin_b, Vo, True)                
                 
+                _P2_1 = self.get_prob(z, M_b, dndm_b * f_h, Mmin_b, Vne1, True)
+                _P2_2 = self.get_prob(z, M_b, dndm_b * f_h, Mmin_b, Vne2, True, ep)    
+                                
+                # kludge! to account for Qh = 1 - Qi at late times.
+                # Integrals above will always get over-estimated for hot
+                # regions.
+                #_P2_1 = min(Qh, _P2_1)
+                #_P2_2 = min(Qh, _P2_2)
+                                
+                _P2 = (1. - _P1) * _P2_1 * _P2_2
                 
-                # Excursion set approach for temperature.
-                if self.pf['ps_temp_model'] == 2:
-                    Vo = all_V[2]
-                            
-                    Vne1 = Vne2 = V_h - Vo
-                    
-                    _P1 = self.get_prob(z, M_s, dndm_s, Mmin_s, Vo, True)
-                
-                    _P2_1 = self.get_prob(z, M_s, dndm_s, Mmin_s, Vne1, True)
-                    _P2_2 = self.get_prob(z, M_s, dndm_s, Mmin_s, Vne2, True, ep)
-                
-                    #_P2_1 -= Qi
-                    #_P2_1 -= Qi
-                
-                    _P2 = (1. - _P1) * _P2_1 * _P2_2
-                                                                    
-                    #if self.pf['ps_volfix'] and Qi > 0.5:
-                    #    P1[i] = _P1
-                    #    P2[i] = (1. - P1[i]) * _P2_1**2
-                    #                    
-                    #else:
-                    P1[i] = _P1
-                    P2[i] = _P2
-                    
+                # The BSD is normalized so that its integral will recover
+                # zeta * fcoll.
+                                                   
+                # Start chugging along on two-bubble term   
+                bad = np.sum(Vne1 < 1e-12, axis=-1)
+                if np.any(bad):
+                    print('z={}: Vss_ne_1 (hh) < 0 for {} / {} separations (up to {} / {} times)'.format(z, 
+                        np.sum(bad > 0), R.size, bad.max(), len(R_s)))
+                    print(np.all(V_ioh > V_i), np.all(V_ioh > all_IV[2]))
+                
+                # Must correct for the fact that Qi+Qh<=1
+                if self.heating_ongoing:
+                    P1[:] = _P1
+                    P2[:] = _P2
                 else:
+                    P1[:] = _P1 * (1. - Qh - Qi)
+                    P2[:] = Qh**2
                 
-                    #Vii = all_V[0]
-                    #_integrand1 = dndm * Vii
-                    #
-                    #_exp_int1 = np.exp(-simps(_integrand1[iM:] * M_b[iM:],
-                    #    x=np.log(M_b[iM:])))
-                    #_P1_ii = (1. - _exp_int1)
-                    
-                    # Region in which two points are heated by the same source
-                    Vo = all_V[2]
-                                         
-                    # Subtract off region of the intersection HH volume
-                    # in which source 1 would do *anything* to point 2.
-                    #Vss_ne_1 = Vh - (Vo - self.IV(sep, R_i, R_s) + all_V[0])
-                    #Vne1 = Vne2 = Vh - Vo
-                    # For ionization, this is just Vi - Vo
-                    #Vne1 = V2 - all_IV[2] - (V1 - all_IV[1])
-                    Vne1 = V_ioh - all_IV[2] - (V_i - all_IV[1])
-                    #Vne1 =  V2 - self.IV(sep, R_s, R_s) - (V1 - self.IV(sep, R_i, R_s))
-                    Vne2 = Vne1
-                    
-                    # Shouldn't max(Vo) = Vh?
-                    
-                    #_P1, _P2 = self.get_prob(z, zeta, Vo, Vne1, Vne2, corr, term)
-                                    
-                    _P1 = self.get_prob(z, M_b, dndm_b * f_h, Mmin_b, Vo, True)                
-                    
-                    _P2_1 = self.get_prob(z, M_b, dndm_b * f_h, Mmin_b, Vne1, True)
-                    _P2_2 = self.get_prob(z, M_b, dndm_b * f_h, Mmin_b, Vne2, True, ep)    
-                                    
-                    # kludge! to account for Qh = 1 - Qi at late times.
-                    # Integrals above will always get over-estimated for hot
-                    # regions.
-                    #_P2_1 = min(Qh, _P2_1)
-                    #_P2_2 = min(Qh, _P2_2)
-                                    
-                    _P2 = (1. - _P1) * _P2_1 * _P2_2
-                    
-                    # The BSD is normalized so that its integral will recover
-                    # zeta * fcoll.
-                                                       
-                    # Start chugging along on two-bubble term   
-                    if np.any(Vne1 < 1e-12):
-                        N = sum(Vne1 < 1e-12)
-                        print('z={}, R={}: Vss_ne_1 (hh) < 0 {} / {} times'.format(z, sep, N, len(R_s)))
-                        #print(Vne1[Vne1 < 1e-12])
-                        print(np.all(V_ioh > V_i), np.all(V_ioh > all_IV[2]), all_IV[2][-1], all_IV[1][-1])
-                    
-                    # Must correct for the fact that Qi+Qh<=1
-                    if self.heating_ongoing:
-                        P1[i] = _P1
-                        P2[i] = _P2
-                    else:
-                        P1[i] = _P1 * (1. - Qh - Qi)
-                        P2[i] = Qh**2
-                    
-            elif term == 'ih':
-                
-                if self.pf['ps_temp_model'] == 2:
-                    continue
-                
-                if not self.pf['ps_include_xcorr_ion_hot']:
-                    P1[i] = 0.0
-                    P2[i] = Qh * Qi
-                    continue
-                
+        elif term == 'ih':
+            
+            if self.pf['ps_temp_model'] == 2:
+                pass
+            elif not self.pf['ps_include_xcorr_ion_hot']:
+                P1[:] = 0.0
+                P2[:] = Qh * Qi
+            else:
+            
                 #Vo_sh_r1, Vo_sh_r2, Vo_sh_r3 = \
                 #    self.overlap_region_shell(sep, R_i, R_s)
                 #Vo = 2. * Vo_sh_r2 - Vo_sh_r3
@@ -1961,10 +1940,10 @@ class Fluctuations(object): # pragma: no cover
                 Vne2 =  V_ioh - all_IV[2] - (V_i - all_IV[1])
                 #Vne2 =  V2 - self.IV(sep, R_s, R_s) - (V1 - self.IV(sep, R_i, R_s))
         
-                if np.any(Vne2 < 0):
-                    N = sum(Vne2 < 0)
-                    print('R={}: Vss_ne_2 (ih) < 0 {} / {} times'.format(sep, N, len(R_s)))
-            
+                bad = np.sum(Vne2 < 0, axis=-1)
+                if np.any(bad):
+                    print('Vss_ne_2 (ih) < 0 for {} / {} separations (up to {} / {} times)'.format(
+                        np.sum(bad > 0), R.size, bad.max(), len(R_s)))
             
                 #_P1, _P2 = self.get_prob(z, zeta, Vo, Vne1, Vne2, corr, term)
                 
@@ -1983,24 +1962,30 @@ class Fluctuations(object): # pragma: no cover
                 #P2[i] = min(_P2, Qh * Qi)
                 
                 if self.heating_ongoing:
-                    P1[i] = _P1
-                    P2[i] = _P2
+                    P1[:] = _P1
+                    P2[:] = _P2
                 else:
-                    P1[i] = _P1 * (1. - Qh - Qi)
-                    P2[i] = Qh * Qi
+                    P1[:] = _P1 * (1. - Qh - Qi)
+                    P2[:] = Qh * Qi
+        
+        ## 
+        # Density stuff from here down. These terms are still computed one
+        # separation at a time.
+        ##
+        for i, sep in enumerate(R):
             
-            ## 
-            # Density stuff from here down
-            ##    
             if term.count('d') == 0:
-                continue
-
+                break
                 
             if not (self.pf['ps_include_xcorr_ion_rho'] \
                  or self.pf['ps_include_xcorr_hot_rho']):
                 # These terms will remain zero
                 #if term.count('d') > 0:
-                continue
+                break
+                
+            all_V = all_OV_z[i]
+            all_IV = all_IV_z[i]
+            
             
             ##
             # First, grab a bunch of stuff we'll need.
@@ -2358,9 +2343,7 @@ class Fluctuations(object): # pragma: no cover
         PT = P1 + P2
         
         if term in ['ii', 'hh', 'ih', 'ib', 'hb', 'bb']:
-            if term not in self._cache_jp_[z]:
-                self._cache_jp_[z][term] = R, PT, P1, P2
-        
+            self._memo_put('jp', z, term, (R, PT, P1, P2), R=R)
         return PT, P1, P2
                 
     def ThreeZoneModel(self, z, R, term='ii', R_s=None, R3=None, 
@@ -2560,6 +2543,19 @@ class Fluctuations(object): # pragma: no cover
             raise NotImplementedError('No model for term={} in ThreeZoneModel.'.format(term))
         
         
+    def _work_buffer(self, shape):
+        """
+        Scratch space for integrands, re-used from call to call.
+        """
+        
+        if not hasattr(self, '_work_buffers'):
+            self._work_buffers = {}
+            
+        if shape not in self._work_buffers:
+            self._work_buffers[shape] = np.empty(shape)
+            
+        return self._work_buffers[shape]
+        
     def get_prob(self, z, M, dndm, Mmin, V, exp=True, ep=0.0, Mmax=None):
         """
         Basically do an integral over some distribution function.
@@ -2573,10 +2569,16 @@ class Fluctuations(object): # pragma: no cover
         else:
             iM2 = None    
         
-        # One-source term
-        integrand = dndm * V * (1. + ep)
+        # One-source term. V and ep can be 2-D, i.e., (separation x mass),
+        # in which case we integrate over the last axis.
+        shape = np.broadcast(dndm, V, ep).shape
+        integrand = np.multiply(dndm, V, out=self._work_buffer(shape))
+        if np.any(ep):
+            integrand *= 1. + ep
+        
+        integrand[...,iM:iM2] *= M[iM:iM2]
                  
-        integr = np.trapz(integrand[iM:iM2] * M[iM:iM2], x=np.log(M[iM:iM2])) 
+        integr = np.trapz(integrand[...,iM:iM2], x=np.log(M[iM:iM2]), axis=-1)
         
         # Exponentiate?
         if exp:
@@ -2612,16 +2614,10 @@ class Fluctuations(object): # pragma: no cover
         ##
         # Check cache for match
         ##
-        cached_result = self._cache_cf(z, term)
+        cached_result = self._cache_cf(z, term, R)
         
         if cached_result is not None:
-            _R, _cf = cached_result
-            
-            if _R.size == R.size:
-                if np.allclose(_R, R):
-                    return _cf
-            
-            return np.interp(R, _R, _cf)
+            return cached_result[1]
         
         ##
         # 21-cm correlation function
@@ -2693,7 +2689,7 @@ class Fluctuations(object): # pragma: no cover
             
             if not self.pf['ps_include_density']:
                 cf = np.zeros_like(R)    
-                self._cache_cf_[z][term] = R, cf
+                self._memo_put('cf', z, term, (R, cf), R=R)
                 return cf
             
             iz = np.argmin(np.abs(z - self.halos.tab_z_ps))
@@ -2709,7 +2705,7 @@ class Fluctuations(object): # pragma: no cover
         elif term == 'ii':
             if not self.pf['ps_include_ion']:
                 cf = np.zeros_like(R)    
-                self._cache_cf_[z][term] = R, cf
+                self._memo_put('cf', z, term, (R, cf), R=R)
                 return cf
                 
             ev_ii, ev_ii_1, ev_ii_2 = \
@@ -2726,7 +2722,7 @@ class Fluctuations(object): # pragma: no cover
         elif term == 'hh':
             if not self.pf['ps_include_temp']:
                 cf = np.zeros_like(R)    
-                self._cache_cf_[z][term] = R, cf
+                self._memo_put('cf', z, term, (R, cf), R=R)
                 return cf
         
             jp_hh, jp_hh_1, jp_hh_2 = \
@@ -2754,7 +2750,7 @@ class Fluctuations(object): # pragma: no cover
         elif term == 'id':
             if self.pf['ps_include_xcorr_ion_rho'] == 0:
                 cf = np.zeros_like(R)
-                self._cache_cf_[z][term] = R, cf
+                self._memo_put('cf', z, term, (R, cf), R=R)
                 return cf
 
             #jp_ii, jp_ii_1, jp_ii_2 = \
@@ -2783,7 +2779,7 @@ class Fluctuations(object): # pragma: no cover
         elif term == 'cc':
             if not self.pf['ps_include_temp']:
                 cf = np.zeros_like(R)    
-                self._cache_cf_[z][term] = R, cf
+                self._memo_put('cf', z, term, (R, cf), R=R)
                 return cf
                 
             ev_cc, ev_cc_1, ev_cc_2 = \
@@ -2817,7 +2813,7 @@ class Fluctuations(object): # pragma: no cover
         elif term == 'ih':
             if not self.pf['ps_include_temp']:
                 cf = np.zeros_like(R)    
-                self._cache_cf_[z][term] = R, cf
+                self._memo_put('cf', z, term, (R, cf), R=R)
                 return cf
                 
             if self.pf['ps_temp_model'] == 2:
@@ -2895,14 +2891,14 @@ class Fluctuations(object): # pragma: no cover
             else:
                 ulya = lambda kk, mm, zz: self.halos.u_isl(kk, mm, zz, rmax)
        
-            ps_try = self._cache_ps(z, 'aa')
+            ps_try = self._cache_ps(z, term, k)
             
             if ps_try is not None:
                 ps = ps_try
             else:
                 ps = np.array([self.halos.PowerSpectrum(z, _k, ulya, Mmin(z)) \
                     for _k in k])
-                self._cache_ps_[z][term] = ps
+                self._memo_put('ps', z, term, ps, k=k)
                 
             cf = self.CorrelationFunctionFromPS(R, ps, k, split_by_scale=True)
                     
@@ -2912,8 +2908,7 @@ class Fluctuations(object): # pragma: no cover
         #if term not in ['21', 'mm']:
         #    cf /= (2. * np.pi)**3
         
-        self._cache_cf_[z][term] = R, cf.copy()
-        
+        self._memo_put('cf', z, term, (R, cf.copy()), R=R)
         return cf
             
    # def PowerSpectrum(self, z, zeta, Q=None, term='ii', rescale=False, 
@@ -2999,24 +2994,32 @@ class Fluctuations(object): # pragma: no cover
         #return (delta_T / (1. + delta_T)) * (Tcmb / (Tk - Tcmb))
 
     def CorrelationFunctionFromPS(self, R, ps, k=None, split_by_scale=False,
-        kmin=None, epsrel=1-8, epsabs=1e-8, method='clenshaw-curtis', 
+        kmin=None, epsrel=1-8, epsabs=1e-8, method=None, 
         use_pb=False, suppression=np.inf):
         
         if np.all(ps == 0):
             return np.zeros_like(R)
         
+        if method is None:
+            method = self.pf['ps_fht_method']
+        
         return self.halos.InverseFT3D(R, ps, k, kmin=kmin, 
             epsrel=epsrel, epsabs=epsabs, use_pb=use_pb,
-            split_by_scale=split_by_scale, method=method, suppression=suppression)
+            split_by_scale=split_by_scale, method=method, suppression=suppression,
+            bias=self.pf['ps_fht_bias'], pad=self.pf['ps_fht_pad'])
             
     def PowerSpectrumFromCF(self, k, cf, R=None, split_by_scale=False,
-        Rmin=None, epsrel=1-8, epsabs=1e-8, method='clenshaw-curtis',
+        Rmin=None, epsrel=1-8, epsabs=1e-8, method=None,
         use_pb=False, suppression=np.inf):
         
         if np.all(cf == 0):
             return np.zeros_like(k)
         
+        if method is None:
+            method = self.pf['ps_fht_method']
+        
         return self.halos.FT3D(k, cf, R, Rmin=Rmin, 
             epsrel=epsrel, epsabs=epsabs, use_pb=use_pb,
-            split_by_scale=split_by_scale, method=method, suppression=suppression)
+            split_by_scale=split_by_scale, method=method, suppression=suppression,
+            bias=self.pf['ps_fht_bias'], pad=self.pf['ps_fht_pad'])
         
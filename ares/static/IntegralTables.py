@@ -88,11 +88,11 @@ class IntegralTable:
             self.esec = SecondaryElectrons(method=self.pf['secondary_ionization'])
             if self.pf['secondary_ionization'] == 2:
                 self.logx = np.linspace(self.pf['tables_logxmin'], 0,
-                    abs(self.pf['tables_logxmin']) \
-                    // self.pf['tables_dlogx'] + 1)
+                    int(abs(self.pf['tables_logxmin']) \
+                    // self.pf['tables_dlogx']) + 1)
                 self.E = np.linspace(self.src.Emin, self.src.Emax,
-                    (self.src.Emax - self.src.Emin) \
-                    // self.pf['tables_dE'] + 1)
+                    int((self.src.Emax - self.src.Emin) \
+                    // self.pf['tables_dE']) + 1)
             elif self.pf['secondary_ionization'] == 3:
                 self.logx = self.esec.logx
                 self.E = self.esec.E
@@ -261,8 +261,16 @@ class IntegralTable:
                 
                 pb = ProgressBar(self.elements_per_table, name)                
                 pb.start()
-                                                              
+                
                 tab = np.zeros(dims)
+                
+                # Whole table at once, if we can.
+                if self._is_batchable(integral):
+                    self._TabulateBatch(tab, integral, absorber, donor, pb)
+                    tabs[name] = np.squeeze(tab).copy()
+                    pb.finish()
+                    continue
+                                                              
                 for j, ind in enumerate(self.indices_N):
                         
                     if j % size != rank:
@@ -338,26 +346,17 @@ class IntegralTable:
                     continue
 
             buff = np.zeros([len(self.E[absorber]), self.Nall.shape[0]])
+            
+            # Column densities this processor is responsible for
+            mine = np.arange(self.Nall.shape[0]) % size == rank
 
             for j, actual_absorber in enumerate(self.grid.absorbers):
-
-                pb = ProgressBar(self.elements_per_table, 
-                    'tau(E, N; {0!s}, {1!s})'.format(absorber,\
-                    actual_absorber))
-                pb.start()
-
                 sigma = self.sigma_E[actual_absorber]
+                buff[:,mine] += np.outer(sigma, self.Nall[mine,j])
                 
-                for k in range(self.Nall.shape[0]):
-                    
-                    if k % size != rank:
-                        continue
-                    
-                    buff[:,k] += sigma * self.Nall[k][j]
-                    
-                    pb.update(k)
-                
-                pb.finish()
+            if size == 1:
+                self._tau_E_N[absorber] = buff
+                continue
                                  
             self._tau_E_N[absorber] = \
                 np.zeros([len(self.E[absorber]), self.Nall.shape[0]])
@@ -366,6 +365,172 @@ class IntegralTable:
             
             del buff
             
+    def _is_batchable(self, integral):
+        """
+        Can we compute every element of this table at once?
+        
+        In discrete mode, Tau, Phi, and Psi are just weighted sums over the 
+        (E x N) optical depth table. In continuous mode, the secondary 
+        electron integrals are done on a fixed energy grid anyways, and 
+        Tau is linear in column density.
+        """
+        
+        if self.pf['tables_discrete_gen']:
+            return integral in ['Tau', 'Phi', 'Psi']
+            
+        if integral == 'Tau':
+            return bool(self.src.continuous)
+        
+        if integral in ['PhiHat', 'PsiHat', 'PhiWiggle', 'PsiWiggle']:
+            return bool(self.pf['photon_conserving'])
+        
+        return False
+        
+    def _chunks(self):
+        """
+        Slices of self.Nall this processor is responsible for, with at most 
+        `tables_chunk_size` column densities in each.
+        """
+        
+        Ncells = self.Nall.shape[0]
+        chunk = self.pf['tables_chunk_size']
+        if chunk is None:
+            chunk = Ncells
+            
+        for i, lo in enumerate(range(0, Ncells, chunk)):
+            if i % size != rank:
+                continue
+            yield slice(lo, min(lo + chunk, Ncells))
+            
+    def _quadrature_weights(self, E, rule='trapz'):
+        """
+        Weights such that np.dot(w, y) is the integral of y(E).
+        """
+        
+        if rule == 'trapz':
+            return np.trapz(np.eye(E.size), E, axis=-1)
+        else:
+            return simps(np.eye(E.size), E, axis=-1)
+        
+    def _integrand_weights(self, integral, absorber, donor, t=0):
+        """
+        Everything in the integrand of a rate integral except the
+        attenuation, exp(-tau), times the quadrature weights.
+        
+        Returns
+        -------
+        Tuple: (energy mask, weights). The weights have shape 
+        (len(self.x), number of energies), so that the integral for all 
+        column densities is just a matrix product with exp(-tau(E, N)).
+        
+        """
+        
+        if self.pf['tables_discrete_gen']:
+            E = self.E[absorber]
+            w = self._quadrature_weights(E, 'trapz') * self.I_E[absorber]
+            
+            if not self.pf['photon_conserving']:
+                w *= self.sigma_E[absorber]
+            
+            if integral == 'Phi':
+                w /= E * erg_per_ev
+                
+            return None, w[None,:]
+        
+        # Continuous mode: secondary electron integrals on fixed energy grid.
+        if integral in ['PhiHat', 'PsiHat']:
+            Ei = self.E_th[absorber]
+            channel = 'heat'
+        else:
+            Ei = self.E_th[donor]
+            channel = absorber
+            
+        c = self.E >= max(Ei, self.src.Emin)
+        c &= self.E <= self.src.Emax
+        E = self.E[c]
+        
+        spec = np.array(list(map(lambda E: self.src.Spectrum(E, t=t), E)))
+        
+        # Shape (len(E), len(x))
+        f = self.esec.DepositionFraction(self.x, E=E-Ei, channel=channel)
+        
+        w = self._quadrature_weights(E, 'simps') * spec
+        if integral in ['PhiHat', 'PhiWiggle']:
+            w /= E * erg_per_ev
+        
+        return c, (f * w[:,None]).T
+        
+    def _tau_chunk(self, absorber, c, chunk):
+        """
+        Optical depth due to all absorbers, shape (number of energies, 
+        number of column densities in `chunk`).
+        """
+        
+        if self.pf['tables_discrete_gen']:
+            return self.tau_E_N[absorber][:,chunk]
+            
+        E = self.E[c]
+        
+        tau = np.zeros([E.size, self.Nall[chunk].shape[0]])
+        for i, actual_absorber in enumerate(self.grid.absorbers):
+            ok = E >= self.grid.ioniz_thresholds[actual_absorber]
+            sigma = np.array(list(map(
+                self.grid.bf_cross_sections[actual_absorber], E[ok])))
+            tau[ok] += np.outer(sigma, self.Nall[chunk,i])
+        
+        return tau
+        
+    def _TabulateBatch(self, tab, integral, absorber, donor, pb=None):
+        """
+        Fill lookup table `tab` (in place) for all column densities, 
+        ionized fractions, and times at once, chunk by chunk.
+        """
+        
+        # View with one axis for all column density combinations. Entries
+        # are in the same order as self.indices_N.
+        flat = tab.reshape(self.Nall.shape[0], *tab.shape[len(self.dimsN):])
+        
+        if integral == 'Tau':
+            if self.pf['tables_discrete_gen']:
+                w = {_abs: self._quadrature_weights(self.E[_abs]) \
+                    for _abs in self.grid.absorbers}
+            else:
+                # Linear in column density, so integrate cross sections once
+                # (at a typical column density, so quad's absolute tolerance
+                # doesn't matter).
+                Nref = self.Nall.max(axis=0)
+                w = np.array([self.OpticalDepth(Nref[i], absorber) / Nref[i] \
+                    for i, absorber in enumerate(self.grid.absorbers)])
+                
+            for chunk in self._chunks():
+                if self.pf['tables_discrete_gen']:
+                    tau = 0.0
+                    for _abs in self.grid.absorbers:
+                        tau += np.dot(w[_abs], self.tau_E_N[_abs][:,chunk])
+                else:
+                    tau = np.dot(self.Nall[chunk], w)
+                    
+                flat[chunk,0,0] = np.log10(tau)
+                
+                if pb is not None:
+                    pb.update(chunk.stop)
+                
+            return tab
+            
+        for k, t in enumerate(self.t):
+            c, w = self._integrand_weights(integral, absorber, donor, t=t)
+            
+            for chunk in self._chunks():
+                integ = np.dot(w, np.exp(-self._tau_chunk(absorber, c, chunk)))
+                
+                # Shape of integ is (len(x), chunk size)
+                flat[chunk,k,:] = np.log10(integ.T)
+                
+                if pb is not None:
+                    pb.update(chunk.stop)
+        
+        return tab
+            
     def TotalOpticalDepth(self, N, ind=None):
         """
         Optical depth due to all absorbing species at given column density.
@@ -489,6 +654,10 @@ class IntegralTable:
                 self._E = None
                 
         return self._E
+        
+    @E.setter
+    def E(self, value):
+        self._E = value
     
     @property
     def sigma_E(self):    
@@ -16,6 +16,7 @@ from ..util import Survey
 from ..util import ProgressBar
 from ..phenom import Madau1995
 from ..util import ParameterFile
+from ..util.Cache import LRUCache, fingerprint
 from scipy.optimize import curve_fit
 from scipy.interpolate import interp1d
 from ..physics.Cosmology import Cosmology
@@ -641,6 +642,19 @@ class SpectralSynthesis(object):
         This is just a wrapper around `Luminosity`.
         """
         
+        # Do all wavelengths at once if we can.
+        if self._can_synthesize_at_once(sfh=sfh, hist=hist, band=band, 
+            zobs=zobs, tobs=tobs):
+            spec = self._SpectrumAtOnce(waves, sfh=sfh, tarr=tarr, zarr=zarr,
+                zobs=zobs, tobs=tobs, idnum=idnum, hist=hist, extras=extras,
+                window=window, load=load)
+            
+            if units in ['A', 'Ang']:
+                dwdn = waves**2 / (c * 1e8)
+                spec = spec / dwdn
+            
+            return spec
+        
         # Select single row of SFH array if `idnum` provided.
         if sfh.ndim == 2 and idnum is not None:
             sfh = sfh[idnum,:]
@@ -716,6 +730,191 @@ class SpectralSynthesis(object):
 
         return spec
 
+    def _can_synthesize_at_once(self, sfh=None, hist={}, band=None, 
+        zobs=None, tobs=None):
+        """
+        Determine whether `Spectrum` can synthesize all wavelengths in one
+        pass, i.e., without calling `Luminosity` once per wavelength.
+        """
+        
+        if (zobs is None) and (tobs is None):
+            return False
+        if band is not None:
+            return False
+        if self.pf['nthreads'] is not None:
+            return False
+        if self.pf['pop_enrichment']:
+            return False
+        if not (self.src.pf['source_aging'] or self.src.pf['source_ssp']):
+            return False
+        if np.ndim(zobs) > 0 or np.ndim(tobs) > 0:
+            return False
+            
+        # Merger trees are only treated one wavelength at a time.
+        if (hist is not None) and ('children' in hist):
+            if (hist['children'] is not None) and self.pf['pop_mergers']:
+                return False
+                
+        return True
+        
+    def _SpectrumAtOnce(self, waves, sfh=None, tarr=None, zarr=None, 
+        window=1, zobs=None, tobs=None, idnum=None, hist={}, extras={}, 
+        load=True, use_cache=True):
+        """
+        Synthesize luminosity at many wavelengths in a single pass.
+        
+        This is equivalent to calling `Luminosity` for each element of 
+        `waves`, but the SFH slicing, stellar ages, (over-sampled) time grid,
+        and age interpolant are shared by all wavelengths, so the cost is 
+        roughly that of synthesizing one wavelength.
+        
+        Parameters
+        ----------
+        waves : np.ndarray
+            Rest wavelengths of interest [Angstrom].
+        
+        See `Luminosity` for all other parameters.
+        
+        Returns
+        -------
+        Array of luminosities in erg/s/Hz with shape (number of galaxies, 
+        number of wavelengths), or just (number of wavelengths) if `sfh` is 
+        1-D or `idnum` is supplied.
+        
+        """
+        
+        waves = np.atleast_1d(waves)
+        
+        if (sfh is None) or ((tarr is None) and (zarr is None)):
+            assert ('z' in hist) or ('t' in hist), \
+                "`hist` must contain redshifts, `z`, or times, `t`."
+            sfh = hist['SFR'] if 'SFR' in hist else hist['sfr']
+            if 'z' in hist:
+                zarr = hist['z']
+            else:    
+                tarr = hist['t']
+                
+        kw = {'sfh':sfh, 'zobs':zobs, 'tobs':tobs, 'wave':waves, 
+            'tarr':tarr, 'zarr':zarr, 'band':'spectrum', 'idnum':idnum, 
+            'hist':hist, 'extras':extras, 'window': window}
+                
+        if load:
+            _kwds, cached_result = self._cache_lum(kw)
+            if cached_result is not None:
+                return cached_result
+        
+        Mh = None
+        if sfh.ndim == 2 and idnum is not None:
+            sfh = sfh[idnum,:]
+            if 'Mh' in hist:
+                Mh = hist['Mh'][idnum,:]
+        elif 'Mh' in hist:
+            Mh = hist['Mh']
+        
+        batch_mode = sfh.ndim == 2
+        
+        if tarr is not None:
+            zarr = self.cosm.z_of_t(tarr * s_per_myr)
+        else:
+            tarr = self.cosm.t_of_z(zarr) / s_per_myr
+            
+        assert np.all(np.diff(tarr) > 0), \
+            "Must supply SFH in time-ascending (i.e., redshift-descending) order!"
+            
+        if tobs is not None:
+            zobs = self.cosm.z_of_t(tobs * s_per_myr)
+            assert tarr.min() <= tobs <= tarr.max(), \
+                "Requested time of observation (`tobs={}`) not in supplied range ({}, {})!".format(tobs, 
+                    tarr.min(), tarr.max())
+        
+        if not (zarr.min() <= zobs <= zarr.max()):
+            if batch_mode:
+                return np.ones((sfh.shape[0], waves.size)) * -99999
+            else:
+                return np.ones(waves.size) * -99999
+                    
+        izobs = np.argmin(np.abs(zarr - zobs))
+        if zarr[izobs] > zobs:
+            izobs += 1
+        
+        # First time step at or below zobs.
+        i = np.argwhere(zarr <= zobs)[0][0]
+        
+        dt = np.hstack((np.diff(tarr * 1e6), np.zeros(1)))
+        oversample = self.oversampling_enabled and (dt[-2] > 1.01e6)
+        
+        ##
+        # Ages (and SFRs) are the same for all wavelengths.
+        ages = tarr[i] - tarr[0:i+1]
+        
+        if oversample and len(ages) > 1:
+            if batch_mode:
+                _ages, _SFR = self._oversample_sfh(ages, sfh[:,0:i+1], i)
+            else:
+                _ages, _SFR = self._oversample_sfh(ages, sfh[0:i+1], i)
+            _dt = np.abs(np.diff(_ages) * 1e6)
+        else:
+            _ages = ages
+            _SFR = sfh[...,0:i+1]
+            _dt = dt[0:i]
+            
+        # Trapezoidal integration weights
+        weights = np.zeros(_ages.size)
+        weights[0:-1] += 0.5 * _dt
+        weights[1:] += 0.5 * _dt
+                
+        ##
+        # Luminosity per unit star formation as a function of age for all 
+        # wavelengths at once.
+        Loft = np.array([self.src.L_per_sfr_of_t(wave=wave, avg=window) \
+            for wave in waves])
+        Loft[Loft == 0] = tiny_lum
+        
+        _func = interp1d(np.log(self.src.times), np.log(Loft), axis=1,
+            kind=self.pf['pop_synth_age_interp'], bounds_error=False, 
+            fill_value=(Loft[:,0], Loft[:,-1]))
+            
+        L_per_msun = np.exp(_func(np.log(np.maximum(_ages, 1.))))
+            
+        # Extrapolate linearly at times < 1 Myr
+        young = _ages < 1
+        _m = (Loft[:,1] - Loft[:,0]) / (self.src.times[1] - self.src.times[0])
+        L_per_msun[:,young] = _m[:,None] * _ages[None,young] \
+            + Loft[:,0][:,None]
+            
+        # Integrate over past star formation: (galaxies x ages) times 
+        # (ages x wavelengths).
+        if batch_mode:
+            Lout = np.einsum('ga,wa->gw', _SFR, L_per_msun * weights[None,:])
+        else:
+            Lout = np.einsum('a,wa->w', _SFR, L_per_msun * weights[None,:])
+            
+        ##
+        # Redden spectra
+        ##
+        if ('Sd' in hist) and np.any(hist['Sd'] > 0):
+            
+            assert 'kappa' in extras
+            
+            Sd = hist['Sd'][idnum] if idnum is not None else hist['Sd']
+            
+            for k, wave in enumerate(waves):
+                kappa = self._cache_kappa(wave)
+                
+                if kappa is None:
+                    kappa = extras['kappa'](wave=wave, Mh=Mh)
+                    self._cache_kappa_[wave] = kappa
+                    
+                tau = kappa * Sd
+                
+                Lout[...,k] *= np.exp(-tau[...,izobs])
+                
+        if use_cache:
+            key = self._cache_lum_key(kw)
+            self._cache_lum_.put(key, (kw, Lout))
+            
+        return Lout
+        
     def Magnitude(self, wave=1600., sfh=None, tarr=None, zarr=None, window=1,
         zobs=None, tobs=None, band=None, idnum=None, hist={}, extras={}):
         
@@ -795,12 +994,6 @@ class SpectralSynthesis(object):
                 
         return _ages, _SFR
         
-    @property
-    def _cache_lum_ctr(self):
-        if not hasattr(self, '_cache_lum_ctr_'):
-            self._cache_lum_ctr_ = 0
-        return self._cache_lum_ctr_  
-        
     def _cache_kappa(self, wave):
         if not hasattr(self, '_cache_kappa_'):
             self._cache_kappa_ = {}
@@ -810,114 +1003,219 @@ class SpectralSynthesis(object):
         
         return None
         
+    @property
+    def _cache_lum_(self):
+        if not hasattr(self, '_cache_lum__'):
+            self._cache_lum__ = LRUCache(maxsize=self.pf['pop_synth_cache_size'])
+        return self._cache_lum__
+
+    @property
+    def _cache_lum_loose_(self):
+        """
+        Map from (wave, zobs) to full cache keys, used when `careful_cache`
+        is turned off.
+        """
+        if not hasattr(self, '_cache_lum_loose__'):
+            self._cache_lum_loose__ = {}
+        return self._cache_lum_loose__
+
+    @property
+    def cache_stats(self):
+        """
+        Hit/miss statistics for the luminosity cache.
+        """
+        return self._cache_lum_.stats
+
+    def _cache_lum_key(self, kwds):
+        """
+        Convert keyword arguments of `Luminosity` into a hashable key.
+
+        The scalar quantities (wavelength, redshift, etc.) are used directly,
+        while arrays and dictionaries (SFHs, histories) are reduced to
+        digests of their contents, so looking up an entry costs the same no
+        matter how many entries are already in the cache.
+        """
+
+        scalars = tuple(fingerprint(kwds[key]) \
+            for key in ('wave', 'zobs', 'tobs', 'idnum', 'window', 'band'))
+        arrays = tuple(fingerprint(kwds[key]) \
+            for key in ('sfh', 'tarr', 'zarr', 'hist', 'extras'))
+
+        return scalars + arrays
+
     def _cache_lum(self, kwds):
         """
         Cache object for spectral synthesis of stellar luminosity.
         """
-        if not hasattr(self, '_cache_lum_'):
-            self._cache_lum_ = {}
-                  
-        notok = -1
-        
-        t1 = time.time()                
-                        
-        # If we set order by hand, it greatly speeds things up because
-        # more likely than not, the redshift and wavelength are the only
-        # things that change and that's an easy logical check to do.
-        # Checking that SFHs, histories, etc., is more expensive.
-        ok_keys = ('wave', 'zobs', 'tobs', 'idnum', 'sfh', 'tarr', 'zarr', 
-            'window', 'band', 'hist', 'extras', 'load')                
-                        
-        ct = -1
-        
-        # Loop through keys to do more careful comparison for unhashable types.
-        #all_waves = self._cache_lum_waves_
-
-        all_keys = self._cache_lum_.keys()
 
-        # Search in reverse order since we often the keys represent different
-        # wavelengths, which are generated in ascending order.
-        for keyset in all_keys:
+        t1 = time.time()
 
-            ct += 1
+        # If we're not being as careful as possible, retrieve cached
+        # result so long as wavelength and zobs match requested values.
+        # This should only be used when SpectralSynthesis is summoned
+        # internally! Likely to lead to confusing behavior otherwise.
+        loose = (fingerprint(kwds['wave']), fingerprint(kwds['zobs']))
+        if self.careful_cache == 0:
+            key = self._cache_lum_loose_.get(loose)
+        else:
+            key = None
 
-            # Remember: keyset is just a number.
-            kw, data = self._cache_lum_[keyset]
-            
-            # Check wavelength first. Most common thing.
-            
-            # If we're not being as careful as possible, retrieve cached
-            # result so long as wavelength and zobs match requested values.
-            # This should only be used when SpectralSynthesis is summoned
-            # internally! Likely to lead to confusing behavior otherwise.
-            if (self.careful_cache == 0) and ('wave' in kw) and ('zobs' in kw):
-                if (kw['wave'] == kwds['wave']) and (kw['zobs'] == kwds['zobs']):
-                    notok = 0
-                    break
-                        
-            notok = 0
-            # Loop over cached keywords, compare to those supplied.
-            for key in ok_keys:
+        if key is None:
+            key = self._cache_lum_key(kwds)
 
-                if key not in kwds:
-                    notok += 1
-                    break
-                                    
-                #if isinstance(kw[key], collections.Hashable):
-                #    if kwds[key] == kw[key]:
-                #        continue
-                #    else:
-                #        notok += 1
-                #        break
-                #else:
-                # For unhashable types, must work on case-by-case basis.
-                if type(kwds[key]) != type(kw[key]):
-                    notok += 1 
-                    break
-                elif type(kwds[key]) == np.ndarray:
-                    if np.array_equal(kwds[key], kw[key]):
-                        continue
-                    else:
-                        # This happens when, e.g., we pass SFH by hand.
-                        notok += 1
-                        break
-                elif type(kwds[key]) == dict:
-                    if kwds[key] == kw[key]:
-                        continue
-                    else:
-                        
-                        #for _key in kwds[key]:
-                        #    print(_key, kwds[key][_key] == kw[key][_key])
-                        #
-                        #raw_input('<enter>')
-                        
-                        notok += 1
-                        break
-                else:
-                    if kwds[key] == kw[key]:
-                        continue
-                    else:
-                        notok += 1
-                        break
-                        
-            if notok > 0:
-                #print(keyset, key)
-                continue
-                
-            # If we're here, load this thing.
-            break        
+        data = self._cache_lum_.get(key)
 
         t2 = time.time()
 
-        if notok < 0:
+        if data is None:
+            # Entry may have been evicted since it was last stored.
+            if loose in self._cache_lum_loose_:
+                if self._cache_lum_loose_[loose] == key:
+                    del self._cache_lum_loose_[loose]
             return kwds, None
-        elif notok == 0:
-            if (self.pf['verbose'] and self.pf['debug']):
-                print("Loaded from cache! Took N={} iterations, {} sec to find match".format(ct, t2 - t1))
-            # Recall that this is (kwds, data)
-            return self._cache_lum_[keyset]
+
+        if (self.pf['verbose'] and self.pf['debug']):
+            print("Loaded from cache! Took {} sec to find match".format(t2 - t1))
+
+        # Recall that this is (kwds, data)
+        return data
+
+    def _age_kernel(self, tarr, func, L_small_t):
+        """
+        Tabulate luminosity-weights for the integral over past star formation.
+
+        Element [i,j] of the returned matrix is the luminosity per unit SFR of
+        stars formed at `tarr[j]` and observed at `tarr[i]`, multiplied by
+        the trapezoidal integration weight for step j. All elements with
+        j > i are zero.
+
+        Parameters
+        ----------
+        tarr : np.ndarray
+            Array of times in ascending order [Myr].
+        func : callable
+            Log-luminosity as a function of log-age.
+        L_small_t : callable
+            Luminosity at ages < 1 Myr.
+
+        Returns
+        -------
+        Array of shape (len(tarr), len(tarr)) in units of erg/s/Hz/(Msun/yr).
+
+        """
+
+        dt = np.diff(tarr * 1e6)
+
+        ages = np.tril(tarr[:,None] - tarr[None,:])
+
+        young = ages < 1
+        L_per_msun = np.exp(func(np.log(np.maximum(ages, 1.))))
+        L_per_msun[young] = L_small_t(ages[young])
+
+        # Trapezoidal weights: row i integrates over steps k < i.
+        half = np.tril(np.ones((tarr.size, tarr.size)), k=-1) \
+            * np.hstack((dt, [0]))[None,:] * 0.5
+        weights = half.copy()
+        weights[:,1:] += half[:,0:-1]
+
+        return L_per_msun * weights
+
+    def _LuminosityHistory(self, sfh, tarr, func, L_small_t, method='matrix',
+        chunk=1000, rtol=1e-8):
+        """
+        Compute luminosity at all times in `tarr` without looping over time.
+
+        The luminosity at time t_i is the star formation history convolved
+        with the luminosity of a simple stellar population of age t_i - t_j.
+        For arbitrary time grids we tabulate the (lower triangular) kernel
+        once and contract it against all histories at once. On uniform time
+        grids the kernel only depends on i - j, so we can instead do the
+        convolution with FFTs.
+
+        Parameters
+        ----------
+        sfh : np.ndarray
+            Star formation histories, 1-D (time) or 2-D (galaxy, time).
+        method : str
+            Either 'matrix' or 'fft'. The latter is only used for uniform
+            time grids, otherwise we revert to 'matrix'.
+        chunk : int
+            Number of galaxies to process at once with the FFT method.
+        rtol : float
+            With the FFT method, luminosities whose estimated round-off error
+            exceeds this fraction of their value are instead computed by
+            direct summation.
+
+        Returns
+        -------
+        Array of the same shape as `sfh`, luminosities in erg/s/Hz.
+
+        """
+
+        dt = np.diff(tarr)
+
+        uniform = np.allclose(dt, dt[0], rtol=1e-8, atol=0)
+
+        if (method == 'fft') and uniform:
+            dtyr = dt[0] * 1e6
+            N = tarr.size
+
+            K = np.exp(func(np.log(np.maximum(tarr - tarr[0], 1.))))
+            young = (tarr - tarr[0]) < 1
+            K[young] = L_small_t(tarr[young] - tarr[0])
+
+            nfft = 2**int(np.ceil(np.log2(2 * N - 1)))
+            Kf = np.fft.rfft(K, n=nfft)
+
+            _sfh = np.atleast_2d(sfh)
+            Lhist = np.zeros(_sfh.shape)
+            W = None
+            for lo in range(0, _sfh.shape[0], chunk):
+                hi = lo + chunk
+                Sf = np.fft.rfft(_sfh[lo:hi], n=nfft, axis=1)
+                conv = np.fft.irfft(Sf * Kf[None,:], n=nfft, axis=1)[:,0:N]
+
+                # Trapezoidal end-point corrections.
+                Lhist[lo:hi] = dtyr * (conv - 0.5 * (K[None,:] \
+                    * _sfh[lo:hi,0:1] + K[0] * _sfh[lo:hi]))
+
+                # Round-off error in the FFT is set by the norms of the 
+                # inputs, i.e., by the biggest SFRs and luminosities, so it
+                # can swamp the (tiny) luminosity at early times if the SFH
+                # is steep. Do the sum directly wherever that happens.
+                err = np.finfo(float).eps * np.log2(nfft) * dtyr \
+                    * np.sqrt(np.sum(K**2)) \
+                    * np.sqrt(np.sum(_sfh[lo:hi]**2, axis=1))
+                bad = np.abs(Lhist[lo:hi]) * rtol < err[:,None]
+                bad[:,0] = False
+                
+                if np.any(bad):
+                    if W is None:
+                        W = self._age_kernel(tarr, func, L_small_t)
+                    gg, ii = np.nonzero(bad)
+                    Lhist[lo+gg,ii] = np.einsum('nj,nj->n', W[ii], 
+                        _sfh[lo+gg])
+
+            Lhist[:,0] = 0.0
+
+            if sfh.ndim == 1:
+                return Lhist[0]
+
+            return Lhist
+
+        elif method not in ['matrix', 'fft']:
+            raise NotImplementedError(\
+                "Unrecognized pop_synth_conv={}".format(method))
+
+        W = self._age_kernel(tarr, func, L_small_t)
+
+        # Use einsum rather than np.dot so that results for a given galaxy
+        # don't depend (at the round-off level) on how many other galaxies
+        # are in the batch.
+        if sfh.ndim == 2:
+            return np.einsum('gj,ij->gi', sfh, W)
         else:
-            return kwds, None
+            return np.einsum('j,ij->i', sfh, W)
 
     def Luminosity(self, wave=1600., sfh=None, tarr=None, zarr=None, window=1,
         zobs=None, tobs=None, band=None, idnum=None, hist={}, extras={},
@@ -986,7 +1284,8 @@ class SpectralSynthesis(object):
         if load:
             _kwds, cached_result = self._cache_lum(kw)
         else:
-            self._cache_lum_ = {}
+            self._cache_lum_.clear()
+            self._cache_lum_loose_.clear()
             cached_result = None
 
         if cached_result is not None:
@@ -1122,176 +1421,188 @@ class SpectralSynthesis(object):
             # Lhist will just get made once. Don't need to initialize
         
         ##
-        # Loop over the history of object(s) and compute the luminosity of 
-        # simple stellar populations of the corresponding ages (relative to
-        # zobs).
+        # If we want the whole luminosity history, it's just a convolution
+        # of the SFH with L(age), so compute it in one shot if possible.
+        ##
+        vectorize = do_all_time and (self.pf['pop_synth_conv'] is not None) \
+            and (self.src.pf['source_aging'] or self.src.pf['source_ssp']) \
+            and (not self.pf['pop_enrichment']) and (not oversample)
+
+        if vectorize:
+            Lhist = self._LuminosityHistory(sfh, tarr, _func, L_small_t,
+                method=self.pf['pop_synth_conv'])
+
+        ##
+        # Otherwise, loop over the history of object(s) and compute the 
+        # luminosity of simple stellar populations of the corresponding ages 
+        # (relative to zobs).
         ##
         
         # Start from initial redshift and move forward in time, i.e., from
         # high redshift to low.
-        
-        for i, _tobs in enumerate(tarr):
+        else:
+            for i, _tobs in enumerate(tarr):
                                     
-            # If zobs is supplied, we only have to do one iteration
-            # of this loop. This is just a dumb way to generalize this function
-            # to either do one redshift or return a whole history.
-            if not do_all_time:
-                if (zarr[i] > zobs):
-                    continue
+                # If zobs is supplied, we only have to do one iteration
+                # of this loop. This is just a dumb way to generalize this function
+                # to either do one redshift or return a whole history.
+                if not do_all_time:
+                    if (zarr[i] > zobs):
+                        continue
                     
-            ##
-            # Life if easy for constant SFR models        
-            if not (self.src.pf['source_aging'] or self.src.pf['source_ssp']):
+                ##
+                # Life if easy for constant SFR models        
+                if not (self.src.pf['source_aging'] or self.src.pf['source_ssp']):
                                 
-                if not do_all_time:
-                    Lhist = L_asympt * sfh[:,i]
-                    break
+                    if not do_all_time:
+                        Lhist = L_asympt * sfh[:,i]
+                        break
                 
-                raise NotImplemented('does this happne?')
-                Lhist[:,i] = L_asympt * sfh[:,i]
+                    raise NotImplemented('does this happne?')
+                    Lhist[:,i] = L_asympt * sfh[:,i]
                     
-                continue
-
-            # If we made it here, it's time to integrate over star formation
-            # at previous times. First, retrieve ages of stars formed in all 
-            # past star forming episodes.
-            ages = tarr[i] - tarr[0:i+1]
-            # Note: this will be in order of *descending* age, i.e., the 
-            # star formation episodes furthest in the past are first in the 
-            # array.
+                    continue
+
+                # If we made it here, it's time to integrate over star formation
+                # at previous times. First, retrieve ages of stars formed in all 
+                # past star forming episodes.
+                ages = tarr[i] - tarr[0:i+1]
+                # Note: this will be in order of *descending* age, i.e., the 
+                # star formation episodes furthest in the past are first in the 
+                # array.
             
-            # Recall also that `sfh` contains SFRs for all time, so any
-            # z < zobs will contain zeroes, hence all the 0:i+1 slicing below.
+                # Recall also that `sfh` contains SFRs for all time, so any
+                # z < zobs will contain zeroes, hence all the 0:i+1 slicing below.
             
-            # Treat metallicity evolution? If so, need to grab luminosity as 
-            # function of age and Z.
-            if self.pf['pop_enrichment']:
+                # Treat metallicity evolution? If so, need to grab luminosity as 
+                # function of age and Z.
+                if self.pf['pop_enrichment']:
 
-                assert batch_mode
+                    assert batch_mode
 
-                logA = np.log10(ages)
-                logZ = np.log10(Z[:,0:i+1])
-                L_per_msun = np.zeros_like(ages)
-                logL_at_wave = self.L_of_Z_t(wave)
+                    logA = np.log10(ages)
+                    logZ = np.log10(Z[:,0:i+1])
+                    L_per_msun = np.zeros_like(ages)
+                    logL_at_wave = self.L_of_Z_t(wave)
                                 
-                L_per_msun = np.zeros_like(logZ)
-                for j, _Z_ in enumerate(range(logZ.shape[0])):
-                    L_per_msun[j,:] = 10**logL_at_wave(logA, logZ[j,:], 
-                        grid=False)
+                    L_per_msun = np.zeros_like(logZ)
+                    for j, _Z_ in enumerate(range(logZ.shape[0])):
+                        L_per_msun[j,:] = 10**logL_at_wave(logA, logZ[j,:], 
+                            grid=False)
                  
-                # erg/s/Hz
-                if batch_mode:
-                    Lall = L_per_msun[:,0:i+1] * sfh[:,0:i+1]
-                else:
-                    Lall = L_per_msun[0:i+1] * sfh[0:i+1]
+                    # erg/s/Hz
+                    if batch_mode:
+                        Lall = L_per_msun[:,0:i+1] * sfh[:,0:i+1]
+                    else:
+                        Lall = L_per_msun[0:i+1] * sfh[0:i+1]
                     
-                if oversample:
-                    raise NotImplemented('help!')    
-                else:
-                    _dt = dt[0:i]
+                    if oversample:
+                        raise NotImplemented('help!')    
+                    else:
+                        _dt = dt[0:i]
 
-                _ages = ages
-            else:
+                    _ages = ages
+                else:
                                 
-                ##
-                # If time resolution is >= 2 Myr, over-sample final interval.
-                if oversample and len(ages) > 1:
+                    ##
+                    # If time resolution is >= 2 Myr, over-sample final interval.
+                    if oversample and len(ages) > 1:
                                         
-                    if batch_mode:
-                        _ages, _SFR = self._oversample_sfh(ages, sfh[:,0:i+1], i)
-                    else:        
-                        _ages, _SFR = self._oversample_sfh(ages, sfh[0:i+1], i)
+                        if batch_mode:
+                            _ages, _SFR = self._oversample_sfh(ages, sfh[:,0:i+1], i)
+                        else:        
+                            _ages, _SFR = self._oversample_sfh(ages, sfh[0:i+1], i)
                         
-                    _dt = np.abs(np.diff(_ages) * 1e6)
+                        _dt = np.abs(np.diff(_ages) * 1e6)
                     
-                    # `_ages` is in order of old to young.
+                        # `_ages` is in order of old to young.
                         
-                    # Now, compute luminosity at expanded ages.
-                    L_per_msun = np.exp(_func(np.log(_ages)))   
+                        # Now, compute luminosity at expanded ages.
+                        L_per_msun = np.exp(_func(np.log(_ages)))   
                                                                         
-                    # Interpolate linearly at t < 1 Myr    
-                    L_per_msun[_ages < 1] = L_small_t(_ages[_ages < 1])   
-                    #L_per_msun[_ages < 10] = 0.   
+                        # Interpolate linearly at t < 1 Myr    
+                        L_per_msun[_ages < 1] = L_small_t(_ages[_ages < 1])   
+                        #L_per_msun[_ages < 10] = 0.   
                                         
-                    # erg/s/Hz/yr
-                    if batch_mode:
-                        Lall = L_per_msun * _SFR
-                    else:    
-                        Lall = L_per_msun * _SFR
+                        # erg/s/Hz/yr
+                        if batch_mode:
+                            Lall = L_per_msun * _SFR
+                        else:    
+                            Lall = L_per_msun * _SFR
                     
-                else:    
-                    L_per_msun = np.exp(_func(np.log(ages)))   
-                    #L_per_msun = np.exp(np.interp(np.log(ages), 
-                    #    np.log(self.src.times), np.log(Loft),
-                    #    left=np.log(Loft[0]), right=np.log(Loft[-1])))
+                    else:    
+                        L_per_msun = np.exp(_func(np.log(ages)))   
+                        #L_per_msun = np.exp(np.interp(np.log(ages), 
+                        #    np.log(self.src.times), np.log(Loft),
+                        #    left=np.log(Loft[0]), right=np.log(Loft[-1])))
 
-                    _dt = dt[0:i]
+                        _dt = dt[0:i]
 
-                    # Fix early time behavior
-                    L_per_msun[ages < 1] = L_small_t(ages[ages < 1])
+                        # Fix early time behavior
+                        L_per_msun[ages < 1] = L_small_t(ages[ages < 1])
         
-                    _ages = ages
+                        _ages = ages
                             
-                    # erg/s/Hz/yr
-                    if batch_mode:
-                        Lall = L_per_msun * sfh[:,0:i+1]
-                    else:    
-                        Lall = L_per_msun * sfh[0:i+1]
+                        # erg/s/Hz/yr
+                        if batch_mode:
+                            Lall = L_per_msun * sfh[:,0:i+1]
+                        else:    
+                            Lall = L_per_msun * sfh[0:i+1]
                                                                 
-                # Correction for IMF sampling (can't use SPS).
-                #if self.pf['pop_sample_imf'] and np.any(bursty):
-                #    life = self._stars.tab_life
-                #    on = np.array([life > age for age in ages])
-                #
-                #    il = np.argmin(np.abs(wave - self._stars.wavelengths))
-                #
-                #    if self._stars.aging:
-                #        raise NotImplemented('help')
-                #        lum = self._stars.tab_Ls[:,il] * self._stars.dldn[il]
-                #    else:
-                #        lum = self._stars.tab_Ls[:,il] * self._stars.dldn[il]
-                #
-                #    # Need luminosity in erg/s/Hz
-                #    #print(lum)
-                #
-                #    # 'imf' is (z or age, mass)
-                #
-                #    integ = imf[bursty==1,:] * lum[None,:]
-                #    Loft = np.sum(integ * on[bursty==1], axis=1)
-                #
-                #    Lall[bursty==1] = Loft
+                    # Correction for IMF sampling (can't use SPS).
+                    #if self.pf['pop_sample_imf'] and np.any(bursty):
+                    #    life = self._stars.tab_life
+                    #    on = np.array([life > age for age in ages])
+                    #
+                    #    il = np.argmin(np.abs(wave - self._stars.wavelengths))
+                    #
+                    #    if self._stars.aging:
+                    #        raise NotImplemented('help')
+                    #        lum = self._stars.tab_Ls[:,il] * self._stars.dldn[il]
+                    #    else:
+                    #        lum = self._stars.tab_Ls[:,il] * self._stars.dldn[il]
+                    #
+                    #    # Need luminosity in erg/s/Hz
+                    #    #print(lum)
+                    #
+                    #    # 'imf' is (z or age, mass)
+                    #
+                    #    integ = imf[bursty==1,:] * lum[None,:]
+                    #    Loft = np.sum(integ * on[bursty==1], axis=1)
+                    #
+                    #    Lall[bursty==1] = Loft
 
 
-            # Apply local reddening
-            #tau_bc = self.pf['pop_tau_bc']
-            #if tau_bc > 0:
-            #
-            #    corr = np.ones_like(_ages) * np.exp(-tau_bc)
-            #    corr[_ages > self.pf['pop_age_bc']] = 1
-            #
-            #    Lall *= corr
+                # Apply local reddening
+                #tau_bc = self.pf['pop_tau_bc']
+                #if tau_bc > 0:
+                #
+                #    corr = np.ones_like(_ages) * np.exp(-tau_bc)
+                #    corr[_ages > self.pf['pop_age_bc']] = 1
+                #
+                #    Lall *= corr
 
-            ###
-            ## Integrate over all times up to this tobs
-            if batch_mode:
-                # Should really just np.sum here...using trapz assumes that
-                # the SFH is a smooth function and not a series of constant 
-                # SFRs. Doesn't really matter in practice, though.
-                if not do_all_time:
-                    Lhist = np.trapz(Lall, dx=_dt, axis=1)
+                ###
+                ## Integrate over all times up to this tobs
+                if batch_mode:
+                    # Should really just np.sum here...using trapz assumes that
+                    # the SFH is a smooth function and not a series of constant 
+                    # SFRs. Doesn't really matter in practice, though.
+                    if not do_all_time:
+                        Lhist = np.trapz(Lall, dx=_dt, axis=1)
+                    else:
+                        Lhist[:,i] = np.trapz(Lall, dx=_dt, axis=1)
                 else:
-                    Lhist[:,i] = np.trapz(Lall, dx=_dt, axis=1)
-            else:
-                if not do_all_time:
-                    Lhist = np.trapz(Lall, dx=_dt)                
-                else:    
-                    Lhist[i] = np.trapz(Lall, dx=_dt)
+                    if not do_all_time:
+                        Lhist = np.trapz(Lall, dx=_dt)                
+                    else:    
+                        Lhist[i] = np.trapz(Lall, dx=_dt)
 
-            ##
-            # In this case, we only need one iteration of this loop.
-            ##
-            if not do_all_time:
-                break
+                ##
+                # In this case, we only need one iteration of this loop.
+                ##
+                if not do_all_time:
+                    break
                                                                 
         ##
         # Redden spectra
@@ -1417,11 +1728,13 @@ class SpectralSynthesis(object):
                         pb.finish()
                              
         ##
-        # Will be unhashable types so just save to a unique identifier
-        ##            
-        if use_cache:              
-            self._cache_lum_[self._cache_lum_ctr] = kw, Lout
-            self._cache_lum_ctr_ += 1
+        # Inputs are unhashable types so save under a digest of their contents
+        ##
+        if use_cache:
+            key = self._cache_lum_key(kw)
+            self._cache_lum_.put(key, (kw, Lout))
+            loose = (fingerprint(kw['wave']), fingerprint(kw['zobs']))
+            self._cache_lum_loose_[loose] = key
                                     
         # Get outta here.
         return Lout
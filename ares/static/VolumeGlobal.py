@@ -246,7 +246,7 @@ class GlobalVolume(object):
                             self.fexc[i] = [None for k in range(Nbands)]
                     
                 # More convenient variables
-                E = self._E[i][j]
+                E = np.asarray(self._E[i][j])
                 N = E.size
 
                 # Compute some things we need, like bound-free cross-section
@@ -255,50 +255,40 @@ class GlobalVolume(object):
                 
                 # 
                 for k, species in enumerate(['h_1', 'he_1', 'he_2']):
-                    self._sigma_E[species][i][j] = \
-                        np.array([self.sigma(Eval, k) for Eval in E])
+                    self._sigma_E[species][i][j] = self.sigma(E, k)
 
-                # Pre-compute secondary ionization and heating factors
+                # Pre-compute secondary ionization and heating factors, 
+                # each on the full (E, x) mesh at once.
                 if self.esec.method > 1:
                 
-                    # Don't worry: we'll fill these in in a sec!
-                    self.fheat[i][j] = np.ones([N, len(self.esec.x)])
                     self.flya[i][j] = np.ones([N, len(self.esec.x)])
                     self.fexc[i][j] = np.ones([N, len(self.esec.x)])
                 
                     # Must evaluate at ELECTRON energy, not photon energy
-                    for k, nrg in enumerate(E - E_th[0]):
-                        self.fheat[i][j][k] = \
+                    nrg = E - E_th[0]
+                    self.fheat[i][j] = \
+                        self.esec.DepositionFraction(self.esec.x, E=nrg, 
+                        channel='heat')
+                    self.fion['h_1'][i][j] = \
+                        self.esec.DepositionFraction(self.esec.x, E=nrg, 
+                        channel='h_1')
+                
+                    if self.pf['secondary_lya']:
+                        self.flya[i][j] = \
                             self.esec.DepositionFraction(self.esec.x, E=nrg, 
-                            channel='heat')
-                        self.fion['h_1'][i][j][k] = \
+                            channel='lya') 
+                        self.fexc[i][j] = \
                             self.esec.DepositionFraction(self.esec.x, E=nrg, 
-                            channel='h_1')
-                
-                        if self.pf['secondary_lya']:
-                            self.flya[i][j][k] = \
-                                self.esec.DepositionFraction(self.esec.x, E=nrg, 
-                                channel='lya') 
-                            self.fexc[i][j][k] = \
-                                self.esec.DepositionFraction(self.esec.x, E=nrg, 
-                                channel='exc')    
+                            channel='exc')    
                 
                     # Helium
                     if self.pf['include_He'] and not self.pf['approx_He']:
-                
-                        # Don't worry: we'll fill these in in a sec!
-                        self.fion['he_1'][i][j] = np.ones([N, len(self.esec.x)])
-                        self.fion['he_2'][i][j] = np.ones([N, len(self.esec.x)])
-                
-                        for k, nrg in enumerate(E - E_th[1]):
-                            self.fion['he_1'][i][j][k] = \
-                                self.esec.DepositionFraction(self.esec.x, 
-                                E=nrg, channel='he_1')
-                
-                        for k, nrg in enumerate(E - E_th[2]):
-                            self.fion['he_2'][i][j][k] = \
-                                self.esec.DepositionFraction(self.esec.x, 
-                                E=nrg, channel='he_2')    
+                        self.fion['he_1'][i][j] = \
+                            self.esec.DepositionFraction(self.esec.x, 
+                            E=E - E_th[1], channel='he_1')
+                        self.fion['he_2'][i][j] = \
+                            self.esec.DepositionFraction(self.esec.x, 
+                            E=E - E_th[2], channel='he_2')    
                 
                     else:
                         self.fion['he_1'][i][j] = np.zeros([N, len(self.esec.x)])
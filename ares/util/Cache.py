@@ -0,0 +1,595 @@
+"""
+
+Cache.py
+
+Description: Content fingerprints and bounded least-recently-used caches
+(in memory or on disk) for expensive, repeatedly-requested calculations, and
+read-only memory-mapped tables that many processes on a node can share.
+
+"""
+
+import os
+import glob
+import shutil
+import weakref
+import hashlib
+import tempfile
+import threading
+import numpy as np
+from collections import OrderedDict
+
+def fingerprint(obj):
+    """
+    Reduce `obj` to a short, hashable summary of its contents.
+
+    Arrays are digested byte-by-byte (along with their shape and dtype), so
+    two arrays with identical contents map to the same key regardless of
+    whether they are the same object in memory. Dictionaries, lists, and
+    tuples are fingerprinted recursively. Anything else that is hashable
+    (numbers, strings, None) is used as-is, and everything else (e.g.,
+    functions) falls back to object identity, which is what an equality
+    check would have done anyway.
+
+    Parameters
+    ----------
+    obj : anything
+        Object to summarize.
+
+    Returns
+    -------
+    A hashable object suitable for use as (part of) a dictionary key.
+
+    """
+
+    if isinstance(obj, np.ndarray):
+        arr = np.ascontiguousarray(obj)
+        if arr.dtype == object:
+            return ('obj', arr.shape) \
+                + tuple(fingerprint(element) for element in arr.ravel())
+
+        h = hashlib.md5(arr.view(np.uint8))
+        return ('arr', arr.shape, arr.dtype.str, h.hexdigest())
+    elif isinstance(obj, dict):
+        return ('dict',) + tuple((key, fingerprint(obj[key])) \
+            for key in sorted(obj.keys(), key=str))
+    elif isinstance(obj, (list, tuple)):
+        return (type(obj).__name__,) \
+            + tuple(fingerprint(element) for element in obj)
+    elif isinstance(obj, np.generic):
+        return obj.item()
+
+    try:
+        hash(obj)
+    except TypeError:
+        return ('id', id(obj))
+
+    if callable(obj):
+        return ('id', id(obj))
+
+    return obj
+
+def digest(obj):
+    """
+    Hex digest of `obj`, suitable for naming files after their contents.
+
+    Unlike `fingerprint`, this is only reproducible across sessions if
+    `obj` is built from arrays, numbers, strings, and containers thereof,
+    i.e., no functions or other objects compared by identity.
+    """
+    return hashlib.sha1(repr(fingerprint(obj)).encode('utf-8')).hexdigest()
+
+class LRUCache(object):
+    def __init__(self, maxsize=None):
+        """
+        Dictionary-like cache that evicts its least-recently-used entries.
+        
+        Safe to share between threads.
+
+        Parameters
+        ----------
+        maxsize : int, None
+            Maximum number of entries to hold. If None, the cache will grow
+            without bound (but hit/miss statistics are still recorded).
+
+        """
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        """
+        Retrieve entry `key`, marking it as most recently used.
+        """
+        with self._lock:
+            if key in self.data:
+                self.hits += 1
+                value = self.data.pop(key)
+                self.data[key] = value
+                return value
+
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """
+        Store `value` under `key`, evicting old entries if necessary.
+        """
+        with self._lock:
+            if key in self.data:
+                del self.data[key]
+            self.data[key] = value
+
+            if self.maxsize is None:
+                return
+
+            while len(self.data) > max(self.maxsize, 0):
+                self.data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Remove all entries. Statistics are preserved.
+        """
+        with self._lock:
+            self.data.clear()
+
+    @property
+    def hit_rate(self):
+        N = self.hits + self.misses
+        if N == 0:
+            return 0.0
+        return self.hits / float(N)
+
+    @property
+    def stats(self):
+        """
+        Dictionary summarizing the performance of this cache.
+        """
+        return {'hits': self.hits, 'misses': self.misses,
+            'evictions': self.evictions, 'size': len(self.data),
+            'maxsize': self.maxsize, 'hit_rate': self.hit_rate}
+
+class DiskCache(object):
+    def __init__(self, path, maxbytes=None):
+        """
+        Content-addressed cache of arrays on disk.
+
+        Each entry is a dictionary of arrays saved to `<path>/<key>.npz`,
+        where `key` is normally a `digest` of whatever went into computing
+        the arrays. Writes go to a temporary file that is then renamed, so
+        many processes can safely share a cache: readers never see partial
+        entries, and simultaneous writers of the same key just leave one
+        copy behind.
+
+        Parameters
+        ----------
+        path : str
+            Directory in which to store entries. Created if need be.
+        maxbytes : int, float, None
+            Upper limit on the total size of the cache. When exceeded,
+            least-recently-used entries are deleted. If None, the cache
+            will grow without bound.
+
+        """
+        self.path = path
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _fn(self, key):
+        return '{!s}/{!s}.npz'.format(self.path, key)
+
+    def __contains__(self, key):
+        return os.path.exists(self._fn(key))
+
+    def get(self, key, default=None):
+        """
+        Retrieve entry `key`, marking it as most recently used.
+        """
+        fn = self._fn(key)
+
+        try:
+            with np.load(fn, allow_pickle=False) as f:
+                value = {name: f[name] for name in f.files}
+            os.utime(fn, None)
+        except Exception:
+            # Missing, or evicted (or corrupted) by another process.
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Store dictionary of arrays `value` under `key`.
+        """
+        if not os.path.isdir(self.path):
+            try:
+                os.makedirs(self.path)
+            except OSError:
+                # Another process beat us to it
+                if not os.path.isdir(self.path):
+                    raise
+
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **value)
+            os.rename(tmp, self._fn(key))
+        except:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        """
+        Delete least-recently-used entries until the cache fits in
+        `maxbytes`. Entry `keep` is spared.
+        """
+        if self.maxbytes is None:
+            return
+
+        entries = []
+        for fn in glob.glob(self._fn('*')):
+            try:
+                st = os.stat(fn)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, fn))
+
+        total = sum([entry[1] for entry in entries])
+        for mtime, nbytes, fn in sorted(entries):
+            if total <= self.maxbytes:
+                break
+            if fn == self._fn(keep):
+                continue
+
+            try:
+                os.remove(fn)
+                self.evictions += 1
+            except OSError:
+                pass
+
+            total -= nbytes
+
+    def clear(self):
+        for fn in glob.glob(self._fn('*')):
+            try:
+                os.remove(fn)
+            except OSError:
+                pass
+
+    @property
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+            'evictions': self.evictions, 'path': self.path,
+            'maxbytes': self.maxbytes}
+
+def _is_reproducible(fp):
+    """
+    Does fingerprint `fp` avoid falling back on object identity anywhere?
+    """
+    if isinstance(fp, tuple):
+        if len(fp) == 2 and fp[0] == 'id':
+            return False
+        return all([_is_reproducible(element) for element in fp])
+    return True
+
+def _pack(value):
+    if isinstance(value, tuple):
+        return {'t{}'.format(i): np.asarray(element) \
+            for i, element in enumerate(value)}
+    return {'v': np.asarray(value)}
+
+def _unpack(data):
+    if 'v' in data:
+        arr = data['v']
+        return arr.item() if arr.ndim == 0 else arr
+
+    elements = [data['t{}'.format(i)] for i in range(len(data))]
+    return tuple([arr.item() if arr.ndim == 0 else arr for arr in elements])
+
+class MemoCache(object):
+    def __init__(self, maxsize=None, ztol=1e-6, path=None, maxbytes=None,
+        model=None, persist=None):
+        """
+        Bounded memo for quantities computed redshift-by-redshift.
+
+        Entries are keyed by the kind of quantity (e.g., 'cf' for
+        correlation functions), the redshift rounded to a multiple of
+        `ztol`, a term (e.g., 'ii'), and a fingerprint of any other inputs
+        (e.g., the array of scales), so that redshifts differing only by
+        round-off are still hits. Each kind of quantity gets its own
+        `LRUCache`, and optionally a `DiskCache` so that results survive
+        from one run to the next.
+
+        Parameters
+        ----------
+        maxsize : int, dict, None
+            Number of entries to hold in memory for each kind of quantity.
+            Can be a dictionary, with key None providing the default for
+            kinds not listed explicitly.
+        ztol : float
+            Redshifts are considered equal if they round to the same
+            multiple of `ztol`.
+        path : str, None
+            Directory in which to persist entries. If None, entries live
+            in memory only.
+        maxbytes : int, float, None
+            Upper limit on the size of the cache on disk.
+        model : anything
+            Everything else the cached quantities depend on, e.g., the
+            parameter file. Folded into the keys of entries on disk. If
+            it can't be fingerprinted reproducibly (e.g., it contains
+            functions), nothing is persisted.
+        persist : list, None
+            Kinds of quantities to persist. If None, will persist all.
+
+        """
+
+        self.maxsize = maxsize
+        self.ztol = ztol
+        self.persist = persist
+        self.caches = {}
+        self.hits = {}
+        self.misses = {}
+
+        self.disk = None
+        if path is not None:
+            fp = fingerprint(model)
+            if _is_reproducible(fp):
+                self.disk = DiskCache(path, maxbytes)
+                self.model = digest(fp)
+
+    def _get_maxsize(self, kind):
+        if not isinstance(self.maxsize, dict):
+            return self.maxsize
+        return self.maxsize.get(kind, self.maxsize.get(None))
+
+    def _cache(self, kind):
+        if kind not in self.caches:
+            self.caches[kind] = LRUCache(self._get_maxsize(kind))
+            self.hits[kind] = 0
+            self.misses[kind] = 0
+        return self.caches[kind]
+
+    def key(self, z, term=None, **kwargs):
+        """
+        Construct key for quantity at redshift `z`.
+
+        Any keyword arguments (e.g., R=R) are fingerprinted, so arrays
+        with identical contents yield identical keys.
+        """
+        return (int(round(z / self.ztol)), term, fingerprint(kwargs))
+
+    def _persistent(self, kind):
+        if self.disk is None:
+            return False
+        return (self.persist is None) or (kind in self.persist)
+
+    def get(self, kind, z, term=None, **kwargs):
+        """
+        Retrieve quantity `kind` at redshift `z`, or None if we don't have it.
+        """
+        cache = self._cache(kind)
+        key = self.key(z, term, **kwargs)
+
+        value = cache.get(key)
+
+        if (value is None) and self._persistent(kind):
+            data = self.disk.get(digest((self.model, kind, key)))
+            if data is not None:
+                value = _unpack(data)
+                cache.put(key, value)
+
+        if value is None:
+            self.misses[kind] += 1
+        else:
+            self.hits[kind] += 1
+
+        return value
+
+    def put(self, kind, z, term, value, **kwargs):
+        """
+        Store `value` of quantity `kind` at redshift `z`.
+        """
+        key = self.key(z, term, **kwargs)
+        self._cache(kind).put(key, value)
+
+        if self._persistent(kind):
+            self.disk.put(digest((self.model, kind, key)), _pack(value))
+
+    def clear(self):
+        """
+        Remove all entries from memory (not disk). Statistics are preserved.
+        """
+        for kind in self.caches:
+            self.caches[kind].clear()
+
+    @property
+    def stats(self):
+        """
+        Hits, misses, etc. for each kind of quantity.
+        """
+        stats = {}
+        for kind in self.caches:
+            N = self.hits[kind] + self.misses[kind]
+            stats[kind] = {'hits': self.hits[kind],
+                'misses': self.misses[kind],
+                'hit_rate': self.hits[kind] / float(N) if N > 0 else 0.0,
+                'evictions': self.caches[kind].evictions,
+                'size': len(self.caches[kind])}
+
+        if self.disk is not None:
+            stats['disk'] = self.disk.stats
+
+        return stats
+
+class MappedCache(object):
+    def __init__(self, path):
+        """
+        Content-addressed store of read-only, memory-mapped arrays.
+
+        Each entry is a dictionary of arrays saved as uncompressed .npy files
+        in `<path>/<key>/`. Entries are read back with `mmap_mode='r'`, so
+        every process on a node that maps the same entry shares one copy of
+        the data in the page cache rather than holding its own. Entries are
+        written to a temporary directory that is then renamed, so readers
+        never see partial entries and simultaneous writers just leave one
+        copy behind.
+
+        Arrays handed out by this cache are read-only: modify a copy.
+
+        Parameters
+        ----------
+        path : str
+            Directory in which to store entries. Created if need be.
+
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+    def _dir(self, key):
+        return '{!s}/{!s}'.format(self.path, key)
+
+    def __contains__(self, key):
+        return os.path.isdir(self._dir(key))
+
+    def get(self, key, default=None):
+        """
+        Map entry `key` into memory.
+        """
+        dn = self._dir(key)
+
+        try:
+            names = [fn for fn in os.listdir(dn) if fn.endswith('.npy')]
+            value = {fn[0:-4]: _map('{!s}/{!s}'.format(dn, fn)) \
+                for fn in names}
+        except (OSError, IOError, ValueError):
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Store dictionary of arrays `value` under `key`.
+
+        Returns
+        -------
+        Dictionary of memory-mapped copies of `value`, which should be used
+        in place of the originals so that they can be freed.
+
+        """
+        if not os.path.isdir(self.path):
+            try:
+                os.makedirs(self.path)
+            except OSError:
+                # Another process beat us to it
+                if not os.path.isdir(self.path):
+                    raise
+
+        tmp = tempfile.mkdtemp(dir=self.path, suffix='.tmp')
+        try:
+            for name in value:
+                np.save('{!s}/{!s}.npy'.format(tmp, name),
+                    np.asarray(value[name]), allow_pickle=False)
+            os.rename(tmp, self._dir(key))
+        except OSError:
+            # Lost race with another process writing the same entry.
+            if key not in self:
+                raise
+        finally:
+            if os.path.exists(tmp):
+                shutil.rmtree(tmp)
+
+        return self.get(key)
+
+    def clear(self):
+        """
+        Remove all entries. Processes that have them mapped already are
+        unaffected.
+        """
+        for dn in glob.glob(self._dir('*')):
+            shutil.rmtree(dn, ignore_errors=True)
+
+    @property
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'path': self.path}
+
+# Arrays we've mapped (by id), so that objects holding them can be pickled
+# as references to files rather than copies of their contents.
+_mapped = {}
+
+def _map(fn):
+    arr = np.load(fn, mmap_mode='r', allow_pickle=False)
+
+    fn = os.path.abspath(fn)
+    key = id(arr)
+    _mapped[key] = (weakref.ref(arr, lambda ref: _mapped.pop(key, None)), fn)
+
+    return arr
+
+class MappedArray(object):
+    """
+    Stand-in for a memory-mapped array when pickling.
+    """
+    def __init__(self, fn):
+        self.fn = fn
+
+def pack_mapped(state):
+    """
+    Replace arrays from a `MappedCache` in dictionary `state` by references.
+
+    Intended for use in `__getstate__`, so that objects holding on to big
+    shared tables (e.g., a HaloMassFunction instance) are cheap to send to
+    other processes, which then map the same files via `unpack_mapped`.
+    """
+
+    state = state.copy()
+    for name, value in state.items():
+        if not isinstance(value, np.ndarray):
+            continue
+        if id(value) not in _mapped:
+            continue
+
+        ref, fn = _mapped[id(value)]
+        if ref() is value:
+            state[name] = MappedArray(fn)
+
+    return state
+
+def unpack_mapped(state):
+    """
+    Inverse of `pack_mapped`, i.e., for use in `__setstate__`.
+    """
+    state = state.copy()
+    for name, value in state.items():
+        if isinstance(value, MappedArray):
+            state[name] = _map(value.fn)
+
+    return state
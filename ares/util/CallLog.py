@@ -0,0 +1,177 @@
+"""
+
+CallLog.py
+
+Description: Cheap record of likelihood calls for post-mortems. Each process
+keeps a fixed-size ring buffer of its most recent calls (parameters, time
+each phase finished, result) in a memory-mapped .npy file. Recording a call
+is just a few memory writes, i.e., no files are opened or closed. Pages are
+synced to disk every `flush_every` seconds, upon SIGTERM or SIGUSR1, and at
+exit. Because the buffer lives in the page cache rather than the process,
+it survives the process dying abruptly (e.g., segfault or OOM kill) too.
+
+"""
+
+import os
+import time
+import atexit
+import signal
+import numpy as np
+
+phases = ('sim', 'like', 'blobs')
+
+def _call_log_dtype(Npars):
+    fields = [('call', np.int64), ('start', np.float64)]
+    fields += [(phase, np.float64) for phase in phases]
+    fields += [('stop', np.float64), ('lnL', np.float64),
+        ('pars', np.float64, (Npars,))]
+    return np.dtype(fields)
+
+class CallLog(object):
+    def __init__(self, fn, Npars, Ncalls=1000, flush_every=60.):
+        """
+        Initialize ring buffer of likelihood calls.
+
+        Parameters
+        ----------
+        fn : str
+            Name of .npy file to write to. If it already exists and has the
+            same layout (e.g., because we're restarting), will keep
+            appending to it.
+        Npars : int
+            Number of parameters per call.
+        Ncalls : int
+            Number of most recent calls to hold onto.
+        flush_every : int, float
+            Sync buffer to disk at most this often [seconds].
+
+        """
+
+        self.fn = fn
+        self.flush_every = flush_every
+
+        dtype = _call_log_dtype(Npars)
+
+        self.buf = None
+        if os.path.exists(fn):
+            try:
+                buf = np.lib.format.open_memmap(fn, mode='r+')
+                if buf.dtype == dtype and buf.shape == (Ncalls,):
+                    self.buf = buf
+            except ValueError:
+                pass
+
+        if self.buf is None:
+            self.buf = np.lib.format.open_memmap(fn, mode='w+', dtype=dtype,
+                shape=(Ncalls,))
+
+        self.Ncalls = Ncalls
+        self.counter = int(self.buf['call'].max())
+        self.row = None
+        self.last_flush = time.time()
+
+    def begin(self, pars):
+        """ Start recording a new call with parameters `pars`. """
+        self.row = self.counter % self.Ncalls
+        self.counter += 1
+
+        row = self.buf[self.row]
+        row['start'] = time.time()
+        for phase in phases:
+            row[phase] = np.nan
+        row['stop'] = np.nan
+        row['lnL'] = np.nan
+        row['pars'] = pars
+
+        # Last, so an incompletely-written entry can't be mistaken for
+        # the latest call.
+        row['call'] = self.counter
+
+    def mark(self, phase):
+        """ Note that `phase` of the current call is done. """
+        self.buf[self.row][phase] = time.time()
+
+    def end(self, lnL):
+        row = self.buf[self.row]
+        row['lnL'] = lnL
+        row['stop'] = time.time()
+
+        if (row['stop'] - self.last_flush) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self.buf.flush()
+        self.last_flush = time.time()
+
+def _flush_and_chain(logs, signum, previous):
+    def handler(sig, frame):
+        for log in logs:
+            log.flush()
+
+        if callable(previous):
+            previous(sig, frame)
+        elif previous == signal.SIG_DFL:
+            signal.signal(sig, signal.SIG_DFL)
+            os.kill(os.getpid(), sig)
+
+    return handler
+
+_logs = {}
+def get_call_log(fn, Npars, **kwargs):
+    """
+    Return the CallLog writing to `fn`, creating it if need be.
+
+    The first time this is called in a given process, will make sure all
+    CallLogs are flushed on exit, SIGTERM, and SIGUSR1 (which most batch
+    schedulers send before killing jobs). Pre-existing handlers for those
+    signals are still called afterward.
+
+    """
+
+    if fn in _logs:
+        return _logs[fn]
+
+    if not _logs:
+        logs = _logs.values()
+        atexit.register(lambda: [log.flush() for log in logs])
+        for signum in [signal.SIGTERM, getattr(signal, 'SIGUSR1', None)]:
+            if signum is None:
+                continue
+            try:
+                previous = signal.getsignal(signum)
+                signal.signal(signum,
+                    _flush_and_chain(logs, signum, previous))
+            except ValueError:
+                # Not the main thread: can't install signal handlers.
+                pass
+
+    _logs[fn] = CallLog(fn, Npars, **kwargs)
+
+    return _logs[fn]
+
+def read_call_log(fn):
+    """
+    Read a CallLog from disk.
+
+    Returns
+    -------
+    Dictionary of arrays, ordered from oldest to most recent call. Includes
+    the wall-clock time spent in each phase, e.g., 'dt_sim', and 'done',
+    which is False for calls that were interrupted.
+
+    """
+
+    buf = np.load(fn)
+    buf = np.sort(buf[buf['call'] > 0], order='call')
+
+    data = {name: buf[name] for name in buf.dtype.names}
+
+    prev = data['start']
+    for phase in phases:
+        data['dt_{}'.format(phase)] = data[phase] - prev
+        prev = np.where(np.isfinite(data[phase]), data[phase], prev)
+
+    data['dt'] = data['stop'] - data['start']
+    data['done'] = np.isfinite(data['stop'])
+
+    return data
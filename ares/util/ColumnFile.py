@@ -0,0 +1,119 @@
+"""
+
+ColumnFile.py
+
+Description: Append-only storage of typed arrays, e.g., MCMC chains and blobs.
+Each field lives in a raw binary file, `<fn>.bin`, plus a small index,
+`<fn>.idx`, that records the data type, the shape of a single row, and how
+many complete rows have been written. Reads are memory-mapped.
+
+"""
+
+import os
+import json
+import numpy as np
+
+def column_files(fn):
+    """ Names of the data and index files for field `fn`. """
+    return '{!s}.bin'.format(fn), '{!s}.idx'.format(fn)
+
+def column_file_exists(fn):
+    return os.path.exists(column_files(fn)[1])
+
+def read_column_index(fn):
+    """
+    Returns
+    -------
+    Tuple containing the data type, the shape of each row, and the number
+    of rows that have been written.
+    """
+    with open(column_files(fn)[1], 'r') as f:
+        info = json.load(f)
+
+    return np.dtype(info['dtype']), tuple(info['shape']), int(info['rows'])
+
+def _write_column_index(fn, dtype, shape, rows):
+    fn_idx = column_files(fn)[1]
+
+    # Write to a temporary file first so that the index on disk is always
+    # complete, even if we get killed mid-checkpoint.
+    with open(fn_idx + '.tmp', 'w') as f:
+        json.dump({'dtype': dtype.str, 'shape': list(shape), 'rows': rows}, f)
+
+    os.rename(fn_idx + '.tmp', fn_idx)
+
+def append_columns(fn, data):
+    """
+    Append rows to field `fn`, creating it if need be.
+
+    Parameters
+    ----------
+    fn : str
+        Prefix for the data and index files, e.g., 'test.chain'.
+    data : np.ndarray
+        Rows to append. The first dimension is the row number, and all
+        subsequent dimensions must match those already on disk.
+
+    """
+
+    fn_bin, fn_idx = column_files(fn)
+
+    data = np.asarray(data)
+
+    if data.dtype == object:
+        raise TypeError('Cannot write ragged or object arrays to {}.'.format(
+            fn_bin))
+
+    if os.path.exists(fn_idx):
+        dtype, shape, rows = read_column_index(fn)
+
+        if data.shape[1:] != shape:
+            raise ValueError(('Shape of rows to append {} does not match ' +\
+                'those in {} {}.').format(data.shape[1:], fn_bin, shape))
+
+        data = data.astype(dtype, copy=False)
+    else:
+        dtype, shape, rows = data.dtype, data.shape[1:], 0
+
+    # Bytes beyond the last indexed row are leftovers from an interrupted
+    # write, so drop them before appending.
+    with open(fn_bin, 'ab') as f:
+        f.truncate(rows * dtype.itemsize * int(np.prod(shape)))
+        f.write(np.ascontiguousarray(data).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+    _write_column_index(fn, dtype, shape, rows + data.shape[0])
+
+def read_columns(fn, mmap=True):
+    """
+    Read field `fn`.
+
+    Returns
+    -------
+    Array with shape (rows, row shape...). If `mmap` is True, this is a
+    read-only memory map of the data on disk, i.e., nothing is read until
+    it is needed.
+
+    """
+
+    fn_bin, fn_idx = column_files(fn)
+
+    dtype, shape, rows = read_column_index(fn)
+
+    if rows == 0:
+        return np.zeros((0,) + shape, dtype=dtype)
+
+    if mmap:
+        return np.memmap(fn_bin, dtype=dtype, mode='r',
+            shape=(rows,) + shape)
+
+    with open(fn_bin, 'rb') as f:
+        data = np.fromfile(f, dtype=dtype, count=rows * int(np.prod(shape)))
+
+    return data.reshape((rows,) + shape)
+
+def delete_columns(fn):
+    for _fn in column_files(fn):
+        if os.path.exists(_fn):
+            os.remove(_fn)
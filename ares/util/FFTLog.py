@@ -0,0 +1,126 @@
+"""
+
+FFTLog.py
+
+Description: Fast spherical Bessel transforms of functions sampled on
+logarithmic grids, following Hamilton (2000). The function is expanded in
+complex power laws (via an FFT in ln x), each of which can be transformed
+analytically, so whole arrays of wavenumbers (or scales) cost O(N log N)
+rather than one numerical integral apiece.
+
+"""
+
+import numpy as np
+from scipy.special import loggamma
+
+def mellin_jl(s, ell=0):
+    """
+    Mellin transform of the spherical Bessel function j_ell.
+
+    Returns the integral of t^(s-1) j_ell(t) from 0 to infinity, which
+    converges for -ell < Re(s) < 2.
+
+    """
+
+    lnM = (s - 2.) * np.log(2.) + 0.5 * np.log(np.pi) \
+        + loggamma(0.5 * (ell + s)) - loggamma(0.5 * (3. + ell - s))
+
+    return np.exp(lnM)
+
+def log_grid(x, f):
+    """
+    Make sure `f` is sampled uniformly in ln(x), interpolating if need be.
+
+    Returns
+    -------
+    Tuple: (ln x, f, d ln x).
+
+    """
+
+    x = np.asarray(x, dtype=float)
+    f = np.asarray(f, dtype=float)
+
+    lnx = np.log(x)
+    dlnx = (lnx[-1] - lnx[0]) / (x.size - 1.)
+
+    if not np.allclose(np.diff(lnx), dlnx, rtol=1e-6, atol=0):
+        _lnx = np.linspace(lnx[0], lnx[-1], x.size)
+        f = np.interp(_lnx, lnx, f)
+        lnx = _lnx
+
+    return lnx, f, dlnx
+
+def fftlog(x, f, y=None, ell=0, bias=1.5, pad=0):
+    """
+    Compute g(y) = int_0^inf f(x) j_ell(x y) x^2 dx.
+
+    For example, the correlation function is fftlog(k, P(k)) / (2 pi^2)
+    and the power spectrum is 4 pi fftlog(R, xi(R)).
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Points at which `f` is sampled. Should be uniformly spaced in ln(x);
+        if not, `f` will be interpolated onto such a grid.
+    f : np.ndarray
+        Function to be transformed.
+    y : np.ndarray
+        Points at which to return the transform. If None, will use the
+        reciprocal of the (padded) `x` grid.
+    ell : int
+        Order of the spherical Bessel function.
+    bias : int, float
+        Power-law bias, q. We actually transform f(x) x^(3 - q), which
+        should be as close to periodic in ln(x) as possible (i.e., vanish
+        at both ends). Must satisfy -ell < q < 2.
+    pad : int
+        Number of zeros to add to each end of the input (in ln x), which
+        reduces aliasing (ringing) at the cost of a longer FFT. If `y` is
+        supplied, more will be added if need be so that the output grid
+        spans all of `y`.
+
+    Returns
+    -------
+    Tuple: (y, g(y)).
+
+    """
+
+    assert -ell < bias < 2, \
+        "Bias must satisfy -ell < q < 2 (got q={}).".format(bias)
+
+    lnx, f, dlnx = log_grid(x, f)
+
+    pad_lo = pad_hi = int(pad)
+    if y is not None:
+        lny = np.log(y)
+        pad_lo = max(pad_lo, int(np.ceil((lnx[0] + lny.max()) / dlnx)))
+        pad_hi = max(pad_hi, int(np.ceil((-lny.min() - lnx[-1]) / dlnx)))
+
+    lnx = np.concatenate((lnx[0] - dlnx * np.arange(pad_lo, 0, -1), lnx,
+        lnx[-1] + dlnx * np.arange(1, pad_hi + 1)))
+    f = np.concatenate((np.zeros(pad_lo), f, np.zeros(pad_hi)))
+
+    N = lnx.size
+
+    # Output grid: x_n * y_(N-1-n) = 1
+    lny = -lnx[-1::-1]
+
+    # Expand biased input in (complex) power laws
+    c = np.fft.fft(f * np.exp((3. - bias) * lnx)) / N
+
+    # ...and transform them analytically
+    m = np.fft.fftfreq(N, d=1. / N)
+    w = 2. * np.pi * m / (N * dlnx)
+    u = np.exp(-1j * w * (lnx[0] + lny[0])) * mellin_jl(bias + 1j * w, ell)
+
+    # The Nyquist mode has no partner, so keep only the real part to get a
+    # real result.
+    if N % 2 == 0:
+        u[N // 2] = u[N // 2].real
+
+    g = np.fft.fft(c * u).real * np.exp(-bias * lny)
+
+    if y is None:
+        return np.exp(lny), g
+
+    return y, np.interp(np.log(y), lny, g, left=0.0, right=0.0)
@@ -0,0 +1,163 @@
+"""
+
+HistoryStore.py
+
+Description: Out-of-core access to halo assembly histories, so that sets of
+histories bigger than RAM can be streamed through in blocks of halos.
+
+"""
+
+import os
+import numpy as np
+
+try:
+    import h5py
+except ImportError:
+    pass
+
+class HistoryStore(object):
+    def __init__(self, source):
+        """
+        Read-only container for halo histories.
+
+        Parameters
+        ----------
+        source : str, dict
+            Either (i) the name of an HDF5 file, (ii) the name of a directory
+            containing one .npy file per field (which will be memory-mapped),
+            or (iii) a dictionary of arrays already in memory.
+
+        Per-halo fields have shape (number of halos, number of redshifts),
+        and are only read from disk one block of halos at a time. Anything
+        else (e.g., 'z' and 't') is read in full when requested.
+
+        """
+
+        self.source = source
+
+        if isinstance(source, dict):
+            self._data = {key:np.asarray(source[key]) for key in source}
+            self._file = None
+        elif os.path.isdir(source):
+            self._data = {}
+            for fn in sorted(os.listdir(source)):
+                if not fn.endswith('.npy'):
+                    continue
+                self._data[fn[0:-4]] = np.load('{}/{}'.format(source, fn),
+                    mmap_mode='r')
+            self._file = None
+        else:
+            self._file = h5py.File(source, 'r')
+            self._data = self._file
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def keys(self):
+        # Skip HDF5 groups, e.g., 'cosmology'
+        return [key for key in self._data.keys() \
+            if hasattr(self._data[key], 'shape')]
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __getitem__(self, key):
+        """ Read the entirety of some field. """
+        return np.array(self._data[key])
+
+    @property
+    def Nhalos(self):
+        if not hasattr(self, '_Nhalos'):
+            self._Nhalos = self._data['Mh'].shape[0]
+        return self._Nhalos
+
+    @property
+    def Nz(self):
+        if not hasattr(self, '_Nz'):
+            self._Nz = self._data['Mh'].shape[1]
+        return self._Nz
+
+    def is_per_halo(self, key):
+        """ Does field `key` have one row per halo? """
+        shape = self._data[key].shape
+        return (len(shape) > 1) and (shape[0] == self.Nhalos)
+
+    def blocks(self, size):
+        """
+        Yield (start, stop) indices of consecutive blocks of halos.
+        """
+        size = int(size)
+        for lo in range(0, self.Nhalos, size):
+            yield lo, min(lo + size, self.Nhalos)
+
+    def read(self, lo, hi):
+        """
+        Read halos lo <= i < hi into memory.
+
+        Returns
+        -------
+        Dictionary of arrays. Per-halo fields are sliced, and, if the store
+        has a 'mask' field, masked elements of per-halo fields are zeroed.
+
+        """
+
+        block = {}
+        for key in self.keys():
+            if key == 'mask':
+                continue
+
+            if self.is_per_halo(key):
+                block[key] = np.array(self._data[key][lo:hi])
+            else:
+                block[key] = self[key]
+
+        if 'mask' in self:
+            mask = np.array(self._data['mask'][lo:hi])
+            for key in block:
+                if (key == 'children') or (not self.is_per_halo(key)):
+                    continue
+                block[key] = block[key] * np.logical_not(mask)
+
+        return block
+
+def save_histories(fn, hist, chunk=1000, clobber=False):
+    """
+    Write halo histories to disk in a format that can be streamed.
+
+    Parameters
+    ----------
+    fn : str
+        If this ends in '.hdf5', will write an HDF5 file with per-halo fields
+        chunked in blocks of `chunk` halos. Otherwise, `fn` is treated as a
+        directory, and each field is saved to its own .npy file.
+    hist : dict
+        Histories, e.g., from `GalaxyCohort.Trajectories`.
+    chunk : int
+        Number of halos per HDF5 chunk. Should be comparable to the
+        `pop_hist_block` that will be used to read the histories.
+
+    """
+
+    if os.path.exists(fn) and (not clobber):
+        raise IOError('{} exists! Set clobber=True to overwrite.'.format(fn))
+
+    Nh = hist['Mh'].shape[0]
+
+    if fn.endswith('.hdf5'):
+        f = h5py.File(fn, 'w')
+        for key in hist:
+            data = np.asarray(hist[key])
+            if (data.ndim > 1) and (data.shape[0] == Nh):
+                chunks = (min(chunk, Nh),) + data.shape[1:]
+                f.create_dataset(key, data=data, chunks=chunks)
+            else:
+                f.create_dataset(key, data=data)
+        f.close()
+    else:
+        if not os.path.exists(fn):
+            os.mkdir(fn)
+
+        for key in hist:
+            np.save('{}/{}.npy'.format(fn, key), np.asarray(hist[key]))
@@ -1,5 +1,10 @@
 import gc
 
+try:
+    import dill as _pickle
+except ImportError:
+    import pickle as _pickle
+
 try:
     from mpi4py import MPI
     rank = MPI.COMM_WORLD.rank
@@ -19,6 +24,45 @@ except ImportError:
     rank = 0
     size = 1
     
+# Objects kept around by each process under some handle, so that they need 
+# only be sent once (see `MPIPool.broadcast`).
+_resident = {}
+
+def set_resident(handle, obj):
+    """ Store `obj` under `handle` in this process. """
+    _resident[handle] = obj
+
+def get_resident(handle):
+    """ Retrieve object stored under `handle` in this process. """
+    return _resident[handle]
+
+class ResidentFunction(object):
+    def __init__(self, handle):
+        """
+        Stand-in for a function and (possibly large) extra arguments.
+        
+        Only the handle gets pickled, so sending this to a worker costs a 
+        few tens of bytes. The function and arguments must already be 
+        resident on the receiving end, i.e., stored as a (function, args)
+        tuple via `MPIPool.broadcast` or `set_resident`.
+        
+        Parameters
+        ----------
+        handle : str
+            Name under which (function, args) is stored.
+        
+        """
+        self.handle = handle
+        
+    def __call__(self, arg):
+        function, args = get_resident(self.handle)
+        return function(arg, *args)
+
+class _ResidentState(object):
+    def __init__(self, handle, data):
+        self.handle = handle
+        self.data = data
+
 class MPIPool(object): # pragma: no cover
 
     def __init__(self, comm=None, master=0):
@@ -41,6 +85,10 @@ class MPIPool(object): # pragma: no cover
         self.master = master
         self.workers = set(range(self.comm.size))
         self.workers.discard(self.master)
+        
+        # Running totals of pickled bytes sent to workers
+        self.bytes_sent = 0
+        self.bytes_broadcast = 0
                 
     def is_master(self):
         return self.master == self.comm.rank
@@ -48,12 +96,44 @@ class MPIPool(object): # pragma: no cover
     def is_worker(self):
         return self.comm.rank in self.workers
 
+    def broadcast(self, handle, obj):
+        """
+        Send `obj` to all workers once, to be kept under `handle`.
+        
+        Workers process messages in the order they're sent, so anything
+        broadcast before a call to `map` is available to its tasks, e.g., 
+        via a `ResidentFunction`.
+        
+        Returns
+        -------
+        Number of bytes sent to each worker.
+        
+        """
+        assert self.is_master()
+        
+        set_resident(handle, obj)
+        
+        msg = _ResidentState(handle, _pickle.dumps(obj))
+        for worker in self.workers:
+            self.comm.send(msg, dest=worker, tag=0)
+        
+        self.bytes_broadcast += len(msg.data) * len(self.workers)
+        
+        return len(msg.data)
+
     def map(self, function, iterable):
         assert self.is_master()
 
         comm = self.comm
         workerset = self.workers.copy()
-        tasklist = [(tid, (function, arg)) for tid, arg in enumerate(iterable)]
+        
+        # Pickle tasks ourselves so we can keep track of how much we send.
+        tasklist = []
+        for tid, arg in enumerate(iterable):
+            task = _pickle.dumps((function, arg))
+            self.bytes_sent += len(task)
+            tasklist.append((tid, task))
+            
         resultlist = [None] * len(tasklist)
         pending = len(tasklist)
 
@@ -94,8 +174,13 @@ class MPIPool(object): # pragma: no cover
             task = comm.recv(source=master, tag=MPI.ANY_TAG, status=status)
             if task is None: 
                 break
+                
+            if isinstance(task, _ResidentState):
+                set_resident(task.handle, _pickle.loads(task.data))
+                del task
+                continue
 
-            function, arg = task
+            function, arg = _pickle.loads(task)
             result = function(arg)
             comm.ssend(result, master, status.tag)
 
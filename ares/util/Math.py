@@ -81,6 +81,35 @@ def central_difference(x, y):
     
     return x[1:-1], dydx
         
+def hermite_interp(x, xp, fp, dfp):
+    """
+    Cubic Hermite interpolation, i.e., using known derivatives at nodes.
+    
+    Parameters
+    ----------
+    x : int, float, np.ndarray
+        Point(s) at which to interpolate.
+    xp : np.ndarray
+        Nodes, in ascending order.
+    fp, dfp : np.ndarray
+        Function and its first derivative at each node.
+        
+    Beyond the ends of `xp`, the first or last cubic is extrapolated.
+    
+    """
+    x = np.asarray(x, dtype=float)
+    i = np.clip(np.searchsorted(xp, x) - 1, 0, len(xp) - 2)
+    
+    h = xp[i+1] - xp[i]
+    t = (x - xp[i]) / h
+    t2 = t * t
+    t3 = t2 * t
+    
+    return (2. * t3 - 3. * t2 + 1.) * fp[i] \
+         + (t3 - 2. * t2 + t) * h * dfp[i] \
+         + (3. * t2 - 2. * t3) * fp[i+1] \
+         + (t3 - t2) * h * dfp[i+1]
+    
 def five_pt_stencil(x, y):
     """
     Compute the first derivative of y wrt x using five point method.
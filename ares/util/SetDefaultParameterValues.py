@@ -94,6 +94,9 @@ def GridParameters():
     
     "tables_times": None,
     "tables_dt": s_per_myr,
+    
+    # Number of column densities to do at once when tabulating integrals
+    "tables_chunk_size": 1000,
             
     }
     
@@ -432,6 +435,22 @@ def PowerSpectrumParameters():
      'ps_fht_rtol': 1e-4,
      'ps_fht_atol': 1e-4,
      
+     # 'fftlog' or 'clenshaw-curtis' (i.e., quad, one k or R at a time)
+     'ps_fht_method': 'fftlog',
+     'ps_fht_bias': 1.5,
+     'ps_fht_pad': 0,
+     
+     # Memo for terms at each redshift (number of entries per quantity), 
+     # and optional directory in which to persist them between runs.
+     'ps_memo_size': 500,
+     'ps_memo_size_volumes': 2,
+     'ps_memo_ztol': 1e-6,
+     'ps_cache': None,
+     'ps_cache_size': 1e9, # bytes
+     
+     # Number of threads over which to split redshifts (None = serial)
+     'ps_nthreads': None,
+     
      'ps_include_lya_lc': False,
 
      "ps_volfix": True,
@@ -659,7 +678,9 @@ def PopulationParameters():
     "pop_synth_Mmax": 1e14,
     "pop_synth_minimal": False,  # Can turn off for testing (so we don't need MF)
     "pop_synth_cache_level": 1, # Bigger = more careful
+    "pop_synth_cache_size": 1000, # Max number of cached luminosities
     "pop_synth_age_interp": 'cubic',
+    "pop_synth_conv": 'matrix', # or 'fft' for uniform time grids, or None
     "pop_synth_cache_phot": {},
     
     # Need to avoid doing synthesis in super duper detail for speed.
@@ -677,6 +698,7 @@ def PopulationParameters():
     "pop_dlogM": 0.1,
 
     "pop_histories": None,
+    "pop_hist_block": None, # Stream histories in blocks of this many halos
     "pop_guide_pop": None,
     "pop_thin_hist": False,
     "pop_scatter_mar": 0.0,
@@ -695,6 +717,7 @@ def PopulationParameters():
     "pop_force_equilibrium": np.inf,
     "pop_sample_imf": False,
     "pop_sample_cmf": False,
+    "pop_sam_per_halo": False, # Evolve halos one at a time? (slow)
     "pop_imf": 2.35,     # default to standard SSPs. 
     "pop_imf_bins": None,#np.arange(0.1, 150.01, 0.01),  # bin centers
     "pop_cmf": None,
@@ -1160,6 +1183,9 @@ def HaloMassFunctionParameters():
     'hps_lnk_max': 10.,
     'hps_lnR_min': -10.,
     'hps_lnR_max': 10.,
+    
+    # Number of (k, M) profile tables to hold onto
+    'hps_prof_cache_size': 16,
 
     # Note that this is not passed to hmf yet.
     "hmf_window": 'tophat',
@@ -1261,6 +1287,13 @@ def ControlParameters():
     # Solvers
     "solver_rtol": 1e-8,
     "solver_atol": 1e-8,
+    "solver_batch": True, # evolve all cells at once (agrees with the
+                          # cell-by-cell solver to within the tolerances,
+                          # but several times faster for many cells)
+    "solver_nproc": 1,    # split cells among processes (batch mode only).
+                          # Pool lives for the whole run, but each step
+                          # still pays for shipping data back and forth,
+                          # so this only helps for expensive steps.
     "interp_tab": 'cubic',
     "interp_cc": 'linear',
     "interp_rc": 'linear',
@@ -1327,11 +1360,19 @@ def ControlParameters():
     "tau_Emin": 2e2,
     "tau_Emax": 3e4,
     "tau_Emin_pin": True,
+    "tau_integrator": 'gauss', # or 'quad' (one integral per cell)
+    "tau_gauss_order": 16,
+    "tau_cache": None, # directory, shared by all models
+    "tau_cache_size": 2e9, # bytes
+
+    # Memory-mapped HMF & SPS tables, shared by all processes on a node
+    "shared_tables": None, # directory
 
     "sam_dt": 1., # Myr
     "sam_dz": None, # Usually good enough!
     "sam_atol": 1e-4,
     "sam_rtol": 1e-4,
+    "sam_integrator": 'rk4', # or 'euler', or 'lsoda' (one ODE per cohort)
 
     # File format
     "preferred_format": 'hdf5',
@@ -3,6 +3,9 @@ from ares.util.Pickling import read_pickle_file, write_pickle_file,\
     delete_file, delete_file_if_clobber, overwrite_pickle_file
 import ares.util.Photometry
 from ares.util.GridND import GridND
+from ares.util.Cache import LRUCache
+from ares.util.HistoryStore import HistoryStore, save_histories
+from ares.util.ColumnFile import append_columns, read_columns
 from ares.util.Survey import Survey
 from ares.util.Aesthetics import labels
 from ares.util.WriteData import CheckPoints
@@ -11,6 +11,10 @@ parallel, e.g.,
 
     mpirun -np 4 python generate_hmf_tables.py
 
+or, without MPI, will use all available cores on one node. HDF5 tables are
+written one redshift at a time, so if a job gets killed, just re-run the 
+same command to pick up where it left off.
+
 """
 
 import sys
@@ -63,7 +67,10 @@ hmf = ares.physics.HaloMassFunction(hmf_analytic=False,
 hmf.info()
 
 try:
-    hmf.SaveHMF(fmt=kwargs['hmf_fmt'], clobber=False)
+    if kwargs['hmf_fmt'] == 'hdf5':
+        hmf.GenerateHMF()
+    else:
+        hmf.SaveHMF(fmt=kwargs['hmf_fmt'], clobber=False)
 except IOError as err:
     print(err)
 
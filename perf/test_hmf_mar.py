@@ -0,0 +1,60 @@
+"""
+
+test_hmf_mar.py
+
+Description: How long does it take to tabulate halo mass accretion rates
+from cumulative number density trajectories? Compares the vectorized
+HaloMassFunction.TabulateMAR to the old one-trajectory-at-a-time approach
+for a random subset of halos, and makes sure they agree.
+
+Usage: python test_hmf_mar.py [number of halos to check (default: 100)]
+
+"""
+
+import sys
+import time
+import ares
+import numpy as np
+from scipy.interpolate import interp1d
+from ares.util.Math import central_difference
+from ares.physics.Constants import s_per_yr
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+hmf = ares.physics.HaloMassFunction(hmf_load=True, verbose=False)
+poke = hmf.tab_dndm
+Nz, NM = hmf.tab_z.size, hmf.tab_M.size
+
+print("# HMF grid: {} x {} (logM x z)".format(NM, Nz))
+
+t1 = time.time()
+hmf.TabulateMAR()
+t2 = time.time()
+
+print("# Vectorized TabulateMAR: {:.3g} s".format(t2 - t1))
+
+# Old way, for a random subset of trajectories.
+np.random.seed(1234)
+rows = np.random.randint(1, Nz + NM - 1, size=N)
+dtdz = hmf.cosm.dtdz(hmf.tab_z)[1:-1]
+
+t3 = time.time()
+for row in rows:
+    if row < Nz:
+        hist = hmf._run_CND(row, 0)
+    else:
+        hist = hmf._run_CND(Nz - 1, row - Nz + 1)
+
+    assert np.array_equal(hist, hmf.tab_traj[row])
+
+    z, dmdz = central_difference(hmf.tab_z, hist)
+    dmdt = dmdz[-1::-1] * s_per_yr / -dtdz[-1::-1]
+    _interp = interp1d(np.log(z[-1::-1]), np.log(dmdt), kind='linear',
+        bounds_error=False, fill_value=-np.inf)
+    dmdt_rg = np.exp(_interp(np.log(hmf.tab_z)))
+
+t4 = time.time()
+
+print("# Old way: {:.3g} s per halo, i.e., ~{:.3g} s total.".format(
+    (t4 - t3) / N, (t4 - t3) * (Nz + NM - 2) / N))
+print("# Speed-up: ~{:.3g}x".format((t4 - t3) * (Nz + NM - 2) / N / (t2 - t1)))
@@ -0,0 +1,52 @@
+"""
+
+test_ps_21cm.py
+
+Description: How long does a standard 21-cm power spectrum calculation take?
+Runs PowerSpectrum21cm (ionization fluctuations only) serially, and then
+again with redshifts split over a pool of threads, and makes sure the two
+agree.
+
+Usage: python test_ps_21cm.py [number of threads (default: 4)]
+
+"""
+
+import sys
+import time
+import ares
+import numpy as np
+
+nthreads = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+
+pars = \
+{
+ 'include_cgm': False,
+ 'ps_include_ion': True,
+ 'ps_include_temp': False,
+ 'ps_include_21cm': True,
+ 'ps_output_z': np.arange(6, 16, 1),
+ 'verbose': False,
+ 'progress_bar': False,
+}
+
+# Run the global signal first so it's not part of the timing.
+gs = ares.simulations.PowerSpectrum21cm(**pars).gs
+gs.run()
+
+hist = {}
+for N in [None, nthreads]:
+    sim = ares.simulations.PowerSpectrum21cm(ps_nthreads=N, **pars)
+    sim.gs = gs
+    sim.mean_history = gs.history
+
+    t1 = time.time()
+    sim.run()
+    t2 = time.time()
+
+    print("# ps_nthreads={}: {:.3g} s for {} redshifts ({} R, {} k)".format(
+        N, t2 - t1, sim.z.size, sim.R.size, sim.k.size))
+
+    hist[N] = sim.history
+
+assert np.allclose(hist[None]['ps_21'], hist[nthreads]['ps_21'], rtol=1e-8)
+print("# Serial and threaded results agree.")
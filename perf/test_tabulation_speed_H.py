@@ -21,7 +21,7 @@ t3 = time.time()
 sim2 = ares.simulations.RaySegment(problem_type=2, tables_discrete_gen=True)
 t4 = time.time()
 
-print "Discrete tabulation is %.2gx faster than quad." % ((t2 - t1) / (t4 - t3))
+print("Discrete tabulation is %.2gx faster than quad." % ((t2 - t1) / (t4 - t3)))
 
 sim1.run()
 sim2.run()
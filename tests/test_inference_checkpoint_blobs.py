@@ -0,0 +1,67 @@
+"""
+
+test_inference_checkpoint_blobs.py
+
+Description: Make sure blobs whose shape varies from model to model can be
+checkpointed in binary format, i.e., that they get pickled (as object
+arrays) instead, along with anything written before they went ragged.
+
+"""
+
+import os
+import ares
+import shutil
+import tempfile
+import numpy as np
+from ares.util.Pickling import read_pickle_file
+from ares.util.ColumnFile import read_columns, column_file_exists
+
+def _blobs(steps, walkers, ragged=False):
+    # Shape is (steps, walkers, blob groups, blobs in group)
+    blobs = []
+    for k in range(steps):
+        blobs.append([])
+        for j in range(walkers):
+            N = 3 + j if ragged else 3
+            blobs[-1].append([[np.arange(3.) + k, np.ones(N) * j]])
+    return blobs
+
+def test():
+    path = tempfile.mkdtemp()
+    prefix = '{}/test'.format(path)
+
+    try:
+        fitter = ares.inference.ModelFit()
+        fitter.nwalkers = 2
+        fitter.checkpoint_format = 'bin'
+        fitter._blob_names = [['x', 'y']]
+        fitter._blob_nd = [1]
+
+        fitter.save_blobs(_blobs(4, 2), prefix=prefix)
+        fitter.save_blobs(_blobs(4, 2, ragged=True), prefix=prefix)
+        fitter.save_blobs(_blobs(4, 2), prefix=prefix)
+
+        # Regular blob stays in binary
+        x = read_columns('{}.blob_1d.x'.format(prefix))
+        assert x.shape == (24, 3)
+        assert not os.path.exists('{}.blob_1d.x.pkl'.format(prefix))
+
+        # Ragged blob moves to a pickle, old rows and all.
+        fn = '{}.blob_1d.y.pkl'.format(prefix)
+        assert not column_file_exists(fn[0:-4])
+
+        y = []
+        for chunk in read_pickle_file(fn, nloads=None, verbose=False):
+            y.extend(chunk)
+
+        assert len(y) == 24
+        # Rows are ordered by walker, then step, within each checkpoint.
+        assert [len(row) for row in y] == [3] * 12 + [4] * 4 + [3] * 8
+        assert np.all(y[0] == 0) and np.all(y[8] == 0) and np.all(y[12] == 1)
+        assert np.all(y[-1] == 1)
+
+    finally:
+        shutil.rmtree(path)
+
+if __name__ == '__main__':
+    test()
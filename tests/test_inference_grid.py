@@ -57,6 +57,31 @@ def test():
     #ax2 = anl.ContourScatter(anl.parameters[0], anl.parameters[1], 'tau_e',
     #    fig=3)
     
+    # Dynamic scheduler should know the grid is done, and how long each
+    # model took.
+    mg.scheduler = 'dynamic'
+    assert mg._pending_models('test_grid').size == 0
+    
+    pts, dt = mg._known_costs('test_grid')
+    assert pts.shape == (size, 2)
+    
+    # Cost records come in whatever order processors finished, so line
+    # them up with the grid first.
+    lookup = {tuple([kw[par] for par in mg.parameters]): h \
+        for h, kw in enumerate(mg.grid.all_kwargs)}
+    h = np.array([lookup[tuple(pt)] for pt in pts])
+    assert np.array_equal(np.sort(h), np.arange(size))
+    dt = dt[np.argsort(h)]
+    
+    # Most expensive models first
+    order = mg._schedule('test_grid', np.arange(size))
+    assert np.all(np.diff(dt[order]) <= 0)
+    
+    mg.run('test_grid', clobber=True, save_freq=10)
+    
+    anl_3 = ares.analysis.ModelSet('test_grid')
+    assert anl_3.chain.shape == (size, 2)
+    
     # Clean-up
     mcmc_files = glob.glob('{}/test_grid*'.format(os.environ.get('ARES')))
     
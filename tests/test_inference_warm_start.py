@@ -0,0 +1,102 @@
+"""
+
+test_inference_warm_start.py
+
+Description: Check ordering of grid points and bookkeeping for warm starts,
+using stand-ins for simulation objects.
+
+"""
+
+import itertools
+import numpy as np
+from ares.inference.WarmStart import WarmStart, snake_order
+
+class _Thing(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+def _fake_sim(Mmin, feedback=True):
+    field = _Thing(_zarr=np.arange(5.), _Mmin_now=Mmin * np.ones(5))
+    pop = _Thing(_tab_Mmin_=Mmin * np.ones(5),
+        halos=_Thing(tab_z=np.arange(5.)))
+    return _Thing(pf={'feedback_LW': feedback}, medium=_Thing(field=field),
+        pops=[pop])
+
+def test():
+    shape = (3, 4, 2)
+    coords = list(itertools.product(*[range(N) for N in shape]))
+    order = snake_order(coords, shape)
+
+    # Every grid point exactly once, and consecutive points are neighbors.
+    assert np.array_equal(np.sort(order), np.arange(len(coords)))
+    steps = np.abs(np.diff(np.array(coords)[order], axis=0)).sum(axis=1)
+    assert np.all(steps == 1)
+
+    ##
+    # LW feedback guesses: always OK to re-use, pick nearest.
+    ##
+    warm = WarmStart(['pop_Tmin{0}', 'pop_fstar{0}'])
+
+    p = {'feedback_LW': True, 'feedback_LW_sfrd_popid': 0}
+    assert warm.seed({'pop_Tmin{0}': 1e3, 'pop_fstar{0}': 0.1}, p) == {}
+    assert 'feedback_LW_guesses' not in p
+
+    warm.store({'pop_Tmin{0}': 1e3, 'pop_fstar{0}': 0.1}, _fake_sim(1.))
+    warm.store({'pop_Tmin{0}': 1e3, 'pop_fstar{0}': 0.5}, _fake_sim(2.))
+
+    p = {'feedback_LW': True, 'feedback_LW_sfrd_popid': 0}
+    warm.seed({'pop_Tmin{0}': 2e3, 'pop_fstar{0}': 0.4}, p)
+    z, Mmin = p['feedback_LW_guesses']
+    assert np.all(Mmin == 2.)
+    assert warm.hits['feedback_LW_Mmin'] == 1
+
+    ##
+    # Mmin tables: re-used exactly, so only if Tmin is the same.
+    ##
+    warm = WarmStart(['pop_Tmin{0}', 'pop_fstar{0}'], names=['tab_Mmin'])
+    warm.store({'pop_Tmin{0}': 1e3, 'pop_fstar{0}': 0.1},
+        _fake_sim(3., feedback=False))
+
+    to_inject = warm.seed({'pop_Tmin{0}': 2e3, 'pop_fstar{0}': 0.1}, {})
+    assert to_inject == {}
+
+    to_inject = warm.seed({'pop_Tmin{0}': 1e3, 'pop_fstar{0}': 0.9}, {})
+    sim = _fake_sim(0., feedback=False)
+    warm.inject(sim, to_inject)
+    assert np.all(sim.pops[0]._tab_Mmin_ == 3.)
+    assert (warm.hits['tab_Mmin'], warm.misses['tab_Mmin']) == (1, 1)
+    
+    ##
+    # Parameters not known to be safe force a rebuild, e.g., this one
+    # might feed into Mmin.
+    ##
+    warm = WarmStart(['pq_func_par0{0}', 'pop_fstar{0}'], names=['tab_Mmin'])
+    warm.store({'pq_func_par0{0}': 1., 'pop_fstar{0}': 0.1},
+        _fake_sim(3., feedback=False))
+    assert warm.seed({'pq_func_par0{0}': 2., 'pop_fstar{0}': 0.1}, {}) == {}
+    assert 'tab_Mmin' in warm.seed({'pq_func_par0{0}': 1., 
+        'pop_fstar{0}': 0.2}, {})
+    
+    ##
+    # Memory use is bounded, but we always hang on to the latest model.
+    ##
+    nbytes = 5 * 8 * 2 # z and Mmin(z) from LW feedback
+    warm = WarmStart(['pop_fstar{0}'], maxbytes=2.5 * nbytes)
+    for i in range(4):
+        warm.store({'pop_fstar{0}': 0.1 * (i + 1)}, _fake_sim(i))
+        assert warm.nbytes[(0.1 * (i + 1),)] == nbytes
+        assert len(warm.cache) == min(i + 1, 2)
+        
+    assert sorted(warm.nbytes.keys()) == sorted(warm.cache.data.keys())
+        
+    warm = WarmStart(['pop_fstar{0}'], maxbytes=1)
+    warm.store({'pop_fstar{0}': 0.1}, _fake_sim(1.))
+    assert len(warm.cache) == 1
+    
+    warm = WarmStart(['pop_fstar{0}'], maxsize=3, maxbytes=None)
+    for i in range(5):
+        warm.store({'pop_fstar{0}': 0.1 * (i + 1)}, _fake_sim(i))
+    assert len(warm.cache) == len(warm.nbytes) == 3
+
+if __name__ == '__main__':
+    test()
@@ -11,8 +11,9 @@ Description:
 """
 
 import numpy as np
+from scipy.integrate import quad
 from ares.physics import Cosmology
-from ares.physics.Constants import s_per_gyr, m_H, m_He, cm_per_mpc
+from ares.physics.Constants import s_per_gyr, m_H, m_He, cm_per_mpc, c
 
 def test(rtol=1e-3):
     
@@ -43,6 +44,25 @@ def test(rtol=1e-3):
     assert abs(R_a - R_n) / R_a < rtol, \
         "Comoving radial distance @ high-z not accurate to < {:.3g}%.".format(rtol)
         
+    # Tabulated distances vs. brute force
+    z = np.array([0.01, 0.5, 1., 3., 6., 10., 30., 100., 2e4])
+    integrand = lambda zz: cosm.hubble_0 / cosm.HubbleParameter(zz)
+    D = np.array([quad(integrand, 0., zz)[0] for zz in z])
+    R_q = c * D / cosm.hubble_0
+    R_t = cosm.ComovingRadialDistance(0., z)
+    assert np.allclose(R_t, R_q, rtol=1e-4, atol=0)
+    assert np.allclose(cosm.LuminosityDistance(z), R_t * (1. + z))
+    assert np.isscalar(cosm.LuminosityDistance(1.))
+    
+    # Inverse lookups
+    assert np.allclose(cosm.ComovingDistanceToRedshift(R_t), z, rtol=1e-8)
+    dz = cosm.DeltaZed(z, 10.)
+    R = cosm.ComovingRadialDistance(z, z + dz) / cm_per_mpc
+    assert np.allclose(R, 10., rtol=1e-8)
+    
+    ang = cosm.ComovingLengthToAngle(z[1:4], 1.)
+    assert np.allclose(cosm.AngleToComovingLength(z[1:4], ang), 1.)
+    
     # Test a user-supplied cosmology and one that grabs a row from Planck chain
     # Remember: test suite doesn't have CosmoRec, so don't use get_inits_rec.
     cosm = Cosmology(cosmology_name='user', cosmology_id='jordan')
@@ -0,0 +1,77 @@
+"""
+
+test_physics_halo_model_mesh.py
+
+Description: Make sure (k, M) profile tables and the vectorized halo model
+integrals agree with the old one-k-at-a-time approach.
+
+"""
+
+import ares
+import numpy as np
+from scipy.integrate import quad
+
+def test(rtol=1e-6):
+    hm = ares.physics.HaloModel()
+
+    k = np.logspace(-2, 1, 8)
+    z = 10.
+    iz = np.argmin(np.abs(hm.tab_z - z))
+    ok = hm.tab_fcoll[iz] > 0
+    lnM = np.log(hm.tab_M[ok])
+    rho_bar = hm.cosm.rho_m_z0 * ares.physics.Constants.rho_cgs
+
+    # Profiles should broadcast over (k, M)
+    tab = hm.u_nfw(k[:,None], hm.tab_M[None,:], z)
+    assert tab.shape == (k.size, hm.tab_M.size)
+    assert np.allclose(tab[3,100], hm.u_nfw(k[3], hm.tab_M[100], z))
+
+    # 1-halo term, brute force
+    ps1h = []
+    for _k in k:
+        p = np.abs([hm.u_nfw(_k, M, z) for M in hm.tab_M])
+        integrand = hm.tab_dndlnm[iz] * hm.tab_M**2 * p**2 / rho_bar**2
+        ps1h.append(np.trapz(integrand[ok], x=lnM))
+
+    assert np.allclose(hm.get_ps_1h(z, k), ps1h, rtol=rtol)
+
+    # Scalar k should still give a scalar
+    assert np.ndim(hm.get_ps_2h(z, k[0])) == 0
+    assert np.allclose(hm.get_ps_2h(z, k[0]), hm.get_ps_2h(z, k)[0],
+        rtol=rtol)
+
+    # Profile tables are cached, including lambdas that close over
+    # different parameters.
+    hits = hm._cache_prof_.hits
+    hm.get_ps_1h(z, k)
+    assert hm._cache_prof_.hits > hits
+
+    ps = []
+    for rmax in [10., 20.]:
+        prof = lambda kk, mm, zz: hm.u_isl(kk, mm, zz, rmax)
+        ps.append(hm.get_ps_2h(z, k, prof1=prof))
+    assert not np.allclose(ps[0], ps[1])
+
+    # Luminosity-weighted, as in GalaxyCohort
+    lum = hm.tab_M**0.8
+    ps_lum = hm.get_ps_2h(z, k, prof1=lambda kk, mm, zz: 1. * kk**0,
+        lum1=lum, lum2=lum)
+    integrand = hm.tab_dndlnm[iz] * lum * hm.tab_bias[iz]
+    plin = np.exp(np.interp(np.log(k), np.log(hm.tab_k_lin),
+        np.log(hm.tab_ps_lin[iz])))
+    assert np.allclose(ps_lum, np.trapz(integrand[ok], x=lnM)**2 * plin,
+        rtol=rtol)
+
+    # LW flux profile vs. quad
+    r_LW = 97.39 * hm.ScalingFactor(z)
+    den = quad(lambda r: hm.ModulationFactor(z, r=r), 0., r_LW)[0]
+    for _k in [1e-3, 0.1, 1.]:
+        num = quad(lambda r: hm.ModulationFactor(z, r=r) \
+            * np.sin(_k * r) / (_k * r), 0., r_LW, limit=200)[0]
+        assert abs(hm.FluxProfileFT(_k, 1e10, z) - num / den) < 1e-4
+
+    assert hm.FluxProfileFT(k[:,None], hm.tab_M[None,:], z).shape \
+        == (k.size, hm.tab_M.size)
+
+if __name__ == '__main__':
+    test()
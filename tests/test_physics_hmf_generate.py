@@ -0,0 +1,84 @@
+"""
+
+test_physics_hmf_generate.py
+
+Description: Make sure HMF tables generated in one go match those generated
+in pieces, i.e., after an interrupted run is resumed, both serially and with
+a pool of processes. Uses a made-up mass function so that we don't need hmf
+or CAMB.
+
+"""
+
+import os
+import ares
+import h5py
+import shutil
+import tempfile
+import numpy as np
+
+class _StubMF(object):
+    """
+    Stand-in for hmf.MassFunction. Raises an error if asked for a redshift
+    beyond `zfail`, to mimic a job getting killed part of the way through.
+    """
+    def __init__(self, zfail=None):
+        self.M = self.m = np.logspace(8, 12, 41)
+        self.k = np.logspace(-2, 1, 31)
+        self._sigma_0 = 2. * (self.M / 1e8)**-0.1
+        self._dlnsdlnm = -0.1 * np.ones_like(self.M)
+        self.zfail = zfail
+        self.z = None
+
+    def update(self, z):
+        if (self.zfail is not None) and (z > self.zfail):
+            raise RuntimeError('Pretend we ran out of time.')
+
+        self.z = z
+        self.growth_factor = 1. / (1. + z)
+        self.dndm = 1e-3 * np.exp(-self.M * (1. + z) / 1e11) / self.M
+        self.ngtm = self.dndm * self.M
+        self.rho_gtm = self.ngtm * self.M
+        self.power = self.k**-2 * self.growth_factor**2
+
+def _generate(fn, nproc, zfail=None):
+    hmf = ares.physics.HaloMassFunction(hmf_table=fn, hmf_load=False,
+        verbose=False)
+    hmf.tab_z = np.arange(5., 10.5, 0.5)
+    hmf._MF = _StubMF(zfail)
+
+    try:
+        hmf.GenerateHMF(fn=fn, nproc=nproc, save_MAR=False)
+    except RuntimeError:
+        return None
+
+    return hmf
+
+def test():
+    path = tempfile.mkdtemp()
+
+    try:
+        ref = _generate('{}/ref.hdf5'.format(path), nproc=1)
+
+        for nproc in [1, 2]:
+            fn = '{}/nproc_{}.hdf5'.format(path, nproc)
+
+            assert _generate(fn, nproc, zfail=7.) is None
+
+            with h5py.File(fn, 'r') as f:
+                done = np.array(f[('done')])
+
+            assert not np.all(done)
+            if nproc == 1:
+                assert done.sum() == 5
+
+            hmf = _generate(fn, nproc)
+
+            for name in ['tab_M', 'tab_dndm', 'tab_ngtm', 'tab_mgtm',
+                'tab_ps_lin', 'tab_growth']:
+                assert np.array_equal(getattr(hmf, name), getattr(ref, name)), \
+                    "Mismatch in {} (nproc={}).".format(name, nproc)
+    finally:
+        shutil.rmtree(path)
+
+if __name__ == '__main__':
+    test()
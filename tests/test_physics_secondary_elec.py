@@ -108,6 +108,17 @@ def test():
         pl.savefig('{0!s}_{1}.png'.format(__file__[0:__file__.rfind('.')], i))
         
     pl.close('all')
+    
+    # Evaluating on the full (E, x) mesh at once should agree with looping
+    for esec in [esec2, esec3]:
+        for channel in ['heat', 'h_1']:
+            f = esec.DepositionFraction(xHII=xe, E=E, channel=channel)
+            assert f.shape == (E.size, len(xe))
+            
+            for k, x in enumerate(xe):
+                f1 = [esec.DepositionFraction(xHII=x, E=EE, 
+                    channel=channel)[0] for EE in E]
+                assert np.allclose(f[:,k], f1)
         
     assert True
     
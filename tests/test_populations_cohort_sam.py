@@ -0,0 +1,42 @@
+"""
+
+test_populations_cohort_sam.py
+
+Description: Make sure fixed-step SAM agrees with lsoda.
+
+"""
+
+import ares
+import numpy as np
+
+def test(rtol=1e-2):
+    pars = \
+    {
+     'pop_sfr_model': 'sfe-func',
+     'pop_fstar': 'pq',
+     'pq_func': 'dpl',
+     'pq_func_var': 'Mh',
+     'pq_func_par0': 0.05,
+     'pq_func_par1': 2.8e11,
+     'pq_func_par2': 0.49,
+     'pq_func_par3': -0.61,
+     'pq_func_par4': 1e10,
+     'pop_zform': 12.,
+     'pop_zdead': 6.,
+    }
+
+    data = {}
+    for integrator in ['lsoda', 'rk4']:
+        pop = ares.populations.GalaxyPopulation(sam_integrator=integrator,
+            **pars)
+        zform, data[integrator] = pop.Trajectories()
+
+    assert np.allclose(data['rk4']['zform'], data['lsoda']['zform'])
+    assert np.allclose(data['rk4']['z'], data['lsoda']['z'])
+
+    for key in ['Mh', 'Mg', 'Ms', 'MZ', 'Mbh', 'nh']:
+        assert np.allclose(data['rk4'][key], data['lsoda'][key], rtol=rtol,
+            atol=0.0), "Fixed-step SAM disagrees with lsoda for {}".format(key)
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,147 @@
+"""
+
+test_populations_ensemble_batch.py
+
+Description: Check the array-valued galaxy history engine, i.e.,
+`_gen_galaxy_histories` and `_gen_stars_batch`, against a case that can be
+worked out by hand, and make sure it conserves mass and SNe.
+
+"""
+
+import ares
+import numpy as np
+from ares.physics.Constants import s_per_myr
+from ares.populations.GalaxyEnsemble import GalaxyEnsemble
+
+class _Guide(object):
+    # Only used to fill in smooth accretion rates in the output.
+    def MAR(self, z, Mh):
+        return np.zeros_like(Mh)
+
+def _get_pop(**kwargs):
+    pars = \
+    {
+     'pop_sample_cmf': True,
+     'pop_sam_per_halo': False,
+     'pop_fstar_cloud': 0.1,
+     'pop_coupling_sne': 0.,
+     'pop_guide_pop': _Guide(),
+     'pop_imf_bins': np.arange(-1, 2.52, 0.02),
+     'verbose': False,
+    }
+    pars.update(kwargs)
+
+    pop = GalaxyEnsemble(**pars)
+
+    # All clusters have the same mass.
+    pop.tab_Mcl = np.array([1e3, 1e3])
+    pop.tab_cdf = np.array([0., 1.])
+
+    return pop
+
+def test():
+
+    ##
+    # Hand-computed case: with no winds, keep adding 1e3 Msun clusters until
+    # we've used up 10% of the gas, unless the first cluster would need
+    # more than all of it. Last one spans several blocks of draws.
+    ##
+    pop = _get_pop()
+
+    Mg = np.array([0., 500., 2.5e3, 1e5, 1e8])
+    Ms_ref = np.array([0., 0., 1e3, 1e4, 1e7])
+
+    N = Mg.size
+    t = np.array([0., 10., 20.])
+    vesc = 1e7 * np.ones(N)
+    SN = np.zeros((N, t.size))
+    Ms, Mw, Nsn = pop._gen_stars_batch(np.arange(N), Mg, vesc, SN, t, 0)
+
+    assert np.array_equal(Ms, Ms_ref), Ms
+    assert np.all(Mw == 0)
+
+    ##
+    # With winds: the next cluster must have been turned away.
+    ##
+    pop = _get_pop(pop_coupling_sne=0.1)
+
+    Mg = np.logspace(4, 8, 20)
+    N = Mg.size
+    vesc = 3e6 * np.ones(N)
+    SN = np.zeros((N, t.size))
+    SN[:,0] = 5
+    Ms, Mw, Nsn = pop._gen_stars_batch(np.arange(N), Mg, vesc, SN, t, 0)
+
+    Mw_per_SN = 2e51 * 0.1 / vesc**2 / ares.physics.Constants.g_per_msun
+    assert np.allclose(Mw, Mw_per_SN * Nsn * (Nsn > 5), rtol=1e-10)
+    assert np.all(Nsn >= 5)
+    assert np.all(np.logical_or(Ms + Mw >= 0.1 * Mg, Ms + 1e3 + Mw >= Mg))
+
+    ##
+    # SNe are conserved when they're delayed: same draws, so same clusters,
+    # but all SNe show up in a later time-step instead.
+    ##
+    Mg = np.logspace(4, 6, 20)
+    N = Mg.size
+    vesc = 1e7 * np.ones(N)
+
+    pop0 = _get_pop(pop_delay_sne_feedback=0)
+    pop1 = _get_pop(pop_delay_sne_feedback=1)
+    pop1._stars._avg_sn_delay = 20.
+
+    SN0 = np.zeros((N, t.size))
+    SN1 = np.zeros((N, t.size))
+
+    np.random.seed(42)
+    Ms0, Mw0, Nsn0 = pop0._gen_stars_batch(np.arange(N), Mg, vesc, SN0, t, 0)
+    np.random.seed(42)
+    Ms1, Mw1, Nsn1 = pop1._gen_stars_batch(np.arange(N), Mg, vesc, SN1, t, 0)
+
+    assert np.array_equal(Ms0, Ms1)
+    assert np.all(Nsn1 == 0)
+    assert np.sum(Nsn0) > 0
+    assert np.array_equal(SN1[:,2], Nsn0)
+    assert np.all(SN1[:,0:2] == 0) and np.all(SN0 == 0)
+
+    ##
+    # Full histories: gas + stars = initial gas + all gas accreted, since
+    # there's no feedback. One halo shows up late.
+    ##
+    pop = _get_pop()
+
+    z = np.linspace(6., 10., 41)
+    t = pop.cosm.t_of_z(z) / s_per_myr
+    Mh = np.array([1e10, 1e11, 1e9])[:,None] * np.exp(-0.5 * (z - 6.))
+    Mh[2,z > 8] = 0
+    MAR = 0.5 * Mh / np.abs(np.gradient(t, z) * 1e6) # Msun / yr
+
+    halos = {'z': z, 't': t, 'Mh': Mh, 'MAR': MAR, 'nh': np.ones_like(Mh),
+        'zthin': np.zeros_like(z)}
+
+    hist = pop._gen_galaxy_histories(halos)
+
+    fb = pop.cosm.fbar_over_fcdm
+
+    # Back to ascending time.
+    Mh = Mh[:,-1::-1]
+    MAR = MAR[:,-1::-1]
+    t = t[-1::-1]
+
+    Macc = fb * 0.5 * (MAR[:,1:] + MAR[:,0:-1]) * np.diff(t)[None,:] * 1e6
+    Macc[Mh[:,0:-1] == 0] = 0
+
+    i0 = np.argmax(Mh > 0, axis=1)
+    Mb = fb * Mh[np.arange(3),i0][:,None] + np.cumsum(Macc, axis=1)
+
+    for k in range(3):
+        ok = np.arange(1, z.size) > i0[k]
+        M = hist['Mg'][k,1:] + hist['Ms'][k,1:]
+        assert np.allclose(M[ok], Mb[k,ok], rtol=1e-10)
+        assert np.all(hist['Ms'][k,0:i0[k]+1] == 0)
+
+    assert np.all(np.diff(hist['Ms'], axis=1) >= 0)
+    assert np.all(hist['Ms'][:,-1] > 0)
+    assert np.all(hist['Mg'] >= 0)
+
+if __name__ == '__main__':
+    test()
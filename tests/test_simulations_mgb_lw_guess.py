@@ -0,0 +1,59 @@
+"""
+
+test_simulations_mgb_lw_guess.py
+
+Description: Make sure seeding the LW feedback iteration with Mmin(z) from a
+neighboring model (as WarmStart does) gets to the same answer in fewer
+iterations.
+
+"""
+
+import ares
+import numpy as np
+
+def test():
+    pop = ares.util.ParameterBundle('pop:sfe-func') \
+        + ares.util.ParameterBundle('sed:uv')
+    pop['pop_fstar'] = 0.01
+    pop['pop_solve_rte'] = (10.2, 13.6)
+    pop['pop_tau_Nz'] = 200
+
+    # One population that feels LW feedback, one that doesn't.
+    pop0 = pop.copy()
+    pop0['pop_Tmin'] = 500.
+    pop0.num = 0
+    pop1 = pop.copy()
+    pop1['pop_Tmin'] = 1e4
+    pop1.num = 1
+
+    pars = pop0 + pop1
+    pars['tau_approx'] = True
+    pars['initial_redshift'] = 40.
+    pars['final_redshift'] = 10.
+    pars['feedback_LW'] = True
+    pars['feedback_LW_sfrd_popid'] = 0
+    pars['feedback_LW_maxiter'] = 30
+    pars['feedback_LW_Mmin_rtol'] = 1e-2
+    pars['feedback_LW_sfrd_rtol'] = 0
+    pars['verbose'] = False
+    pars['progress_bar'] = False
+
+    def run(fstar, guess=None):
+        p = pars.copy()
+        p['pop_fstar{0}'] = fstar
+        p['feedback_LW_guesses'] = guess
+        sim = ares.simulations.MetaGalacticBackground(**p)
+        sim.run()
+        return sim
+
+    neighbor = run(0.012)
+    cold = run(0.01)
+    warm = run(0.01, (neighbor._zarr.copy(), neighbor._Mmin_now.copy()))
+
+    assert warm.count < cold.count, \
+        "Seeded run took {} iterations, unseeded {}.".format(warm.count,
+        cold.count)
+    assert np.allclose(warm._Mmin_now, cold._Mmin_now, rtol=2e-2)
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,63 @@
+"""
+
+test_solvers_chem_batch.py
+
+Description: Make sure evolving all cells at once agrees with evolving them
+one at a time, for isothermal and non-isothermal gas, and with cells split
+among processes.
+
+"""
+
+import ares
+import numpy as np
+
+def test(rtol=1e-4):
+
+    base = \
+    {
+     'grid_cells': 32,
+     'stop_time': 1e2,
+     'radiative_transfer': False,
+     'density_units': 1.0,
+     'initial_timestep': 1,
+     'max_timestep': 1e2,
+     'restricted_timestep': None,
+    }
+    
+    iso = base.copy()
+    iso['isothermal'] = True
+    iso['initial_temperature'] = np.logspace(3, 5, 32)
+    iso['initial_ionization'] = [1.-1e-8, 1e-8]
+    # Default atol is comparable to initial h_2, so tighten it up so that
+    # both solvers are converged.
+    iso['solver_atol'] = 1e-14
+    
+    # Rate coefficients change every step here, which the workers in the
+    # process pool need to know about.
+    noniso = base.copy()
+    noniso['isothermal'] = False
+    noniso['initial_temperature'] = np.logspace(3, 4, 32)
+    noniso['initial_ionization'] = [1.-1e-4, 1e-4]
+    
+    for pf, fields in [(iso, ['h_1', 'h_2', 'e']), 
+                       (noniso, ['h_1', 'h_2', 'e', 'Tk'])]:
+        data = {}
+        for batch, nproc in [(False, 1), (True, 1), (True, 2)]:
+            sim = ares.simulations.GasParcel(solver_batch=batch, 
+                solver_nproc=nproc, **pf)
+            sim.run()
+            data[(batch, nproc)] = sim.history
+            
+        ref = data[(False, 1)]
+        for key in [(True, 1), (True, 2)]:
+            assert np.array_equal(data[key]['t'], ref['t'])
+            for field in fields:
+                assert np.allclose(data[key][field], ref[field], rtol=rtol,
+                    atol=0), "Batch solver disagrees in field {}".format(field)
+        
+        # Make sure the non-isothermal case actually does something
+        if not pf['isothermal']:
+            assert not np.allclose(ref['Tk'][-1], ref['Tk'][0], rtol=1e-2)
+        
+if __name__ == '__main__':
+    test()
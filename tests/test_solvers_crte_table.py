@@ -0,0 +1,96 @@
+"""
+
+test_solvers_crte_table.py
+
+Description: Make sure the whole-table flux solution agrees with the
+original one-redshift-at-a-time recurrence relation, and with (and doesn't
+interfere with) a regular background calculation.
+
+"""
+
+import ares
+import numpy as np
+from ares.physics.Constants import c
+
+pars = \
+{
+ 'pop_sfr_model': 'sfrd-func',
+ 'pop_type': 'galaxy',
+ 'pop_sfrd': lambda z: 0.1 * (1. + z)**-6.,
+ 'pop_sfrd_units': 'msun/yr/mpc^3',
+ 'pop_sed': 'pl',
+ 'pop_alpha': -2.,
+ 'pop_Emin': 2e2,
+ 'pop_Emax': 3e4,
+ 'pop_EminNorm': 2e2,
+ 'pop_EmaxNorm': 3e4,
+ 'pop_logN': 21.,
+ 'pop_hardening': 'extrinsic',
+ 'pop_solve_rte': True,
+ 'tau_redshift_bins': 100,
+ 'initial_redshift': 40.,
+ 'final_redshift': 10.,
+}
+
+def test():
+    mgb = ares.simulations.MetaGalacticBackground(**pars)
+    solver = mgb.solver
+
+    table = solver.FluxTable(0)[0]
+
+    E = solver.energies[0][0]
+    z = solver.redshifts[0]
+    ehat = solver.emissivities[0][0]
+    tau = solver.tau[0][0]
+
+    assert table.shape == (z.size, E.size)
+
+    # Reference: Eq. 25 in Mirocha (2014), one redshift at a time.
+    x = 1. + z
+    Rsq = (x[1] / x[0])**2
+    tau_r = np.roll(tau, -1, axis=1)
+    ehat_r = np.roll(np.roll(ehat, -1, axis=0), -1, axis=1)
+
+    flux = np.zeros_like(E)
+    ref = [flux]
+    for ll in range(z.size - 2, -1, -1):
+        tb = 0.5 * (z[ll+1] - z[ll])
+        flux = c / 4. / np.pi * (x[ll]**2 * tb * ehat[ll]) \
+            + np.exp(-tau_r[ll]) * (c / 4. / np.pi * x[ll+1]**2 * tb \
+            * ehat_r[ll] + np.hstack((flux[1:], [0])) / Rsq)
+        flux[-1] = 0.0
+        ref.append(flux)
+
+    assert np.allclose(table, ref, rtol=1e-10, atol=0)
+    
+    # Second population doesn't solve the RTE, so no table.
+    p = {}
+    for key in pars:
+        if key.startswith('pop_'):
+            p['{}{{0}}'.format(key)] = p['{}{{1}}'.format(key)] = pars[key]
+        else:
+            p[key] = pars[key]
+            
+    p['pop_solve_rte{1}'] = False
+    
+    mgb = ares.simulations.MetaGalacticBackground(**p)
+    assert mgb.solver.FluxTable(1) is None
+    
+    # Now run the background as usual, but build the table part way 
+    # through (and again at the end).
+    for i in range(z.size // 2):
+        mgb.update_fluxes(popid=0)
+    
+    table_mid = mgb.solver.FluxTable(0)[0]
+    
+    fluxes = [mgb.update_fluxes(popid=0)[1][0] for i in range(z.size // 2, 
+        z.size)]
+    
+    table_end = mgb.solver.FluxTable(0)[0]
+    
+    assert np.array_equal(table_mid, table)
+    assert np.array_equal(table_end, table)
+    assert np.array_equal(fluxes, table[z.size // 2:])
+
+if __name__ == '__main__':
+    test()
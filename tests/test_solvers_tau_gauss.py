@@ -0,0 +1,42 @@
+"""
+
+test_solvers_tau_gauss.py
+
+Description: Make sure vectorized optical depth tables agree with quad.
+
+"""
+
+import ares
+import numpy as np
+
+def test(rtol=1e-4):
+    pars = \
+    {
+     'initial_redshift': 20.,
+     'final_redshift': 6.,
+     'first_light_redshift': 20.,
+     'tau_redshift_bins': 30,
+     'tau_Emin': 1e2,
+     'tau_Emax': 1e3,
+    }
+
+    for include_He in [0, 1]:
+        pars['include_He'] = pars['approx_He'] = include_He
+
+        tau = {}
+        for integrator in ['quad', 'gauss']:
+            igm = ares.solvers.OpticalDepth(tau_integrator=integrator,
+                **pars)
+            igm.ionization_history = lambda z: 0.1
+            tau[integrator] = igm.TabulateOpticalDepth()
+
+        assert tau['gauss'].shape == tau['quad'].shape
+        assert np.allclose(tau['gauss'], tau['quad'], rtol=rtol, atol=0), \
+            "Gauss-Legendre tau table disagrees with quad!"
+
+        # Error estimate should be conservative
+        err = np.abs(tau['gauss'] - tau['quad'])
+        assert np.all(err <= igm.tau_err + rtol * tau['quad'])
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,69 @@
+"""
+
+test_static_chemnet_eor.py
+
+Description: Make sure `monotonic_EoR` only switches off the hydrogen rate
+equations in cells that are already (nearly) fully ionized, and leaves the
+rest alone.
+
+"""
+
+import ares
+import numpy as np
+
+def test():
+
+    pf = \
+    {
+     'grid_cells': 2,
+     'isothermal': False,
+     'radiative_transfer': False,
+     'density_units': 1.0,
+     'initial_temperature': 1e4,
+     'initial_ionization': [1.-1e-4, 1e-4],
+    }
+
+    sim = ares.simulations.GasParcel(**pf)
+    grid = sim.grid
+    data = grid.data
+    chemnet = sim.chem.chemnet
+    chemnet.SourceIndependentCoefficients(data['Tk'])
+    ntot = grid.particle_density(data, 0.)
+
+    fields = grid.evolving_fields
+    i1, i2 = fields.index('h_1'), fields.index('h_2')
+
+    # First cell is done reionizing, the second is half-way there.
+    q = np.array([data[species] for species in fields])
+    q[i1] = [1e-8, 0.5]
+    q[i2] = 1. - q[i1]
+    q[fields.index('e')] = q[i2]
+
+    cells = slice(0, 2)
+    args = (cells, grid.zeros_absorbers, grid.zeros_absorbers2,
+        grid.zeros_absorbers, ntot, 0.0)
+
+    chemnet.monotonic_EoR = False
+    ref = chemnet.RateEquations(0.0, q.copy(), args).copy()
+
+    chemnet.monotonic_EoR = 1e-6
+    dqdt = chemnet.RateEquations(0.0, q.copy(), args).copy()
+
+    assert np.all(ref[i1] != 0)
+    assert np.allclose(ref[i2], -ref[i1])
+
+    # Done: both hydrogen equations off.
+    assert dqdt[i1,0] == dqdt[i2,0] == 0
+
+    # Not done: untouched (in particular, signs of h_1 and h_2 rates).
+    assert np.array_equal(dqdt[:,1], ref[:,1])
+
+    # Same thing one cell at a time.
+    for cell in range(2):
+        args = (cell, grid.zeros_absorbers, grid.zeros_absorbers2,
+            grid.zeros_absorbers, ntot[cell], 0.0)
+        dqdt_c = chemnet.RateEquations(0.0, q[:,cell].copy(), args)
+        assert np.allclose(dqdt_c, dqdt[:,cell], rtol=1e-12, atol=0)
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,34 @@
+"""
+
+test_static_integral_tables.py
+
+Description: Make sure rate integral tables computed all at once agree with
+those computed one column density at a time.
+
+"""
+
+import ares
+import numpy as np
+
+def test():
+    for discrete in [True, False]:
+        sim = ares.simulations.RaySegment(problem_type=2,
+            tables_discrete_gen=discrete, tables_chunk_size=7)
+
+        src = sim.field.sources[0]
+        tabs = src.tabs
+        tab = src.tab
+
+        for integral in ['Tau', 'Phi', 'Psi']:
+            name = tab._DatasetName(integral, 'h_1', 'h_1')
+
+            if name not in tabs:
+                continue
+
+            for j, ind in enumerate(tab.indices_N):
+                val = tab.Tabulate(integral, 'h_1', 'h_1', tab.Nall[j],
+                    ind=j)
+                assert np.allclose(tabs[name][ind], val, rtol=1e-8, atol=0)
+
+if __name__ == '__main__':
+    test()
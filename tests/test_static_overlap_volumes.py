@@ -0,0 +1,49 @@
+"""
+
+test_static_overlap_volumes.py
+
+Description: Make sure (separation x bubble size) volume tables and
+probability integrals agree with the one-separation-at-a-time approach.
+
+"""
+
+import ares
+import numpy as np
+
+def test():
+    R = np.exp(np.arange(-5, 5, 0.1))
+    R_i = np.logspace(-2, 1, 200)
+    R3 = np.zeros_like(R_i)
+
+    for temp, model in [(0, 1), (1, 1), (1, 2)]:
+        field = ares.static.Fluctuations(ps_include_temp=temp,
+            ps_temp_model=model)
+
+        R_s = 2 * R_i if temp else np.zeros_like(R_i)
+
+        OV = field._tabulate_volumes(field.overlap_volumes, R, R_i, R_s)
+        IV = field._tabulate_volumes(field.intersectional_volumes, R, R_i,
+            R_s, R3)
+
+        assert OV.shape == IV.shape == (R.size, 6, R_i.size)
+
+        for i, sep in enumerate(R):
+            assert np.allclose(OV[i], field.overlap_volumes(sep, R_i, R_s))
+            assert np.allclose(IV[i],
+                field.intersectional_volumes(sep, R_i, R_s, R3))
+
+    # Probabilities for all separations at once
+    M = np.logspace(6, 14, R_i.size)
+    dndm = 1e-3 * M**-1.9
+    V = OV[:,0,:]
+    ep = 0.1 * np.outer(np.exp(-R), np.ones_like(M))
+
+    P = field.get_prob(6., M, dndm, 1e8, V, True, ep)
+
+    assert P.shape == R.shape
+    for i, sep in enumerate(R):
+        assert np.allclose(P[i], field.get_prob(6., M, dndm, 1e8, V[i], True,
+            ep[i]), rtol=1e-12)
+
+if __name__ == '__main__':
+    test()
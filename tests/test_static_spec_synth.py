@@ -233,6 +233,48 @@ def test(show_bpass=False, oversample_age=30., dt_coarse=10):
     
     assert np.all(L2b[0] == L2)
     assert np.all(L3b[0] == L3)
+    
+    ##
+    # Test vectorized (convolution) luminosity histories against loop
+    ##
+    
+    sfh3 = np.random.rand(10, tarr2.size) * tarr2[None,:]
+    
+    L_by_conv = {}
+    for conv in [None, 'matrix', 'fft']:
+        ss3 = ares.static.SpectralSynthesis(pop_synth_conv=conv)
+        ss3.src = toy
+        ss3.oversampling_enabled = False
+        L_by_conv[conv] = ss3.Luminosity(sfh=sfh3, tarr=tarr2, load=False)
+    
+    assert np.allclose(L_by_conv['matrix'], L_by_conv[None], rtol=1e-8)
+    assert np.allclose(L_by_conv['fft'], L_by_conv[None], rtol=1e-8)
+    
+    # Steep SFHs: FFT round-off would swamp luminosities at early times.
+    tarr3 = np.arange(0, 1000, 1.)
+    sfh4 = np.array([np.exp(np.log(floor) * (1. - tarr3 / tarr3.max())) \
+        for floor in [1e-6, 1e-12, 1e-30]])
+    
+    L_by_conv = {}
+    for conv in [None, 'fft']:
+        ss3 = ares.static.SpectralSynthesis(pop_synth_conv=conv)
+        ss3.src = toy
+        ss3.oversampling_enabled = False
+        L_by_conv[conv] = ss3.Luminosity(sfh=sfh4, tarr=tarr3, load=False)
+        
+    assert np.all(L_by_conv['fft'] >= 0)
+    assert np.allclose(L_by_conv['fft'], L_by_conv[None], rtol=1e-8, atol=0)
+    
+    ##
+    # Test multi-wavelength synthesis against one-at-a-time
+    ##
+    waves = np.arange(1000., 3000., 100.)
+    spec = ss.Spectrum(waves, sfh=sfh3, tarr=tarr2, tobs=500., load=False)
+    Lw = np.array([ss.Luminosity(wave=wave, sfh=sfh3, tarr=tarr2, tobs=500., 
+        load=False) for wave in waves]).T
+    
+    assert spec.shape == (sfh3.shape[0], waves.size)
+    assert np.allclose(spec, Lw, rtol=1e-8)
                 
         #print("Mean error in L(t) with oversampling at t<{} Myr: {}".format(oversample_age,
         #    np.mean(err)))
@@ -0,0 +1,83 @@
+"""
+
+test_util_cache.py
+
+Description:
+
+"""
+
+import ares
+import time
+import pickle
+import threading
+import numpy as np
+from ares.util.Cache import LRUCache, fingerprint
+
+class _SlowKey(int):
+    def __hash__(self):
+        time.sleep(0)
+        return int.__hash__(self)
+
+def test():
+    x = np.arange(100.)
+    y = x.copy()
+
+    # Fingerprints should depend on contents, not identity.
+    assert fingerprint(x) == fingerprint(y)
+    assert fingerprint(x) != fingerprint(x + 1)
+    assert fingerprint(x) != fingerprint(x.reshape(10, 10))
+    assert fingerprint({'a': x, 'b': 1}) == fingerprint({'b': 1, 'a': y})
+    assert fingerprint({'a': x}) != fingerprint({'a': x[::-1]})
+
+    cache = LRUCache(maxsize=3)
+    for i in range(3):
+        cache.put(i, i**2)
+
+    # Touch first element so that it isn't evicted next
+    assert cache.get(0) == 0
+
+    cache.put(3, 9)
+    assert len(cache) == 3
+    assert 1 not in cache
+    assert cache.get(1) is None
+    assert cache.get(0) == 0
+
+    assert cache.hits == 2
+    assert cache.misses == 1
+    assert cache.evictions == 1
+    assert 0 < cache.hit_rate < 1
+
+    cache.clear()
+    assert len(cache) == 0
+    
+    # Share a small cache between threads, so that entries get evicted 
+    # between one thread checking for them and fetching them. Hashing keys
+    # gives up the GIL to make that more likely.
+    cache = LRUCache(maxsize=4)
+    errors = []
+    def work(seed):
+        try:
+            for i in np.random.RandomState(seed).randint(0, 8, size=1000):
+                key = _SlowKey(i)
+                if cache.get(key) is None:
+                    cache.put(key, i**2)
+        except Exception as err:
+            errors.append(err)
+        
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+        
+    assert not errors, errors
+    assert cache.hits + cache.misses == 8 * 1000
+    assert len(cache) <= 4
+    
+    # Should survive a round trip through pickle (lock and all)
+    cache2 = pickle.loads(pickle.dumps(cache))
+    assert cache2.stats == cache.stats
+    cache2.put(100, 1)
+
+if __name__ == '__main__':
+    test()
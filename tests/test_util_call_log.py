@@ -0,0 +1,54 @@
+"""
+
+test_util_call_log.py
+
+Description:
+
+"""
+
+import shutil
+import tempfile
+import numpy as np
+from ares.util.CallLog import CallLog, read_call_log
+
+def test():
+    path = tempfile.mkdtemp()
+    fn = '{}/test.000.calls.npy'.format(path)
+
+    try:
+        log = CallLog(fn, 3, Ncalls=10, flush_every=0)
+
+        # Wrap around the buffer a bit
+        for i in range(13):
+            log.begin(np.array([i, 2. * i, 3. * i]))
+            log.mark('sim')
+            log.mark('like')
+            log.mark('blobs')
+            log.end(-float(i))
+
+        # Pretend we died during the simulation
+        log.begin(np.array([-1., -1., -1.]))
+        log.flush()
+
+        data = read_call_log(fn)
+        assert len(data['call']) == 10
+        assert np.all(np.diff(data['call']) == 1)
+        assert data['call'][-1] == 14
+        assert np.array_equal(data['pars'][-1], [-1, -1, -1])
+        assert not data['done'][-1]
+        assert np.all(data['done'][0:-1])
+        assert np.array_equal(data['lnL'][0:-1], -np.arange(4, 13))
+        assert np.all(data['dt_sim'][0:-1] >= 0)
+
+        # On restart, should pick up where we left off.
+        log2 = CallLog(fn, 3, Ncalls=10)
+        log2.begin(np.zeros(3))
+        log2.end(0.0)
+        log2.flush()
+        assert read_call_log(fn)['call'][-1] == 15
+
+    finally:
+        shutil.rmtree(path)
+
+if __name__ == '__main__':
+    test()
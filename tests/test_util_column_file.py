@@ -0,0 +1,59 @@
+"""
+
+test_util_column_file.py
+
+Description:
+
+"""
+
+import os
+import shutil
+import tempfile
+import numpy as np
+from ares.util.ColumnFile import append_columns, read_columns, \
+    read_column_index
+
+def test():
+    path = tempfile.mkdtemp()
+    fn = '{}/test.chain'.format(path)
+
+    try:
+        chunks = [np.random.rand(40, 3) for i in range(3)]
+        for chunk in chunks:
+            append_columns(fn, chunk)
+
+        chain = read_columns(fn)
+        assert isinstance(chain, np.memmap)
+        assert chain.shape == (120, 3)
+        assert np.array_equal(chain, np.concatenate(chunks))
+        assert np.array_equal(read_columns(fn, mmap=False), chain)
+
+        # Simulate a checkpoint that died mid-write: stray bytes should be
+        # ignored on read and overwritten on the next append.
+        with open(fn + '.bin', 'ab') as f:
+            f.write(b'garbage')
+
+        append_columns(fn, chunks[0])
+        dtype, shape, rows = read_column_index(fn)
+        assert rows == 160
+        assert os.path.getsize(fn + '.bin') == 160 * 3 * dtype.itemsize
+        assert np.array_equal(read_columns(fn)[120:], chunks[0])
+
+        # Rows must have consistent shape
+        try:
+            append_columns(fn, np.ones((10, 4)))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('Should have complained about shape!')
+
+        # 1-D things, like logL, work too.
+        logL = -np.random.rand(50)
+        append_columns('{}/test.logL'.format(path), logL)
+        assert np.array_equal(read_columns('{}/test.logL'.format(path)), logL)
+
+    finally:
+        shutil.rmtree(path)
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,57 @@
+"""
+
+test_util_disk_cache.py
+
+Description:
+
+"""
+
+import os
+import glob
+import shutil
+import tempfile
+import numpy as np
+from ares.util.Cache import DiskCache, digest
+
+def test():
+    x = np.linspace(0, 1, 1000)
+
+    # Digests depend on contents only
+    assert digest({'a': x, 'b': 1}) == digest({'b': 1, 'a': x.copy()})
+    assert digest({'a': x, 'b': 1}) != digest({'a': x, 'b': 2})
+
+    path = tempfile.mkdtemp()
+
+    try:
+        cache = DiskCache('{}/cache'.format(path))
+        assert cache.get('nope') is None
+
+        keys = [digest(x * i) for i in range(3)]
+        for i, key in enumerate(keys):
+            cache.put(key, {'x': x * i, 'i': np.array(i)})
+            # Make access times unambiguous
+            os.utime(cache._fn(key), (i, i))
+
+        data = cache.get(keys[1])
+        assert np.array_equal(data['x'], x)
+        assert int(data['i']) == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        # No stray temporary files
+        assert len(glob.glob('{}/cache/*'.format(path))) == 3
+
+        # Shrink the cache: entry 0 is least recently used, since we just
+        # read entry 1.
+        size = os.path.getsize(cache._fn(keys[2]))
+        cache.maxbytes = 2.5 * size
+        cache.evict()
+        assert keys[0] not in cache
+        assert keys[1] in cache
+        assert keys[2] in cache
+        assert cache.evictions == 1
+
+    finally:
+        shutil.rmtree(path)
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,41 @@
+"""
+
+test_util_fftlog.py
+
+Description: Make sure FFTLog transforms agree with analytic results and
+with the quad-based transforms in HaloModel.
+
+"""
+
+import ares
+import numpy as np
+from ares.util.FFTLog import fftlog
+
+def test(rtol=5e-3):
+    k = np.exp(np.arange(-8, 4.001, 0.01))
+
+    # Gaussian P(k) has a Gaussian correlation function
+    R, cf = fftlog(k, np.exp(-k**2))
+    ok = np.logical_and(R > 0.1, R < 5)
+    cf_a = (4. * np.pi)**-1.5 * np.exp(-R**2 / 4.)
+    assert np.allclose(cf[ok] / 2. / np.pi**2, cf_a[ok], rtol=1e-3, atol=0)
+
+    # Something more like a matter power spectrum, vs. quad
+    ps = k / (1. + (k / 0.02)**2)**1.5 / (1. + k / 5.)
+
+    hm = ares.physics.HaloModel()
+    R = np.logspace(-1, 2, 7)
+
+    cf_q = hm.InverseFT3D(R, ps, k, method='clenshaw-curtis')
+    cf_f = hm.InverseFT3D(R, ps, k, method='fftlog')
+    assert np.allclose(cf_f, cf_q, rtol=rtol, atol=0)
+
+    # Round trip
+    Rg = np.exp(np.arange(-8, 8.001, 0.01))
+    cf = hm.InverseFT3D(Rg, ps, k, method='fftlog', pad=2000)
+    kk = np.logspace(-2, 0.5, 6)
+    ps_f = hm.FT3D(kk, cf, Rg, method='fftlog')
+    assert np.allclose(ps_f, np.interp(kk, k, ps), rtol=rtol, atol=0)
+
+if __name__ == '__main__':
+    test()
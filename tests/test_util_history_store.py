@@ -0,0 +1,52 @@
+"""
+
+test_util_history_store.py
+
+Description:
+
+"""
+
+import os
+import shutil
+import tempfile
+import numpy as np
+from ares.util.HistoryStore import HistoryStore, save_histories
+
+def test():
+    zarr = np.linspace(5, 20, 31)
+    Mh = 10**np.random.uniform(8, 12, size=(105, zarr.size))
+
+    hist = {'z': zarr, 'Mh': Mh, 'MAR': 1e-2 * Mh, 
+        'nh': np.random.rand(105, zarr.size)}
+
+    path = tempfile.mkdtemp()
+    fn = '{}/hgh'.format(path)
+    
+    try:
+        save_histories(fn, hist)
+        
+        store = HistoryStore(fn)
+        assert store.Nhalos == 105
+        assert np.array_equal(store['z'], zarr)
+        
+        # Blocks should cover all halos, exactly once.
+        blocks = list(store.blocks(20))
+        assert len(blocks) == 6
+        assert blocks[-1] == (100, 105)
+        
+        Mh_b = np.vstack([store.read(lo, hi)['Mh'] for lo, hi in blocks])
+        assert np.array_equal(Mh_b, Mh)
+        
+        # 1-D fields come along with every block
+        assert np.array_equal(store.read(20, 40)['z'], zarr)
+        
+        # Should behave the same if histories are already in memory.
+        store2 = HistoryStore(hist)
+        assert np.array_equal(store2.read(20, 40)['MAR'], 
+            store.read(20, 40)['MAR'])
+        
+    finally:
+        shutil.rmtree(path)
+
+if __name__ == '__main__':
+    test()
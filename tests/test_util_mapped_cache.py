@@ -0,0 +1,71 @@
+"""
+
+test_util_mapped_cache.py
+
+Description:
+
+"""
+
+import pickle
+import shutil
+import tempfile
+import numpy as np
+from ares.util.Cache import MappedCache, digest, pack_mapped, unpack_mapped
+
+class Holder(object):
+    def __getstate__(self):
+        return pack_mapped(self.__dict__)
+
+    def __setstate__(self, state):
+        self.__dict__.update(unpack_mapped(state))
+
+def test():
+    path = tempfile.mkdtemp()
+
+    try:
+        cache = MappedCache('{}/shared'.format(path))
+        x = np.random.rand(200, 300)
+        key = digest(x)
+
+        assert cache.get(key) is None
+        tabs = cache.put(key, {'x': x, 'y': np.arange(3)})
+        assert isinstance(tabs['x'], np.memmap)
+        assert np.array_equal(tabs['x'], x)
+
+        # Read-only!
+        try:
+            tabs['x'][0,0] = 0.
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('Shared tables should be read-only!')
+
+        # Writing the same entry again is harmless
+        tabs2 = cache.put(key, {'x': x, 'y': np.arange(3)})
+        assert np.array_equal(tabs2['y'], np.arange(3))
+        assert key in cache
+
+        # Pickling sends references, not data.
+        obj = Holder()
+        obj.x = tabs['x']
+        obj.z = np.ones(10)
+        s = pickle.dumps(obj)
+        assert len(s) < x.nbytes / 100
+
+        obj2 = pickle.loads(s)
+        assert isinstance(obj2.x, np.memmap)
+        assert np.array_equal(obj2.x, x)
+        assert np.array_equal(obj2.z, obj.z)
+
+        # Slices of shared tables are still pickled by value.
+        obj.x = tabs['x'][0:2]
+        assert np.array_equal(pickle.loads(pickle.dumps(obj)).x, x[0:2])
+
+        cache.clear()
+        assert key not in cache
+
+    finally:
+        shutil.rmtree(path)
+
+if __name__ == '__main__':
+    test()
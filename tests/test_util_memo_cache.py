@@ -0,0 +1,75 @@
+"""
+
+test_util_memo_cache.py
+
+Description:
+
+"""
+
+import shutil
+import tempfile
+import numpy as np
+from ares.util.Cache import MemoCache
+
+def test():
+    R = np.logspace(-1, 2, 50)
+
+    memo = MemoCache(maxsize={None: 2, 'Vo': 1}, ztol=1e-6)
+
+    assert memo.get('cf', 10., 'ii', R=R) is None
+    memo.put('cf', 10., 'ii', (R, R**-2), R=R)
+
+    # Round-off in redshift and copies of R are still hits.
+    _R, cf = memo.get('cf', 10. + 1e-9, 'ii', R=R.copy())
+    assert np.array_equal(cf, R**-2)
+
+    # Different scales or terms are not
+    assert memo.get('cf', 10., 'ii', R=R[0:-1]) is None
+    assert memo.get('cf', 10., 'hh', R=R) is None
+
+    # Bounded
+    for i, z in enumerate([11., 12., 13.]):
+        memo.put('cf', z, 'ii', (R, R**-i), R=R)
+    assert memo.get('cf', 10., 'ii', R=R) is None
+    assert len(memo.caches['cf']) == 2
+
+    memo.put('Vo', 10., None, np.ones((3, 3)), R=R)
+    memo.put('Vo', 11., None, np.ones((3, 3)), R=R)
+    assert len(memo.caches['Vo']) == 1
+
+    stats = memo.stats
+    assert stats['cf']['hits'] == 1
+    assert stats['cf']['misses'] == 4
+    assert stats['Vo']['evictions'] == 1
+
+    # Persist between "runs"
+    path = tempfile.mkdtemp()
+
+    try:
+        pars = {'ps_include_temp': False, 'ps_output_z': np.arange(6, 20)}
+        memo1 = MemoCache(path=path, model=pars, persist=['p', 'cf'])
+        memo1.put('p', 10., 'i', 0.5)
+        memo1.put('cf', 10., 'ii', (R, R**-2), R=R)
+        memo1.put('Vo', 10., None, np.ones(3), R=R)
+
+        memo2 = MemoCache(path=path, model=pars.copy(), persist=['p', 'cf'])
+        assert memo2.get('p', 10., 'i') == 0.5
+        _R, cf = memo2.get('cf', 10., 'ii', R=R)
+        assert np.array_equal(_R, R)
+        assert np.array_equal(cf, R**-2)
+        assert memo2.get('Vo', 10., R=R) is None
+
+        # Different model, no hits.
+        pars['ps_include_temp'] = True
+        memo3 = MemoCache(path=path, model=pars, persist=['p', 'cf'])
+        assert memo3.get('p', 10., 'i') is None
+
+        # Can't be reproduced in another session, so don't persist.
+        memo4 = MemoCache(path=path, model={'f': lambda x: x})
+        assert memo4.disk is None
+
+    finally:
+        shutil.rmtree(path)
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,32 @@
+"""
+
+test_util_mpi_pool.py
+
+Description: Make sure functions with resident arguments are cheap to ship.
+
+"""
+
+import numpy as np
+from ares.util.MPIPool import ResidentFunction, set_resident, _pickle
+
+def _like(pars, table, offset):
+    return np.sum(table * pars) + offset
+
+def test():
+    table = np.random.rand(1000, 100)
+    pars = np.random.rand(100)
+
+    set_resident('test', (_like, (table, 3.)))
+
+    func = ResidentFunction('test')
+    assert func(pars) == _like(pars, table, 3.)
+
+    # What a worker would receive each time
+    task = _pickle.dumps((func, pars))
+    assert len(task) < 2e3
+
+    func2, pars2 = _pickle.loads(task)
+    assert func2(pars2) == func(pars)
+
+if __name__ == '__main__':
+    test()